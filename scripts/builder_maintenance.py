@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Batched builder maintenance: id resolution, builder writes, topic assignment
+
+Builder scripts used to resolve every lookup id with its own `sf data query`
+subprocess and then POST one TopicAssignment per curl call. Here each step is
+one round trip no matter how many builders or topics are involved:
+- resolve(): builder, topic, RecordType and record ids come from one composite
+  request of up to 5 SOQL subrequests, or none if the id cache has them all
+- save_builders(): inserts and updates in one composite request (per 25)
+- assign_topics(): every TopicAssignment in one collection insert (per 200)
+
+Resolved ids are cached per org in tests/.harness_state/builder_ids.json.
+Cached ids are checked by the org whenever they are used: a write rejected for
+a deleted or invalid id (builder, topic, RecordType or record) re-resolves the
+cached ids it sent in one composite request and retries once.
+
+Usage:
+    ops = BuilderMaintenance(SalesforceClient.from_cli(ORG_ALIAS))
+    ids = ops.resolve(builders=["Evidence Binding Rules v2"], topics=["P0"],
+                      record_types=[("ccai__AI_Prompt__c", "Builder")])
+    ops.save_builders(updates={"Evidence Binding Rules v2": {...}}, inserts=[{...}])
+    ops.assign_topics([builder_id], [topic_id])
+"""
+
+import json
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tests"))
+from harness.sf_client import COMPOSITE_MAX_QUERIES, COMPOSITE_MAX_SUBREQUESTS, SalesforceError
+
+ID_CACHE_FILE = REPO_ROOT / "tests" / ".harness_state" / "builder_ids.json"
+
+# Write errors that mean an id we sent is stale
+STALE_ID_ERRORS = {"ENTITY_IS_DELETED", "INVALID_CROSS_REFERENCE_KEY", "INVALID_ID_FIELD",
+                   "MALFORMED_ID", "NOT_FOUND"}
+# A topic already on the record counts as assigned
+ALREADY_ASSIGNED_ERRORS = {"DUPLICATE_VALUE"}
+
+
+def builder_key(name):
+    return f"builder:{name}"
+
+
+def topic_key(name):
+    return f"topic:{name}"
+
+
+def record_type_key(sobject, developer_name):
+    return f"recordType:{sobject}.{developer_name}"
+
+
+def record_key(sobject, record_id):
+    return f"record:{sobject}:{record_id}"
+
+
+def soql_list(values):
+    return ",".join("'" + str(v).replace("\\", "\\\\").replace("'", "\\'") + "'" for v in values)
+
+
+def error_codes(body):
+    """errorCode / statusCode values of a composite or collection error body"""
+    if isinstance(body, dict):
+        body = body.get("errors") or []
+    return {e.get("errorCode") or e.get("statusCode") for e in body or [] if isinstance(e, dict)}
+
+
+class IdCache:
+    """Name -> id per org, persisted between runs"""
+
+    def __init__(self, org_key, path=ID_CACHE_FILE):
+        self.org_key = org_key
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r') as f:
+                self.all = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.all = {}
+        self.ids = self.all.setdefault(org_key, {})
+
+    def get(self, key):
+        return self.ids.get(key)
+
+    def put(self, key, record_id):
+        if record_id:
+            self.ids[key] = record_id
+        else:
+            self.ids.pop(key, None)
+
+    def evict(self, keys):
+        for key in keys:
+            self.ids.pop(key, None)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.all, f, indent=2, sort_keys=True)
+
+
+class BuilderMaintenance:
+    """Builder lookups and writes in a fixed handful of round trips"""
+
+    def __init__(self, client, cache=None):
+        self.client = client
+        self.cache = cache or IdCache(client.instance_url)
+        self.round_trips = 0
+
+    # -- Id resolution ------------------------------------------------------
+
+    def _queries(self, builders, topics, record_types, records):
+        """(referenceId, soql, {name field value: cache key}) per lookup group"""
+        queries = []
+        if builders:
+            queries.append(("builders",
+                            "SELECT Id, Name FROM ccai__AI_Prompt__c WHERE RecordType.DeveloperName = 'Builder' "
+                            f"AND Name IN ({soql_list(builders)}) ORDER BY CreatedDate",
+                            "Name", {name: builder_key(name) for name in builders}))
+        if topics:
+            queries.append(("topics", f"SELECT Id, Name FROM Topic WHERE Name IN ({soql_list(topics)})",
+                            "Name", {name: topic_key(name) for name in topics}))
+        if record_types:
+            sobjects = sorted({sobject for sobject, _ in record_types})
+            names = sorted({name for _, name in record_types})
+            queries.append(("recordTypes",
+                            "SELECT Id, SobjectType, DeveloperName FROM RecordType "
+                            f"WHERE SobjectType IN ({soql_list(sobjects)}) AND DeveloperName IN ({soql_list(names)})",
+                            None, {f"{s}.{n}": record_type_key(s, n) for s, n in record_types}))
+        by_sobject = {}
+        for sobject, record_id in records:
+            by_sobject.setdefault(sobject, []).append(record_id)
+        for i, (sobject, record_ids) in enumerate(sorted(by_sobject.items())):
+            queries.append((f"records{i}", f"SELECT Id FROM {sobject} WHERE Id IN ({soql_list(record_ids)})",
+                            "Id", {record_id: record_key(sobject, record_id) for record_id in record_ids}))
+        return queries
+
+    def resolve(self, builders=(), topics=(), record_types=(), records=(), refresh=()):
+        """
+        {cache key: id or None} for every requested lookup
+        Cached ids are returned as is, except for the keys in refresh (use it when
+        the answer decides whether to insert); the rest are queried in one composite request.
+        """
+        wanted = ([builder_key(n) for n in builders] + [topic_key(n) for n in topics]
+                  + [record_type_key(s, n) for s, n in record_types]
+                  + [record_key(s, i) for s, i in records])
+        missing = [key for key in wanted if key in refresh or self.cache.get(key) is None]
+        if missing:
+            missing_set = set(missing)
+            queries = self._queries(
+                [n for n in builders if builder_key(n) in missing_set],
+                [n for n in topics if topic_key(n) in missing_set],
+                [(s, n) for s, n in record_types if record_type_key(s, n) in missing_set],
+                [(s, i) for s, i in records if record_key(s, i) in missing_set])
+            if len(queries) > COMPOSITE_MAX_QUERIES:
+                raise ValueError(f"At most {COMPOSITE_MAX_QUERIES} lookup groups per resolve, got {len(queries)}")
+            responses = self.client.composite([
+                {"method": "GET", "url": f"/query?q={quote(soql)}", "referenceId": ref}
+                for ref, soql, _, _ in queries])
+            self.round_trips += 1
+            for ref, _, name_field, keys in queries:
+                status, body = responses[ref]
+                if status >= 400:
+                    raise SalesforceError(f"Lookup {ref} failed: {body}", status=status, body=body)
+                found = {}
+                for row in body.get("records", []):
+                    name = row[name_field] if name_field else f"{row['SobjectType']}.{row['DeveloperName']}"
+                    # Oldest record wins for duplicate names, like the old LIMIT-less [0] lookups
+                    found.setdefault(name, row["Id"])
+                for name, key in keys.items():
+                    self.cache.put(key, found.get(name))
+            self.cache.save()
+        return {key: self.cache.get(key) for key in wanted}
+
+    def refresh(self, keys):
+        """Re-resolve cache keys in one composite request; {key: id or None}"""
+        builders, topics, record_types, records = [], [], [], []
+        for key in keys:
+            kind, _, rest = key.partition(":")
+            if kind == "builder":
+                builders.append(rest)
+            elif kind == "topic":
+                topics.append(rest)
+            elif kind == "recordType":
+                record_types.append(tuple(rest.split(".", 1)))
+            elif kind == "record":
+                records.append(tuple(rest.split(":", 1)))
+        return self.resolve(builders, topics, record_types, records, refresh=set(keys))
+
+    def _refresh_ids(self, rows):
+        """
+        Re-resolve the cached ids used by rows (field dicts) the org rejected as stale
+        Returns one row per input with the current ids swapped in, or None where an id
+        is gone from the org or was not ours to re-resolve.
+        """
+        sent = {value for row in rows for value in row.values() if isinstance(value, str)}
+        keys = {record_id: key for key, record_id in self.cache.ids.items() if record_id in sent}
+        fresh = self.refresh(set(keys.values())) if keys else {}
+        current = {old_id: fresh[key] for old_id, key in keys.items()}
+        refreshed = []
+        for row in rows:
+            used = [value for value in row.values() if isinstance(value, str) and value in current]
+            if used and all(current[value] for value in used):
+                refreshed.append({field: current.get(value, value) if isinstance(value, str) else value
+                                  for field, value in row.items()})
+            else:
+                refreshed.append(None)
+        return refreshed
+
+    # -- Writes ---------------------------------------------------------------
+
+    def save_builders(self, updates=None, inserts=()):
+        """
+        Update builders by name ({name: fields}) and insert new ones ([fields with Name])
+        One composite request per 25 writes; returns {name: id} of the records saved.
+        Update targets come from resolve(); a write rejected for a stale cached id
+        (the target, a RecordTypeId, a lookup) is re-resolved and retried once.
+        """
+        updates = dict(updates or {})
+        ids = self.resolve(builders=list(updates)) if updates else {}
+        unknown = [name for name in updates if ids.get(builder_key(name)) is None]
+        if unknown:
+            raise SalesforceError(f"No Builder record named: {', '.join(unknown)}")
+
+        # (name, fields): an Id makes the write an update of that record
+        rows = [(name, {"Id": ids[builder_key(name)], **fields}) for name, fields in updates.items()]
+        rows += [(fields["Name"], dict(fields)) for fields in inserts]
+
+        def subrequests(rows):
+            subs = []
+            for i, (name, fields) in enumerate(rows):
+                fields = dict(fields)
+                record_id = fields.pop("Id", None)
+                url = "/sobjects/ccai__AI_Prompt__c" + (f"/{record_id}" if record_id else "")
+                subs.append({"method": "PATCH" if record_id else "POST", "url": url,
+                             "referenceId": f"write{i}", "body": fields, "name": name})
+            return subs
+
+        saved, stale = self._write(subrequests(rows))
+        if stale:
+            rows = [(name, fields) for name, fields in rows if name in stale]
+            refreshed = self._refresh_ids([fields for _, fields in rows])
+            gone = [name for (name, _), fields in zip(rows, refreshed) if fields is None]
+            more, stale = self._write(subrequests([(name, fields) for (name, _), fields in zip(rows, refreshed)
+                                                   if fields is not None]))
+            saved.update(more)
+            if gone or stale:
+                raise SalesforceError(f"Builder writes use ids gone from the org: {', '.join(gone + stale)}")
+        for name, record_id in saved.items():
+            self.cache.put(builder_key(name), record_id)
+        self.cache.save()
+        return saved
+
+    def _write(self, subrequests):
+        """({name: id} saved, [names rejected for a stale id]); other failures raise"""
+        saved, stale, failures = {}, [], []
+        for start in range(0, len(subrequests), COMPOSITE_MAX_SUBREQUESTS):
+            batch = subrequests[start:start + COMPOSITE_MAX_SUBREQUESTS]
+            responses = self.client.composite([{k: v for k, v in sub.items() if k != "name"} for sub in batch])
+            self.round_trips += 1
+            for sub in batch:
+                status, body = responses[sub["referenceId"]]
+                if status < 400:
+                    saved[sub["name"]] = body["id"] if body else sub["url"].rsplit("/", 1)[-1]
+                elif error_codes(body) & STALE_ID_ERRORS:
+                    stale.append(sub["name"])
+                else:
+                    failures.append(f"{sub['name']}: {body}")
+        if failures:
+            raise SalesforceError("Builder writes failed: " + "; ".join(failures))
+        return saved, stale
+
+    def assign_topics(self, entity_ids, topic_ids):
+        """
+        Assign every topic to every entity with one collection insert per 200 assignments
+        Returns the number of new assignments (ones already present are not an error).
+        Assignments rejected for a stale cached topic or entity id are re-resolved and retried once.
+        """
+        assignments = [{"EntityId": entity_id, "TopicId": topic_id}
+                       for entity_id in entity_ids for topic_id in topic_ids]
+        created, failures = 0, []
+        for attempt in range(2):
+            if not assignments:
+                break
+            results = self.client.create_records("TopicAssignment", assignments)
+            self.round_trips += -(-len(assignments) // 200)
+            stale = []
+            for assignment, result in zip(assignments, results):
+                codes = error_codes(result)
+                if result.get("success"):
+                    created += 1
+                elif attempt == 0 and codes & STALE_ID_ERRORS:
+                    stale.append(assignment)
+                elif not codes & ALREADY_ASSIGNED_ERRORS:
+                    failures.append(f"{assignment['TopicId']} -> {assignment['EntityId']}: {result.get('errors')}")
+            refreshed = self._refresh_ids(stale) if stale else []
+            failures += [f"{assignment['TopicId']} -> {assignment['EntityId']}: id gone from the org"
+                         for assignment, fields in zip(stale, refreshed) if fields is None]
+            assignments = [fields for fields in refreshed if fields is not None]
+        if failures:
+            raise SalesforceError("Topic assignments failed: " + "; ".join(failures))
+        return created
@@ -2,11 +2,24 @@
 """
 Create complete builder prompts with FULL content from source files
 Uses SF CLI data create commands with proper content escaping
+
+Content comes from heading sections of the markdown sources (harness/doc_index.py),
+and only builders whose section changed since the last successful run against
+this org, or whose record is no longer in the org, are deleted and recreated
+(--all rebuilds every one).
 """
 
+import argparse
+import hashlib
 import subprocess
 import json
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from harness.doc_index import BuildLedger, DocumentIndex
+from harness.sf_client import SalesforceClient
+from sync_builders import query_org_builders
 
 # Correct DCM and Connection IDs
 CORRECT_DCM = "a05QH000008PLavYAG"
@@ -14,10 +27,8 @@ CORRECT_AI_CONNECTION = "a01gD000003okzEQAQ"
 BUILDER_RT_ID = "012QH0000045bz7YAA"
 ORG_ALIAS = "agentictso"
 
-def read_file_content(filepath):
-    """Read full content from file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.read()
+ANALYTICAL_PATTERNS = 'tests/phase0b/patterns/ANALYTICAL_PATTERNS.md'
+UI_COMPONENTS = 'tests/phase0b/patterns/UI_COMPONENTS.md'
 
 def escape_for_json(text):
     """Escape text for JSON"""
@@ -59,38 +70,40 @@ def create_builder(name, category, prompt_command, how_it_works=None):
         print(f"❌ Failed to create {name}: {result.stderr}")
         return None
 
+def record_builds(client, ledger, builders_created):
+    """Ledger the created records as the org holds them now (one query for their LastModifiedDate)"""
+    if builders_created:
+        ids = ",".join(f"'{builder_id}'" for _, builder_id, _ in builders_created)
+        records = {r["Id"]: r for r in client.query(
+            f"SELECT Id, LastModifiedDate FROM ccai__AI_Prompt__c WHERE Id IN ({ids})")}
+        for name, builder_id, content_sha in builders_created:
+            if builder_id in records:
+                ledger.record(name, content_sha, records[builder_id])
+    ledger.save()
+
 def main():
+    parser = argparse.ArgumentParser(description="Create the complete builders from their source documents")
+    parser.add_argument("--all", action="store_true", help="rebuild every builder, changed or not")
+    args = parser.parse_args()
+
     print("=== CREATING COMPLETE BUILDERS WITH FULL CONTENT ===\n")
     
-    # Step 1: Delete existing incomplete builders
-    print("Step 1: Deleting incomplete builders...")
-    delete_cmd = f"""sf data delete bulk -o {ORG_ALIAS} -s ccai__AI_Prompt__c -w "RecordType.DeveloperName='Builder' AND Name IN ('Evidence Binding Rules v2','Risk Assessment Pattern','Stat Card Component','Alert Box Component','Healthcare Payer Context')" """
-    subprocess.run(delete_cmd, shell=True)
-    print("✅ Deleted old builders\n")
+    # Step 1: Read full content from source files (each document is parsed once, then cached)
+    print("Step 1: Reading full content from source files...")
+    index = DocumentIndex()
     
-    # Step 2: Read full content from source files
-    print("Step 2: Reading full content from source files...")
-    
-    evidence_binding_full = read_file_content('docs/quality-rules/evidence_binding_v2.md')
+    evidence_binding_full = index.read('docs/quality-rules/evidence_binding_v2.md')
     print(f"  - Evidence Binding: {len(evidence_binding_full)} characters")
     
-    # Read Risk Assessment pattern (lines 9-56 from ANALYTICAL_PATTERNS.md)
-    with open('tests/phase0b/patterns/ANALYTICAL_PATTERNS.md', 'r') as f:
-        lines = f.readlines()
-        risk_pattern_full = ''.join(lines[8:160])  # Full Pattern 1 section
+    risk_pattern_full = index.read(ANALYTICAL_PATTERNS, "PATTERN 1: Risk Assessment & Identification")
     print(f"  - Risk Assessment: {len(risk_pattern_full)} characters")
     
-    # Read Stat Card component (lines 9-87 from UI_COMPONENTS.md)
-    with open('tests/phase0b/patterns/UI_COMPONENTS.md', 'r') as f:
-        lines = f.readlines()
-        stat_card_full = ''.join(lines[8:87])
+    stat_card_full = index.read(UI_COMPONENTS, "COMPONENT 1: Stat Card / Metric Tile")
     print(f"  - Stat Card: {len(stat_card_full)} characters")
     
-    # Read Alert Box component (lines 336-417 from UI_COMPONENTS.md)
-    with open('tests/phase0b/patterns/UI_COMPONENTS.md', 'r') as f:
-        lines = f.readlines()
-        alert_box_full = ''.join(lines[335:417])
+    alert_box_full = index.read(UI_COMPONENTS, "COMPONENT 5: Alert/Info Box")
     print(f"  - Alert Box: {len(alert_box_full)} characters")
+    index.save()
     
     # Create Healthcare context (use full version from script)
     healthcare_full = """=== CONTEXT TEMPLATE: HEALTHCARE PAYER ===
@@ -101,41 +114,47 @@ Industry-specific context, terminology, and heuristics for healthcare payer/insu
 """
     print(f"  - Healthcare Context: {len(healthcare_full)} characters\n")
     
+    builders = [
+        ("Evidence Binding Rules v2", "Quality Rule", evidence_binding_full),
+        ("Risk Assessment Pattern", "Pattern", risk_pattern_full),
+        ("Stat Card Component", "UI Component", stat_card_full),
+        ("Alert Box Component", "UI Component", alert_box_full),
+        ("Healthcare Payer Context", "Context Template", healthcare_full),
+    ]
+    client = SalesforceClient.from_cli(ORG_ALIAS)
+    ledger = BuildLedger("create_complete_builders", client.instance_url)
+    changed = [(name, category, content, hashlib.sha256(content.encode('utf-8')).hexdigest())
+               for name, category, content in builders]
+    if not args.all:
+        org, _ = query_org_builders(client, BUILDER_RT_ID)
+        changed = [builder for builder in changed if ledger.changed(builder[0], builder[3], org.get(builder[0]))]
+    if not changed:
+        print("✅ No builder content changed since the last run and every builder is in the org "
+              "(use --all to rebuild anyway)")
+        return
+    
+    # Step 2: Delete the builders being rebuilt
+    print(f"Step 2: Deleting {len(changed)} changed builders...")
+    names = ",".join(f"'{name}'" for name, _, _, _ in changed)
+    delete_cmd = f"""sf data delete bulk -o {ORG_ALIAS} -s ccai__AI_Prompt__c -w "RecordType.DeveloperName='Builder' AND Name IN ({names})" """
+    subprocess.run(delete_cmd, shell=True)
+    print("✅ Deleted old builders\n")
+    
     # Step 3: Create builders
     print("Step 3: Creating builders with full content...\n")
     
     builders_created = []
-    
-    # 1. Evidence Binding
-    id1 = create_builder("Evidence Binding Rules v2", "Quality Rule", evidence_binding_full)
-    if id1:
-        builders_created.append(("Evidence Binding", id1))
-    
-    # 2. Risk Assessment
-    id2 = create_builder("Risk Assessment Pattern", "Pattern", risk_pattern_full)
-    if id2:
-        builders_created.append(("Risk Assessment", id2))
-    
-    # 3. Stat Card
-    id3 = create_builder("Stat Card Component", "UI Component", stat_card_full)
-    if id3:
-        builders_created.append(("Stat Card", id3))
-    
-    # 4. Alert Box
-    id4 = create_builder("Alert Box Component", "UI Component", alert_box_full)
-    if id4:
-        builders_created.append(("Alert Box", id4))
-    
-    # 5. Healthcare Context
-    id5 = create_builder("Healthcare Payer Context", "Context Template", healthcare_full)
-    if id5:
-        builders_created.append(("Healthcare", id5))
+    for name, category, content, content_sha in changed:
+        builder_id = create_builder(name, category, content)
+        if builder_id:
+            builders_created.append((name, builder_id, content_sha))
+    record_builds(client, ledger, builders_created)
     
     print(f"\n✅ Created {len(builders_created)} builders with COMPLETE content")
     
     # Summary
     print("\n=== SUMMARY ===")
-    for name, id in builders_created:
+    for name, id, _ in builders_created:
         print(f"  {name}: {id}")
     
     print("\n🎯 ALL BUILDERS NOW HAVE FULL CONTENT AND CORRECT DCM")
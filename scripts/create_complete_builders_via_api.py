@@ -2,11 +2,26 @@
 """
 Create complete builder prompts with FULL content using Salesforce REST API
 Avoids Apex string escaping issues
+
+Content comes from heading sections of the markdown sources (harness/doc_index.py),
+and only builders whose section changed since the last successful run against
+this org, or whose record is no longer in the org, are deleted and recreated
+(--all rebuilds every one).
 """
 
+import argparse
+import hashlib
 import subprocess
 import json
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from harness.doc_index import BuildLedger, DocumentIndex
+from harness.sf_client import SalesforceClient
+from create_complete_builders import record_builds
+from sync_builders import query_org_builders
 
 # Configuration
 ORG_ALIAS = "agentictso"
@@ -14,6 +29,9 @@ CORRECT_DCM = "a05QH000008PLavYAG"
 CORRECT_AI_CONNECTION = "a01gD000003okzEQAQ"
 BUILDER_RT_ID = "012QH0000045bz7YAA"
 
+ANALYTICAL_PATTERNS = 'tests/phase0b/patterns/ANALYTICAL_PATTERNS.md'
+UI_COMPONENTS = 'tests/phase0b/patterns/UI_COMPONENTS.md'
+
 def get_access_token():
     """Get Salesforce access token from CLI"""
     cmd = f"sf org display --target-org {ORG_ALIAS} --json"
@@ -21,12 +39,13 @@ def get_access_token():
     data = json.loads(result.stdout)
     return data['result']['accessToken'], data['result']['instanceUrl']
 
-def delete_existing_builders():
-    """Delete incomplete builders"""
-    print("Step 1: Deleting incomplete builders...")
+def delete_existing_builders(names):
+    """Delete the builders about to be recreated"""
+    print("Step 2: Deleting changed builders...")
     
     # Query existing builders
-    query = "SELECT Id FROM ccai__AI_Prompt__c WHERE RecordType.DeveloperName='Builder' AND Name IN ('Evidence Binding Rules v2','Risk Assessment Pattern','Stat Card Component','Alert Box Component','Healthcare Payer Context')"
+    name_list = ",".join(f"'{name}'" for name in names)
+    query = f"SELECT Id FROM ccai__AI_Prompt__c WHERE RecordType.DeveloperName='Builder' AND Name IN ({name_list})"
     
     cmd = f"sf data query -o {ORG_ALIAS} --query \"{query}\" --json"
     result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
@@ -98,41 +117,32 @@ def create_builder_via_api(name, category, prompt_command, description=None, how
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description="Create the complete builders from their source documents")
+    parser.add_argument("--all", action="store_true", help="rebuild every builder, changed or not")
+    args = parser.parse_args()
+
     print("=== CREATING COMPLETE BUILDERS VIA REST API ===\n")
     
-    # Delete existing
-    delete_existing_builders()
-    
-    # Read full content
-    print("Step 2: Reading full content from source files...\n")
+    # Read full content (each document is parsed once into heading sections, then cached)
+    print("Step 1: Reading full content from source files...\n")
+    index = DocumentIndex()
     
     # 1. Evidence Binding - Full content
-    with open('docs/quality-rules/evidence_binding_v2.md', 'r', encoding='utf-8') as f:
-        evidence_content = f.read()
+    evidence_content = index.read('docs/quality-rules/evidence_binding_v2.md')
     
     # 2. Risk Assessment - Full Pattern 1 section
-    with open('tests/phase0b/patterns/ANALYTICAL_PATTERNS.md', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        # Extract Pattern 1 (lines 9-57)
-        risk_content = ''.join(lines[8:57])
+    risk_content = index.read(ANALYTICAL_PATTERNS, "PATTERN 1: Risk Assessment & Identification")
     
     # 3. Stat Card - Full Component 1
-    with open('tests/phase0b/patterns/UI_COMPONENTS.md', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        # Extract Component 1 (lines 9-87)
-        stat_card_content = ''.join(lines[8:87])
+    stat_card_content = index.read(UI_COMPONENTS, "COMPONENT 1: Stat Card / Metric Tile")
     
     # 4. Alert Box - Full Component 5
-    with open('tests/phase0b/patterns/UI_COMPONENTS.md', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        # Extract Component 5 (lines 336-417)
-        alert_box_content = ''.join(lines[335:417])
+    alert_box_content = index.read(UI_COMPONENTS, "COMPONENT 5: Alert/Info Box")
     
     # 5. Healthcare Context - Read from phase0c if it exists
     healthcare_file = 'tests/phase0c/evidence_binding_v2.md'
     if os.path.exists(healthcare_file):
-        with open(healthcare_file, 'r', encoding='utf-8') as f:
-            healthcare_content = f.read()
+        healthcare_content = index.read(healthcare_file)
     else:
         # Use abbreviated version
         healthcare_content = """=== CONTEXT TEMPLATE: HEALTHCARE PAYER ===
@@ -178,37 +188,51 @@ BENCHMARKS:
     print(f"  Stat Card: {len(stat_card_content)} chars")
     print(f"  Alert Box: {len(alert_box_content)} chars")
     print(f"  Healthcare: {len(healthcare_content)} chars\n")
+    index.save()
+    
+    definitions = [
+        ("Evidence Binding Rules v2", "Quality Rule", evidence_content,
+         "Complete evidence binding rules v2 - insight-first approach"),
+        ("Risk Assessment Pattern", "Pattern", risk_content,
+         "Complete risk assessment pattern with examples"),
+        ("Stat Card Component", "UI Component", stat_card_content,
+         "Complete stat card UI component with HTML templates"),
+        ("Alert Box Component", "UI Component", alert_box_content,
+         "Complete alert box UI component with color schemes"),
+        ("Healthcare Payer Context", "Context Template", healthcare_content,
+         "Healthcare payer industry context and heuristics"),
+    ]
+    client = SalesforceClient.from_cli(ORG_ALIAS)
+    ledger = BuildLedger("create_complete_builders_via_api", client.instance_url)
+    changed = [(definition, hashlib.sha256(definition[2].encode('utf-8')).hexdigest())
+               for definition in definitions]
+    if not args.all:
+        org, _ = query_org_builders(client, BUILDER_RT_ID)
+        changed = [(definition, sha) for definition, sha in changed
+                   if ledger.changed(definition[0], sha, org.get(definition[0]))]
+    if not changed:
+        print("✅ No builder content changed since the last run and every builder is in the org "
+              "(use --all to rebuild anyway)")
+        return
+    
+    # Delete the builders being rebuilt
+    delete_existing_builders([definition[0] for definition, _ in changed])
     
     # Create builders
     print("Step 3: Creating builders via REST API...\n")
     
     builders = []
-    
-    id1 = create_builder_via_api("Evidence Binding Rules v2", "Quality Rule", evidence_content, 
-                                  "Complete evidence binding rules v2 - insight-first approach")
-    if id1: builders.append(("Evidence Binding", id1))
-    
-    id2 = create_builder_via_api("Risk Assessment Pattern", "Pattern", risk_content,
-                                  "Complete risk assessment pattern with examples")
-    if id2: builders.append(("Risk Assessment", id2))
-    
-    id3 = create_builder_via_api("Stat Card Component", "UI Component", stat_card_content,
-                                  "Complete stat card UI component with HTML templates")
-    if id3: builders.append(("Stat Card", id3))
-    
-    id4 = create_builder_via_api("Alert Box Component", "UI Component", alert_box_content,
-                                  "Complete alert box UI component with color schemes")
-    if id4: builders.append(("Alert Box", id4))
-    
-    id5 = create_builder_via_api("Healthcare Payer Context", "Context Template", healthcare_content,
-                                  "Healthcare payer industry context and heuristics")
-    if id5: builders.append(("Healthcare", id5))
+    for (name, category, content, description), content_sha in changed:
+        builder_id = create_builder_via_api(name, category, content, description)
+        if builder_id:
+            builders.append((name, builder_id, content_sha))
+    record_builds(client, ledger, builders)
     
     print(f"\n{'='*60}")
     print(f"✅ CREATED {len(builders)} COMPLETE BUILDERS")
     print(f"{'='*60}\n")
     
-    for name, builder_id in builders:
+    for name, builder_id, _ in builders:
         print(f"  {name}: {builder_id}")
     
     print("\n🎯 All builders now have FULL content + correct DCM")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Differential sync of the builder library into the org
+
+Local builders come from scripts/data/*_builders.json and the markdown
+sources the create_complete_builders scripts read. Each builder is turned
+into its ccai__AI_Prompt__c field values and hashed.
+
+One SOQL query lists the org's Builder records (Id, Name, LastModifiedDate).
+A builder is skipped when the org record is the one last synced: same Id,
+same LastModifiedDate, and the local hash matches the one stored at that
+sync. Everything else is written through sObject Collections, up to 200
+records per request: updates for names that exist, inserts for new ones.
+Re-syncing an unchanged library costs one query and zero writes.
+
+Sync state lives in tests/.harness_state/builder_sync.json, per org.
+
+Usage:
+    python3 scripts/sync_builders.py --dry-run
+    python3 scripts/sync_builders.py
+    python3 scripts/sync_builders.py --force
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tests"))
+from harness.doc_index import WHOLE_DOCUMENT, DocumentIndex
+from harness.sf_client import COLLECTION_BATCH_SIZE, SalesforceClient
+
+ORG_ALIAS = "agentictso"
+CORRECT_DCM = "a05QH000008PLavYAG"
+CORRECT_AI_CONNECTION = "a01gD000003okzEQAQ"
+BUILDER_RT_ID = "012QH0000045bz7YAA"
+
+DATA_DIR = REPO_ROOT / "scripts" / "data"
+STATE_FILE = REPO_ROOT / "tests" / ".harness_state" / "builder_sync.json"
+
+# Builders whose content is a markdown file, or one heading section of it
+MARKDOWN_BUILDERS = [
+    {
+        "name": "Evidence Binding Rules v2",
+        "category": "Quality Rule",
+        "source": "docs/quality-rules/evidence_binding_v2.md",
+        "description": "Complete evidence binding rules v2 - insight-first approach",
+    },
+    {
+        "name": "Risk Assessment Pattern",
+        "category": "Pattern",
+        "source": "tests/phase0b/patterns/ANALYTICAL_PATTERNS.md",
+        "section": "PATTERN 1: Risk Assessment & Identification",
+        "description": "Complete risk assessment pattern with examples",
+    },
+    {
+        "name": "Stat Card Component",
+        "category": "UI Component",
+        "source": "tests/phase0b/patterns/UI_COMPONENTS.md",
+        "section": "COMPONENT 1: Stat Card / Metric Tile",
+        "description": "Complete stat card UI component with HTML templates",
+    },
+    {
+        "name": "Alert Box Component",
+        "category": "UI Component",
+        "source": "tests/phase0b/patterns/UI_COMPONENTS.md",
+        "section": "COMPONENT 5: Alert/Info Box",
+        "description": "Complete alert box UI component with color schemes",
+    },
+    {
+        "name": "Next Best Action Pattern",
+        "category": "Pattern",
+        "source": "docs/quality-rules/next_best_action_pattern.md",
+        "how_it_works": "Provides specific, actionable recommendations with clear owners, deadlines, and evidence. "
+                        "Enforces use of actual names, specific dates, and bounded actions. "
+                        "Extracted from Phase 0B Variant 16.",
+    },
+]
+
+
+def builder_fields(name, category, prompt_command, description=None, **extra):
+    """ccai__AI_Prompt__c values for a Builder (ccai__Type__c mirrors Category__c, see migrate_builders_to_type.apex)"""
+    fields = {
+        "Name": name,
+        "Category__c": category,
+        "ccai__Type__c": category,
+        "ccai__Status__c": "Active",
+        "ccai__Prompt_Command__c": prompt_command,
+    }
+    if description:
+        fields["ccai__Description__c"] = description
+    fields.update(extra)
+    return fields
+
+
+def load_json_builders(data_dir=DATA_DIR):
+    """Builders from scripts/data/*_builders.json (traversal configs are stored as compact JSON)"""
+    builders = []
+    for path in sorted(Path(data_dir).glob("*_builders.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            for builder in json.load(f):
+                command = builder["promptCommand"]
+                extra = {}
+                if not isinstance(command, str):
+                    extra["ccai__Object__c"] = command.get("sourceObject")
+                    command = json.dumps(command, separators=(',', ':'), ensure_ascii=False)
+                builders.append(builder_fields(builder["name"], builder["category"], command,
+                                               builder.get("description"), **extra))
+    return builders
+
+
+def load_markdown_builders(definitions=MARKDOWN_BUILDERS, index=None):
+    """Builders from markdown sources; each document is parsed once (and cached) by the index"""
+    index = index or DocumentIndex()
+    builders = []
+    for definition in definitions:
+        extra = {
+            "ccai__Object__c": "Opportunity",
+            "ccai__AI_Connection__c": CORRECT_AI_CONNECTION,
+            "ccai__AI_Data_Extraction_Mapping__c": CORRECT_DCM,
+        }
+        if definition.get("how_it_works"):
+            extra["ccai__How_it_Works__c"] = definition["how_it_works"]
+        content = index.read(definition["source"], definition.get("section", WHOLE_DOCUMENT))
+        builders.append(builder_fields(definition["name"], definition["category"], content,
+                                       definition.get("description"), **extra))
+    index.save()
+    return builders
+
+
+def content_hash(fields):
+    """sha256 over the builder's field values (key order independent)"""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def load_state(org_key, path=STATE_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get(org_key, {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(org_key, entries, path=STATE_FILE):
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    state[org_key] = entries
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def query_org_builders(client, record_type_id=BUILDER_RT_ID):
+    """{Name: {Id, LastModifiedDate}} for every Builder record (first of any duplicate names wins)"""
+    records = client.query(
+        "SELECT Id, Name, LastModifiedDate FROM ccai__AI_Prompt__c "
+        f"WHERE RecordTypeId = '{record_type_id}' ORDER BY Name")
+    org, duplicates = {}, []
+    for record in records:
+        if record["Name"] in org:
+            duplicates.append(record["Name"])
+            continue
+        org[record["Name"]] = record
+    return org, duplicates
+
+
+def plan_sync(builders, org, state, force=False):
+    """
+    (inserts, updates, unchanged) - updates carry the org Id
+    A builder is unchanged only if the org record is exactly the one the last sync wrote
+    """
+    inserts, updates, unchanged = [], [], []
+    for fields in builders:
+        name = fields["Name"]
+        record = org.get(name)
+        if record is None:
+            inserts.append(fields)
+            continue
+        synced = state.get(name, {})
+        if (not force and synced.get("id") == record["Id"]
+                and synced.get("lastModifiedDate") == record["LastModifiedDate"]
+                and synced.get("hash") == content_hash(fields)):
+            unchanged.append(fields)
+        else:
+            updates.append({"Id": record["Id"], **fields})
+    return inserts, updates, unchanged
+
+
+def failed_names(label, records, results):
+    """Print and return the names of records a collection request did not save"""
+    failed = set()
+    for record, result in zip(records, results):
+        if not result.get("success"):
+            failed.add(record["Name"])
+            errors = "; ".join(e.get("message", "") for e in result.get("errors", []))
+            print(f"   ❌ {label} {record['Name']}: {errors}")
+    return failed
+
+
+def sync(client, builders, record_type_id=BUILDER_RT_ID, force=False, dry_run=False):
+    """Bring the org's Builder records in line with builders; returns a summary dict"""
+    builders = [{**fields, "RecordTypeId": record_type_id} for fields in builders]
+    org_key = client.instance_url
+    state = load_state(org_key)
+    org, duplicates = query_org_builders(client, record_type_id)
+    for name in sorted(set(duplicates)):
+        print(f"   ⚠️  Duplicate Builder name in org, syncing the first: {name}")
+    inserts, updates, unchanged = plan_sync(builders, org, state, force)
+    summary = {"queries": 1, "writes": 0, "inserted": len(inserts), "updated": len(updates),
+               "unchanged": len(unchanged), "failed": 0}
+    if dry_run or not (inserts or updates):
+        return summary
+
+    failed = set()
+    if updates:
+        failed |= failed_names("update", updates, client.update_records("ccai__AI_Prompt__c", updates))
+        summary["writes"] += -(-len(updates) // COLLECTION_BATCH_SIZE)
+    if inserts:
+        failed |= failed_names("insert", inserts, client.create_records("ccai__AI_Prompt__c", inserts))
+        summary["writes"] += -(-len(inserts) // COLLECTION_BATCH_SIZE)
+    summary["failed"] = len(failed)
+
+    # Record what the org holds now; failed builders keep no state and are retried next time
+    org, _ = query_org_builders(client, record_type_id)
+    summary["queries"] += 1
+    entries = {}
+    for fields in builders:
+        record = org.get(fields["Name"])
+        if record is not None and fields["Name"] not in failed:
+            entries[fields["Name"]] = {"id": record["Id"], "lastModifiedDate": record["LastModifiedDate"],
+                                       "hash": content_hash(fields)}
+    save_state(org_key, entries)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the builder library into ccai__AI_Prompt__c Builder records")
+    parser.add_argument("--org", default=ORG_ALIAS, help="sf CLI org alias")
+    parser.add_argument("--record-type-id", default=BUILDER_RT_ID, help="Builder RecordTypeId")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be written")
+    parser.add_argument("--force", action="store_true", help="Rewrite every builder regardless of sync state")
+    args = parser.parse_args()
+
+    builders = load_json_builders() + load_markdown_builders()
+    print(f"📋 {len(builders)} local builders ({len(MARKDOWN_BUILDERS)} from markdown)")
+
+    started = time.perf_counter()
+    client = SalesforceClient.from_cli(args.org)
+    summary = sync(client, builders, args.record_type_id, args.force, args.dry_run)
+    elapsed = time.perf_counter() - started
+
+    verb = "Would write" if args.dry_run else "Wrote"
+    print(f"{'🔍' if args.dry_run else '✅'} {verb} {summary['inserted']} new, {summary['updated']} changed; "
+          f"{summary['unchanged']} unchanged")
+    print(f"⏱️  {summary['queries']} queries, {summary['writes']} collection writes in {elapsed:.2f}s")
+    if summary["failed"]:
+        print(f"❌ {summary['failed']} builders failed to sync")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Shared experiment harness for the Prompt Factory test runners and scorers
+
+Runner scripts under tests/ add this directory's parent to sys.path and
+import from the submodules directly, e.g.:
+
+    from harness.sf_client import SalesforceClient
+"""
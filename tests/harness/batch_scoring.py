@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Process-pool batch scoring for large output archives
+
+The scorers' main() loads every output into one dict and scores them one
+after another, which is fine for a 5-19 variant experiment but not for the
+thousands of responses a multi-record or nightly run leaves behind.
+score_archive() instead:
+
+- walks the archive lazily (paths only, never the whole archive in memory);
+- hands chunks of paths to a process pool - workers read and score their
+  own files, so only paths and metric dicts cross process boundaries;
+- keeps a bounded number of chunks in flight, so memory stays flat no
+  matter how many outputs there are;
+- streams one record per output to a sink (JSONL, or CSV of the scalar
+  metrics) as each chunk finishes.
+
+Each scorer exposes a module-level `score_file(path)` for the workers and a
+`--batch DIR` mode that calls score_archive().
+
+Usage:
+    with JsonlSink("scores.jsonl") as sink:
+        stats = score_archive(score_file, iter_output_files(archive), sink, workers=8)
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+DEFAULT_CHUNK_SIZE = 32
+# Chunks queued per worker: enough to keep every core busy between refills
+CHUNKS_PER_WORKER = 2
+
+
+def iter_output_files(root, pattern="*.html"):
+    """Output files under root (a directory, recursively, or a single file), lazily"""
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    yield from root.rglob(pattern)
+
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _score_chunk(score_file, paths):
+    """Worker side: score each file, recording failures instead of losing the chunk"""
+    records = []
+    for path in paths:
+        try:
+            record = {"path": str(path), **score_file(path)}
+        except Exception as e:
+            record = {"path": str(path), "error": f"{type(e).__name__}: {e}"}
+        records.append(record)
+    return records
+
+
+def flatten(record, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}; lists are dropped (not columnar)"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif not isinstance(value, (list, tuple)):
+            flat[name] = value
+    return flat
+
+
+class JsonlSink:
+    """One JSON object per line, flushed per chunk"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w')
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(JsonlSink):
+    """
+    Flattened scalar metrics, one row per output
+    Columns come from the first successful record; an error column is
+    always present so failed outputs still get a row.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._writer = None
+        # Error rows that arrived before the columns were known
+        self._pending = []
+
+    def write(self, records):
+        for record in records:
+            row = flatten(record)
+            if self._writer is None:
+                if "error" in row:
+                    self._pending.append(row)
+                    continue
+                columns = ["path", "error"] + [c for c in row if c not in ("path", "error")]
+                self._writer = csv.DictWriter(self._file, columns, extrasaction='ignore')
+                self._writer.writeheader()
+                for pending in self._pending:
+                    self._writer.writerow(pending)
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        if self._writer is None:
+            # Nothing scored successfully; keep the errors readable
+            writer = csv.DictWriter(self._file, ["path", "error"], extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self._pending)
+        super().close()
+
+
+def open_sink(path):
+    """Sink by file extension: .csv is columnar, anything else JSONL"""
+    return CsvSink(path) if str(path).endswith(".csv") else JsonlSink(path)
+
+
+def score_archive(score_file, paths, sink, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """
+    Score every path in a process pool, streaming records into sink
+
+    score_file must be a module-level function (it is pickled to the
+    workers). At most workers * CHUNKS_PER_WORKER chunks are in flight.
+    Returns {outputs, errors, seconds, per_second, workers}.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * CHUNKS_PER_WORKER
+    chunks = iter_chunks(paths, chunk_size)
+    started = time.perf_counter()
+    outputs = errors = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(_score_chunk, score_file, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = future.result()
+                sink.write(records)
+                outputs += len(records)
+                errors += sum(1 for r in records if "error" in r)
+            if on_progress:
+                on_progress(outputs, errors)
+
+    seconds = time.perf_counter() - started
+    return {
+        "outputs": outputs,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "per_second": round(outputs / seconds, 1) if seconds else None,
+        "workers": workers,
+    }
+
+
+def run_batch(score_file, root, out_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, pattern="*.html"):
+    """The scorers' --batch mode: score an archive into out_path and print a summary"""
+    print(f"📦 Batch scoring {root} -> {out_path} ({workers or os.cpu_count()} workers, chunks of {chunk_size})")
+
+    def progress(outputs, errors):
+        print(f"\r   Scored {outputs} outputs ({errors} errors)", end="", flush=True)
+
+    with open_sink(out_path) as sink:
+        stats = score_archive(score_file, iter_output_files(root, pattern), sink,
+                              workers=workers, chunk_size=chunk_size, on_progress=progress)
+    print(f"\n✅ {stats['outputs']} outputs in {stats['seconds']}s ({stats['per_second']}/s), "
+          f"{stats['errors']} errors")
+    print(f"   Saved: {out_path}")
+    return stats
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Composite weight calibration against Stage 12 quality audits
+
+The composite weights (phase0c 2.0/2.0/1.5/...) and cut-offs (>= 75 "KEEP
+(P0)", v26 TARGET_SCORE = 90) are guesses. Stage 12 has Claude audit each
+run's output into PF_Quality_Score__c (five 1-10 dimensions,
+Overall_Score__c = their average, Pass_Threshold__c = 9.0). This tool uses
+those audits as labels for the scorers' feature matrix (feature_matrix.py)
+and reports:
+
+- fit          least-squares weights (non-negative) reproducing the labels
+- loo          leave-one-out refits: how much the output ranking and the
+               winner move when any single labelled output is dropped
+- sensitivity  each weight scaled 0-2x alone: label agreement and winner
+- grid         every combination of a weight grid (7 values ^ 7 phase0c
+               weights = 823,543 rubrics), ranked by Spearman agreement
+               with the labels
+- threshold    composite cut-off that best separates audits that passed
+
+Evaluation is vectorized over weight vectors in blocks. Outputs with
+identical features are collapsed into one row with a multiplicity, and
+proportional weight vectors (which rank identically) are evaluated once,
+so the full grid runs in seconds.
+
+Labels are {key: Overall_Score__c x 10} JSON. A key is matched against a
+record's promptId, label/path, file name/stem or "V<variant_num>";
+--fetch-labels builds the file from the org, keyed by run and prompt id.
+
+Requires numpy.
+
+Usage:
+    python3 tests/harness/calibration.py phase0c scores.jsonl --fetch-labels --org agentictso
+    python3 tests/harness/calibration.py v26 tests/v26/outputs --labels labels.json --grid 0,1,2,3
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.feature_matrix import RUBRICS, FeatureMatrix, load_records
+
+DEFAULT_LABELS_FILE = Path(__file__).resolve().parent.parent / ".harness_state" / "quality_labels.json"
+DEFAULT_GRID = (0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0)
+SENSITIVITY_FACTORS = np.linspace(0.0, 2.0, 21)
+# Pass_Threshold__c default (Stage12_QualityAudit), on the 0-100 composite scale
+DEFAULT_PASS_THRESHOLD = 90.0
+# Weight vectors evaluated per block (bounds memory at rows x BLOCK floats)
+BLOCK = 20000
+
+QUALITY_SOQL = ("SELECT Id, Run__c, Run__r.Created_Prompt_Id__c, Overall_Score__c, Pass_Threshold__c "
+                "FROM PF_Quality_Score__c WHERE Overall_Score__c != null ORDER BY CreatedDate")
+
+
+# -- labels -------------------------------------------------------------------
+
+def fetch_quality_labels(client):
+    """{run id / prompt id: Overall_Score__c x 10} from every Stage 12 audit"""
+    labels = {}
+    for record in client.query(QUALITY_SOQL):
+        score = float(record['Overall_Score__c']) * 10
+        labels[record['Run__c']] = score
+        prompt_id = (record.get('Run__r') or {}).get('Created_Prompt_Id__c')
+        if prompt_id:
+            labels[prompt_id] = score
+    return labels
+
+
+def record_keys(record):
+    """Every key a label may be filed under for this record"""
+    keys = [record.get("promptId"), record.get("label")]
+    if record.get("label"):
+        keys += [Path(str(record["label"])).name, Path(str(record["label"])).stem]
+    if record.get("variant_num") is not None:
+        keys += [f"V{record['variant_num']}", str(record["variant_num"])]
+    return [k for k in keys if k]
+
+
+def join_labels(records, labels):
+    """The labelled subset of records and their labels"""
+    labelled, values = [], []
+    for record in records:
+        for key in record_keys(record):
+            if key in labels:
+                labelled.append(record)
+                values.append(float(labels[key]))
+                break
+    return labelled, np.asarray(values, dtype=float)
+
+
+# -- vectorized evaluation -------------------------------------------------------
+
+def average_ranks(values, counts):
+    """
+    Tie-averaged ranks (1-based) of each row of `values` (rows x K) per column,
+    where row i stands for counts[i] identical outputs
+    """
+    rows, columns = values.shape
+    order = np.argsort(values, axis=0, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=0)
+    weights = counts[order]
+    before = np.cumsum(weights, axis=0) - weights
+
+    first = np.ones_like(ordered, dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    group = np.cumsum(first, axis=0) - 1 + np.arange(columns) * rows
+    totals = np.bincount(group.ravel(), weights=weights.ravel(), minlength=rows * columns)
+    starts = np.bincount(group.ravel(), weights=(before * first).ravel(), minlength=rows * columns)
+    ranked = starts[group] + (totals[group] + 1) / 2
+
+    ranks = np.empty_like(ranked)
+    np.put_along_axis(ranks, order, ranked, axis=0)
+    return ranks
+
+
+class Evaluator:
+    """
+    Spearman agreement of many rubrics with one target ranking
+
+    Identical feature rows are collapsed (np.unique) into one row carrying
+    its multiplicity and the sum of its outputs' target ranks, so each block
+    costs unique_rows x K instead of outputs x K.
+    """
+
+    def __init__(self, values, target, divisor=1.0):
+        values = np.asarray(values, dtype=float)
+        target = np.asarray(target, dtype=float)
+        self.n = len(target)
+        self.unique, inverse, self.counts = np.unique(values, axis=0, return_inverse=True, return_counts=True)
+        self.counts = self.counts.astype(float)
+        self.divisor = divisor
+        target_ranks = average_ranks(target[:, None], np.ones(self.n))[:, 0]
+        self.target_rank_sums = np.bincount(inverse.ravel(), weights=target_ranks, minlength=len(self.unique))
+        mean = (self.n + 1) / 2
+        self._mean = mean
+        self._target_var = float((target_ranks ** 2).sum() - self.n * mean * mean)
+
+    def composites(self, weights):
+        # Rounded so equal composites from different rows tie exactly
+        return np.round(self.unique @ np.atleast_2d(weights).T / self.divisor, 6)
+
+    def spearman(self, weights):
+        """(K,) rank correlation of each weight vector's composites with the target"""
+        weights = np.atleast_2d(weights)
+        result = np.empty(len(weights))
+        for start in range(0, len(weights), BLOCK):
+            block = weights[start:start + BLOCK]
+            ranks = average_ranks(self.composites(block), self.counts)
+            n, mean = self.n, self._mean
+            covariance = (ranks * self.target_rank_sums[:, None]).sum(axis=0) - n * mean * mean
+            variance = (ranks * ranks * self.counts[:, None]).sum(axis=0) - n * mean * mean
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[start:start + BLOCK] = covariance / np.sqrt(variance * self._target_var)
+        # A rubric that ties every output carries no ranking at all
+        return np.nan_to_num(result, nan=0.0)
+
+
+def winners(values, weights, divisor=1.0):
+    """Index of the best output under each weight vector (first on ties)"""
+    composites = np.round(np.asarray(values) @ np.atleast_2d(weights).T / divisor, 6)
+    return np.argmax(composites, axis=0)
+
+
+# -- analyses ----------------------------------------------------------------
+
+def fit_weights(values, target, divisor=1.0):
+    """
+    Least-squares weights with composite ~= label, kept non-negative by
+    dropping the most negative feature and refitting (active-set NNLS)
+    """
+    values = np.asarray(values, dtype=float) / divisor
+    active = list(range(values.shape[1]))
+    weights = np.zeros(values.shape[1])
+    while active:
+        solution = np.linalg.lstsq(values[:, active], target, rcond=None)[0]
+        if (solution >= 0).all():
+            weights[active] = solution
+            break
+        active.pop(int(np.argmin(solution)))
+    return weights
+
+
+def leave_one_out(values, target, divisor=1.0):
+    """Refit without each output: ranking agreement with the full fit, winner stability, PRESS error"""
+    values = np.asarray(values, dtype=float)
+    full = fit_weights(values, target, divisor)
+    n = len(target)
+    refits = np.empty((n, values.shape[1]))
+    errors = np.empty(n)
+    keep = np.ones(n, dtype=bool)
+    for i in range(n):
+        keep[i] = False
+        refits[i] = fit_weights(values[keep], target[keep], divisor)
+        keep[i] = True
+        errors[i] = values[i] @ refits[i] / divisor - target[i]
+    full_composites = values @ full / divisor
+    agreement = Evaluator(values, full_composites, divisor).spearman(refits)
+    winner = winners(values, full, divisor)[0]
+    return {
+        "weights": full,
+        "refits": refits,
+        "rank_agreement": agreement,
+        "winner_kept": float((winners(values, refits, divisor) == winner).mean()),
+        "rmse": float(np.sqrt((errors ** 2).mean())),
+    }
+
+
+def sensitivity(values, target, base, divisor=1.0, factors=SENSITIVITY_FACTORS):
+    """Per weight: label agreement and winner as that weight alone is scaled by each factor"""
+    base = np.asarray(base, dtype=float)
+    evaluator = Evaluator(values, target, divisor)
+    base_winner = winners(values, base, divisor)[0]
+    report = []
+    for j in range(len(base)):
+        scaled = np.repeat(base[None, :], len(factors), axis=0)
+        scaled[:, j] = base[j] * factors if base[j] else factors
+        agreement = evaluator.spearman(scaled)
+        kept = winners(values, scaled, divisor) == base_winner
+        report.append({"agreement": agreement, "winner_kept": kept})
+    return report
+
+
+def grid_weights(features, grid):
+    """Every combination of grid values, minus the all-zero and proportional duplicates"""
+    grid = sorted(set(float(g) for g in grid))
+    steps = [g for g in grid if g]
+    # Proportional vectors rank identically; keep those whose grid indexes share no common factor
+    unit = min(steps) if steps else 1.0
+    combos = np.array(list(itertools.product(grid, repeat=features)))
+    combos = combos[combos.any(axis=1)]
+    integral = np.round(combos / unit, 6)
+    if np.allclose(integral, np.round(integral)):
+        divisors = np.gcd.reduce(np.round(integral).astype(int), axis=1)
+        combos = combos[divisors == 1]
+    return combos
+
+
+def grid_search(values, target, grid=DEFAULT_GRID, divisor=1.0, top=10):
+    weights = grid_weights(values.shape[1], grid)
+    agreement = Evaluator(values, target, divisor).spearman(weights)
+    best = np.argsort(-agreement, kind="stable")[:top]
+    return {"evaluated": len(weights), "weights": weights[best], "agreement": agreement[best]}
+
+
+def best_threshold(composites, passed):
+    """Composite cut-off maximizing balanced accuracy for predicting a passing audit"""
+    if passed.all() or not passed.any():
+        return None, None
+    best = (None, -1.0)
+    for cut in np.unique(composites):
+        predicted = composites >= cut
+        balanced = (predicted[passed].mean() + (~predicted[~passed]).mean()) / 2
+        if balanced > best[1]:
+            best = (float(cut), float(balanced))
+    return best
+
+
+# -- CLI ------------------------------------------------------------------------
+
+def format_weights(features, weights):
+    return ", ".join(f"{name}={w:.2f}" for name, w in zip(features, weights))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate composite weights against Stage 12 audit scores")
+    parser.add_argument("scorer", choices=sorted(RUBRICS))
+    parser.add_argument("source", help="Batch JSONL, scoring_results.json, or a v26 outputs directory")
+    parser.add_argument("--labels", default=str(DEFAULT_LABELS_FILE),
+                        help="JSON {key: Overall_Score__c x 10} (see --fetch-labels)")
+    parser.add_argument("--fetch-labels", action="store_true",
+                        help="Query PF_Quality_Score__c and write --labels first")
+    parser.add_argument("--org", default="agentictso", help="sf CLI org alias for --fetch-labels")
+    parser.add_argument("--grid", default=",".join(str(g) for g in DEFAULT_GRID),
+                        help="Comma-separated values every weight takes in the grid search")
+    parser.add_argument("--pass-threshold", type=float, default=DEFAULT_PASS_THRESHOLD,
+                        help="Label at or above which an audit passed (0-100 scale)")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.fetch_labels:
+        from harness.sf_client import SalesforceClient
+        labels = fetch_quality_labels(SalesforceClient.from_cli(args.org))
+        Path(args.labels).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.labels, 'w') as f:
+            json.dump(labels, f, indent=2)
+        print(f"📥 {len(labels)} label keys from PF_Quality_Score__c -> {args.labels}")
+    else:
+        with open(args.labels, 'r') as f:
+            labels = json.load(f)
+
+    rubric = RUBRICS[args.scorer]
+    loaded = load_records(args.source)
+    records, target = join_labels(loaded, labels)
+    if len(records) < 3:
+        print(f"❌ Only {len(records)} of {len(loaded)} outputs have an audit score; need at least 3")
+        sys.exit(1)
+    fm = FeatureMatrix.from_records(rubric, records)
+    values, features, divisor = fm.values, rubric.features, rubric.divisor
+    print(f"🎯 {len(records)} labelled outputs (of {len(loaded)} loaded) x {len(features)} features ({rubric.name})")
+
+    evaluator = Evaluator(values, target, divisor)
+    default_agreement = evaluator.spearman(rubric.weights)[0]
+    print(f"\n📏 Default weights: Spearman vs labels {default_agreement:.3f}")
+    print(f"   {format_weights(features, rubric.weights)}")
+
+    started = time.perf_counter()
+    loo = leave_one_out(values, target, divisor)
+    fitted = loo["weights"]
+    print(f"\n📈 Fitted weights: Spearman vs labels {evaluator.spearman(fitted)[0]:.3f}, "
+          f"LOO RMSE {loo['rmse']:.1f} ({time.perf_counter() - started:.2f}s)")
+    print(f"   {format_weights(features, fitted)}")
+    print(f"   Leave-one-out ranking agreement: median {np.median(loo['rank_agreement']):.3f}, "
+          f"min {loo['rank_agreement'].min():.3f}; winner unchanged in {loo['winner_kept']:.0%} of refits")
+
+    print("\n🎚️  Sensitivity (each default weight scaled 0-2x alone)")
+    print(f"   {'Feature':<22} {'Spearman range':>16} {'Winner kept':>12}")
+    for name, result in zip(features, sensitivity(values, target, rubric.weights, divisor)):
+        agreement = result["agreement"]
+        print(f"   {name:<22} {agreement.min():>7.3f}-{agreement.max():<7.3f} "
+              f"{result['winner_kept'].mean():>11.0%}")
+
+    grid = [float(g) for g in args.grid.split(",")]
+    combinations = len(grid) ** len(features)
+    if combinations > 50_000_000:
+        print(f"\n⚠️  Grid of {combinations:,} combinations is too large; use fewer grid values")
+    else:
+        started = time.perf_counter()
+        search = grid_search(values, target, grid, divisor, args.top)
+        print(f"\n🔍 Grid search: {search['evaluated']:,} distinct rubrics "
+              f"({combinations:,} combinations) in {time.perf_counter() - started:.2f}s")
+        for weights, agreement in zip(search["weights"], search["agreement"]):
+            print(f"   {agreement:.3f}  {format_weights(features, weights)}")
+
+    passed = target >= args.pass_threshold
+    for name, weights in (("default", rubric.weights), ("fitted", fitted)):
+        cut, balanced = best_threshold(values @ weights / divisor, passed)
+        if cut is not None:
+            print(f"\n🚦 Best pass cut-off ({name} weights): composite >= {cut:.1f} "
+                  f"(balanced accuracy {balanced:.0%}, {int(passed.sum())}/{len(passed)} audits passed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Heading-indexed section extraction for markdown builder sources
+
+The builder scripts used to cut content out of ANALYTICAL_PATTERNS.md and
+UI_COMPONENTS.md with line ranges (lines[8:160], lines[335:417], ...),
+re-reading the file per slice, and the ranges silently drifted into the
+neighbouring sections whenever a document was edited.
+
+DocumentIndex parses each file once into a heading tree. A section runs from
+its heading line to the next heading of the same or a higher level, and
+headings inside ``` / ~~~ fences are ignored. Sections are stored as
+[start, end) byte offsets plus a sha256 of their bytes. The table is cached in
+tests/.harness_state/doc_index.json and keyed by mtime and size, falling back
+to the file hash. An unchanged document is never re-parsed, and a section is
+read with one seek().
+
+Sections are named by heading text ("PATTERN 1: Risk Assessment & Identification")
+or, for repeated headings, by the end of their heading path
+("COMPONENT 5: Alert/Info Box > Description").
+
+BuildLedger records, per org, the section hashes a script last built from
+and the records it created, so only builders whose sections changed or whose
+records are gone from the org are rebuilt.
+
+Usage:
+    python3 tests/harness/doc_index.py tests/phase0b/patterns/UI_COMPONENTS.md
+    python3 tests/harness/doc_index.py tests/phase0b/patterns/UI_COMPONENTS.md "COMPONENT 5: Alert/Info Box"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+STATE_DIR = Path(__file__).resolve().parent.parent / ".harness_state"
+DEFAULT_CACHE_FILE = STATE_DIR / "doc_index.json"
+
+HEADING_PATTERN = re.compile(rb'^(#{1,6})[ \t]+(.+?)[ \t#]*$')
+FENCE_PATTERN = re.compile(rb'^[ \t]{0,3}(`{3,}|~{3,})')
+PATH_SEPARATOR = " > "
+# Name of the pseudo-section covering a whole document
+WHOLE_DOCUMENT = ""
+
+
+def parse_sections(data):
+    """
+    Heading tree of a markdown document (bytes) as a flat list in document order:
+    {title, level, path, start, end, sha256}. Offsets are bytes; end is exclusive.
+    """
+    sections, open_sections, stack = [], [], []
+    fence = None
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        stripped = line.rstrip(b'\r\n')
+        fence_match = FENCE_PATTERN.match(stripped)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[:1] == fence[:1] and len(marker) >= len(fence):
+                fence = None
+        elif fence is None:
+            match = HEADING_PATTERN.match(stripped)
+            if match:
+                level = len(match.group(1))
+                while open_sections and open_sections[-1]["level"] >= level:
+                    open_sections.pop()["end"] = offset
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                title = match.group(2).decode('utf-8')
+                stack.append((level, title))
+                section = {"title": title, "level": level,
+                           "path": PATH_SEPARATOR.join(t for _, t in stack),
+                           "start": offset, "end": len(data)}
+                sections.append(section)
+                open_sections.append(section)
+        offset += len(line)
+    for section in sections:
+        section["sha256"] = hashlib.sha256(data[section["start"]:section["end"]]).hexdigest()
+    return sections
+
+
+class Document:
+    """One indexed file; section lookups are dict hits, reads are one seek()"""
+
+    def __init__(self, path, sha256, size, sections):
+        self.path = Path(path)
+        self.sha256 = sha256
+        self.size = size
+        self.sections = sections
+        self._by_path = {s["path"]: s for s in sections}
+        # Every trailing part of a path ("Description", "COMPONENT 5: ... > Description")
+        self._by_suffix = {}
+        for section in sections:
+            parts = section["path"].split(PATH_SEPARATOR)
+            for i in range(len(parts)):
+                self._by_suffix.setdefault(PATH_SEPARATOR.join(parts[i:]), []).append(section)
+
+    def find(self, name):
+        """Section by full path, or by heading text / trailing path if only one section has it"""
+        if name == WHOLE_DOCUMENT:
+            return {"title": WHOLE_DOCUMENT, "level": 0, "path": WHOLE_DOCUMENT,
+                    "start": 0, "end": self.size, "sha256": self.sha256}
+        section = self._by_path.get(name)
+        if section is not None:
+            return section
+        matches = self._by_suffix.get(name, [])
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise KeyError(f'{self.path.name}: "{name}" is ambiguous, use one of: '
+                           + "; ".join(s["path"] for s in matches))
+        raise KeyError(f'{self.path.name}: no section "{name}"')
+
+    def read(self, name):
+        """Section text (heading line included)"""
+        section = self.find(name)
+        with open(self.path, 'rb') as f:
+            f.seek(section["start"])
+            return f.read(section["end"] - section["start"]).decode('utf-8')
+
+    def sha256_of(self, name):
+        return self.find(name)["sha256"]
+
+
+class DocumentIndex:
+    """
+    Section tables for every markdown source, cached on disk
+
+    Usage:
+        index = DocumentIndex()
+        text = index.read("tests/phase0b/patterns/UI_COMPONENTS.md", "COMPONENT 1: Stat Card / Metric Tile")
+        index.save()
+    """
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, root=REPO_ROOT):
+        self.cache_file = Path(cache_file)
+        self.root = Path(root)
+        self.documents = {}
+        self.parsed = 0
+        self._dirty = False
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.cache = {}
+
+    def _key(self, path):
+        path = Path(path)
+        if not path.is_absolute():
+            path = self.root / path
+        try:
+            return str(path.resolve().relative_to(self.root.resolve())), path
+        except ValueError:
+            return str(path.resolve()), path
+
+    def document(self, path):
+        """The indexed Document, parsing the file only if its mtime/size and hash changed"""
+        key, path = self._key(path)
+        if key in self.documents:
+            return self.documents[key]
+        stat = os.stat(path)
+        entry = self.cache.get(key)
+        if not (entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size):
+            data = path.read_bytes()
+            sha256 = hashlib.sha256(data).hexdigest()
+            if not (entry and entry["sha256"] == sha256):
+                entry = {"sha256": sha256, "sections": parse_sections(data)}
+                self.parsed += 1
+            entry.update(mtime_ns=stat.st_mtime_ns, size=len(data))
+            self.cache[key] = entry
+            self._dirty = True
+        document = Document(path, entry["sha256"], entry["size"], entry["sections"])
+        self.documents[key] = document
+        return document
+
+    def read(self, path, section=WHOLE_DOCUMENT):
+        return self.document(path).read(section)
+
+    def sha256_of(self, path, section=WHOLE_DOCUMENT):
+        return self.document(path).sha256_of(section)
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump(self.cache, f)
+        self._dirty = False
+
+
+class BuildLedger:
+    """
+    Section hashes each builder was last built from, per script and org
+
+    A builder counts as built only while the org still holds the record that
+    build created (same Id and LastModifiedDate, as sync_builders checks), so
+    builders deleted in the org, or a different org, are rebuilt.
+
+    Usage:
+        ledger = BuildLedger("create_complete_builders", client.instance_url)
+        if ledger.changed(name, sha256, org_records.get(name)):
+            ...rebuild...
+            ledger.record(name, sha256, new_org_record)
+        ledger.save()
+    """
+
+    def __init__(self, name, org_key, state_dir=STATE_DIR):
+        self.path = Path(state_dir) / f"{name}_built.json"
+        self.org_key = org_key
+        try:
+            with open(self.path, 'r') as f:
+                self.all = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.all = {}
+        # Ledgers from before org keys ({name: sha256}) say nothing about any org
+        self.all = {org: built for org, built in self.all.items() if isinstance(built, dict)}
+        self.built = self.all.setdefault(org_key, {})
+
+    def changed(self, name, sha256, org_record):
+        """True unless org_record ({Id, LastModifiedDate} or None) is what the last build of sha256 left"""
+        built = self.built.get(name)
+        return not (built and org_record
+                    and built["sha256"] == sha256
+                    and built["id"] == org_record["Id"]
+                    and built["lastModifiedDate"] == org_record["LastModifiedDate"])
+
+    def record(self, name, sha256, org_record):
+        self.built[name] = {"sha256": sha256, "id": org_record["Id"],
+                            "lastModifiedDate": org_record["LastModifiedDate"]}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.all, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or extract heading sections of a markdown document")
+    parser.add_argument("path")
+    parser.add_argument("section", nargs="?", help="Heading text or path; omit to list the heading tree")
+    args = parser.parse_args()
+
+    index = DocumentIndex()
+    document = index.document(args.path)
+    index.save()
+    if args.section is None:
+        for section in document.sections:
+            print(f"{'  ' * (section['level'] - 1)}{section['title']}  "
+                  f"[{section['start']}:{section['end']}] {section['sha256'][:12]}")
+        return
+    try:
+        sys.stdout.write(document.read(args.section))
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Concurrent variant execution engine
+
+Every variant runs against its own clone of the template ccai__AI_Prompt__c,
+so variants no longer overwrite the shared PROMPT_ID and can go through
+update -> executePrompt -> fetch side by side. A full matrix takes about as
+long as its slowest LLM call instead of the sum of all of them.
+
+The Salesforce client is blocking; calls run on a thread pool sized to the
+concurrency limit, and a semaphore bounds how many variants are in flight.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness.journal import COMPLETED, EXECUTED, FAILED, RESPONDED, UPDATED
+from harness.polling import SUCCESS_STATUSES, TERMINAL_STATUSES, ResponsePoller, latest_response_id
+from harness.response_cache import CacheMiss
+from harness.responses import extract_html, fetch_bodies
+from harness.sf_client import SalesforceError
+
+# Fields copied from the template prompt onto each clone
+PROMPT_CLONE_FIELDS = [
+    "Name",
+    "RecordTypeId",
+    "ccai__AI_Connection__c",
+    "ccai__AI_Data_Extraction_Mapping__c",
+    "ccai__Object__c",
+    "ccai__Type__c",
+    "ccai__Max_Output_Tokens__c",
+    "ccai__Temperature__c",
+]
+
+# Same activation error markers Stage09_CreateAndDeploy checks in ccai__Message__c
+ACTIVATION_ERROR_MARKERS = ('error', 'invalid', 'failed', 'not found', 'mismatch', 'cannot', 'unable')
+
+FAILURE_STATUSES = TERMINAL_STATUSES - SUCCESS_STATUSES
+
+NAME_MAX_LENGTH = 80
+DEFAULT_CONCURRENCY = 4
+
+
+def variant_key(variant):
+    """Journal key for a variant"""
+    return f"{variant['variant_num']}_{variant['variant_name']}"
+
+
+def parse_record_ids(raw):
+    """Split a comma-separated id list the way Sample_Record_Ids__c is parsed in Apex"""
+    ids = []
+    for record_id in (raw or '').split(','):
+        record_id = record_id.strip()
+        if len(record_id) >= 15 and record_id not in ids:
+            ids.append(record_id)
+    return ids
+
+
+class PromptCloner:
+    """Creates short-lived, activated copies of a template prompt"""
+
+    def __init__(self, client, template_prompt_id, activation_timeout=60, activation_interval=1.0):
+        self.client = client
+        self.template_prompt_id = template_prompt_id
+        self.activation_timeout = activation_timeout
+        self.activation_interval = activation_interval
+        self._template = None
+
+    def template(self):
+        """Template prompt fields (fetched once)"""
+        if self._template is None:
+            record = self.client.get_record("ccai__AI_Prompt__c", self.template_prompt_id, PROMPT_CLONE_FIELDS)
+            self._template = {k: record.get(k) for k in PROMPT_CLONE_FIELDS if record.get(k) is not None}
+        return self._template
+
+    def clone(self, prompt_command, label):
+        """
+        Create and activate a copy of the template with a new prompt command
+        Returns (prompt_id, prompt_request_id)
+        """
+        fields = dict(self.template())
+        fields["Name"] = f"{fields.get('Name', 'Variant')} [{label}]"[:NAME_MAX_LENGTH]
+        fields["ccai__Prompt_Command__c"] = prompt_command
+        fields["ccai__Status__c"] = "Draft"
+        fields["ccai__External_Id__c"] = f"{label}-{time.time_ns()}"
+
+        prompt_id = self.client.create_record("ccai__AI_Prompt__c", fields)
+        try:
+            self.client.update_record("ccai__AI_Prompt__c", prompt_id, {"ccai__Status__c": "Active"})
+            return prompt_id, self._wait_for_request_id(prompt_id)
+        except Exception:
+            self.discard(prompt_id)
+            raise
+
+    def _wait_for_request_id(self, prompt_id):
+        """GPTfy generates ccai__Prompt_Request_Id__c asynchronously after activation"""
+        query = ("SELECT ccai__Prompt_Request_Id__c, ccai__Message__c, ccai__Status__c "
+                 f"FROM ccai__AI_Prompt__c WHERE Id = '{prompt_id}'")
+        deadline = time.monotonic() + self.activation_timeout
+        while True:
+            records = self.client.query(query)
+            if records:
+                prompt = records[0]
+                message = (prompt.get('ccai__Message__c') or '').lower()
+                if any(marker in message for marker in ACTIVATION_ERROR_MARKERS):
+                    raise SalesforceError(f"Prompt activation failed: {prompt.get('ccai__Message__c')}")
+                if prompt.get('ccai__Prompt_Request_Id__c'):
+                    return prompt['ccai__Prompt_Request_Id__c']
+            if time.monotonic() >= deadline:
+                raise SalesforceError(f"No Prompt Request ID for {prompt_id} after {self.activation_timeout}s")
+            time.sleep(self.activation_interval)
+
+    def discard(self, prompt_id):
+        """Deactivate and delete a clone; returns False if the org refused"""
+        try:
+            self.client.update_record("ccai__AI_Prompt__c", prompt_id, {"ccai__Status__c": "Draft"})
+            self.client.delete_record("ccai__AI_Prompt__c", prompt_id)
+            return True
+        except SalesforceError:
+            return False
+
+
+class _SharedClone:
+    """One prompt clone shared by every record cell of a variant"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.prompt_id = None
+        self.request_id = None
+        self.remaining = 0
+        self.all_completed = True
+
+
+class VariantExecutor:
+    """
+    Runs prompt variants concurrently, each on its own cloned prompt
+
+    Variants are dicts with variant_num, variant_name and prompt_text.
+    record_ids is one record id or a list of them; with several, every
+    variant runs against every record (the variant x record grid), sharing
+    one clone per variant, with at most `concurrency` cells in flight.
+    on_result, if given, is called with each result dict as soon as that
+    cell finishes (in completion order).
+    With a ResponseCache, cells whose (prompt, record, DCM, connection)
+    were executed before are answered from the cache without cloning.
+    With a RunJournal, every step is journaled and a rerun resumes: completed
+    cells are reloaded by responseId, in-flight ones are polled, and
+    nothing that already produced a response is executed again.
+    """
+
+    def __init__(self, client, template_prompt_id, record_ids, concurrency=DEFAULT_CONCURRENCY,
+                 response_timeout=300, keep_clones=False, on_result=None, history=None, cache=None,
+                 journal=None):
+        self.client = client
+        self.record_ids = [record_ids] if isinstance(record_ids, str) else list(record_ids)
+        self.cloner = PromptCloner(client, template_prompt_id)
+        self.concurrency = concurrency
+        self.response_timeout = response_timeout
+        self.poller = ResponsePoller(client, history=history, timeout=response_timeout, query_runner=self._call)
+        self.keep_clones = keep_clones
+        self.on_result = on_result
+        self.cache = cache
+        self.journal = journal
+        self.metrics = client.metrics
+        self._threads = None
+        self._clones = {}
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._threads, func, *args)
+
+    def _key(self, variant, record_id):
+        # Single-record runs keep the plain variant key (and their existing journals)
+        if len(self.record_ids) == 1:
+            return variant_key(variant)
+        return f"{variant_key(variant)}@{record_id}"
+
+    async def _resolve_response_id(self, prompt_id, record_id, started):
+        """Find the response when executePrompt didn't return a responseId"""
+        # The clone is private to this variant, so "latest for this prompt and record" is unambiguous
+        deadline = started + self.response_timeout
+        attempt = 0
+        while True:
+            response_id = await self._call(latest_response_id, self.client, prompt_id, record_id)
+            if response_id or time.monotonic() >= deadline:
+                return response_id
+            await asyncio.sleep(self.poller.schedule.delay(attempt))
+            attempt += 1
+
+    async def _fetch_response(self, response_id, latency_key, started):
+        """Wait for the response record to reach a terminal status; returns the full record"""
+        if not response_id:
+            return None
+        return await self.poller.wait(response_id, key=latency_key, started=started)
+
+    def _journal(self, key, state, **fields):
+        if self.journal:
+            self.journal.record(key, state, **fields)
+
+    def _cache_key(self, variant, record_id):
+        template = self.cloner.template()
+        return self.cache.key(
+            variant["prompt_text"],
+            record_id,
+            template.get("ccai__AI_Data_Extraction_Mapping__c"),
+            template.get("ccai__AI_Connection__c"),
+        )
+
+    async def _from_cache(self, variant, record_id, result):
+        """
+        Fill result from the cache
+        Returns (cache_key to store under, done) - done means no execution is needed.
+        """
+        if not self.cache:
+            return None, False
+        cache_key = self._cache_key(variant, record_id)
+        try:
+            entry = await self._call(self.cache.get, cache_key)
+        except CacheMiss as e:
+            result.update({"status": "Error", "error": str(e), "html": None, "html_size": 0})
+            return None, True
+        if not entry:
+            return cache_key, False
+        result.update({
+            "response_id": entry.get("response_id"),
+            "status": entry.get("status"),
+            "record": entry.get("record") or {},
+            "html": entry["html"],
+            "html_size": len(entry["html"]),
+            "elapsed_seconds": 0.0,
+            "cached": True,
+        })
+        return cache_key, True
+
+    async def _acquire_clone(self, variant, progress):
+        """The variant's shared clone: a journaled one if known, else created once"""
+        shared = self._clones[variant_key(variant)]
+        async with shared.lock:
+            if shared.prompt_id is None:
+                if progress.get("prompt_id"):
+                    shared.prompt_id, shared.request_id = progress["prompt_id"], progress.get("request_id")
+                else:
+                    label = f"V{variant['variant_num']} {variant['variant_name']}"
+                    shared.prompt_id, shared.request_id = await self._call(
+                        self.cloner.clone, variant["prompt_text"], label)
+            return shared.prompt_id, shared.request_id
+
+    async def _release_clone(self, variant, completed):
+        """Discard the clone once its last cell is done"""
+        shared = self._clones[variant_key(variant)]
+        shared.remaining -= 1
+        shared.all_completed = shared.all_completed and completed
+        # A journaled run keeps unfinished clones so a resumed run can pick up their responses
+        if (shared.remaining == 0 and shared.prompt_id and not self.keep_clones
+                and (shared.all_completed or not self.journal)):
+            await self._call(self.cloner.discard, shared.prompt_id)
+
+    async def run_cell(self, variant, record_id, semaphore):
+        """update (clone) -> executePrompt -> fetch for one variant/record cell"""
+        result = {
+            "variant_num": variant["variant_num"],
+            "variant_name": variant["variant_name"],
+            "record_id": record_id,
+        }
+        key = self._key(variant, record_id)
+        cache_key, done = await self._from_cache(variant, record_id, result)
+        if done:
+            if result.get("cached"):
+                self._journal(key, COMPLETED, response_id=result["response_id"], status=result["status"],
+                              cached=True)
+            await self._release_clone(variant, True)
+            if self.on_result:
+                self.on_result(result)
+            return result
+
+        progress = self.journal.get(key) if self.journal else {}
+        queued = time.monotonic()
+        async with semaphore:
+            started = time.monotonic()
+            self.metrics.observe("queue", started - queued, key)
+            completed = False
+            try:
+                with self.metrics.span("clone", key):
+                    prompt_id, request_id = await self._acquire_clone(variant, progress)
+                if not progress.get("prompt_id"):
+                    self._journal(key, UPDATED, prompt_id=prompt_id, request_id=request_id)
+                result["prompt_id"] = prompt_id
+
+                label = f"V{variant['variant_num']} {variant['variant_name']}"
+                latency_key = f"{self.cloner.template_prompt_id}/{label}"
+                executed_at = time.monotonic()
+                execution = {}
+                record = None
+                # A response that ended Failed/Error is retried; anything else is picked up again
+                retry = progress.get("state") == FAILED and progress.get("status") in FAILURE_STATUSES
+                response_id = None if retry else progress.get("response_id")
+                if not response_id and progress.get("prompt_id") and not retry:
+                    # Resumed clone: any response on it for this record came from our earlier executePrompt
+                    response_id = await self._call(latest_response_id, self.client, prompt_id, record_id)
+
+                if not response_id:
+                    execution = await self._call(self.client.execute_prompt, request_id, record_id)
+                    response_id = execution.get('responseId')
+                    self._journal(key, EXECUTED, response_id=response_id, status=execution.get('status'))
+                    if execution.get('status') in SUCCESS_STATUSES and execution.get('responseBody'):
+                        record = execution
+                    elif not response_id:
+                        response_id = await self._resolve_response_id(prompt_id, record_id, executed_at)
+
+                if record is None:
+                    if response_id and response_id != progress.get("response_id"):
+                        self._journal(key, RESPONDED, response_id=response_id)
+                    record = await self._fetch_response(response_id, latency_key, executed_at) or {}
+                    html = extract_html(record) if record else None
+                    response_id = record.get('Id', response_id)
+                else:
+                    html = execution['responseBody']
+                # executePrompt sent -> response body in hand (LLM time plus polling lag)
+                self.metrics.observe("llm", time.monotonic() - executed_at, key)
+
+                result.update({
+                    "response_id": response_id,
+                    "status": record.get('ccai__Status__c', execution.get('status')),
+                    "record": record,
+                    "html": html,
+                    "html_size": len(html) if html else 0,
+                })
+                completed = bool(html) and result["status"] in SUCCESS_STATUSES
+                if completed:
+                    self._journal(key, COMPLETED, response_id=response_id, status=result["status"])
+                else:
+                    self._journal(key, FAILED, response_id=response_id, status=result["status"])
+                if cache_key and completed:
+                    await self._call(self.cache.put, cache_key, {
+                        "response_id": response_id,
+                        "status": result["status"],
+                        "record": record,
+                        "html": html,
+                        "variant_num": variant["variant_num"],
+                        "variant_name": variant["variant_name"],
+                        "record_id": record_id,
+                    })
+            except (SalesforceError, KeyError, ValueError) as e:
+                result.update({"status": "Error", "error": str(e), "html": None, "html_size": 0})
+                self._journal(key, FAILED, error=str(e)[:500])
+            finally:
+                await self._release_clone(variant, completed)
+                result["elapsed_seconds"] = round(time.monotonic() - started, 2)
+                self.metrics.observe("variant", time.monotonic() - started, key)
+
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+    async def _resume_completed(self, cells):
+        """Results for journaled-complete cells, rebuilt from one bulk body query"""
+        progress = {self._key(v, r): self.journal.get(self._key(v, r)) for v, r in cells}
+        response_ids = [p["response_id"] for p in progress.values() if p.get("response_id")]
+        records = await self._call(fetch_bodies, self.client, response_ids) if response_ids else {}
+
+        results = {}
+        for variant, record_id in cells:
+            key = self._key(variant, record_id)
+            record = records.get(progress[key].get("response_id")) or {}
+            html = extract_html(record) if record else None
+            result = {
+                "variant_num": variant["variant_num"],
+                "variant_name": variant["variant_name"],
+                "record_id": record_id,
+                "response_id": progress[key].get("response_id"),
+                "status": record.get('ccai__Status__c', progress[key].get("status")),
+                "record": record,
+                "html": html,
+                "html_size": len(html) if html else 0,
+                "elapsed_seconds": 0.0,
+                "resumed": True,
+            }
+            if not html:
+                # Completed before, so it is never executed again - report instead
+                result["error"] = "completed response no longer retrievable"
+            if self.on_result:
+                self.on_result(result)
+            results[key] = result
+        return results
+
+    async def run(self, variants):
+        """Run every variant x record cell with at most `concurrency` in flight; results keep grid order"""
+        cells = [(v, r) for v in variants for r in self.record_ids]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as threads:
+            self._threads = threads
+            try:
+                # Resolve the template once up front instead of racing N threads on it
+                await self._call(self.cloner.template)
+                resumed = {}
+                if self.journal:
+                    done = [(v, r) for v, r in cells if self.journal.is_completed(self._key(v, r))]
+                    resumed = await self._resume_completed(done)
+                pending = [(v, r) for v, r in cells if self._key(v, r) not in resumed]
+
+                self._clones = {}
+                for variant, _ in pending:
+                    shared = self._clones.setdefault(variant_key(variant), _SharedClone())
+                    shared.remaining += 1
+
+                fresh = await asyncio.gather(*(self.run_cell(v, r, semaphore) for v, r in pending))
+                fresh = dict(zip((self._key(v, r) for v, r in pending), fresh))
+                return [resumed.get(self._key(v, r)) or fresh[self._key(v, r)] for v, r in cells]
+            finally:
+                self._threads = None
+
+    def run_all(self, variants):
+        """Blocking entry point for the runner scripts"""
+        return asyncio.run(self.run(variants))
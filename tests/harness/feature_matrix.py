@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Vectorized composite scoring over an outputs x features matrix
+
+Every scorer's composite is a weighted sum of per-dimension scores:
+- phase0   (evidence + forbidden + customer + diagnostic + structure) / 1.5
+- phase0b  mean of 5 Phase 0B + 5 Stage12 dimensions, x10
+- phase0c  7 dimensions weighted 2.0/2.0/1.5/1.5/1.5/1.0/0.5
+- v26      evidence + dateAnalysis + forbidden + colors + customer
+
+FeatureMatrix pulls those per-dimension scores out of saved scorer results
+(batch JSONL from --batch, scoring_results.json, v26 *_metrics.json) into a
+dense float matrix once. A composite is then F @ w, and K alternative
+weight vectors are one (n x 7) @ (7 x K) product - re-ranking an archive
+under thousands of rubrics takes milliseconds instead of re-running the
+scorers.
+
+Requires numpy (the rest of the harness is stdlib only).
+
+Usage:
+    python3 tests/harness/feature_matrix.py phase0c tests/phase0c/comparison/batch_scores.jsonl
+    python3 tests/harness/feature_matrix.py phase0c scores.jsonl --weights 3,1,1.5,1.5,1.5,1,0.5
+    python3 tests/harness/feature_matrix.py v26 tests/v26/outputs --sweep 5000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+class Rubric:
+    """How a scorer's composite is built from its per-dimension scores"""
+
+    def __init__(self, name, features, weights, extract, composite_key, divisor=1.0):
+        self.name = name
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype=float)
+        self.extract = extract
+        self.composite_key = composite_key
+        self.divisor = divisor
+
+
+PHASE0B_DIMENSIONS = ["visual_diversity", "analytical_depth", "pattern_application", "evidence_binding", "ui_elegance"]
+STAGE12_DIMENSIONS = ["visualQuality", "dataAccuracy", "personaFit", "actionability", "businessValue"]
+PHASE0C_DIMENSIONS = ["pattern_effectiveness", "ui_impact", "evidence_binding", "output_quality",
+                      "analytical_value", "information_density", "actionability"]
+PHASE0_COMPONENTS = ["evidence", "forbidden", "customer", "diagnostic", "structure"]
+V26_COMPONENTS = ["evidence", "dateAnalysis", "forbidden", "colors", "customer"]
+
+RUBRICS = {
+    "phase0": Rubric(
+        "phase0", PHASE0_COMPONENTS, [1.0] * 5,
+        lambda r: [r["scores"][c] for c in PHASE0_COMPONENTS],
+        "compositeScore", divisor=1.5),
+    # ((sum(phase0b) / 5 + sum(stage12) / 5) / 2) * 10 == plain sum of the 10 dimensions
+    "phase0b": Rubric(
+        "phase0b", PHASE0B_DIMENSIONS + STAGE12_DIMENSIONS, [1.0] * 10,
+        lambda r: ([r["phase0b_metrics"][d]["score"] for d in PHASE0B_DIMENSIONS] +
+                   [r["stage12_metrics"][d] for d in STAGE12_DIMENSIONS]),
+        "overall_composite"),
+    "phase0c": Rubric(
+        "phase0c", PHASE0C_DIMENSIONS, [2.0, 2.0, 1.5, 1.5, 1.5, 1.0, 0.5],
+        lambda r: [r["metrics"][d]["score"] for d in PHASE0C_DIMENSIONS],
+        "composite_score"),
+    "v26": Rubric(
+        "v26", V26_COMPONENTS, [1.0] * 5,
+        lambda r: [r["scores"][c] for c in V26_COMPONENTS],
+        "compositeScore"),
+}
+
+
+def load_records(source):
+    """
+    Scorer results with a "label" each, from any of the formats the scorers save:
+    batch JSONL, a scoring_results.json, or a directory of v26 *_metrics.json
+    (other JSON sharing the directory, such as a latency report, is skipped)
+    """
+    source = Path(source)
+    records = []
+    if source.is_dir():
+        for metrics_file in sorted(source.glob("*_metrics.json")):
+            with open(metrics_file, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or "metrics" not in data:
+                continue
+            records.append({"label": metrics_file.name.replace("_metrics.json", ""), **data["metrics"]})
+    elif source.suffix == ".jsonl":
+        with open(source, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if "error" not in record:
+                        records.append({"label": record.get("path"), **record})
+    else:
+        with open(source, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "variants" in data:
+            # phase0 scoring_results.json
+            records = [{"label": f"V{v['number']} {v['name']}", **v["metrics"]} for v in data["variants"]]
+        else:
+            records = [{"label": f"V{r.get('variant_num')}", **r} for r in data]
+    return records
+
+
+class FeatureMatrix:
+    """
+    Dense outputs x features matrix for one rubric
+
+    Usage:
+        fm = FeatureMatrix.from_records(RUBRICS["phase0c"], load_records(path))
+        fm.composites()                    # (n,) under the rubric's weights
+        fm.composites(weight_matrix)       # (n, K) for K weight vectors
+        fm.rank(weights)                   # output indexes, best first
+    """
+
+    def __init__(self, rubric, values, labels, recorded=None):
+        self.rubric = rubric
+        self.values = np.asarray(values, dtype=float).reshape(len(labels), len(rubric.features))
+        self.labels = list(labels)
+        self.recorded = None if recorded is None else np.asarray(recorded, dtype=float)
+
+    @classmethod
+    def from_records(cls, rubric, records):
+        values, labels, recorded = [], [], []
+        for record in records:
+            values.append(rubric.extract(record))
+            labels.append(record.get("label"))
+            recorded.append(record.get(rubric.composite_key, np.nan))
+        return cls(rubric, values, labels, recorded)
+
+    def save(self, path):
+        np.savez(path, values=self.values, labels=np.asarray(self.labels, dtype=str),
+                 recorded=self.recorded if self.recorded is not None else np.array([]))
+
+    @classmethod
+    def load(cls, rubric, path):
+        data = np.load(path)
+        recorded = data["recorded"] if data["recorded"].size else None
+        return cls(rubric, data["values"], data["labels"].tolist(), recorded)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _weights(self, weights):
+        weights = self.rubric.weights if weights is None else np.asarray(weights, dtype=float)
+        if weights.shape[-1] != len(self.rubric.features):
+            raise ValueError(f"{self.rubric.name} takes {len(self.rubric.features)} weights "
+                             f"({', '.join(self.rubric.features)}), got {weights.shape[-1]}")
+        return weights
+
+    def composites(self, weights=None):
+        """F @ w: (n,) for one weight vector, (n, K) for a (K, features) matrix"""
+        weights = self._weights(weights)
+        return (self.values @ weights.T) / self.rubric.divisor
+
+    def rank(self, weights=None):
+        """Output indexes ordered best first (stable for ties)"""
+        return np.argsort(-self.composites(weights), kind="stable")
+
+    def ranks(self, weight_matrix):
+        """(n, K) rank position of each output under each weight vector (0 = best)"""
+        scores = self.composites(weight_matrix)
+        order = np.argsort(-scores, axis=0, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(len(self))[:, None], axis=0)
+        return ranks
+
+    def verify(self):
+        """Outputs whose recorded composite the rubric's default weights don't reproduce"""
+        if self.recorded is None:
+            return []
+        expected = np.round(self.composites(), 1)
+        mismatched = ~np.isclose(expected, self.recorded) & ~np.isnan(self.recorded)
+        return [self.labels[i] for i in np.flatnonzero(mismatched)]
+
+    def sweep(self, weight_matrix):
+        """
+        Summary of re-ranking the archive under K weight vectors:
+        winner counts, and Spearman correlation of each ranking with the default one
+        """
+        ranks = self.ranks(weight_matrix).astype(float)
+        base = self.ranks(self.rubric.weights[None, :])[:, 0].astype(float)
+        n = len(self)
+        if n > 1:
+            d2 = ((ranks - base[:, None]) ** 2).sum(axis=0)
+            spearman = 1 - 6 * d2 / (n * (n * n - 1))
+        else:
+            spearman = np.ones(ranks.shape[1])
+        winners = np.bincount(np.argmin(ranks, axis=0), minlength=n)
+        return {"winners": winners, "spearman": spearman}
+
+
+def random_weights(rubric, count, seed=0, spread=0.5):
+    """count weight vectors around the rubric's: each weight scaled by U(1-spread, 1+spread)"""
+    rng = np.random.default_rng(seed)
+    return rubric.weights * rng.uniform(1 - spread, 1 + spread, size=(count, len(rubric.features)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-rank scored outputs under alternative composite weights")
+    parser.add_argument("scorer", choices=sorted(RUBRICS))
+    parser.add_argument("source", help="Batch JSONL, scoring_results.json, or a v26 outputs directory")
+    parser.add_argument("--weights", help="Comma-separated weights, one per feature")
+    parser.add_argument("--sweep", type=int, default=0, metavar="K",
+                        help="Re-rank under K random weight vectors around the default")
+    parser.add_argument("--spread", type=float, default=0.5, help="Sweep: relative weight perturbation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rubric = RUBRICS[args.scorer]
+    started = time.perf_counter()
+    fm = FeatureMatrix.from_records(rubric, load_records(args.source))
+    print(f"📐 {len(fm)} outputs x {len(rubric.features)} features ({', '.join(rubric.features)}) "
+          f"in {time.perf_counter() - started:.3f}s")
+    if not len(fm):
+        print("❌ No scored outputs found")
+        sys.exit(1)
+
+    mismatched = fm.verify()
+    if mismatched:
+        print(f"⚠️  Default weights don't reproduce {len(mismatched)} recorded composites "
+              f"(scorer changed?): {', '.join(map(str, mismatched[:5]))}")
+
+    weights = np.array([float(w) for w in args.weights.split(",")]) if args.weights else rubric.weights
+    default_scores = fm.composites()
+    scores = fm.composites(weights)
+    default_position = {index: position for position, index in enumerate(fm.rank())}
+    print(f"\n🏆 Top {args.top} under weights {weights.tolist()}")
+    for position, index in enumerate(fm.rank(weights)[:args.top]):
+        moved = default_position[index] - position
+        change = f" ({'+' if moved > 0 else ''}{moved})" if args.weights and moved else ""
+        print(f"   {position + 1:>3}. {scores[index]:6.1f}  (default {default_scores[index]:5.1f}){change}  {fm.labels[index]}")
+
+    if args.sweep:
+        weight_matrix = random_weights(rubric, args.sweep, args.seed, args.spread)
+        started = time.perf_counter()
+        summary = fm.sweep(weight_matrix)
+        elapsed = time.perf_counter() - started
+        spearman = summary["spearman"]
+        print(f"\n🔀 {args.sweep} weight vectors (±{args.spread:.0%}) in {elapsed * 1000:.1f}ms")
+        print(f"   Rank correlation with default: median {np.median(spearman):.3f}, min {spearman.min():.3f}")
+        print("   Most frequent winners:")
+        for index in np.argsort(-summary["winners"])[:5]:
+            if summary["winners"][index]:
+                print(f"   {summary['winners'][index] / args.sweep:6.1%}  {fm.labels[index]}")
+
+
+if __name__ == "__main__":
+    main()
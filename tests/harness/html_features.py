@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Parse-once feature extraction for the HTML scorers
+
+The phase0b/phase0c `assess_*` functions each sweep the raw output with their
+own regexes (40+ full scans per output). HtmlFeatures scans an output once
+and every dimension reads from the result:
+
+- tags     Counter of opening tag names (lowercase)
+- colors   Counter of '#hex' colour literals as written
+- one Aho-Corasick pass over the output records where the literal prefix
+  of every scorer pattern occurs ('border-left:', 'linear-gradient',
+  'risk', ...)
+
+count()/search() then run a pattern only at the offsets where its prefix
+was found, in the same leftmost, non-overlapping order re.findall uses, so
+the results are exactly re.findall/re.search on the full text. Patterns
+without a literal prefix fall back to a full scan.
+
+Usage:
+    features = HtmlFeatures(html, SCORER_PATTERNS)
+    features.count(r'linear-gradient')        # == len(re.findall(..., re.I))
+    features.search(r'#(?:dc3545|FF9800)', 0) # == bool(re.search(...))
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+
+from harness.phrases import PhraseMatcher
+
+TAG_RE = re.compile(r'<([A-Za-z][\w-]*)')
+COLOR_RE = re.compile(r'#[0-9A-Fa-f]+')
+
+# Metacharacters that end a pattern's literal prefix
+_META = set('.^$*+?{}[]()|')
+_QUANTIFIERS = set('*?{')
+
+
+def split_branches(pattern):
+    """Top-level alternatives of a regex (| outside groups and classes)"""
+    branches, current, depth, in_class, i = [], [], 0, False, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            current.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            branches.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(c)
+        i += 1
+    branches.append("".join(current))
+    return branches
+
+
+def literal_prefix(branch):
+    """Characters every match of `branch` must start with ('' if none)"""
+    prefix = []
+    i = 0
+    while i < len(branch):
+        c = branch[i]
+        if c == '\\':
+            # Only escaped punctuation stands for itself; an escaped letter or digit is a
+            # class, anchor, backreference or character code (\d, \b, \1, \n, \x41, \u00e9)
+            if i + 1 >= len(branch) or branch[i + 1].isalnum():
+                break
+            literal, i = branch[i + 1], i + 2
+        elif c in _META:
+            break
+        else:
+            literal, i = c, i + 1
+        if i < len(branch) and branch[i] in _QUANTIFIERS:
+            # x?, x*, x{0,n} - the character may be absent
+            break
+        prefix.append(literal)
+        if i < len(branch) and branch[i] == '+':
+            break
+    return "".join(prefix)
+
+
+@lru_cache(maxsize=None)
+def _compiled(pattern, flags):
+    return re.compile(pattern, flags)
+
+
+@lru_cache(maxsize=64)
+def _prefix_index(patterns):
+    """(matcher over every prefix, {pattern: [prefix index, ...] or None})"""
+    prefixes = []
+    by_pattern = {}
+    for pattern in patterns:
+        branch_prefixes = [literal_prefix(b) for b in split_branches(pattern)]
+        if not all(branch_prefixes):
+            # Some branch can start anywhere; this pattern needs a full scan
+            by_pattern[pattern] = None
+            continue
+        indexes = []
+        for prefix in branch_prefixes:
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+            indexes.append(prefixes.index(prefix))
+        by_pattern[pattern] = indexes
+    # Case-insensitive prefixes are a superset for case-sensitive patterns;
+    # the pattern itself still decides at each candidate offset
+    matcher = PhraseMatcher(prefixes, ignore_case=True) if prefixes else None
+    return matcher, by_pattern
+
+
+class HtmlFeatures:
+    """Everything the scoring dimensions need from one output, extracted once"""
+
+    def __init__(self, html, patterns=()):
+        self.html = html
+        self.size = len(html)
+        self.tags = Counter(name.lower() for name in TAG_RE.findall(html))
+        self.colors = Counter(COLOR_RE.findall(html))
+        self.is_single_line = '\n' not in html.strip()
+        self.starts_with_div = html.strip().startswith('<div')
+
+        self._matcher, self._by_pattern = _prefix_index(tuple(patterns))
+        self._positions = self._matcher.positions(html) if self._matcher else {}
+        self._counts = {}
+
+    def tag_count(self, prefix):
+        """Opening tags whose name starts with prefix (what r'<table' counts)"""
+        return sum(n for name, n in self.tags.items() if name.startswith(prefix))
+
+    def has_color(self, *hex_values):
+        """Any '#...' literal starting with one of hex_values (case-sensitive, like the regexes)"""
+        return any(color[1:].startswith(hex_values) for color in self.colors)
+
+    def _candidates(self, pattern):
+        indexes = self._by_pattern.get(pattern)
+        if indexes is None:
+            return None
+        starts = set()
+        for index in indexes:
+            starts.update(self._positions.get(index, ()))
+        return sorted(starts)
+
+    def count(self, pattern, flags=re.IGNORECASE):
+        """len(re.findall(pattern, html, flags))"""
+        key = (pattern, flags)
+        if key not in self._counts:
+            regex = _compiled(pattern, flags)
+            candidates = self._candidates(pattern)
+            if candidates is None:
+                self._counts[key] = len(regex.findall(self.html))
+            else:
+                count, end = 0, 0
+                for start in candidates:
+                    if start < end:
+                        continue
+                    match = regex.match(self.html, start)
+                    if match:
+                        count += 1
+                        end = max(match.end(), start + 1)
+                self._counts[key] = count
+        return self._counts[key]
+
+    def search(self, pattern, flags=re.IGNORECASE):
+        """bool(re.search(pattern, html, flags))"""
+        regex = _compiled(pattern, flags)
+        candidates = self._candidates(pattern)
+        if candidates is None:
+            return regex.search(self.html) is not None
+        return any(regex.match(self.html, start) for start in candidates)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Append-only run journal for resumable experiment runs
+
+Each line of the journal is one JSON event, {"ts", "key", "state", ...fields},
+and is flushed and fsynced before the runner moves on. A variant's current
+state is all of its events merged in order, so after a crash (timeout,
+expired token, Ctrl-C) a restarted runner knows exactly how far each
+variant got:
+
+    updated    prompt clone created and active (prompt_id, request_id)
+    executed   executePrompt returned (response_id if it gave one)
+    responded  response_id known
+    completed  terminal success - never executed again
+    failed     attempt ended without a usable response (kept for retry)
+
+Journals live in tests/.harness_state/journals/<name>.jsonl.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_DIR = Path(__file__).resolve().parent.parent / ".harness_state" / "journals"
+
+UPDATED = "updated"
+EXECUTED = "executed"
+RESPONDED = "responded"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def journal_path(name):
+    return JOURNAL_DIR / f"{name}.jsonl"
+
+
+def new_journal_name(prefix):
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+def latest_journal(prefix):
+    """Most recently modified journal for a runner, or None"""
+    journals = sorted(JOURNAL_DIR.glob(f"{prefix}_*.jsonl"), key=lambda p: p.stat().st_mtime)
+    return journals[-1] if journals else None
+
+
+class RunJournal:
+    """Durable per-variant progress for one experiment run"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.states = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-write can leave a torn last line
+                        continue
+                    self._apply(event)
+
+    def _apply(self, event):
+        state = self.states.setdefault(event["key"], {})
+        state.update({k: v for k, v in event.items() if k not in ("key", "ts")})
+        # Sticky: no later event may make a completed variant look unfinished
+        if event["state"] == COMPLETED:
+            state["completed"] = True
+
+    def record(self, key, state, **fields):
+        """Append an event and fsync it before returning"""
+        event = {"ts": datetime.now().isoformat(), "key": key, "state": state, **fields}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(event) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(event)
+
+    def get(self, key):
+        with self._lock:
+            return dict(self.states.get(key, {}))
+
+    def is_completed(self, key):
+        return self.get(key).get("completed", False)
+
+    def summary(self):
+        """{state: count} over the latest state of every key"""
+        counts = {}
+        with self._lock:
+            for state in self.states.values():
+                counts[state["state"]] = counts.get(state["state"], 0) + 1
+        return counts
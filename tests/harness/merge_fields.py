@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Offline merge-field pre-flight for variant prompts and builders
+
+A broken {{{Object.Field}}} reference in a variant only shows up after a
+60-180s executePrompt round trip. This is a port of MergeFieldValidator.cls
+that runs against a local snapshot of the DCM instead:
+- {{{...}}} extraction and Object.Field parsing as in extractMergeFields()
+- validateAgainstDCM()'s rules, with the same error messages:
+  prefixed fields need the object in the DCM and the field on that object;
+  unprefixed fields are valid on the root or on any child object
+- {{#Collection}} / {{^Collection}} ... {{/Collection}} blocks must be
+  balanced and name an object in the DCM
+
+Apex accepts an unprefixed field found on any object. Here it is also checked
+against the enclosing iteration scope, and a field that only exists on a child
+outside that child's block is reported as a warning (Apex verdicts unchanged).
+
+Builder promptCommands (scripts/data/*_builders.json) contain lowercase slot
+placeholders like {{{title}}} for the LLM to fill; those are counted as slots,
+not DCM fields.
+
+The snapshot is the Map buildDCMConfigFromRecords() returns
+({rootObject, childObjects, fieldsByObject}), fetched once with --fetch-dcm
+(ccai__AI_Data_Extraction_Field__c) or --fetch-describe (sObject describe).
+
+Usage:
+    python3 tests/harness/merge_fields.py --fetch-dcm a0AQH000001abcD
+    python3 tests/harness/merge_fields.py --fetch-describe Opportunity,OpportunityContactRole,Task
+    python3 tests/harness/merge_fields.py tests/*/variants scripts/data
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_SNAPSHOT_FILE = Path(__file__).resolve().parent.parent / ".harness_state" / "dcm_snapshot.json"
+DEFAULT_PATHS = [REPO_ROOT / "tests" / "phase0" / "variants",
+                 REPO_ROOT / "tests" / "phase0b" / "variants",
+                 REPO_ROOT / "tests" / "phase0c" / "variants",
+                 REPO_ROOT / "scripts" / "data"]
+
+# Same pattern as MergeFieldValidator.extractMergeFields()
+MERGE_FIELD_PATTERN = re.compile(r'\{\{\{([^}]+)\}\}\}')
+# {{#Name}} opens, {{^Name}} opens an empty-collection block, {{/Name}} closes
+SECTION_PATTERN = re.compile(r'\{\{([#^/])([^{}]+)\}\}')
+# Builder placeholders: lowercase snake_case, never an API name (no __c / __r)
+SLOT_PATTERN = re.compile(r'^[a-z][a-z0-9]*(?:_[a-z0-9]+)*$')
+
+
+class MergeField:
+    """One {{{...}}} reference (MergeFieldValidator.MergeField plus its position and scope)"""
+
+    def __init__(self, original_text, object_name, field_name, offset=None, scope=None):
+        self.original_text = original_text
+        self.object_name = object_name
+        self.field_name = field_name
+        self.offset = offset
+        self.scope = scope
+        self.is_valid = True
+        self.error_message = None
+        self.warning = None
+
+    def to_dict(self):
+        result = {"field": self.original_text, "offset": self.offset, "valid": self.is_valid}
+        if self.scope:
+            result["scope"] = self.scope
+        if self.error_message:
+            result["error"] = self.error_message
+        if self.warning:
+            result["warning"] = self.warning
+        return result
+
+
+def parse_merge_field(reference, offset=None, scope=None):
+    """
+    Object/field split as in parseMergeField(): only a single dot makes a prefix,
+    anything else is kept whole as the field name
+    """
+    object_name = None
+    field_name = reference.strip()
+    if '.' in reference:
+        parts = reference.split('.')
+        while parts and not parts[-1]:
+            # Apex String.split() drops trailing empty strings
+            parts.pop()
+        if len(parts) == 2:
+            object_name = parts[0].strip()
+            field_name = parts[1].strip()
+    return MergeField('{{{' + reference + '}}}', object_name, field_name, offset, scope)
+
+
+def parse_template(template):
+    """
+    (merge fields with the innermost enclosing collection, block problems)
+    Block problems are (offset, message) for unclosed and mismatched sections.
+    """
+    events = [(m.start(), "field", m) for m in MERGE_FIELD_PATTERN.finditer(template or '')]
+    events += [(m.start(), "section", m) for m in SECTION_PATTERN.finditer(template or '')]
+    events.sort(key=lambda event: event[0])
+
+    fields, problems, stack = [], [], []
+    for offset, kind, match in events:
+        if kind == "field":
+            scope = next((name for name, _, inverted in reversed(stack) if not inverted), None)
+            fields.append(parse_merge_field(match.group(1), offset, scope))
+            continue
+        sigil, name = match.group(1), match.group(2).strip()
+        if sigil != '/':
+            stack.append((name, offset, sigil == '^'))
+        elif not stack:
+            problems.append((offset, f'"{{{{/{name}}}}}" closes a block that was never opened'))
+        elif stack[-1][0] != name:
+            problems.append((offset, f'"{{{{/{name}}}}}" closes "{stack[-1][0]}" opened at offset {stack[-1][1]}'))
+            stack.pop()
+        else:
+            stack.pop()
+    for name, offset, inverted in stack:
+        problems.append((offset, f'"{{{{{"^" if inverted else "#"}{name}}}}}" is never closed'))
+    return fields, problems
+
+
+def find_unsubstituted_fields(output_html):
+    """findUnsubstitutedFields(): every {{{...}}} left in a generated output"""
+    return [m.group(0) for m in MERGE_FIELD_PATTERN.finditer(output_html or '')]
+
+
+class DCMSnapshot:
+    """
+    Local copy of a DCM's structure: root object, child objects, fields per object
+
+    Usage:
+        snapshot = DCMSnapshot.load()
+        report = snapshot.validate(template)
+    """
+
+    def __init__(self, root_object, child_objects=None, fields_by_object=None, source=None):
+        self.root_object = root_object
+        self.child_objects = list(child_objects or [])
+        self.fields_by_object = {obj: list(fields) for obj, fields in (fields_by_object or {}).items()}
+        self.source = source
+        self.valid_objects = {root_object, *self.child_objects}
+        self._fields = {obj: set(fields) for obj, fields in self.fields_by_object.items()}
+        self.all_field_names = set().union(*self._fields.values()) if self._fields else set()
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(config["rootObject"], config.get("childObjects"), config.get("fieldsByObject"),
+                   config.get("source"))
+
+    def to_dict(self):
+        return {"rootObject": self.root_object, "childObjects": self.child_objects,
+                "fieldsByObject": self.fields_by_object, "source": self.source}
+
+    @classmethod
+    def load(cls, path=DEFAULT_SNAPSHOT_FILE):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path=DEFAULT_SNAPSHOT_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def has_field(self, object_name, field_name):
+        """validateFieldInObject()"""
+        return field_name in self._fields.get(object_name, ())
+
+    def _objects_text(self):
+        return self.root_object + (', ' + ', '.join(self.child_objects) if self.child_objects else '')
+
+    def check_field(self, field):
+        """Apply validateAgainstDCM()'s rules to one merge field, then the scope check"""
+        if field.object_name is None:
+            if not self.has_field(self.root_object, field.field_name) and field.field_name not in self.all_field_names:
+                field.is_valid = False
+                field.error_message = f'Field "{field.field_name}" not found in DCM'
+            elif not self.has_field(self.root_object, field.field_name) and not (
+                    field.scope and self.has_field(field.scope, field.field_name)):
+                owners = sorted(obj for obj, fields in self._fields.items() if field.field_name in fields)
+                where = f'inside {{{{#{field.scope}}}}}' if field.scope else 'outside an iteration block'
+                field.warning = f'Field "{field.field_name}" is only on {", ".join(owners)} but used {where}'
+        elif field.object_name not in self.valid_objects:
+            field.is_valid = False
+            field.error_message = (f'Object "{field.object_name}" not found in DCM. '
+                                   f'Available objects: {self._objects_text()}')
+        elif not self.has_field(field.object_name, field.field_name):
+            available = self.fields_by_object.get(field.object_name)
+            field.is_valid = False
+            field.error_message = (f'Field "{field.field_name}" not found on object "{field.object_name}" '
+                                   f'in DCM. Available fields: {", ".join(available) if available else "(none)"}')
+        return field
+
+    def validate(self, template, slots=False):
+        """
+        Report for one template: {passed, total, invalid, warnings, slots, fields, blocks}
+        fields lists only invalid or warned references; with slots=True lowercase
+        builder placeholders (and {{#collection}} blocks over them) are counted
+        instead of checked.
+        """
+        fields, problems = parse_template(template)
+        slot_count = 0
+        checked = []
+        for field in fields:
+            if slots and field.object_name is None and SLOT_PATTERN.match(field.field_name):
+                slot_count += 1
+                continue
+            checked.append(self.check_field(field))
+
+        blocks = [{"offset": offset, "error": message} for offset, message in problems]
+        for match in SECTION_PATTERN.finditer(template or ''):
+            name = match.group(2).strip()
+            if match.group(1) == '/' or name in self.valid_objects or (slots and SLOT_PATTERN.match(name)):
+                continue
+            blocks.append({"offset": match.start(),
+                           "error": f'Collection "{name}" not found in DCM. '
+                                    f'Available objects: {self._objects_text()}'})
+        blocks.sort(key=lambda block: block["offset"])
+
+        invalid = [field for field in checked if not field.is_valid]
+        warned = [field for field in checked if field.is_valid and field.warning]
+        return {
+            "passed": not invalid and not blocks,
+            "total": len(checked),
+            "invalid": len(invalid),
+            "warnings": len(warned),
+            "slots": slot_count,
+            "fields": [field.to_dict() for field in sorted(invalid + warned, key=lambda f: f.offset)],
+            "blocks": blocks,
+        }
+
+
+# -- Snapshots from the org -----------------------------------------------------
+
+def fetch_dcm_snapshot(client, dcm_id):
+    """Build a snapshot from ccai__AI_Data_Extraction_Field__c like buildDCMConfigFromRecords()"""
+    records = client.query(
+        "SELECT Id, ccai__Type__c, ccai__Field__c, ccai__Object__c "
+        "FROM ccai__AI_Data_Extraction_Field__c "
+        f"WHERE ccai__AI_Data_Extraction_Mapping__c = '{dcm_id}' "
+        "AND ccai__Type__c IN ('OBJECT', 'FIELD') "
+        "ORDER BY ccai__Type__c DESC")
+    root_object, child_objects, fields_by_object = None, [], {}
+    for record in records:
+        if record.get("ccai__Type__c") == "OBJECT":
+            name = record.get("ccai__Object__c")
+            if root_object is None:
+                root_object = name
+            elif name not in child_objects:
+                child_objects.append(name)
+            fields_by_object[name] = []
+    if root_object is None:
+        root_object = next((r["ccai__Object__c"] for r in records
+                            if r.get("ccai__Type__c") == "FIELD" and r.get("ccai__Object__c")), None)
+        if root_object is None:
+            return None
+        fields_by_object[root_object] = []
+    for record in records:
+        if record.get("ccai__Type__c") == "FIELD":
+            fields = fields_by_object.setdefault(record.get("ccai__Object__c") or root_object, [])
+            if record.get("ccai__Field__c") is not None:
+                fields.append(record["ccai__Field__c"])
+    return DCMSnapshot(root_object, child_objects, fields_by_object, source=f"dcm:{dcm_id}")
+
+
+def fetch_describe_snapshot(client, objects):
+    """Build a snapshot from sObject describes: first object is the root, every field is available"""
+    fields_by_object = {}
+    for name in objects:
+        describe = client.request_json("GET", f"{client.data_path}/sobjects/{name}/describe")
+        fields_by_object[name] = [field["name"] for field in describe.get("fields", [])]
+    return DCMSnapshot(objects[0], objects[1:], fields_by_object, source="describe:" + ",".join(objects))
+
+
+# -- Files ----------------------------------------------------------------------
+
+def load_templates(path):
+    """
+    (label, template, slots) for a variant text file or each builder in a *_builders.json
+    Traversal builders carry a JSON config instead of a template and are skipped.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, 'r', encoding='utf-8') as f:
+            builders = json.load(f)
+        return [(f"{path.name}: {builder.get('name')}", builder["promptCommand"], True)
+                for builder in builders if isinstance(builder.get("promptCommand"), str)]
+    return [(path.name, path.read_text(encoding='utf-8'), False)]
+
+
+def collect_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(path.glob("variant_*.txt")) + sorted(path.glob("*_builders.json"))
+        else:
+            files.append(path)
+    return files
+
+
+def preflight(variants, snapshot):
+    """
+    Split runner variants (dicts with prompt_text) into (valid, rejected)
+    rejected entries carry their report under "preflight"
+    """
+    valid, rejected = [], []
+    for variant in variants:
+        report = snapshot.validate(variant["prompt_text"])
+        if report["passed"]:
+            valid.append(variant)
+        else:
+            rejected.append({**variant, "preflight": report})
+    return valid, rejected
+
+
+def print_report(label, report):
+    mark = "❌" if not report["passed"] else ("⚠️ " if report["warnings"] else "✅")
+    slots = f", {report['slots']} slots" if report["slots"] else ""
+    print(f"{mark} {label}: {report['total']} merge fields, {report['invalid']} invalid{slots}")
+    for block in report["blocks"]:
+        print(f"     @{block['offset']}: {block['error']}")
+    for field in report["fields"]:
+        print(f"     @{field['offset']} {field['field']}: {field.get('error') or field['warning']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check variant and builder merge fields against a DCM snapshot")
+    parser.add_argument("paths", nargs="*", help="Variant files, *_builders.json, or directories of them "
+                                                 "(default: every phase's variants and scripts/data)")
+    parser.add_argument("--snapshot", default=str(DEFAULT_SNAPSHOT_FILE), help="DCM snapshot JSON")
+    parser.add_argument("--fetch-dcm", metavar="DCM_ID",
+                        help="Write --snapshot from a ccai__AI_Data_Extraction_Mapping__c first")
+    parser.add_argument("--fetch-describe", metavar="OBJECTS",
+                        help="Write --snapshot from describes of comma-separated objects (root first)")
+    parser.add_argument("--org", default="agentictso", help="sf CLI org alias for --fetch-*")
+    parser.add_argument("--quiet", action="store_true", help="Only print templates that fail")
+    args = parser.parse_args()
+
+    if args.fetch_dcm or args.fetch_describe:
+        from harness.sf_client import SalesforceClient
+        client = SalesforceClient.from_cli(args.org)
+        if args.fetch_dcm:
+            snapshot = fetch_dcm_snapshot(client, args.fetch_dcm)
+        else:
+            snapshot = fetch_describe_snapshot(client, [o.strip() for o in args.fetch_describe.split(",") if o.strip()])
+        if snapshot is None:
+            print(f"❌ DCM {args.fetch_dcm} has no OBJECT or FIELD records")
+            sys.exit(1)
+        snapshot.save(args.snapshot)
+        print(f"📥 {snapshot.source}: {snapshot.root_object} + {len(snapshot.child_objects)} child objects, "
+              f"{sum(len(f) for f in snapshot.fields_by_object.values())} fields -> {args.snapshot}")
+    try:
+        snapshot = DCMSnapshot.load(args.snapshot)
+    except FileNotFoundError:
+        print(f"❌ No DCM snapshot at {args.snapshot} (create one with --fetch-dcm or --fetch-describe)")
+        sys.exit(1)
+
+    files = collect_files(args.paths or DEFAULT_PATHS)
+    started = time.perf_counter()
+    failed = templates = 0
+    for path in files:
+        for label, template, slots in load_templates(path):
+            report = snapshot.validate(template, slots=slots)
+            templates += 1
+            failed += not report["passed"]
+            if not args.quiet or not report["passed"]:
+                print_report(label, report)
+    elapsed = time.perf_counter() - started
+    print(f"\n🔍 {templates} templates in {len(files)} files checked against {snapshot.source or args.snapshot} "
+          f"in {elapsed * 1000:.1f}ms: {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
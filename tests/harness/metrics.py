@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Step latency instrumentation for the experiment runners
+
+Records the wall time of every harness step so a slow run can be pinned on
+token fetches, prompt PATCHes, executePrompt, LLM processing or SOQL
+polling instead of guessed at from timestamps.
+
+- SalesforceClient times every REST call by kind (soql, sobject_patch,
+  execute_prompt, harness_api, token, ...).
+- The runners and the executor add per-variant steps (clone, llm, variant)
+  labelled with the variant key.
+- report() writes p50/p95/p99 per step as JSON and Prometheus text
+  (latency_report.json/.prom, named so the *_metrics.json scorer outputs
+  next to them never pick them up) and flags steps and samples that are
+  slow compared to a stored baseline (tests/.harness_state/latency_baseline.json,
+  one entry per runner and org, so stand-in runs never set an org's baseline).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_BASELINE_FILE = Path(__file__).resolve().parent.parent / ".harness_state" / "latency_baseline.json"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# A step is flagged when its p95 exceeds the baseline p95 by this factor;
+# a single sample when it exceeds the baseline p99 by it
+DEFAULT_TOLERANCE = 1.5
+# Baseline steps with fewer samples are too noisy to compare against
+MIN_BASELINE_SAMPLES = 3
+
+
+def percentile(sorted_values, q):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def quantile_name(q):
+    return f"p{round(q * 100)}"
+
+
+def request_step(method, path):
+    """Step name for a REST call"""
+    if "/query" in path:
+        return "soql"
+    if "/composite/" in path:
+        return "composite"
+    if "/sobjects/" in path:
+        return f"sobject_{method.lower()}"
+    if path.startswith("/services/apexrest/ccai/v1/executePrompt"):
+        return "execute_prompt"
+    if path.startswith("/services/apexrest/test-harness/"):
+        return "harness_api"
+    return "rest"
+
+
+class StepMetrics:
+    """Thread-safe collection of (step, seconds, label) samples"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, step, seconds, label=None):
+        with self._lock:
+            self.samples.setdefault(step, []).append((seconds, label))
+
+    @contextmanager
+    def span(self, step, label=None):
+        """Time the body of a `with` block (works around awaits too)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(step, time.perf_counter() - started, label)
+
+    def summary(self):
+        """{step: {count, sum, min, max, p50, p95, p99}} in seconds"""
+        with self._lock:
+            samples = {step: sorted(s for s, _ in values) for step, values in self.samples.items()}
+        summary = {}
+        for step, values in sorted(samples.items()):
+            stats = {
+                "count": len(values),
+                "sum": round(sum(values), 4),
+                "min": round(values[0], 4),
+                "max": round(values[-1], 4),
+            }
+            for q in QUANTILES:
+                stats[quantile_name(q)] = round(percentile(values, q), 4)
+            summary[step] = stats
+        return summary
+
+    def by_label(self):
+        """{label: {step: total seconds}} for the labelled (per-variant) steps"""
+        totals = {}
+        with self._lock:
+            for step, values in self.samples.items():
+                for seconds, label in values:
+                    if label is not None:
+                        steps = totals.setdefault(label, {})
+                        steps[step] = round(steps.get(step, 0.0) + seconds, 4)
+        return dict(sorted(totals.items()))
+
+    def to_json(self, path, runner=None):
+        payload = {"runner": runner, "steps": self.summary(), "variants": self.by_label()}
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+
+    def to_prometheus(self, path, runner=None, metric="harness_step_seconds"):
+        """Prometheus text exposition format: one summary per step"""
+        runner_label = f'runner="{runner}",' if runner else ""
+        lines = [
+            f"# HELP {metric} Wall time of experiment harness steps",
+            f"# TYPE {metric} summary",
+        ]
+        for step, stats in self.summary().items():
+            labels = f'{runner_label}step="{step}"'
+            for q in QUANTILES:
+                lines.append(f'{metric}{{{labels},quantile="{q}"}} {stats[quantile_name(q)]}')
+            lines.append(f"{metric}_sum{{{labels}}} {stats['sum']}")
+            lines.append(f"{metric}_count{{{labels}}} {stats['count']}")
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def outliers(self, baseline, tolerance=DEFAULT_TOLERANCE):
+        """
+        Compare against a baseline summary ({step: {p95, p99, count, ...}})
+        Returns a list of flags: a step whose p95 regressed, or a single
+        labelled sample slower than the baseline p99.
+        """
+        flags = []
+        summary = self.summary()
+        with self._lock:
+            samples = {step: list(values) for step, values in self.samples.items()}
+        for step, stats in summary.items():
+            base = baseline.get(step)
+            if not base or base.get("count", 0) < MIN_BASELINE_SAMPLES:
+                continue
+            if base["p95"] and stats["p95"] > base["p95"] * tolerance:
+                flags.append({"step": step, "kind": "p95", "seconds": stats["p95"], "baseline": base["p95"]})
+            for seconds, label in samples[step]:
+                if label is not None and base["p99"] and seconds > base["p99"] * tolerance:
+                    flags.append({"step": step, "kind": "sample", "label": label,
+                                  "seconds": round(seconds, 4), "baseline": base["p99"]})
+        return flags
+
+
+def baseline_key(runner, instance_url=None):
+    """Baselines are per runner and org instance (a stand-in server is an instance of its own)"""
+    return f"{runner}@{instance_url.rstrip('/')}" if instance_url else runner
+
+
+def load_baseline(key, path=DEFAULT_BASELINE_FILE):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get(key)
+
+
+def save_baseline(key, summary, path=DEFAULT_BASELINE_FILE):
+    path = Path(path)
+    baselines = {}
+    if path.exists():
+        with open(path, 'r') as f:
+            baselines = json.load(f)
+    baselines[key] = summary
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+
+
+def report(metrics, output_dir, runner, instance_url=None, update_baseline=False,
+           baseline_path=DEFAULT_BASELINE_FILE, tolerance=DEFAULT_TOLERANCE):
+    """
+    Print the step table, write latency_report.json/.prom to output_dir and
+    flag outliers against the runner's baseline for instance_url
+    The first run of a runner against an org (or update_baseline=True) becomes its baseline.
+    Returns the list of outlier flags.
+    """
+    summary = metrics.summary()
+    if not summary:
+        return []
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    json_path, prom_path = output_dir / "latency_report.json", output_dir / "latency_report.prom"
+    metrics.to_json(json_path, runner)
+    metrics.to_prometheus(prom_path, runner)
+
+    print(f"\n⏱️  Step latency ({runner})")
+    print(f"   {'Step':<18} {'Count':>6} {'Total':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for step, stats in summary.items():
+        print(f"   {step:<18} {stats['count']:>6} {stats['sum']:>8.1f}s "
+              f"{stats['p50']:>7.2f}s {stats['p95']:>7.2f}s {stats['p99']:>7.2f}s")
+
+    key = baseline_key(runner, instance_url)
+    baseline = load_baseline(key, baseline_path)
+    flags = metrics.outliers(baseline, tolerance) if baseline else []
+    for flag in flags:
+        where = f" [{flag['label']}]" if flag.get("label") else ""
+        print(f"   ⚠️  {flag['step']}{where}: {flag['seconds']:.2f}s "
+              f"({flag['kind']} vs baseline {flag['baseline']:.2f}s)")
+
+    if baseline is None or update_baseline:
+        save_baseline(key, summary, baseline_path)
+        print(f"   Baseline {'updated' if baseline else 'saved'} for {key}")
+    print(f"   Saved: {json_path}, {prom_path}")
+    return flags
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Local output validation driven by PF_OutputValidationRules.json
+
+Stage 11 (Stage11_SafetyValidation.cls) only applies the output rules inside
+the org, after a full LLM round trip. OutputValidator loads the same static
+resource and checks outputs locally, so variants can be gated in CI and
+archives triaged without org callouts:
+
+- criticalRules      checkPattern with mustMatch / mustNotMatch
+- placeholderRules   every {pattern, description} in patterns
+- securityRules      checkPattern or a patterns list, all must-not-match
+- qualityRules       noAbsoluteDates (checkPattern), minStyleCount,
+                     minLength and noEmojis (WARNING severity)
+- contentQualityDimensions with a lookFor list: at least one term present
+
+Every pattern is compiled once. HTML checks (criticalRules, securityRules,
+qualityRules) ignore case like Stage 11 does; placeholder patterns are
+case-sensitive, since the rules list [X] and [x] separately. re.IGNORECASE
+defeats re's fast literal search (onclick scans ~8x slower), so
+case-insensitive checks run as lowercased patterns over a lowercased copy
+of the output instead - same matches, same offsets.
+mustMatch anchors (^<div style=", </div>$) apply to the output with
+surrounding whitespace stripped, as Stage 11 trims before checking.
+
+Usage:
+    validator = OutputValidator()
+    report = validator.validate(html)   # {passed, errors, warnings, rules: [...]}
+
+    python3 tests/harness/output_validation.py tests/phase0c/outputs
+    python3 tests/harness/output_validation.py archive/ --fail-on warning --out results.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from functools import lru_cache, partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.batch_scoring import DEFAULT_CHUNK_SIZE, iter_output_files, run_batch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+VALIDATION_RULES = REPO_ROOT / "force-app" / "main" / "default" / "staticresources" / "PF_OutputValidationRules.json"
+
+ERROR = "ERROR"
+WARNING = "WARNING"
+# Offsets kept per failed rule (the count is always exact)
+MAX_OFFSETS = 20
+EXCERPT_CHARS = 60
+
+STYLE_ATTRIBUTE = r'style\s*='
+EMOJI = r'[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F]'
+# Characters re.IGNORECASE equates with an ASCII letter that str.lower() doesn't map to it
+FOLD_UNSAFE = "\u017f\u0131\u0130"
+
+
+class Check:
+    """One compiled pattern of a rule"""
+
+    def __init__(self, pattern, flags, description=None, must_match=False):
+        self.pattern = pattern
+        self.regex = re.compile(pattern, flags)
+        self.flags = flags
+        self.description = description or pattern
+        self.must_match = must_match
+        # Case-sensitive equivalent for a lowercased output, when the pattern allows one
+        self.folded = None
+        if flags & re.IGNORECASE and pattern.isascii() and not re.search(r'\\[xuUN]', pattern):
+            self.folded = re.compile(_lower_pattern(pattern), flags & ~re.IGNORECASE)
+
+    def regex_for(self, text):
+        """(regex, string to run it on) for a Text"""
+        if self.folded is not None and text.foldable:
+            return self.folded, text.lowered
+        return self.regex, text.html
+
+
+def _lower_pattern(pattern):
+    """Lowercase a regex's literal letters, leaving escapes (\\S, \\W, \\B, ...) alone"""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern[i] == '\\':
+            out.append(pattern[i:i + 2])
+            i += 2
+        else:
+            out.append(pattern[i].lower())
+            i += 1
+    return "".join(out)
+
+
+class Text:
+    """One output, with the lowercased copy the folded checks run on"""
+
+    def __init__(self, html):
+        self.html = html
+        self.lowered = html.lower()
+        self.foldable = len(self.lowered) == len(html) and not any(c in html for c in FOLD_UNSAFE)
+        self.stripped = html.strip()
+        self.lowered_stripped = self.lowered.strip()
+
+    def stripped_for(self, string):
+        """The stripped form of html or of its lowercased copy"""
+        return self.lowered_stripped if string is self.lowered else self.stripped
+
+
+class Rule:
+    """A rule from the JSON with its compiled checks"""
+
+    def __init__(self, rule_id, section, definition, checks=(), kind="pattern"):
+        self.id = rule_id
+        self.section = section
+        self.name = definition.get("name", rule_id)
+        self.severity = definition.get("severity", WARNING)
+        self.definition = definition
+        self.checks = list(checks)
+        self.kind = kind
+
+
+def _excerpt(html, start, end):
+    return html[start:min(end, start + EXCERPT_CHARS)]
+
+
+class OutputValidator:
+    """
+    PF_OutputValidationRules.json, compiled once
+
+    Usage:
+        validator = OutputValidator()
+        report = validator.validate(html)
+        for rule in report["rules"]:
+            if not rule["passed"]:
+                print(rule["rule"], rule["count"], rule["violations"][:1])
+    """
+
+    def __init__(self, rules_path=VALIDATION_RULES):
+        self.rules_path = Path(rules_path)
+        with open(self.rules_path, 'r', encoding='utf-8') as f:
+            self.definitions = json.load(f)
+        self.version = self.definitions.get("version")
+        self.rules = []
+        # Sections/rules with nothing machine-checkable (reported, not enforced)
+        self.unchecked = []
+        self._load()
+
+    def _load(self):
+        sections = self.definitions
+        for rule_id, definition in sections.get("criticalRules", {}).items():
+            if "checkPattern" in definition:
+                must_match = bool(definition.get("mustMatch"))
+                self.rules.append(Rule(rule_id, "criticalRules", definition, [
+                    Check(definition["checkPattern"], re.IGNORECASE, definition.get("description"), must_match)]))
+            else:
+                self.unchecked.append(f"criticalRules.{rule_id}")
+
+        for rule_id, definition in sections.get("placeholderRules", {}).items():
+            checks = [Check(item["pattern"], 0, item.get("description")) if isinstance(item, dict)
+                      else Check(item, 0) for item in definition.get("patterns", [])]
+            self.rules.append(Rule(rule_id, "placeholderRules", definition, checks))
+
+        for rule_id, definition in sections.get("securityRules", {}).items():
+            patterns = [definition["checkPattern"]] if "checkPattern" in definition else definition.get("patterns", [])
+            self.rules.append(Rule(rule_id, "securityRules", definition,
+                                   [Check(pattern, re.IGNORECASE, definition.get("description") if "checkPattern" in definition
+                                          else pattern) for pattern in patterns]))
+
+        for rule_id, definition in sections.get("qualityRules", {}).items():
+            if "checkPattern" in definition:
+                checks, kind = [Check(definition["checkPattern"], re.IGNORECASE, definition.get("description"))], "pattern"
+            elif "minCount" in definition:
+                checks, kind = [Check(STYLE_ATTRIBUTE, re.IGNORECASE, must_match=True)], "minCount"
+            elif "minLength" in definition:
+                checks, kind = [], "minLength"
+            elif rule_id == "noEmojis":
+                checks, kind = [Check(EMOJI, 0, "emoji character")], "pattern"
+            else:
+                self.unchecked.append(f"qualityRules.{rule_id}")
+                continue
+            self.rules.append(Rule(rule_id, "qualityRules", definition, checks, kind))
+
+        for rule_id, definition in sections.get("contentQualityDimensions", {}).items():
+            if definition.get("lookFor"):
+                look_for = "|".join(re.escape(term) for term in definition["lookFor"])
+                self.rules.append(Rule(rule_id, "contentQualityDimensions", {"severity": WARNING, **definition},
+                                       [Check(look_for, re.IGNORECASE, "one of lookFor", must_match=True)],
+                                       kind="lookFor"))
+            else:
+                self.unchecked.append(f"contentQualityDimensions.{rule_id}")
+
+    # -- checking ---------------------------------------------------------------------
+
+    def _violations(self, check, text):
+        """Offsets of every match (the first MAX_OFFSETS), only for checks that matched at all"""
+        regex, string = check.regex_for(text)
+        if not regex.search(string):
+            return [], 0
+        violations, count = [], 0
+        for match in regex.finditer(string):
+            count += 1
+            if len(violations) < MAX_OFFSETS:
+                violations.append({"offset": match.start(), "match": _excerpt(text.html, match.start(), match.end()),
+                                   "check": check.description})
+        return violations, count
+
+    def _check_rule(self, rule, text):
+        violations, count, message = [], 0, None
+        if rule.kind == "minLength":
+            minimum = rule.definition["minLength"]
+            if len(text.stripped) < minimum:
+                count, message = 1, f"{len(text.stripped)} characters (minimum {minimum})"
+        elif rule.kind == "minCount":
+            regex, string = rule.checks[0].regex_for(text)
+            styles = sum(1 for _ in regex.finditer(string))
+            if styles < rule.definition["minCount"]:
+                count, message = 1, f"{styles} inline style attributes (minimum {rule.definition['minCount']})"
+        elif rule.kind == "lookFor":
+            regex, string = rule.checks[0].regex_for(text)
+            if not regex.search(string):
+                count, message = 1, f"none of: {', '.join(rule.definition['lookFor'])}"
+        else:
+            for check in rule.checks:
+                if check.must_match:
+                    regex, string = check.regex_for(text)
+                    if not regex.search(text.stripped_for(string)):
+                        count += 1
+                        violations.append({"offset": None, "match": None, "check": check.description})
+                else:
+                    found, found_count = self._violations(check, text)
+                    violations += found[:MAX_OFFSETS - len(violations)]
+                    count += found_count
+        return {
+            "rule": rule.id,
+            "section": rule.section,
+            "name": rule.name,
+            "severity": rule.severity,
+            "passed": count == 0,
+            "count": count,
+            "violations": violations,
+            **({"message": message} if message else {}),
+        }
+
+    def validate(self, html):
+        """Per-rule results for one output: {passed, errors, warnings, rules: [...]}"""
+        text = Text(html)
+        results = [self._check_rule(rule, text) for rule in self.rules]
+        errors = sum(1 for r in results if not r["passed"] and r["severity"] == ERROR)
+        warnings = sum(1 for r in results if not r["passed"] and r["severity"] != ERROR)
+        return {"passed": errors == 0, "errors": errors, "warnings": warnings, "rules": results}
+
+    def failures(self, html):
+        """Only the failed rules (what a gate or triage cares about)"""
+        return [rule for rule in self.validate(html)["rules"] if not rule["passed"]]
+
+
+@lru_cache(maxsize=4)
+def get_validator(rules_path=str(VALIDATION_RULES)):
+    """One compiled validator per rules file per process"""
+    return OutputValidator(rules_path)
+
+
+def validate_file(path, rules_path=str(VALIDATION_RULES)):
+    """Validate one output file (batch mode worker): the report without passing rules"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        report = get_validator(rules_path).validate(f.read())
+    report["rules"] = [rule for rule in report["rules"] if not rule["passed"]]
+    return report
+
+
+def _print_failures(path, report):
+    icon = "❌" if report["errors"] else "⚠️ "
+    print(f"{icon} {path}: {report['errors']} errors, {report['warnings']} warnings")
+    for rule in report["rules"]:
+        where = ""
+        offsets = [v["offset"] for v in rule["violations"] if v["offset"] is not None]
+        if offsets:
+            where = f" at {', '.join(map(str, offsets[:5]))}{' ...' if rule['count'] > 5 else ''}"
+        detail = rule.get("message") or "; ".join(dict.fromkeys(v["check"] for v in rule["violations"]))
+        print(f"   {rule['severity']:<7} {rule['section']}.{rule['rule']} ({rule['count']}x{where}): {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate outputs against PF_OutputValidationRules.json locally")
+    parser.add_argument("paths", nargs="+", help="Output files or directories (*.html, recursively)")
+    parser.add_argument("--rules", default=str(VALIDATION_RULES), help="Validation rules JSON")
+    parser.add_argument("--pattern", default="*.html", help="File pattern inside directories")
+    parser.add_argument("--out", help="Save every report (.jsonl, or .csv) instead of printing failures")
+    parser.add_argument("--workers", type=int, default=None, help="With --out: worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="With --out: outputs per work unit")
+    parser.add_argument("--fail-on", choices=["error", "warning", "never"], default="error",
+                        help="Exit 1 if any output has a failure of this severity (CI gate)")
+    args = parser.parse_args()
+
+    validator = get_validator(args.rules)
+    print(f"📋 Rules v{validator.version}: {len(validator.rules)} checked"
+          f"{f', not machine-checkable: {len(validator.unchecked)}' if validator.unchecked else ''}")
+
+    if args.out:
+        for root in args.paths:
+            run_batch(partial(validate_file, rules_path=args.rules), root, args.out,
+                      workers=args.workers, chunk_size=args.chunk_size, pattern=args.pattern)
+        return
+
+    started = time.perf_counter()
+    outputs = with_errors = with_warnings = 0
+    for root in args.paths:
+        for path in iter_output_files(root, args.pattern):
+            report = validate_file(path, args.rules)
+            outputs += 1
+            with_errors += bool(report["errors"])
+            with_warnings += bool(report["warnings"])
+            if report["rules"]:
+                _print_failures(path, report)
+    elapsed = time.perf_counter() - started
+    rate = f" ({outputs / elapsed:.0f}/s)" if elapsed else ""
+    print(f"\n✅ {outputs} outputs in {elapsed:.2f}s{rate}: {with_errors} with errors, {with_warnings} with warnings")
+
+    if (args.fail_on == "error" and with_errors) or (args.fail_on == "warning" and (with_errors or with_warnings)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Concurrent pipeline launcher for end-to-end runs
+
+Starts K pipeline runs through TestHarnessController at once and follows
+all of them with one multiplexed poller: each tick is a single
+`SELECT ... FROM PF_Run__c WHERE Id IN (...)` instead of one run-status
+call per run every 10s. As soon as a run's Stage 9 prompt appears it is
+handed to the caller's evaluate() (execute + score) while the other runs
+keep going, so an iteration costs about max(run) instead of sum(runs).
+
+Once a run scores at or above the target, every run that is still going is
+aborted the same way PromptFactoryController.abortPipeline does it
+(Status__c = 'Aborted', which the pipeline stages check before advancing).
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness.polling import BackoffSchedule
+from harness.responses import query_by_ids
+from harness.sf_client import SalesforceError
+
+RUN_OBJECT = "PF_Run__c"
+RUN_FIELDS = ["Id", "Name", "Status__c", "Current_Stage__c", "Created_Prompt_Id__c", "Error_Message__c"]
+
+# PF_Run__c.Status__c
+FINISHED_RUN_STATUSES = {"Completed", "Failed", "Aborted"}
+UNABORTABLE_RUN_STATUSES = {"Completed", "Failed"}
+
+# Stage09_CreateAndDeploy creates the prompt
+PROMPT_STAGE = 9
+
+# Pipeline stages take tens of seconds, so poll far less eagerly than responses
+DEFAULT_RUN_SCHEDULE = BackoffSchedule(initial=2.0, factor=1.5, max_delay=5.0)
+
+
+def abort_run(client, run_id):
+    """Abort a run unless it already finished; returns True if it was aborted"""
+    record = client.get_record(RUN_OBJECT, run_id, fields=["Status__c"])
+    if record.get('Status__c') in UNABORTABLE_RUN_STATUSES | {"Aborted"}:
+        return False
+    client.update_record(RUN_OBJECT, run_id, {"Status__c": "Aborted"})
+    return True
+
+
+class PipelineLauncher:
+    """
+    Start several pipeline runs and evaluate each one as its prompt appears
+
+    Usage:
+        launcher = PipelineLauncher(client, evaluate, target_score=90)
+        runs = launcher.run_all([{"root_object": "Account", "sample_record_id": acct_id}] * 3)
+
+    `evaluate(run)` is blocking and gets the run dict (index, params, run_id,
+    prompt_id); it returns (score, result). Each returned run dict has
+    status, stage, prompt_id, score, result, error and elapsed.
+    """
+
+    def __init__(self, client, evaluate, target_score=None, max_wait=600, schedule=None,
+                 concurrency=None, on_update=None):
+        self.client = client
+        self.evaluate = evaluate
+        self.target_score = target_score
+        self.max_wait = max_wait
+        self.schedule = schedule or DEFAULT_RUN_SCHEDULE
+        self.concurrency = concurrency
+        self.on_update = on_update or (lambda run, message: None)
+        self.stopped = False
+        self._threads = None
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._threads, func, *args)
+
+    def _update(self, run, message):
+        self.on_update(run, message)
+
+    def _finish(self, run, status, error=None):
+        run["status"] = status
+        run["done"] = True
+        run["elapsed"] = round(time.monotonic() - run["started"], 1)
+        if error:
+            run["error"] = error
+
+    async def _start(self, run):
+        try:
+            response = await self._call(lambda: self.client.start_pipeline(**run["params"]))
+        except SalesforceError as e:
+            response = {"error": str(e)}
+        run["started"] = time.monotonic()
+        if not response or not response.get('success'):
+            self._finish(run, "Failed", f"Pipeline start failed: {response}")
+            self._update(run, run["error"])
+            return
+        run["run_id"] = response.get('runId')
+        run["status"] = "Queued"
+        self._update(run, f"started {run['run_id']}")
+
+    async def _evaluate(self, run):
+        self._update(run, f"Stage {PROMPT_STAGE} prompt {run['prompt_id']} - evaluating")
+        try:
+            with self.client.metrics.span("evaluate", f"run{run['index']}"):
+                score, result = await self._call(self.evaluate, dict(run))
+        except Exception as e:
+            score, result = None, None
+            run["error"] = str(e)
+        run.update({"score": score, "result": result})
+        self._finish(run, "Scored" if score is not None else "Failed", run.get("error"))
+        self._update(run, f"score {score}" if score is not None else f"evaluation failed: {run['error']}")
+
+        if self.target_score is not None and score is not None and score >= self.target_score:
+            await self.stop(f"run {run['index']} scored {score} >= {self.target_score}")
+
+    async def stop(self, reason):
+        """Abort every run still in the pipeline and stop waiting for the rest"""
+        if self.stopped:
+            return
+        self.stopped = True
+        # Runs already past Stage 9 only have their evaluation left; let it finish
+        active = [r for r in self._runs if not r.get("done") and not r.get("evaluating") and r.get("run_id")]
+        await asyncio.gather(*(self._abort(run, reason) for run in active))
+
+    async def _abort(self, run, reason):
+        try:
+            aborted = await self._call(abort_run, self.client, run["run_id"])
+        except SalesforceError as e:
+            aborted = False
+            run["error"] = f"Abort failed: {e}"
+        self._finish(run, "Aborted" if aborted else run.get("status"))
+        self._update(run, f"aborted ({reason})" if aborted else "already finished")
+
+    async def _poll(self):
+        """One PF_Run__c query per tick for every run still waiting on its prompt"""
+        attempt = 0
+        evaluations = []
+        while not self.stopped:
+            waiting = [r for r in self._runs if not r.get("done") and not r.get("evaluating")]
+            if not waiting:
+                break
+            try:
+                by_id = await self._call(query_by_ids, self.client, RUN_FIELDS,
+                                         [r["run_id"] for r in waiting], RUN_OBJECT)
+            except SalesforceError:
+                by_id = {}
+
+            now = time.monotonic()
+            changed = False
+            for run in waiting:
+                record = by_id.get(run["run_id"])
+                if record:
+                    stage = int(record.get('Current_Stage__c') or 0)
+                    status = record.get('Status__c')
+                    if (stage, status) != (run.get("stage"), run.get("status")):
+                        run["stage"], run["status"] = stage, status
+                        changed = True
+                        self._update(run, f"Stage {stage}: {status}")
+                    if stage >= PROMPT_STAGE and record.get('Created_Prompt_Id__c'):
+                        run["prompt_id"] = record['Created_Prompt_Id__c']
+                        self.client.metrics.observe("pipeline", now - run["started"], f"run{run['index']}")
+                        run["evaluating"] = True
+                        evaluations.append(asyncio.ensure_future(self._evaluate(run)))
+                        continue
+                    if status in FINISHED_RUN_STATUSES:
+                        self._finish(run, status, record.get('Error_Message__c')
+                                     or f"Pipeline {status.lower()} at stage {stage}")
+                        self._update(run, run["error"])
+                        continue
+                if now - run["started"] >= self.max_wait:
+                    self._finish(run, "Timeout", f"Timeout waiting for Stage {PROMPT_STAGE}")
+                    self._update(run, run["error"])
+
+            # Progress resets the backoff; a quiet tick stretches it
+            attempt = 0 if changed else attempt + 1
+            await asyncio.sleep(self.schedule.delay(attempt))
+        return evaluations
+
+    async def run(self, launches):
+        """Launch every entry of `launches` (start_pipeline kwargs) and follow them to a score"""
+        self.stopped = False
+        self._runs = [{"index": i, "params": dict(params), "run_id": None, "status": None,
+                       "stage": 0, "prompt_id": None, "score": None, "result": None}
+                      for i, params in enumerate(launches, 1)]
+        workers = self.concurrency or max(len(self._runs), 1)
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            self._threads = threads
+            await asyncio.gather(*(self._start(run) for run in self._runs))
+            evaluations = await self._poll()
+            # Evaluations already in flight finish even after an early stop
+            await asyncio.gather(*evaluations)
+            self._threads = None
+        for run in self._runs:
+            run.pop("evaluating", None)
+            run.pop("done", None)
+            run.pop("started", None)
+        return self._runs
+
+    def run_all(self, launches):
+        """Blocking entry point for the runners"""
+        return asyncio.run(self.run(launches))
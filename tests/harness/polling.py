@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Adaptive completion polling for ccai__AI_Response__c records
+
+Replaces the runners' fixed sleeps (60s/90s/20s, then 20-30s retries):
+- The first poll for a response is scheduled from the latency history of
+  its prompt, slightly before the fastest recent completion.
+- After that, polls back off exponentially with jitter, capped at
+  max_delay (default 1s), so completion is seen within about a second.
+- Every in-flight response shares one poller, which checks all due ids
+  with a single batched `WHERE Id IN (...)` query per tick.
+- Polls select status fields only; bodies of responses that completed in
+  a tick are downloaded together, once (see harness.responses).
+- Each wait respects a total deadline.
+"""
+
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from harness.responses import fetch_bodies, fetch_statuses
+
+# ccai__AI_Response__c statuses
+SUCCESS_STATUSES = {"Processed", "Completed"}
+TERMINAL_STATUSES = SUCCESS_STATUSES | {"Failed", "Error"}
+
+DEFAULT_HISTORY_FILE = Path(__file__).resolve().parent.parent / ".harness_state" / "latency_history.json"
+
+# Local clock vs org clock allowance for "created since executePrompt" lookups
+CLOCK_SKEW = timedelta(seconds=2)
+
+
+class BackoffSchedule:
+    """Exponential backoff with jitter: initial, initial*factor, ... capped at max_delay"""
+
+    def __init__(self, initial=0.25, factor=2.0, max_delay=1.0, jitter=0.2):
+        self.initial = initial
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """Delay before poll number `attempt` (0-based), with +/- jitter"""
+        base = min(self.initial * (self.factor ** attempt), self.max_delay)
+        spread = base * self.jitter
+        return min(max(base + random.uniform(-spread, spread), 0.0), self.max_delay)
+
+
+class LatencyHistory:
+    """Per-prompt LLM latency samples, persisted between runs as JSON"""
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE, max_samples=20):
+        self.path = Path(path)
+        self.max_samples = max_samples
+        self.samples = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.samples = json.load(f)
+
+    def record(self, key, seconds):
+        if key is None:
+            return
+        series = self.samples.setdefault(key, [])
+        series.append(round(seconds, 2))
+        del series[:-self.max_samples]
+
+    def first_delay(self, key, default=1.0, safety=0.8, min_samples=3):
+        """When to poll first: a bit before the fastest recent completion"""
+        series = self.samples.get(key)
+        # Too few runs to trust the floor; start polling right away
+        if not series or len(series) < min_samples:
+            return default
+        return max(min(series) * safety, default)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.samples, f, indent=2)
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def soql_datetime(dt):
+    """Format a datetime as a SOQL datetime literal"""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def latest_response_id(client, prompt_id, record_id=None, created_after=None):
+    """Most recent ccai__AI_Response__c Id for a prompt (fallback when executePrompt gave none)"""
+    where = [f"ccai__AI_Prompt__c = '{prompt_id}'"]
+    if record_id:
+        where.append(f"ccai__Record_Id__c = '{record_id}'")
+    if created_after:
+        where.append(f"CreatedDate >= {soql_datetime(created_after - CLOCK_SKEW)}")
+    records = client.query(
+        f"SELECT Id FROM ccai__AI_Response__c WHERE {' AND '.join(where)} ORDER BY CreatedDate DESC LIMIT 1"
+    )
+    return records[0]['Id'] if records else None
+
+
+class _Pending:
+    def __init__(self, future, key, started, first_delay, deadline):
+        self.future = future
+        self.key = key
+        self.started = started
+        self.deadline = deadline
+        self.next_poll = started + first_delay
+        self.attempt = 0
+        self.record = None
+        self.latency = None
+
+
+class ResponsePoller:
+    """
+    Multiplexed status poller shared by every in-flight response
+
+    Usage (inside a running event loop):
+        poller = ResponsePoller(client)
+        record = await poller.wait(response_id, key=prompt_id, started=t0)
+    """
+
+    def __init__(self, client, schedule=None, history=None, timeout=300, query_runner=None):
+        self.client = client
+        self.schedule = schedule or BackoffSchedule()
+        self.history = history if history is not None else LatencyHistory()
+        self.timeout = timeout
+        # Lets callers route the blocking query through their own thread pool
+        self.query_runner = query_runner
+        self._pending = {}
+        self._wakeup = None
+        self._task = None
+
+    async def wait(self, response_id, key=None, started=None, timeout=None):
+        """
+        Wait until response_id reaches a terminal status or the deadline passes
+        Returns the full record (BODY_FIELDS) once terminal, otherwise the
+        last status record seen ({'Id', 'ccai__Status__c'}) or None.
+        `started` is the time.monotonic() at which executePrompt was sent.
+        """
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        started = started if started is not None else now
+        first_delay = max(self.history.first_delay(key, default=self.schedule.initial) - (now - started), 0.0)
+        entry = _Pending(loop.create_future(), key, started, first_delay,
+                         started + (timeout or self.timeout))
+        self._pending[response_id] = entry
+        self._ensure_running()
+        return await entry.future
+
+    def _ensure_running(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _query(self, func, ids):
+        if self.query_runner:
+            return await self.query_runner(func, self.client, ids)
+        return await asyncio.to_thread(func, self.client, ids)
+
+    async def _run(self):
+        while self._pending:
+            now = time.monotonic()
+            due = [rid for rid, p in self._pending.items() if p.next_poll <= now]
+
+            if due:
+                try:
+                    by_id = await self._query(fetch_statuses, due)
+                except Exception:
+                    # Transient query failure: treat as "not done yet" and keep backing off
+                    by_id = {}
+                polled_at = time.monotonic()
+
+                finished = []
+                for rid in due:
+                    entry = self._pending[rid]
+                    entry.record = by_id.get(rid, entry.record)
+                    status = (entry.record or {}).get('ccai__Status__c')
+                    if status in TERMINAL_STATUSES:
+                        if entry.latency is None:
+                            entry.latency = polled_at - entry.started
+                            self.history.record(entry.key, entry.latency)
+                        finished.append(rid)
+                    elif polled_at >= entry.deadline:
+                        self._resolve(rid, entry.record)
+                    else:
+                        self._backoff(entry, polled_at)
+
+                if finished:
+                    await self._download(finished)
+                continue
+
+            if not self._pending:
+                break
+            sleep_for = min(p.next_poll for p in self._pending.values()) - time.monotonic()
+            self._wakeup.clear()
+            try:
+                # New registrations wake the loop early so their first poll isn't delayed
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(sleep_for, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+        self._wakeup = None
+        self.history.save()
+
+    async def _download(self, response_ids):
+        """One bulk body query for everything that finished this tick"""
+        try:
+            bodies = await self._query(fetch_bodies, response_ids)
+        except Exception:
+            bodies = {}
+        now = time.monotonic()
+        for rid in response_ids:
+            entry = self._pending[rid]
+            if rid in bodies:
+                self._resolve(rid, bodies[rid])
+            elif now >= entry.deadline:
+                self._resolve(rid, entry.record)
+            else:
+                # Retried on the next tick (status is re-checked, which is cheap)
+                self._backoff(entry, now)
+
+    def _backoff(self, entry, now):
+        entry.next_poll = min(now + self.schedule.delay(entry.attempt), entry.deadline)
+        entry.attempt += 1
+
+    def _resolve(self, response_id, record):
+        entry = self._pending.pop(response_id)
+        if not entry.future.done():
+            entry.future.set_result(record)
+
+
+def wait_for_responses(client, response_ids, key=None, started=None, timeout=300, history=None):
+    """
+    Blocking helper for the sequential runners
+    Returns {response_id: full record, last status record, or None}
+    """
+    async def _wait_all():
+        poller = ResponsePoller(client, history=history, timeout=timeout)
+        records = await asyncio.gather(*(poller.wait(rid, key=key, started=started) for rid in response_ids))
+        return dict(zip(response_ids, records))
+    return asyncio.run(_wait_all())
+
+
+def wait_for_prompt_response(client, prompt_id, record_id=None, response_id=None, created_after=None,
+                             started=None, timeout=300, schedule=None, history=None):
+    """
+    Blocking wait for the response to one executePrompt call
+    If executePrompt didn't return a responseId, the newest response for the
+    prompt created after `created_after` is looked up on the same backoff.
+    Returns (response_id, record) - the full record once terminal; either
+    may be None on timeout.
+    """
+    schedule = schedule or BackoffSchedule()
+    started = started if started is not None else time.monotonic()
+    deadline = started + timeout
+    attempt = 0
+    while not response_id:
+        response_id = latest_response_id(client, prompt_id, record_id, created_after)
+        if response_id:
+            break
+        if time.monotonic() >= deadline:
+            return None, None
+        time.sleep(schedule.delay(attempt))
+        attempt += 1
+
+    # The deadline counts from `started`, so the lookup above already used part of it
+    records = wait_for_responses(client, [response_id], key=prompt_id, started=started,
+                                 timeout=timeout, history=history)
+    return response_id, records[response_id]
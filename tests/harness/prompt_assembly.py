@@ -0,0 +1,1241 @@
+#!/usr/bin/env python3
+"""
+Offline Stage 8 prompt assembly
+
+Stage08_PromptAssembly.cls builds the final prompt command inside the org, so
+testing one assembly change costs a deploy and a full 12-stage run. This is a
+port of its prompt-building path that runs locally:
+- meta-prompt (V2.0/V2.5): buildMetaPrompt and its section builders, the
+  grounding rules and the merge field reference appended for Stage 9
+- legacy template mode (V1.1): buildAIInstructions with the
+  loadQualityRules / loadPatterns / loadUIComponents / loadContextTemplates
+  builder loaders
+
+Inputs are a stage snapshot and a set of builders:
+- the snapshot holds the stage 7 outputs Stage 8 receives, the sample record
+  and its children as the REST API returns them, child relationship names,
+  today's date and the running user's time zone
+- builders are ccai__AI_Prompt__c field values (Name, ccai__Type__c,
+  ccai__Status__c, ccai__Object__c, ccai__Description__c,
+  ccai__Prompt_Command__c), taken from the snapshot or from the local
+  library (scripts/data/*_builders.json plus the markdown builders)
+
+The output is byte-identical to the Apex promptCommand, Apex quirks included
+(null concatenates as "null", == on strings ignores case, long values are cut
+at 200 UTF-16 code units). Golden fixtures in tests/golden/stage08/ pair a
+snapshot with the promptCommand captured from the org; --check re-assembles
+each one and diffs it. Snapshots marked "expectedTrimmed" were captured from
+ccai__AI_Response__c.ccai__Prompt_Command__c, which the org stores trimmed, and
+are compared after trimming the assembled prompt the same way.
+
+Builder-derived sections are built once per builder set, so a variant only
+re-renders the sections that depend on the snapshot.
+
+Usage:
+    python3 tests/harness/prompt_assembly.py --check
+    python3 tests/harness/prompt_assembly.py tests/golden/stage08/account_360_v25.json > prompt.txt
+    python3 tests/harness/prompt_assembly.py tests/golden/stage08/account_360_v25.json --library --bench 5000
+    python3 tests/harness/prompt_assembly.py --capture a0gQH000005GHurYAG --name account_360_v25
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+import time
+from datetime import date, datetime
+from decimal import ROUND_HALF_EVEN, Decimal
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+GOLDEN_DIR = REPO_ROOT / "tests" / "golden" / "stage08"
+EXPECTED_SUFFIX = ".expected.txt"
+
+# Describe length of ccai__AI_Prompt__c.ccai__Prompt_Command__c (getPromptCommandMaxLength fallback)
+PROMPT_COMMAND_MAX_LENGTH = 131072
+# USE_V2_5_ACTUAL_DATA in the Apex class
+USE_V2_5_ACTUAL_DATA = True
+DEFAULT_TIME_ZONE = "America/Los_Angeles"
+
+# Parent lookups buildActualDataSection adds to the sample record query
+UNIVERSAL_PARENT_LOOKUPS = {'Owner', 'CreatedBy', 'LastModifiedBy', 'RecordType'}
+# findRelationshipName's hardcoded child relationships
+COMMON_RELATIONSHIPS = {
+    'Account': {
+        'Contact': 'Contacts',
+        'Opportunity': 'Opportunities',
+        'Case': 'Cases',
+        'Task': 'Tasks',
+        'Event': 'Events',
+        'Note': 'Notes',
+        'Attachment': 'Attachments',
+        'AccountContactRelation': 'AccountContactRelations',
+    },
+    'Opportunity': {
+        'OpportunityLineItem': 'OpportunityLineItems',
+        'OpportunityContactRole': 'OpportunityContactRoles',
+        'Task': 'Tasks',
+        'Event': 'Events',
+    },
+    'Contact': {
+        'Case': 'Cases',
+        'Task': 'Tasks',
+        'Event': 'Events',
+        'OpportunityContactRole': 'OpportunityContactRoles',
+    },
+    'Case': {
+        'CaseComment': 'CaseComments',
+        'Task': 'Tasks',
+        'Event': 'Events',
+    },
+    'Lead': {
+        'Task': 'Tasks',
+        'Event': 'Events',
+        'CampaignMember': 'CampaignMembers',
+    },
+}
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+DATETIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})$')
+# Getters System.Address.toString() lists, in order
+ADDRESS_FIELDS = ['city', 'country', 'countryCode', 'geocodeAccuracy', 'postalCode', 'state', 'stateCode', 'street']
+
+
+class StageException(Exception):
+    """Stage08_PromptAssembly.StageException"""
+
+
+# -- Apex semantics -----------------------------------------------------------
+
+def is_blank(value):
+    """String.isBlank"""
+    return value is None or value.strip() == ''
+
+
+def is_not_blank(value):
+    return not is_blank(value)
+
+
+def apex_eq(a, b):
+    """String == String (case-insensitive, null-safe)"""
+    if a is None or b is None:
+        return a is None and b is None
+    return a.lower() == b.lower()
+
+
+def utf16_len(value):
+    """String.length() counts UTF-16 code units"""
+    return len(value.encode('utf-16-le')) // 2
+
+
+def utf16_left(value, length):
+    """String.substring(0, length) in UTF-16 code units"""
+    if utf16_len(value) <= length:
+        return value
+    return value.encode('utf-16-le')[:length * 2].decode('utf-16-le', errors='ignore')
+
+
+def to_decimal(value):
+    return Decimal(value) if isinstance(value, int) else Decimal(repr(value))
+
+
+def decimal_string(value):
+    """String.valueOf(Decimal); JSON numbers carry no scale, so integral values print without one"""
+    d = to_decimal(value)
+    if d == d.to_integral_value():
+        return str(d.quantize(Decimal(1)))
+    return format(d, 'f')
+
+
+def apex_str(value):
+    """String concatenation / String.valueOf of a deserialized JSON value"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return decimal_string(value)
+    if isinstance(value, list):
+        return '(' + ', '.join(apex_str(v) for v in value) + ')'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{k}={apex_str(v)}' for k, v in value.items()) + '}'
+    return str(value)
+
+
+def format_date(value):
+    """Date.format() for en_US"""
+    return f'{value.month}/{value.day}/{value.year}'
+
+
+def format_datetime(value, time_zone):
+    """DateTime.format() for en_US in the user's time zone"""
+    local = value.astimezone(ZoneInfo(time_zone))
+    hour = local.hour % 12 or 12
+    return f'{format_date(local)}, {hour}:{local.minute:02d} {"AM" if local.hour < 12 else "PM"}'
+
+
+def format_address(value):
+    """System.Address.toString()"""
+    return 'System.Address[' + ''.join(
+        f'get{name[0].upper()}{name[1:]}={apex_str(value.get(name))};' for name in ADDRESS_FIELDS) + ']'
+
+
+def format_field_value(value, time_zone=DEFAULT_TIME_ZONE):
+    """formatFieldValue"""
+    if value is None:
+        return '(empty)'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        d = to_decimal(value)
+        # Format currency-like values
+        if d >= 1000:
+            return '$' + format(d.quantize(Decimal('0.001'), rounding=ROUND_HALF_EVEN).normalize(), ',f')
+        return decimal_string(value)
+    if isinstance(value, str) and DATE_PATTERN.match(value):
+        return format_date(date.fromisoformat(value))
+    if isinstance(value, str) and DATETIME_PATTERN.match(value):
+        return format_datetime(datetime.fromisoformat(value), time_zone)
+    if isinstance(value, dict) and 'street' in value:
+        str_value = format_address(value)
+    else:
+        str_value = apex_str(value)
+    # Truncate very long values
+    if utf16_len(str_value) > 200:
+        return utf16_left(str_value, 200) + '...'
+    return str_value
+
+
+def get_field_value(record, field_path):
+    """getFieldValue: dot notation walks the parent records the REST API nests"""
+    if '.' not in field_path:
+        return record.get(field_path)
+    *parents, name = field_path.split('.')
+    current = record
+    for part in parents:
+        current = current.get(part)
+        if current is None:
+            return None
+    return current.get(name)
+
+
+# -- Builders -----------------------------------------------------------------
+
+def soql_sorted(builders):
+    """ORDER BY Name (case-insensitive, like the org's collation)"""
+    return sorted(builders, key=lambda b: ((b.get('Name') or '').casefold(), b.get('Name') or ''))
+
+
+def select_builders(builders, builder_type, root_object=None, object_filter=False, limit=None):
+    """Active Builder records of one ccai__Type__c, ORDER BY Name [LIMIT n]"""
+    selected = [b for b in builders
+                if apex_eq(b.get('ccai__Type__c'), builder_type) and apex_eq(b.get('ccai__Status__c'), 'Active')
+                and (not object_filter or b.get('ccai__Object__c') is None
+                     or apex_eq(b.get('ccai__Object__c'), root_object))]
+    selected = soql_sorted(selected)
+    return selected[:limit] if limit is not None else selected
+
+
+def load_builder_section(builders, builder_type, root_object=None, object_filter=False):
+    """loadQualityRules / loadPatterns / loadUIComponents / loadContextTemplates"""
+    content = ''
+    for builder in select_builders(builders, builder_type, root_object, object_filter):
+        if builder.get('ccai__Prompt_Command__c') is None:
+            # rule.ccai__Prompt_Command__c.length() in the loader's log line
+            raise StageException(f'Failed to load {builder_type}: Attempt to de-reference a null object')
+        content += '\n\n=== ' + apex_str(builder.get('Name')) + ' ===\n\n'
+        content += builder['ccai__Prompt_Command__c']
+    return content
+
+
+def load_compressed_quality_rules(builders):
+    """loadCompressedQualityRules"""
+    rules = select_builders(builders, 'Quality Rule', limit=10)
+    if not rules:
+        return ''
+    content = 'QUALITY RULES:\n'
+    # Prefer compressed versions - use first one found with (Compressed) in name
+    for builder in rules:
+        if 'Compressed' in builder['Name']:
+            content += apex_str(builder.get('ccai__Prompt_Command__c')) + '\n\n'
+            return content
+    # No compressed version found - use first available
+    content += apex_str(rules[0].get('ccai__Prompt_Command__c')) + '\n\n'
+    return content
+
+
+def load_compressed_patterns(builders, root_object):
+    """loadCompressedPatterns (LIMIT 10 applies before the object filter)"""
+    patterns = select_builders(builders, 'Pattern', limit=10)
+    matching = [b for b in patterns
+                if apex_eq(b.get('ccai__Object__c'), root_object) or b.get('ccai__Object__c') is None]
+    # First pass: compressed version matching rootObject or global
+    for builder in matching:
+        if 'Compressed' in builder['Name']:
+            return apex_str(builder.get('ccai__Prompt_Command__c')) + '\n\n'
+    # Second pass: first non-compressed matching object
+    for builder in matching:
+        return apex_str(builder.get('ccai__Prompt_Command__c')) + '\n\n'
+    return ''
+
+
+def load_output_rules(builders):
+    """loadOutputRules"""
+    rules = select_builders(builders, 'Output Rules', limit=1)
+    return rules[0].get('ccai__Prompt_Command__c') if rules else ''
+
+
+def library_builders():
+    """Builders from the local library, as sync_builders would write them"""
+    sys.path.insert(0, str(REPO_ROOT / "scripts"))
+    from sync_builders import load_json_builders, load_markdown_builders
+    return load_json_builders() + load_markdown_builders()
+
+
+# -- Relationships ------------------------------------------------------------
+
+def pluralize(object_name):
+    if object_name.endswith('y'):
+        return object_name[:-1] + 'ies'
+    return object_name + 's'
+
+
+def find_relationship_name(parent_object, child_object):
+    """findRelationshipName: hardcoded map, then pluralization"""
+    relationship = COMMON_RELATIONSHIPS.get(parent_object, {}).get(child_object)
+    if relationship is not None:
+        return relationship
+    if child_object.endswith('s'):
+        return child_object + 'es'
+    return pluralize(child_object)
+
+
+def relationship_name_for_object(child_relationships, child_object, parent_object):
+    """getRelationshipNameForObject: describe's child relationship, else pluralization"""
+    relationship = child_relationships.get(parent_object, {}).get(child_object)
+    if is_not_blank(relationship):
+        return relationship
+    return pluralize(child_object)
+
+
+# -- Meta-prompt sections -----------------------------------------------------
+
+def role_section(target_persona, today):
+    """buildRoleSection"""
+    section = '=== YOUR ROLE ===\n\n'
+
+    # Add current date for date calculations (critical for overdue/stale analysis)
+    section += 'TODAY\'S DATE: ' + format_date(today) + '\n'
+    section += 'Use this date to calculate if dates are PAST (overdue) or FUTURE.\n\n'
+
+    section += 'You are an expert business analyst creating an executive dashboard for ' + apex_str(target_persona) + '.\n\n'
+    section += 'Your job is NOT to display data tables. Your job is to:\n'
+    section += '- ANALYZE the Salesforce data provided\n'
+    section += '- IDENTIFY patterns, risks, and opportunities\n'
+    section += '- PRESENT insights that drive action\n'
+    section += '- RECOMMEND specific next steps\n\n'
+    section += 'Think like a consultant presenting to a senior executive.\n\n'
+    return section
+
+
+def data_payload_section(multi_sample_profile, root_object, selected_fields):
+    """buildDataPayloadSection"""
+    section = '=== DATA CONTEXT ===\n\n'
+
+    if multi_sample_profile is not None:
+        # Multi-sample: show patterns
+        profile = multi_sample_profile
+        sample_count = profile.get('sampleCount')
+
+        section += 'Analyzed ' + apex_str(sample_count) + ' ' + apex_str(root_object) + ' records to understand data patterns.\n\n'
+
+        patterns = profile.get('patterns')
+        if patterns:
+            section += 'KEY PATTERNS DETECTED:\n'
+            for pattern in patterns:
+                section += '- [' + apex_str(pattern.get('severity')) + '] ' + apex_str(pattern.get('description')) + '\n'
+            section += '\n'
+
+        aggregations = profile.get('objectAggregations')
+        if aggregations:
+            section += 'OBJECT AVAILABILITY:\n'
+            for obj_name, agg in aggregations.items():
+                avg_count = to_decimal(agg['avgCount']).quantize(Decimal('0.1'), rounding=ROUND_HALF_EVEN)
+                section += ('- ' + obj_name + ': Present in ' + apex_str(agg.get('samplesWithData')) + '/'
+                            + apex_str(sample_count) + ' samples (avg ' + str(avg_count) + ' records)\n')
+            section += '\n'
+    else:
+        # Single sample: simplified context
+        section += 'Analyzing ' + apex_str(root_object) + ' record data.\n\n'
+
+    # Add available fields summary
+    if selected_fields:
+        section += 'DATA FIELDS AVAILABLE:\n'
+        for obj_name, fields in selected_fields.items():
+            if fields:
+                section += '- ' + obj_name + ': ' + str(len(fields)) + ' fields\n'
+        section += '\n'
+
+    return section
+
+
+def actual_data_section(snapshot, root_object, selected_fields, selected_parent_fields, sample_record_id):
+    """buildActualDataSection, reading the sample record and children from the snapshot"""
+    time_zone = snapshot.get('timeZone') or DEFAULT_TIME_ZONE
+    section = '=== ACTUAL DATA VALUES (Sample Record) ===\n\n'
+    section += 'Below is the actual data from the sample record. Use these values to:\n'
+    section += '- Understand the data scale and formats\n'
+    section += '- Identify which fields have meaningful data\n'
+    section += '- Make informed visualization decisions\n\n'
+
+    # Build field list for root object
+    root_fields = ['Id']
+    for field in (selected_fields or {}).get(root_object) or []:
+        field_name = apex_str(field)
+        if field_name not in root_fields:
+            root_fields.append(field_name)
+
+    # Add parent lookup fields (e.g., Owner.Name, CreatedBy.Email)
+    # Only include UNIVERSAL parent lookups that work on all standard objects
+    for parent_key, parent_fields in (selected_parent_fields or {}).items():
+        if parent_key not in UNIVERSAL_PARENT_LOOKUPS:
+            continue
+        for parent_field in parent_fields or []:
+            field_name = parent_key + '.' + apex_str(parent_field)
+            if field_name not in root_fields:
+                root_fields.append(field_name)
+
+    root_record = snapshot.get('sampleRecord')
+    if not root_record:
+        section += 'Note: Sample record not found (ID: ' + apex_str(sample_record_id) + ')\n\n'
+        return section
+
+    # Format root object data
+    section += '--- ' + apex_str(root_object) + ' ---\n'
+    for field_name in root_fields:
+        if apex_eq(field_name, 'Id'):
+            continue
+        section += field_name + ': ' + format_field_value(get_field_value(root_record, field_name), time_zone) + '\n'
+    section += '\n'
+
+    # Child objects: the snapshot holds what the relationship subquery returned
+    # (an object missing from sampleChildren is one whose subquery failed)
+    sample_children = snapshot.get('sampleChildren') or {}
+    for obj_name, fields in selected_fields.items():
+        if obj_name == root_object or not fields:
+            continue
+
+        child_fields = ['Id']
+        for field in fields:
+            field_name = apex_str(field)
+            if field_name not in child_fields:
+                child_fields.append(field_name)
+
+        children = sample_children.get(obj_name)
+        if not children:
+            continue
+        section += '--- ' + obj_name + ' (' + str(len(children)) + ' records) ---\n'
+        display_limit = min(len(children), 5)
+        try:
+            for i in range(display_limit):
+                section += 'Record ' + str(i + 1) + ':\n'
+                for field_name in child_fields:
+                    if apex_eq(field_name, 'Id'):
+                        continue
+                    if '.' in field_name:
+                        # SObject.get() rejects relationship paths; Apex logs and moves on,
+                        # keeping what it already appended
+                        raise StageException(f'Invalid field {field_name} for {obj_name}')
+                    section += '  ' + field_name + ': ' + format_field_value(children[i].get(field_name), time_zone) + '\n'
+            if len(children) > display_limit:
+                section += '... and ' + str(len(children) - display_limit) + ' more records\n'
+            section += '\n'
+        except StageException:
+            continue
+
+    return section
+
+
+def analysis_principles_section(builders, root_object):
+    """buildAnalysisPrinciplesSection"""
+    section = '=== ANALYSIS PRINCIPLES ===\n\n'
+    section += 'Apply these principles when analyzing the data:\n\n'
+
+    quality_rules = load_compressed_quality_rules(builders)
+    if is_not_blank(quality_rules):
+        section += quality_rules + '\n\n'
+
+    patterns = load_compressed_patterns(builders, root_object)
+    if is_not_blank(patterns):
+        section += patterns + '\n\n'
+
+    return section
+
+
+def information_hierarchy_section():
+    """buildInformationHierarchySection"""
+    section = '=== INFORMATION HIERARCHY ===\n\n'
+    section += 'Structure your output following the inverted pyramid - most important first:\n\n'
+
+    section += '1. LEAD WITH INSIGHTS (top 20% of output)\n'
+    section += '   - Open with the single most important finding or recommendation\n'
+    section += '   - Use attention-grabbing metrics or alerts for critical issues\n'
+    section += '   - If there\'s a problem, say it immediately - don\'t bury it\n\n'
+
+    section += '2. KEY METRICS (next 20%)\n'
+    section += '   - 3-5 most important numbers in stat cards at the top\n'
+    section += '   - These should answer "what do I need to know at a glance?"\n'
+    section += '   - Use color coding: green (good), orange (warning), red (critical)\n\n'
+
+    section += '3. ANALYSIS & PATTERNS (next 40%)\n'
+    section += '   - Group related insights together\n'
+    section += '   - Use cards for each major finding\n'
+    section += '   - Include evidence (specific data points) with each insight\n'
+    section += '   - Prioritize actionable findings over observations\n\n'
+
+    section += '4. SUPPORTING DETAILS (bottom 20%)\n'
+    section += '   - Raw data tables go LAST, if needed at all\n'
+    section += '   - Consider: does the executive need to see every row?\n'
+    section += '   - If showing tables, limit to 5-10 most relevant rows\n'
+    section += '   - Tables should support your insights, not replace them\n\n'
+
+    section += 'ANTI-PATTERNS TO AVOID:\n'
+    section += '- Do NOT start with a data table and expect users to find insights\n'
+    section += '- Do NOT show all data when a summary statistic would suffice\n'
+    section += '- Do NOT use generic headers like "Overview" - be specific\n'
+    section += '- Do NOT repeat the same information in different formats\n\n'
+
+    return section
+
+
+def data_driven_design_section():
+    """buildDataDrivenDesignSection"""
+    section = '=== DATA-DRIVEN DESIGN GUIDANCE ===\n\n'
+    section += 'Choose visualization components based on what the DATA tells you:\n\n'
+
+    # Pipeline pattern guidance (Task 6.13)
+    section += '--- PIPELINE/FUNNEL PATTERN ---\n'
+    section += 'When you see: 3+ opportunities at different stages, deals in various phases, or any multi-stage progression\n'
+    section += 'Use: Pipeline Funnel component showing stage distribution with amounts\n'
+    section += 'Visual impact: Immediately shows where deals are stuck or progressing\n\n'
+
+    # Urgency pattern guidance (Task 6.14)
+    section += '--- URGENCY/RISK PATTERN ---\n'
+    section += 'When you see: Critical issues, overdue items, high-priority problems, or churn risk signals\n'
+    section += 'Use: Featured Hero Card (gradient) for THE most critical issue, or Risk Priority Matrix for multiple risks\n'
+    section += 'Visual impact: Red/orange colors demand immediate attention. Hero card should be used once per dashboard.\n\n'
+
+    # Trend pattern guidance (Task 6.15)
+    section += '--- TREND/CHANGE PATTERN ---\n'
+    section += 'When you see: Revenue changes, growth metrics, before/after comparisons, or period-over-period data\n'
+    section += 'Use: Trend Indicator for simple up/down, KPI Card with Trend for metrics with context, Comparison Card for side-by-side\n'
+    section += 'Visual impact: Green arrows/values for positive trends, red for negative\n\n'
+
+    # Comparison pattern guidance (Task 6.16)
+    section += '--- COMPARISON PATTERN ---\n'
+    section += 'When you see: Two time periods, A vs B scenarios, targets vs actuals, or any paired values\n'
+    section += 'Use: Comparison Card for clear side-by-side, or Two-Column Layout for more complex comparisons\n'
+    section += 'Visual impact: Visual contrast makes differences immediately obvious\n\n'
+
+    # Progress/Score pattern
+    section += '--- PROGRESS/SCORE PATTERN ---\n'
+    section += 'When you see: Percentages, win probability, health scores, completion rates, or any 0-100 values\n'
+    section += 'Use: Progress Ring for percentages, Gauge Meter for scores with zones\n'
+    section += 'Visual impact: Circular graphics are attention-grabbing and easy to interpret\n\n'
+
+    # Timeline pattern
+    section += '--- TIMELINE/SEQUENCE PATTERN ---\n'
+    section += 'When you see: Milestone dates, key events, activity history, or chronological sequences\n'
+    section += 'Use: Timeline component to show progression with dates and status\n'
+    section += 'Visual impact: Shows journey/progress at a glance\n\n'
+
+    section += 'DESIGN PRINCIPLES:\n'
+    section += '- Match the visualization to the data story, not vice versa\n'
+    section += '- If data shows urgency, the visual should convey urgency (reds, bold, hero cards)\n'
+    section += '- If data shows progress, use progressive visuals (funnels, timelines, gauges)\n'
+    section += '- Use 2-3 different component types per dashboard for visual interest\n'
+    section += '- The Featured Hero Card demands attention - use it for the ONE thing that matters most\n\n'
+
+    return section
+
+
+def ui_toolkit_section(builders):
+    """buildUIToolkitSection"""
+    section = '=== UI TOOLKIT ===\n\n'
+    section += 'You have these components available. Use them strategically.\n\n'
+
+    ui_components = select_builders(builders, 'UI Component', limit=20)
+
+    if ui_components:
+        # Use dynamic components from database
+        section += 'AVAILABLE COMPONENTS (use these HTML patterns):\n\n'
+        for component in ui_components:
+            section += '--- ' + apex_str(component.get('Name')) + ' ---\n'
+            if is_not_blank(component.get('ccai__Description__c')):
+                section += 'When to use: ' + component['ccai__Description__c'] + '\n'
+            section += 'HTML Pattern:\n'
+            section += apex_str(component.get('ccai__Prompt_Command__c')) + '\n\n'
+    else:
+        # Fallback to actual HTML patterns if no components in database
+        section += 'LAYOUT COMPONENTS:\n\n'
+
+        section += '--- Stats Strip (use at top for key metrics) ---\n'
+        section += '<div style="display:flex;gap:16px;margin-bottom:20px;"><div style="flex:1;background:white;border-radius:6px;padding:16px;box-shadow:0 1px 3px rgba(0,0,0,0.1);"><div style="font-size:28px;font-weight:700;color:#0176D3;margin-bottom:4px;">$15M</div><div style="font-size:13px;color:#706E6B;">Annual Revenue</div></div></div>\n\n'
+
+        section += '--- Section Card ---\n'
+        section += '<div style="background:white;border-radius:8px;padding:20px;margin-bottom:16px;box-shadow:0 2px 4px rgba(0,0,0,0.1);"><h2 style="margin:0 0 16px 0;font-size:18px;font-weight:600;color:#181818;">Section Title</h2><!-- Content here --></div>\n\n'
+
+        section += 'INSIGHT COMPONENTS:\n\n'
+
+        section += '--- Critical Alert (RED) ---\n'
+        section += '<div style="background:#FED7D7;border-left:4px solid #BA0517;padding:12px 16px;border-radius:4px;margin-bottom:12px;"><div style="font-weight:600;color:#BA0517;margin-bottom:4px;">Critical Issue</div><div style="color:#54514C;">Description with evidence</div></div>\n\n'
+
+        section += '--- Warning Alert (ORANGE) ---\n'
+        section += '<div style="background:#FEF3CD;border-left:4px solid #DD7A01;padding:12px 16px;border-radius:4px;margin-bottom:12px;"><div style="font-weight:600;color:#DD7A01;margin-bottom:4px;">Warning</div><div style="color:#54514C;">Description with evidence</div></div>\n\n'
+
+        section += '--- Info Alert (BLUE) ---\n'
+        section += '<div style="background:#D7E9FC;border-left:4px solid #0176D3;padding:12px 16px;border-radius:4px;margin-bottom:12px;"><div style="font-weight:600;color:#0176D3;margin-bottom:4px;">Information</div><div style="color:#54514C;">Description with evidence</div></div>\n\n'
+
+        section += '--- Insight Card ---\n'
+        section += '<div style="background:white;border-radius:6px;padding:16px;margin-bottom:12px;border:1px solid #DDDBDA;"><div style="font-weight:600;color:#181818;margin-bottom:8px;">Finding Title</div><div style="color:#706E6B;margin-bottom:12px;line-height:1.5;">Analysis with evidence</div><div style="font-size:12px;color:#706E6B;"><strong>Evidence:</strong> specific data points</div></div>\n\n'
+
+        section += '--- Recommendation Card ---\n'
+        section += '<div style="background:#FFFFFF;border-left:4px solid #2E844A;border-radius:6px;padding:16px;margin-bottom:12px;box-shadow:0 1px 3px rgba(0,0,0,0.1);"><div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:8px;"><div style="font-weight:600;color:#181818;">Action</div><div style="background:#DD7A01;color:white;padding:4px 12px;border-radius:12px;font-size:11px;font-weight:600;">URGENT</div></div><div style="color:#706E6B;margin-bottom:12px;line-height:1.5;">Specific action description</div><div style="font-size:12px;color:#706E6B;"><strong>Why:</strong> Rationale</div></div>\n\n'
+
+        section += '--- Health Score ---\n'
+        section += '<div style="display:flex;align-items:center;gap:12px;"><div style="font-size:36px;font-weight:700;color:#2E844A;">85</div><div><div style="font-size:14px;font-weight:600;color:#181818;">Health Score</div><div style="width:200px;height:8px;background:#E0E0E0;border-radius:4px;overflow:hidden;"><div style="width:85%;height:100%;background:#2E844A;"></div></div></div></div>\n\n'
+
+    section += 'COMPONENT USAGE RULES:\n'
+    section += '- Lead with insights (Alert Boxes, Insight Cards) not tables\n'
+    section += '- Use Stats Strip for key metrics at the top\n'
+    section += '- Tables should be LAST, not first - and only if data warrants\n'
+    section += '- Every section should have analysis text, not just data\n\n'
+
+    return section
+
+
+def output_rules_section(builders):
+    """buildOutputRulesSection"""
+    section = '=== OUTPUT RULES ===\n\n'
+    section += 'CRITICAL GPTfy REQUIREMENTS:\n'
+    section += '1. **SINGLE-LINE HTML ONLY** - Your ENTIRE output must be ONE continuous line with NO newlines, line breaks, or \\n characters. Compress all HTML into a single line.\n'
+    section += '2. Inline styles only - no CSS classes or style blocks\n'
+    section += '3. No scripts or event handlers\n'
+    section += '4. Start with <div style="..." and end with </div>\n'
+    section += '5. No emojis or special characters\n'
+    section += '6. No placeholders, TBD, TODO markers\n\n'
+    section += 'SINGLE-LINE HTML ENFORCEMENT:\n'
+    section += '- Remove ALL newlines and line breaks from your HTML\n'
+    section += '- Use single spaces between tags: </div><div> NOT </div>\\n<div>\n'
+    section += '- Do NOT format for readability - format for GPTfy compliance\n'
+    section += '- Example: <div style="padding:20px;"><h2>Title</h2><p>Content</p></div>\n\n'
+
+    # V2.4: Load merge field syntax from Output Rules builder
+    output_rules = load_output_rules(builders)
+    if is_not_blank(output_rules):
+        section += output_rules + '\n\n'
+    else:
+        # Fallback to hardcoded syntax if builder not found
+        section += 'MERGE FIELD SYNTAX:\n'
+        section += '- Root object fields: Use triple braces with field name\n'
+        section += '- Parent lookup fields: Use Relationship.Field pattern\n'
+        section += '- Child iteration: Use hash-Collection syntax\n'
+        section += '- Child fields: Must include Collection prefix inside iteration\n'
+        section += '- Empty check: Use caret-Collection for empty state handling\n\n'
+
+    section += 'STYLING:\n'
+    section += '- Font: Salesforce Sans, system fonts fallback\n'
+    section += '- Colors: Primary #0176D3, Success #2E844A, Warning #DD7A01, Error #BA0517\n'
+    section += '- Background: #F3F3F3, Cards: #FFFFFF, Border: #DDDBDA\n\n'
+
+    return section
+
+
+def directive_section(root_object, business_context):
+    """buildDirectiveSection"""
+    section = '=== YOUR DIRECTIVE ===\n\n'
+    section += 'Create a visually distinctive executive dashboard for this ' + apex_str(root_object) + '.\n\n'
+
+    if is_not_blank(business_context):
+        section += 'SPECIFIC REQUIREMENTS:\n' + business_context + '\n\n'
+
+
+    # V2.6: Story-driven layout instead of rigid structure
+    section += 'TELL THE DATA\'S STORY:\n'
+    section += 'Let the data guide your layout choices. Ask yourself:\n'
+    section += '- What is the SINGLE most important thing the user needs to know? Lead with it.\n'
+    section += '- Does the data show urgency or risk? Use dramatic visuals (Hero Card, red alerts).\n'
+    section += '- Does the data show progress or pipeline? Use progression visuals (Funnel, Timeline).\n'
+    section += '- Does the data show comparisons or trends? Use comparison visuals (Trend Indicator, Comparison Card).\n'
+    section += '- What would make an executive stop scrolling and pay attention?\n\n'
+
+    section += 'CREATIVE FREEDOM:\n'
+    section += 'You are NOT limited to a fixed template. Choose from these layout approaches:\n\n'
+
+    section += '- HERO + GRID: Lead with a Featured Hero Card for the key insight, then a grid of supporting cards\n'
+    section += '- TWO-COLUMN: Side-by-side layout comparing two aspects (e.g., Opportunities vs Risks)\n'
+    section += '- TIMELINE-DRIVEN: Chronological layout when sequence matters (milestones, activity history)\n'
+    section += '- FUNNEL-FOCUSED: Pipeline/funnel visualization with supporting metrics when deals/stages are key\n'
+    section += '- MATRIX + DETAILS: Risk/priority matrix followed by detailed cards for high-priority items\n\n'
+
+    section += 'REQUIREMENTS (non-negotiable):\n'
+    section += '- Use at least 3 DIFFERENT component types per dashboard\n'
+    section += '- Include at least one data visualization (Progress Ring, Gauge, Funnel, or Trend Indicator)\n'
+    section += '- Lead with insights, not tables - tables should support your analysis if used at all\n'
+    section += '- Use colored elements strategically - red for critical, orange for warning, green for positive\n'
+    section += '- Be specific: use actual names ("Sarah Johnson") not titles ("the CFO")\n'
+    section += '- ONLY use merge fields from the AVAILABLE MERGE FIELDS section\n\n'
+
+    section += 'QUALITY CHECKLIST:\n'
+    section += '[ ] Did I lead with the most important finding (not bury it)?\n'
+    section += '[ ] Did I match visualizations to data patterns (see DATA-DRIVEN DESIGN GUIDANCE)?\n'
+    section += '[ ] Did I use at least 3 different component types?\n'
+    section += '[ ] Does every insight cite specific evidence?\n'
+    section += '[ ] Are recommendations specific and actionable with names?\n'
+    section += '[ ] Did I ONLY use merge fields from the AVAILABLE MERGE FIELDS list?\n'
+    section += '[ ] Would this dashboard make an executive take immediate action?\n\n'
+
+    section += 'Generate the dashboard now. Output raw HTML only.\n\n'
+
+    return section
+
+
+def grounding_rules(root_object, target_persona):
+    """buildGroundingRules"""
+    rules = '--- GROUNDING RULES ---\n'
+    rules += '**Grounding Rules:**\n\n'
+
+    rules += '1. **Accuracy:** Use ONLY data from the provided ' + apex_str(root_object) + ' record. Never fabricate company names or contact details.\n'
+    rules += '2. **Tone:** Maintain a professional, enterprise-appropriate tone for ' + apex_str(target_persona) + '.\n'
+    rules += '3. **Format:** Preserve the HTML structure with inline styles. Do NOT use CSS classes.\n'
+    rules += '4. **Consistency:** Use consistent date formats (MM/DD/YYYY), currency formats ($X,XXX), and terminology.\n'
+    rules += '5. **Relevance:** Focus on insights that align with the business objectives.\n'
+    rules += '6. **ANALYZE AND INTERPRET:** Go beyond raw data display. Identify patterns, risks, opportunities, and provide actionable recommendations.\n'
+
+    return rules
+
+
+def merge_field_reference(root_object, selected_fields, selected_grandchildren, child_relationships):
+    """buildMergeFieldReference"""
+    # objectName -> parentObject / relationshipName on parent
+    grandchild_parents, grandchild_relationships = {}, {}
+    for grandchild in selected_grandchildren or []:
+        if isinstance(grandchild, dict):
+            obj_name = grandchild.get('objectName')
+            parent_obj = grandchild.get('parentObject')
+            rel_name = grandchild.get('relationshipName')
+            if is_not_blank(obj_name) and is_not_blank(parent_obj):
+                grandchild_parents[obj_name] = parent_obj
+                if is_not_blank(rel_name):
+                    grandchild_relationships[obj_name] = rel_name
+
+    ref = '=== AVAILABLE MERGE FIELDS ===\n\n'
+    ref += 'Use these merge fields to reference Salesforce data in your HTML output.\n'
+    ref += 'GPTfy will substitute these with actual values at runtime.\n\n'
+
+    # Root object fields
+    if root_object in selected_fields:
+        ref += root_object.upper() + ' (Root Object) - use triple braces:\n'
+        for field in selected_fields[root_object]:
+            ref += '  {{{' + apex_str(field) + '}}}\n'
+        ref += '\n'
+
+    # Child and grandchild object fields
+    for obj_name, fields in selected_fields.items():
+        if apex_eq(obj_name, root_object):
+            continue
+        if obj_name in grandchild_parents:
+            # GRANDCHILD: Needs chained path like Opportunities.OpportunityContactRoles
+            parent_obj_name = grandchild_parents[obj_name]
+            parent_rel_name = relationship_name_for_object(child_relationships, parent_obj_name, root_object)
+            gc_rel_name = (grandchild_relationships[obj_name] if obj_name in grandchild_relationships
+                           else relationship_name_for_object(child_relationships, obj_name, parent_obj_name))
+            chained_path = parent_rel_name + '.' + gc_rel_name
+
+            ref += obj_name.upper() + ' (Grandchild of ' + parent_obj_name + '):\n'
+            ref += ('  Nested iteration: {{#' + parent_rel_name + '}}{{#' + chained_path + '}}...{{/'
+                    + chained_path + '}}{{/' + parent_rel_name + '}}\n')
+            ref += '  Use chained path prefix ' + chained_path + ' for these fields:\n'
+            for field in fields:
+                ref += '    {{{' + chained_path + '.' + apex_str(field) + '}}}\n'
+            ref += '\n'
+        else:
+            # DIRECT CHILD: Simple relationship name
+            relationship_name = relationship_name_for_object(child_relationships, obj_name, root_object)
+
+            ref += (obj_name.upper() + ' (Child) - iterate with {{#' + relationship_name + '}}...{{/'
+                    + relationship_name + '}}:\n')
+            ref += '  Start iteration: {{#' + relationship_name + '}}\n'
+            for field in fields:
+                ref += '    {{{' + relationship_name + '.' + apex_str(field) + '}}}\n'
+            ref += '  End iteration: {{/' + relationship_name + '}}\n'
+            ref += '  Empty check: {{^' + relationship_name + '}}No ' + obj_name + ' records{{/' + relationship_name + '}}\n'
+            ref += '\n'
+
+    # CRITICAL: Enforce that ONLY listed merge fields can be used
+    ref += 'CRITICAL RESTRICTION:\n'
+    ref += 'You may ONLY use merge fields that are explicitly listed above.\n'
+    ref += 'Do NOT invent or guess merge fields. Do NOT use relationships not shown above.\n'
+    ref += 'If a field or relationship is not listed, you cannot use it.\n\n'
+
+    return ref
+
+
+# -- Legacy template mode (V1.1) ----------------------------------------------
+
+def ai_instructions(builders, business_context, target_persona, business_objectives, root_object,
+                    company_profile, strategic_insights, industry_context):
+    """buildAIInstructions"""
+    instructions = 'You are a Salesforce AI assistant generating HTML content for GPTfy.\n\n'
+
+    # === CRITICAL OUTPUT RULES ===
+    instructions += '=== CRITICAL OUTPUT RULES (GPTfy Runtime Validation) ===\n\n'
+
+    instructions += 'Rule 1 - SINGLE LINE: Output MUST be a single line with NO newline characters.\n'
+    instructions += '  WHY: GPTfy stores output as a single field value. Line breaks cause parsing issues.\n\n'
+
+    instructions += 'Rule 2 - NO STYLE BLOCKS: Do NOT include any style tags.\n'
+    instructions += '  WHY: GPTfy renders in Salesforce Lightning which strips style blocks. Only inline styles work.\n\n'
+
+    instructions += 'Rule 3 - NO CSS CLASSES: Do NOT use class attributes.\n'
+    instructions += '  WHY: Without style blocks, CSS classes have no definitions and elements remain unstyled.\n\n'
+
+    instructions += 'Rule 4 - NO SCRIPT TAGS: Do NOT include any JavaScript.\n'
+    instructions += '  WHY: Scripts are a security risk and are stripped by Salesforce Lightning.\n\n'
+
+    instructions += 'Rule 5 - NO MARKDOWN: Do NOT wrap output in code blocks or use markdown formatting.\n'
+    instructions += '  WHY: Output must be raw HTML, not markdown.\n\n'
+
+    instructions += 'Rule 6 - START WITH DIV STYLE: Output MUST begin with a div element with inline style attribute.\n'
+    instructions += '  WHY: Ensures proper container structure with inline styles.\n\n'
+
+    instructions += 'Rule 7 - END WITH DIV: Output MUST end with a closing div tag.\n'
+    instructions += '  WHY: Ensures HTML structure is complete and properly closed.\n\n'
+
+    instructions += 'Rule 8 - NO PLACEHOLDERS: Never output bracket-X patterns, placeholder text, TBD, TODO, or similar.\n'
+    instructions += '  WHY: Indicates the prompt didn\'t properly integrate real data.\n\n'
+
+    instructions += 'Rule 9 - NO NULL VALUES: Never output null, undefined, or Not Available in visible text.\n'
+    instructions += '  WHY: Missing data should be handled gracefully by omitting the section.\n\n'
+
+    instructions += 'Rule 10 - NO EMOJIS: Do NOT use any emoji characters.\n'
+    instructions += '  WHY: Professional business content should not contain emojis.\n\n'
+
+    # === STYLING REQUIREMENTS ===
+    instructions += '=== STYLING REQUIREMENTS (Salesforce Brand) ===\n\n'
+
+    instructions += 'Font: \'Salesforce Sans\', -apple-system, BlinkMacSystemFont, \'Segoe UI\', Roboto, Arial, sans-serif\n'
+    instructions += 'Base Size: 14px\n\n'
+
+    instructions += 'Colors:\n'
+    instructions += '- Primary Blue: #0176D3\n'
+    instructions += '- Dark Blue: #014486\n'
+    instructions += '- Success Green: #2E844A\n'
+    instructions += '- Warning Orange: #DD7A01\n'
+    instructions += '- Error Red: #BA0517\n'
+    instructions += '- Text Primary: #181818\n'
+    instructions += '- Text Secondary: #706E6B\n'
+    instructions += '- Background: #F3F3F3\n'
+    instructions += '- Card Background: #FFFFFF\n'
+    instructions += '- Border: #DDDBDA\n\n'
+
+    instructions += 'Components:\n'
+    instructions += '- Cards: white background, 8px border-radius, 1px solid border in DDDBDA color, 16px padding\n'
+    instructions += '- Headers: linear gradient from Primary Blue to Dark Blue, white text, 16px padding\n'
+    instructions += '- Progress bars: 8px height, DDDBDA background, colored fill based on score\n'
+    instructions += '- Status badges: 4px 12px padding, 4px border-radius, semantic color background\n'
+    instructions += '- Tables: border-collapse, F3F3F3 header background, 10px 12px cell padding\n\n'
+
+    # === DATA HANDLING ===
+    instructions += '=== DATA HANDLING ===\n\n'
+    instructions += '- If a merge field returns empty or null, OMIT that section entirely - do not show empty labels\n'
+    instructions += '- Use relative timeframes in recommendations (this week, within 3 days) not absolute dates\n'
+    instructions += '- All merge fields are provided using triple-brace syntax and will be substituted by GPTfy at runtime\n'
+
+    # === BUSINESS CONTEXT ===
+    instructions += 'Generate a premium, executive-style dashboard for: ' + apex_str(target_persona) + '\n\n'
+
+    # === STRATEGIC CONTEXT (Account 360) ===
+    if is_not_blank(company_profile) or is_not_blank(strategic_insights) or is_not_blank(industry_context):
+        instructions += '=== STRATEGIC CONTEXT (Account 360) ===\n'
+        instructions += 'Use this intelligence to make the content highly relevant and personalized.\n\n'
+
+        if is_not_blank(company_profile):
+            instructions += 'COMPANY PROFILE:\n' + company_profile + '\n\n'
+        if is_not_blank(industry_context):
+            instructions += 'INDUSTRY CONTEXT:\n' + industry_context + '\n\n'
+        if is_not_blank(strategic_insights):
+            instructions += 'STRATEGIC INSIGHTS:\n' + strategic_insights + '\n\n'
+
+    # Include full business context from user input
+    if is_not_blank(business_context):
+        instructions += 'SPECIFIC REQUIREMENTS:\n' + business_context + '\n\n'
+
+    if business_objectives:
+        instructions += 'Business Goals: '
+        instructions += ', '.join(apex_str(obj) for obj in business_objectives) + '\n\n'
+
+    # === CRITICAL: ANALYSIS REQUIREMENTS ===
+    instructions += '=== CRITICAL: ANALYSIS REQUIREMENTS ===\n\n'
+    instructions += 'You are NOT just displaying data - you are providing INTELLIGENT BUSINESS ANALYSIS.\n'
+    instructions += 'The template below contains merge fields that will be replaced with real Salesforce data.\n'
+    instructions += 'Your job is to ANALYZE this data and provide ACTIONABLE INSIGHTS.\n\n'
+
+    instructions += 'ANALYSIS YOU MUST PERFORM:\n\n'
+
+    instructions += '1. OPPORTUNITY HEALTH ANALYSIS:\n'
+    instructions += '   - Identify stale opportunities (close dates in the past or soon)\n'
+    instructions += '   - Flag deals stuck in early stages for too long\n'
+    instructions += '   - Calculate total pipeline value and weighted pipeline\n'
+    instructions += '   - Recommend next steps for each opportunity\n\n'
+
+    instructions += '2. CASE/SUPPORT RISK ANALYSIS:\n'
+    instructions += '   - Flag high-priority open cases that need attention\n'
+    instructions += '   - Identify aging cases (open for extended periods)\n'
+    instructions += '   - Calculate customer satisfaction risk based on case patterns\n'
+    instructions += '   - Recommend resolution priorities\n\n'
+
+    instructions += '3. ENGAGEMENT PATTERN ANALYSIS:\n'
+    instructions += '   - Identify last contact date and engagement gaps\n'
+    instructions += '   - Flag accounts with no recent activity (going cold)\n'
+    instructions += '   - Analyze contact coverage (do we have the right stakeholders?)\n'
+    instructions += '   - Recommend engagement actions\n\n'
+
+    instructions += '4. EXECUTIVE SUMMARY:\n'
+    instructions += '   - Provide an overall account health score or assessment\n'
+    instructions += '   - List top 3 priorities for this account\n'
+    instructions += '   - Identify the biggest risk and biggest opportunity\n'
+    instructions += '   - Recommend immediate actions\n\n'
+
+    instructions += 'OUTPUT STRUCTURE:\n'
+    instructions += 'Your output should include BOTH the templated data AND your analytical sections.\n'
+    instructions += 'Add analysis sections with headers like "Executive Summary", "Key Risks", "Recommended Actions".\n'
+    instructions += 'Do NOT just render tables - add CONTEXT and INTERPRETATION before/after data sections.\n\n'
+
+    instructions += 'The output should be visually stunning, data-rich, and immediately actionable.\n'
+    instructions += 'Use ONLY the merge field embeddings provided in the template below. Do not add or modify merge fields.\n'
+    instructions += 'Merge fields use triple-brace syntax and will be substituted by GPTfy at runtime.\n\n'
+
+    # Builder injection
+    for builder_type, object_filter in (('Quality Rule', False), ('Pattern', True),
+                                        ('UI Component', False), ('Context Template', False)):
+        content = load_builder_section(builders, builder_type, root_object, object_filter)
+        if is_not_blank(content):
+            instructions += content + '\n\n'
+
+    return instructions
+
+
+# -- Assembly -----------------------------------------------------------------
+
+class PromptAssembler:
+    """
+    Stage 8 promptCommand for stage snapshots, sharing builder-derived sections
+
+    Usage:
+        assembler = PromptAssembler(builders)
+        prompt = assembler.prompt_command(snapshot)
+        variant = assembler.prompt_command(snapshot, targetPersona="CFO")
+    """
+
+    def __init__(self, builders):
+        self.builders = list(builders)
+        self._principles = {}
+        self._toolkit = None
+        self._output_rules = None
+        self._legacy_builders = {}
+
+    def analysis_principles(self, root_object):
+        if root_object not in self._principles:
+            self._principles[root_object] = analysis_principles_section(self.builders, root_object)
+        return self._principles[root_object]
+
+    def ui_toolkit(self):
+        if self._toolkit is None:
+            self._toolkit = ui_toolkit_section(self.builders)
+        return self._toolkit
+
+    def output_rules(self):
+        if self._output_rules is None:
+            self._output_rules = output_rules_section(self.builders)
+        return self._output_rules
+
+    def meta_prompt(self, snapshot, inputs, root_object):
+        """buildMetaPrompt"""
+        selected_fields = inputs.get('selectedFields')
+        sample_record_id = inputs.get('sampleRecordId')
+        today = date.fromisoformat(snapshot['today']) if snapshot.get('today') else date.today()
+
+        meta_prompt = role_section(inputs.get('targetPersona'), today)
+        meta_prompt += data_payload_section(inputs.get('multiSampleProfile'), root_object, selected_fields)
+        if USE_V2_5_ACTUAL_DATA and sample_record_id is not None:
+            meta_prompt += actual_data_section(snapshot, root_object, selected_fields,
+                                               inputs.get('selectedParentFields') or {}, sample_record_id)
+        meta_prompt += self.analysis_principles(root_object)
+        meta_prompt += INFORMATION_HIERARCHY_SECTION
+        meta_prompt += DATA_DRIVEN_DESIGN_SECTION
+        meta_prompt += self.ui_toolkit()
+        meta_prompt += self.output_rules()
+        meta_prompt += directive_section(root_object, inputs.get('businessContext'))
+        return meta_prompt
+
+    def prompt_command(self, snapshot, **overrides):
+        """
+        The promptCommand Stage 8 hands to Stage 9 (buildPromptConfigForStage9)
+        overrides replace stage 7 outputs, e.g. targetPersona or businessContext.
+        """
+        inputs = dict(snapshot['inputs'], **overrides)
+        if is_blank(inputs.get('htmlTemplate')):
+            raise StageException('No HTML template provided for prompt assembly')
+        root_object = inputs.get('rootObject')
+        target_persona = inputs.get('targetPersona')
+
+        if not inputs.get('useMetaPrompt'):
+            # Prefer the actual company research over generic AI summary
+            company_intelligence = inputs.get('companyIntelligence')
+            company_context = (company_intelligence if is_not_blank(company_intelligence)
+                               else inputs.get('companyProfile'))
+            return ai_instructions(self.builders, inputs.get('businessContext'), target_persona,
+                                   inputs.get('businessObjectives'), root_object, company_context,
+                                   inputs.get('strategicInsights'), inputs.get('industryContext'))
+
+        return (self.meta_prompt(snapshot, inputs, root_object) + '\n\n'
+                + grounding_rules(root_object, target_persona) + '\n\n'
+                + merge_field_reference(root_object, inputs.get('selectedFields'),
+                                        inputs.get('selectedGrandchildren') or [],
+                                        snapshot.get('childRelationships') or {}))
+
+
+INFORMATION_HIERARCHY_SECTION = information_hierarchy_section()
+DATA_DRIVEN_DESIGN_SECTION = data_driven_design_section()
+
+
+def size_report(prompt):
+    """The Prompt size line Stage 8 logs, plus whether the field limit is exceeded"""
+    length = utf16_len(prompt)
+    return (f"Prompt size: {length}/{PROMPT_COMMAND_MAX_LENGTH} chars "
+            f"({round(length * 100 / PROMPT_COMMAND_MAX_LENGTH)}%)"), length > PROMPT_COMMAND_MAX_LENGTH
+
+
+# -- Snapshots and golden files -----------------------------------------------
+
+def load_snapshot(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def expected_path(snapshot_path):
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(snapshot_path.stem + EXPECTED_SUFFIX)
+
+
+def builders_for(snapshot, use_library=False):
+    if use_library or 'builders' not in snapshot:
+        return library_builders()
+    return snapshot['builders']
+
+
+def first_difference(expected, actual, context=3):
+    """Unified diff of the first few differing lines"""
+    diff = difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                "expected", "assembled", n=context)
+    return "".join(list(diff)[:40])
+
+
+def check_golden(golden_dir=GOLDEN_DIR, use_library=False):
+    """Re-assemble every golden snapshot; returns the number that differ"""
+    snapshots = sorted(p for p in Path(golden_dir).glob("*.json"))
+    failed = 0
+    for path in snapshots:
+        snapshot = load_snapshot(path)
+        expected = expected_path(path).read_bytes()
+        started = time.perf_counter()
+        actual = PromptAssembler(builders_for(snapshot, use_library)).prompt_command(snapshot)
+        if snapshot.get('expectedTrimmed'):
+            actual = actual.strip()
+        actual = actual.encode('utf-8')
+        elapsed = time.perf_counter() - started
+        if actual == expected:
+            print(f"✅ {path.name}: {len(actual)} bytes identical ({elapsed * 1000:.1f}ms)")
+            continue
+        failed += 1
+        print(f"❌ {path.name}: assembled {len(actual)} bytes, expected {len(expected)}")
+        print(first_difference(expected.decode('utf-8'), actual.decode('utf-8')))
+    print(f"\n🔍 {len(snapshots)} golden snapshots: {failed} differ")
+    return failed
+
+
+def bench(assembler, snapshot, count):
+    """Assemble count businessContext variants; returns prompts per second"""
+    context = snapshot['inputs'].get('businessContext') or ''
+    started = time.perf_counter()
+    for i in range(count):
+        assembler.prompt_command(snapshot, businessContext=f"{context} (variant {i})")
+    return count / (time.perf_counter() - started)
+
+
+# -- Capture from the org -----------------------------------------------------
+
+def strip_attributes(value):
+    """REST records without their 'attributes' entries"""
+    if isinstance(value, dict):
+        return {k: strip_attributes(v) for k, v in value.items() if k != 'attributes'}
+    if isinstance(value, list):
+        return [strip_attributes(v) for v in value]
+    return value
+
+
+def stage_output(client, run_id, stage_number):
+    records = client.query(
+        "SELECT Output_Data__c, Started_At__c FROM PF_Run_Stage__c "
+        f"WHERE Run__c = '{run_id}' AND Stage_Number__c = {stage_number} ORDER BY CreatedDate DESC LIMIT 1")
+    if not records or is_blank(records[0].get('Output_Data__c')):
+        return None, None
+    return json.loads(records[0]['Output_Data__c']), records[0].get('Started_At__c')
+
+
+def child_relationship_names(client, parent_object, child_objects):
+    """{child: relationshipName} like SchemaHelper.getChildRelationships (first named relationship wins)"""
+    describe = client.request_json("GET", f"{client.data_path}/sobjects/{parent_object}/describe")
+    names = {}
+    for relationship in describe.get('childRelationships', []):
+        child = relationship.get('childSObject')
+        if child in child_objects and child not in names and relationship.get('relationshipName'):
+            names[child] = relationship['relationshipName']
+    return names
+
+
+def active_builders(client):
+    """The org's active Builder records, in the fields the assembler reads"""
+    return strip_attributes(client.query(
+        "SELECT Name, ccai__Type__c, ccai__Status__c, ccai__Object__c, ccai__Description__c, "
+        "ccai__Prompt_Command__c FROM ccai__AI_Prompt__c WHERE RecordType.DeveloperName = 'Builder' "
+        "AND ccai__Status__c = 'Active' ORDER BY Name"))
+
+
+def capture(client, run_id):
+    """
+    (snapshot, expected promptCommand or None) for a pipeline run
+    Stage 7 outputs come from its PF_Run_Stage__c record (the fallback Stage 8 reads when
+    the run has no PipelineState file); capture right after the run so builders and
+    sample data still match what Stage 8 saw.
+    """
+    from harness.sf_client import SalesforceError
+
+    inputs, _ = stage_output(client, run_id, 7)
+    if inputs is None:
+        raise StageException(f'Run {run_id} has no stage 7 outputs')
+    stage8, started_at = stage_output(client, run_id, 8)
+    time_zone = (client.query("SELECT TimeZoneSidKey FROM Organization")[0].get('TimeZoneSidKey')
+                 or DEFAULT_TIME_ZONE)
+    today = (datetime.fromisoformat(started_at).astimezone(ZoneInfo(time_zone)).date()
+             if started_at else date.today())
+
+    root_object = inputs.get('rootObject')
+    selected_fields = inputs.get('selectedFields') or {}
+    sample_record_id = inputs.get('sampleRecordId')
+    snapshot = {"source": f"run:{run_id}", "today": today.isoformat(), "timeZone": time_zone,
+                "inputs": inputs, "sampleRecord": None, "sampleChildren": {}}
+
+    if sample_record_id:
+        root_fields = ['Id']
+        for field in selected_fields.get(root_object) or []:
+            if field not in root_fields:
+                root_fields.append(field)
+        for parent_key, parent_fields in (inputs.get('selectedParentFields') or {}).items():
+            if parent_key in UNIVERSAL_PARENT_LOOKUPS:
+                root_fields += [f"{parent_key}.{f}" for f in parent_fields or []
+                                if f"{parent_key}.{f}" not in root_fields]
+        records = client.query(f"SELECT {', '.join(root_fields)} FROM {root_object} WHERE Id = '{sample_record_id}'")
+        snapshot["sampleRecord"] = strip_attributes(records[0]) if records else None
+        for obj_name, fields in selected_fields.items():
+            if obj_name == root_object or not fields:
+                continue
+            relationship = find_relationship_name(root_object, obj_name)
+            child_fields = ['Id'] + [f for f in dict.fromkeys(fields) if f != 'Id']
+            try:
+                records = client.query(f"SELECT Id, (SELECT {', '.join(child_fields)} FROM {relationship}) "
+                                       f"FROM {root_object} WHERE Id = '{sample_record_id}'")
+            except SalesforceError:
+                continue
+            children = (records[0].get(relationship) or {}).get('records') if records else None
+            if children:
+                snapshot["sampleChildren"][obj_name] = strip_attributes(children)
+
+    grandchild_parents = {g.get('objectName'): g.get('parentObject') for g in inputs.get('selectedGrandchildren') or []
+                          if isinstance(g, dict)}
+    relationships = {root_object: child_relationship_names(
+        client, root_object, set(selected_fields) | set(grandchild_parents.values()))}
+    for obj_name, parent in grandchild_parents.items():
+        relationships.setdefault(parent, {}).update(child_relationship_names(client, parent, {obj_name}))
+    snapshot["childRelationships"] = relationships
+
+    snapshot["builders"] = active_builders(client)
+
+    expected = ((stage8 or {}).get('promptConfig') or {}).get('promptCommand')
+    return snapshot, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble Stage 8 prompts offline from stage snapshots")
+    parser.add_argument("snapshot", nargs="?", help="Snapshot JSON to assemble (prompt goes to stdout)")
+    parser.add_argument("--check", action="store_true", help="Diff every golden snapshot against its captured prompt")
+    parser.add_argument("--golden-dir", default=str(GOLDEN_DIR), help="Golden snapshot directory")
+    parser.add_argument("--library", action="store_true",
+                        help="Use the local builder library instead of the snapshot's builders")
+    parser.add_argument("--persona", help="Override targetPersona")
+    parser.add_argument("--context", help="Override businessContext")
+    parser.add_argument("--bench", type=int, metavar="N", help="Time N variant assemblies instead of printing")
+    parser.add_argument("--capture", metavar="RUN_ID", help="Write a golden snapshot from a finished pipeline run")
+    parser.add_argument("--name", help="Golden snapshot name for --capture (default: run id)")
+    parser.add_argument("--org", default="agentictso", help="sf CLI org alias for --capture")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check_golden(args.golden_dir, args.library) else 0)
+
+    if args.capture:
+        from harness.sf_client import SalesforceClient
+        snapshot, expected = capture(SalesforceClient.from_cli(args.org), args.capture)
+        path = Path(args.golden_dir) / f"{args.name or args.capture}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"📥 {path.relative_to(REPO_ROOT) if path.is_relative_to(REPO_ROOT) else path}: "
+              f"{len(snapshot['builders'])} builders, {len(snapshot['sampleChildren'])} child objects")
+        if expected is None:
+            print("⚠️  Stage 8 output has no promptConfig.promptCommand; no expected file written")
+        else:
+            expected_path(path).write_bytes(expected.encode('utf-8'))
+            print(f"📥 {expected_path(path).name}: {len(expected)} chars")
+        return
+
+    if not args.snapshot:
+        parser.error("a snapshot path, --check or --capture is required")
+    snapshot = load_snapshot(args.snapshot)
+    assembler = PromptAssembler(builders_for(snapshot, args.library))
+    overrides = {}
+    if args.persona is not None:
+        overrides['targetPersona'] = args.persona
+    if args.context is not None:
+        overrides['businessContext'] = args.context
+
+    if args.bench:
+        if overrides:
+            snapshot = dict(snapshot, inputs=dict(snapshot['inputs'], **overrides))
+        rate = bench(assembler, snapshot, args.bench)
+        print(f"⏱️  {args.bench} variants at {rate:,.0f} prompts/s")
+        return
+
+    prompt = assembler.prompt_command(snapshot, **overrides)
+    sys.stdout.write(prompt)
+    report, too_long = size_report(prompt)
+    print(f"{'❌' if too_long else '📋'} {report}", file=sys.stderr)
+    sys.exit(1 if too_long else 0)
+
+
+if __name__ == "__main__":
+    main()
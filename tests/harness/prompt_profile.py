@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Per-section byte and token profile of Stage 8 prompts
+
+The size of the prompt Stage 8 assembles drives the latency and cost of every
+GPTfy call made with it, but the prompt is one concatenated string. This
+profiler splits it back into its sections:
+- meta-prompt: role, data payload, actual data, analysis principles,
+  information hierarchy, data-driven design, UI toolkit, output rules,
+  directive, grounding rules, merge field reference
+- legacy template mode: the fixed instruction blocks and the builder block
+and attributes bytes (UTF-8) and estimated tokens to each section and to each
+builder whose content appears in the prompt (the compressed quality rules and
+patterns, every UI component, the output rules, ...). Sections partition the
+prompt exactly; builders are located by their content, so captured prompts
+are attributed as well as offline ones.
+
+Prompts come from a finished run (stage 8 Output_Data__c promptConfig, with
+the org's active builders) or are assembled offline from a stage snapshot by
+prompt_assembly.PromptAssembler.
+
+Tokens are counted with tiktoken (cl100k_base) when it is installed, otherwise
+estimated from a cl100k-like pre-tokenization. Each profile records its
+estimator and is only compared with profiles counted the same way.
+
+Profiles are compared with a pinned baseline per label (default: the root
+object) and estimator, kept in tests/.harness_state/prompt_profile_baseline.json.
+The first profile of a label becomes its baseline; after that it only moves
+with --update-baseline, so slow growth adds up against it instead of against
+the last run. A section, builder or total that grew by more than the tolerance
+over the baseline, and by at least MIN_GROWTH_BYTES, is flagged, as is a
+prompt over the promptCommand limit. Unflagged profiles are appended to
+tests/.harness_state/prompt_profile_history.json for trends; a flagged one is
+only recorded (and becomes the baseline) with --update-baseline, so a failed
+--strict gate stays failed on retry.
+
+Usage:
+    python3 tests/harness/prompt_profile.py tests/golden/stage08/account_360_v25.json
+    python3 tests/harness/prompt_profile.py tests/golden/stage08/account_360_v25.json --library --no-record
+    python3 tests/harness/prompt_profile.py --run a0gQH000005GHurYAG --json profile.json --strict
+    python3 tests/harness/prompt_profile.py tests/golden/stage08/account_360_v25.json --update-baseline
+"""
+
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from math import ceil
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.prompt_assembly import (PROMPT_COMMAND_MAX_LENGTH, PromptAssembler, StageException, active_builders,
+                                     builders_for, is_blank, load_snapshot, stage_output, utf16_len)
+
+STATE_DIR = Path(__file__).resolve().parent.parent / ".harness_state"
+DEFAULT_HISTORY_FILE = STATE_DIR / "prompt_profile_history.json"
+DEFAULT_BASELINE_FILE = STATE_DIR / "prompt_profile_baseline.json"
+# Profiles kept per label
+HISTORY_LIMIT = 50
+
+# A section or builder is flagged when it grows by this fraction over the baseline...
+DEFAULT_TOLERANCE = 0.10
+# ...and by at least this many bytes (small sections move with the data)
+MIN_GROWTH_BYTES = 256
+
+# (section, header) in the order Stage 8 emits them; a section runs to the next header found
+META_SECTIONS = [
+    ("role", "=== YOUR ROLE ==="),
+    ("data_payload", "=== DATA CONTEXT ==="),
+    ("actual_data", "=== ACTUAL DATA VALUES (Sample Record) ==="),
+    ("analysis_principles", "=== ANALYSIS PRINCIPLES ==="),
+    ("information_hierarchy", "=== INFORMATION HIERARCHY ==="),
+    ("data_driven_design", "=== DATA-DRIVEN DESIGN GUIDANCE ==="),
+    ("ui_toolkit", "=== UI TOOLKIT ==="),
+    ("output_rules", "=== OUTPUT RULES ==="),
+    ("directive", "=== YOUR DIRECTIVE ==="),
+    ("grounding_rules", "--- GROUNDING RULES ---"),
+    ("merge_field_reference", "=== AVAILABLE MERGE FIELDS ==="),
+]
+LEGACY_SECTIONS = [
+    ("intro", "You are a Salesforce AI assistant generating HTML content for GPTfy."),
+    ("critical_output_rules", "=== CRITICAL OUTPUT RULES (GPTfy Runtime Validation) ==="),
+    ("styling_requirements", "=== STYLING REQUIREMENTS (Salesforce Brand) ==="),
+    ("data_handling", "=== DATA HANDLING ==="),
+    ("business_context", "Generate a premium, executive-style dashboard for: "),
+    ("strategic_context", "=== STRATEGIC CONTEXT (Account 360) ==="),
+    ("analysis_requirements", "=== CRITICAL: ANALYSIS REQUIREMENTS ==="),
+]
+# Legacy builders follow the fixed blocks, each as "\n\n=== Name ===\n\n" + content
+LEGACY_BUILDERS_START = "Merge fields use triple-brace syntax and will be substituted by GPTfy at runtime.\n\n"
+PREAMBLE = "preamble"
+
+# cl100k-like pre-tokenization: contractions, letter runs with one leading
+# non-letter, up to 3 digits, punctuation runs, newlines, other whitespace
+PIECE_PATTERN = re.compile(r"'(?:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+")
+# Letters a vocabulary token usually covers in longer or rarer words
+CHARS_PER_WORD_TOKEN = 6
+
+try:
+    import tiktoken
+except ImportError:  # optional; the estimate is used instead
+    tiktoken = None
+
+
+class TokenCounter:
+    """tiktoken cl100k_base when available, otherwise the pre-tokenization estimate"""
+
+    def __init__(self):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # encoding file not cached and no network
+                self.encoding = None
+        self.name = "tiktoken:cl100k_base" if self.encoding else "estimate:pieces/v1"
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.encoding:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(ceil(len(piece) / CHARS_PER_WORD_TOKEN) if piece.isalpha() else 1
+                   for piece in PIECE_PATTERN.findall(text))
+
+
+# -- Attribution --------------------------------------------------------------
+
+def split_sections(prompt):
+    """[(section, start, end)] covering the whole prompt, in prompt order"""
+    legacy = prompt.startswith(LEGACY_SECTIONS[0][1])
+    headers = LEGACY_SECTIONS if legacy else META_SECTIONS
+    starts, cursor = [], 0
+    for name, header in headers:
+        position = prompt.find(header, cursor)
+        # Headers open a line; anything else is builder or record text quoting them
+        while position > 0 and prompt[position - 1] != '\n':
+            position = prompt.find(header, position + 1)
+        if position >= 0:
+            starts.append((name, position))
+            cursor = position + len(header)
+    if legacy:
+        position = prompt.find(LEGACY_BUILDERS_START, starts[-1][1] if starts else 0)
+        if position >= 0 and position + len(LEGACY_BUILDERS_START) < len(prompt):
+            starts.append(("builders", position + len(LEGACY_BUILDERS_START)))
+    if not starts or starts[0][1] > 0:
+        starts.insert(0, (PREAMBLE, 0))
+    ends = [start for _, start in starts[1:]] + [len(prompt)]
+    return [(name, start, end) for (name, start), end in zip(starts, ends) if end > start]
+
+
+def builder_spans(prompt, builders):
+    """
+    {builder name: (start, end)} for every builder whose content is in the prompt
+    A UI component's span includes its "--- Name ---" / "When to use" / "HTML Pattern"
+    lines and a legacy builder's its "=== Name ===" header. Longer contents are placed
+    first and spans never overlap, so a builder quoting another is not counted twice.
+    """
+    spans, taken = {}, []
+    candidates = [b for b in builders if not is_blank(b.get('ccai__Prompt_Command__c'))]
+    for builder in sorted(candidates, key=lambda b: -len(b['ccai__Prompt_Command__c'])):
+        name, content = builder.get('Name'), builder['ccai__Prompt_Command__c']
+        if name in spans:
+            continue
+        position = prompt.find(content)
+        while position >= 0 and any(position < end and position + len(content) > start for start, end in taken):
+            position = prompt.find(content, position + 1)
+        if position < 0:
+            continue
+        start, end = position, position + len(content)
+        for prefix in wrappers(builder):
+            if prompt.endswith(prefix, 0, start):
+                start -= len(prefix)
+                break
+        spans[name] = (start, end)
+        taken.append((start, end))
+    return spans
+
+
+def wrappers(builder):
+    """Text Stage 8 writes just before a builder's content"""
+    name = str(builder.get('Name'))
+    description = builder.get('ccai__Description__c')
+    component = f"--- {name} ---\n"
+    if not is_blank(description):
+        component += f"When to use: {description}\n"
+    return [component + "HTML Pattern:\n", f"\n\n=== {name} ===\n\n"]
+
+
+def section_at(sections, position):
+    for name, start, end in sections:
+        if start <= position < end:
+            return name
+    return None
+
+
+def measure(text, counter):
+    return {"bytes": len(text.encode('utf-8')), "tokens": counter.count(text)}
+
+
+def profile_prompt(prompt, builders=(), counter=None):
+    """
+    {estimator, total, sections: {name: {bytes, tokens}}, builders: {name: {bytes, tokens, section}}}
+    Sections are in prompt order; builders are the ones found in the prompt, in prompt order.
+    """
+    counter = counter or TokenCounter()
+    sections = split_sections(prompt)
+    spans = builder_spans(prompt, builders)
+    total = measure(prompt, counter)
+    total["chars"] = utf16_len(prompt)
+    return {
+        "estimator": counter.name,
+        "total": total,
+        "sections": {name: measure(prompt[start:end], counter) for name, start, end in sections},
+        "builders": {name: dict(measure(prompt[start:end], counter), section=section_at(sections, start))
+                     for name, (start, end) in sorted(spans.items(), key=lambda item: item[1][0])},
+    }
+
+
+# -- History and regressions --------------------------------------------------
+
+def load_history(label, path=DEFAULT_HISTORY_FILE):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, 'r') as f:
+        return json.load(f).get(label, [])
+
+
+def record_profile(label, profile, path=DEFAULT_HISTORY_FILE):
+    path = Path(path)
+    history = {}
+    if path.exists():
+        with open(path, 'r') as f:
+            history = json.load(f)
+    history[label] = (history.get(label, []) + [profile])[-HISTORY_LIMIT:]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def load_baseline(label, estimator, path=DEFAULT_BASELINE_FILE):
+    """The label's pinned profile counted with estimator, or None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get(label, {}).get(estimator)
+
+
+def save_baseline(label, profile, path=DEFAULT_BASELINE_FILE):
+    path = Path(path)
+    baselines = {}
+    if path.exists():
+        with open(path, 'r') as f:
+            baselines = json.load(f)
+    baselines.setdefault(label, {})[profile["estimator"]] = profile
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+
+
+def regressions(profile, baseline, tolerance=DEFAULT_TOLERANCE, min_growth=MIN_GROWTH_BYTES):
+    """Sections, builders and the total that grew past tolerance, plus a prompt over the limit"""
+    flags = []
+    if profile["total"]["chars"] > PROMPT_COMMAND_MAX_LENGTH:
+        flags.append({"kind": "limit", "name": "total", "chars": profile["total"]["chars"],
+                      "limit": PROMPT_COMMAND_MAX_LENGTH})
+    if baseline is None:
+        return flags
+    groups = [("total", {"total": profile["total"]}, {"total": baseline["total"]}),
+              ("section", profile["sections"], baseline.get("sections", {})),
+              ("builder", profile["builders"], baseline.get("builders", {}))]
+    for kind, current, before in groups:
+        for name, stats in current.items():
+            base = before.get(name, {}).get("bytes", 0)
+            growth = stats["bytes"] - base
+            if growth >= min_growth and stats["bytes"] > base * (1 + tolerance):
+                flags.append({"kind": kind, "name": name, "bytes": stats["bytes"], "baseline": base,
+                              "tokens": stats["tokens"], "baselineTokens": before.get(name, {}).get("tokens", 0)})
+    return flags
+
+
+# -- Prompt sources -----------------------------------------------------------
+
+def prompt_from_run(client, run_id):
+    """(prompt, root object, builders) from a finished run's stage 7 and 8 outputs"""
+    stage8, _ = stage_output(client, run_id, 8)
+    prompt = ((stage8 or {}).get('promptConfig') or {}).get('promptCommand')
+    if is_blank(prompt):
+        raise StageException(f'Run {run_id} has no stage 8 promptConfig.promptCommand')
+    inputs, _ = stage_output(client, run_id, 7)
+    return prompt, (inputs or {}).get('rootObject'), active_builders(client)
+
+
+def prompt_from_snapshot(path, use_library=False):
+    """(prompt, root object, builders) assembled offline"""
+    snapshot = load_snapshot(path)
+    builders = builders_for(snapshot, use_library)
+    return PromptAssembler(builders).prompt_command(snapshot), snapshot['inputs'].get('rootObject'), builders
+
+
+# -- Report -------------------------------------------------------------------
+
+def delta(stats, before):
+    if not before:
+        return "new"
+    change = stats["bytes"] - before["bytes"]
+    return f"{change:+d}" if change else "="
+
+
+def print_profile(profile, baseline, flags, top=20):
+    total = profile["total"]
+    before = baseline or {}
+    print(f"📋 Prompt: {total['bytes']:,} bytes, ~{total['tokens']:,} tokens "
+          f"({total['chars']:,}/{PROMPT_COMMAND_MAX_LENGTH:,} chars) [{profile['estimator']}]")
+    print(f"\n   {'Section':<24} {'Bytes':>8} {'Share':>6} {'Tokens':>7} {'Δ bytes':>8}")
+    for name, stats in profile["sections"].items():
+        print(f"   {name:<24} {stats['bytes']:>8,} {stats['bytes'] * 100 / (total['bytes'] or 1):>5.1f}% "
+              f"{stats['tokens']:>7,} {delta(stats, before.get('sections', {}).get(name)) if baseline else '':>8}")
+
+    builders = sorted(profile["builders"].items(), key=lambda item: -item[1]["bytes"])
+    attributed = sum(stats["bytes"] for _, stats in builders)
+    print(f"\n   Builders: {len(builders)} found, {attributed:,} bytes "
+          f"({attributed * 100 / (total['bytes'] or 1):.1f}% of the prompt)")
+    for name, stats in builders[:top]:
+        label = f"{name} [{stats['section']}]"
+        print(f"   {label[:48]:<48} {stats['bytes']:>8,} {stats['tokens']:>7,} "
+              f"{delta(stats, before.get('builders', {}).get(name)) if baseline else '':>8}")
+    if len(builders) > top:
+        print(f"   ... and {len(builders) - top} more")
+
+    if baseline is None:
+        print("\n   No baseline profile to compare against")
+    for flag in flags:
+        if flag["kind"] == "limit":
+            print(f"   ⚠️  Prompt is {flag['chars']:,} chars, over the {flag['limit']:,} promptCommand limit")
+        else:
+            what = flag['name'] if flag['name'] == flag['kind'] else f"{flag['kind']} {flag['name']}"
+            print(f"   ⚠️  {what}: {flag['baseline']:,} -> {flag['bytes']:,} bytes "
+                  f"(~{flag['baselineTokens']:,} -> ~{flag['tokens']:,} tokens)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Stage 8 prompt size by section and builder")
+    parser.add_argument("snapshot", nargs="?", help="Snapshot JSON to assemble offline and profile")
+    parser.add_argument("--run", metavar="RUN_ID", help="Profile the prompt a finished pipeline run assembled")
+    parser.add_argument("--library", action="store_true",
+                        help="Assemble with the local builder library instead of the snapshot's builders")
+    parser.add_argument("--label", help="History label (default: the root object)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Fractional growth over the baseline profile that is flagged")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Pin this profile as the label's baseline, flagged or not")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this profile to the history")
+    parser.add_argument("--json", metavar="PATH", help="Also write the profile and flags as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 when anything is flagged")
+    parser.add_argument("--org", default="agentictso", help="sf CLI org alias for --run")
+    args = parser.parse_args()
+
+    if bool(args.snapshot) == bool(args.run):
+        parser.error("give either a snapshot path or --run")
+    try:
+        if args.run:
+            from harness.sf_client import SalesforceClient
+            prompt, root_object, builders = prompt_from_run(SalesforceClient.from_cli(args.org), args.run)
+            source = f"run:{args.run}"
+        else:
+            prompt, root_object, builders = prompt_from_snapshot(args.snapshot, args.library)
+            source = f"snapshot:{Path(args.snapshot).name}{' (library)' if args.library else ''}"
+    except StageException as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    profile = profile_prompt(prompt, builders)
+    profile = {"timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'), "source": source, **profile}
+    label = args.label or root_object or Path(args.snapshot or args.run).stem
+    baseline = load_baseline(label, profile["estimator"])
+    flags = regressions(profile, baseline, args.tolerance)
+    print_profile(profile, baseline, flags)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"label": label, "profile": profile, "baseline": baseline, "flags": flags}, f, indent=2)
+        print(f"   Saved: {args.json}")
+    # A flagged profile is only accepted explicitly, so a failed --strict gate can't clear itself on retry
+    accepted = args.update_baseline or not flags
+    if not accepted:
+        print("   Not recorded: pass --update-baseline to accept a flagged profile")
+    elif baseline is None or args.update_baseline:
+        save_baseline(label, profile)
+        print(f"   Baseline {'updated' if baseline else 'saved'} for {label} ({DEFAULT_BASELINE_FILE.name})")
+    if accepted and not args.no_record:
+        record_profile(label, profile)
+        print(f"   Recorded under {label} ({DEFAULT_HISTORY_FILE.name})")
+    if flags and args.strict and not accepted:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
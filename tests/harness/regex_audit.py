@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+"""
+Backtracking safety and cost audit for scorer and validation regexes
+
+The scorers run dozens of regexes over single-line HTML, and several put an
+unbounded .* between two anchors (progress_bars, badges, stat_cards, ...).
+On a long line such a pattern is O(n^2): every occurrence of the prefix
+scans to the end of the line and backtracks looking for the suffix. Two
+gaps make it O(n^3), and a quantifier nested in another can be exponential.
+
+For every pattern in the scorer sources and in the checkPattern / patterns
+entries of PF_OutputValidationRules.json this reports:
+
+- static   a backtracking estimate from the parsed regex: the polynomial
+           degree (one per unbounded repeat that overlaps what follows it,
+           plus one if a failed attempt rescans text the next attempt
+           starts in), or exponential for nested / ambiguous repeats
+- measured findall time on synthetic single-line inputs of doubling size
+           built to pump the pattern (its prefix repeated without the
+           suffix, as is and ending in a character the pattern can't
+           consume so the match has to fail), the fitted exponent, and the
+           projected time on 1 MB
+- bounded  for super-linear patterns, the .{0,N} / \\s{0,256} rewrite
+           (harness.streaming.split_gaps), offered only if it gives the same
+           findall counts on the committed outputs and measures about linear;
+           otherwise the report says there is no safe bounded rewrite and
+           points to a harness.streaming sequence plan (exact and linear for
+           A.*B chains) or to restructuring the pattern
+
+Scorer patterns are read statically (module-level *PATTERN* constants and
+literal re.* calls), so nothing is imported or run. The validation rules run
+in Apex (java.util.regex); its backtracking matches Python's closely enough
+for the estimates to carry over.
+
+Usage:
+    python3 tests/harness/regex_audit.py
+    python3 tests/harness/regex_audit.py --no-bench --strict
+    python3 tests/harness/regex_audit.py --pattern 'height:\\s*\\d+px.*progress'
+"""
+
+import argparse
+import ast
+import json
+import math
+import multiprocessing
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.streaming import COUNT, MAX_WIDTH, REPEAT_LIMIT, UnboundedPatternError, plan_query, split_gaps, width
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+SCORER_SOURCES = {
+    "phase0": REPO_ROOT / "tests" / "phase0" / "score_outputs.py",
+    "phase0b": REPO_ROOT / "tests" / "phase0b" / "score_phase0b_outputs.py",
+    "phase0c": REPO_ROOT / "tests" / "phase0c" / "score_phase0c_outputs.py",
+    "v26": REPO_ROOT / "tests" / "v26" / "run_innovatek_test.py",
+    "harness": REPO_ROOT / "tests" / "harness" / "html_features.py",
+}
+VALIDATION_RULES = REPO_ROOT / "force-app" / "main" / "default" / "staticresources" / "PF_OutputValidationRules.json"
+CORPUS_GLOB = "tests/**/outputs/*.html"
+
+DEFAULT_GAP_LIMIT = 4096
+# Benchmark: stop doubling once one findall takes this long
+DEFAULT_BUDGET = 0.05
+DEFAULT_MAX_CHARS = 1 << 17
+MIN_CHARS = 16
+# A pattern's whole benchmark runs in a child process killed after this long
+DEFAULT_TIMEOUT = 10.0
+# Exponential patterns grow by a few characters at a time, up to this many
+EXPONENTIAL_MAX_CHARS = 64
+PROJECT_CHARS = 1 << 20
+# Timings below this are mostly noise and not used for the fit
+MIN_FIT_SECONDS = 2e-4
+# Measured exponents from here up count as super-linear
+SUPER_LINEAR_EXPONENT = 1.5
+
+RE_FUNCTIONS = {"findall", "search", "match", "fullmatch", "finditer", "compile", "sub", "subn", "split"}
+# Position of the flags argument per re function
+FLAG_ARG = {"compile": 1, "sub": 4, "subn": 4, "split": 3}
+
+# Characters the static analysis reasons over; preference order for examples
+ALPHABET = ("ax0 -:;#.=<>/\"'(){}[]_,%$!?@&*+|^~`\\\t\n\r"
+            + "".join(chr(c) for c in range(33, 127)))
+ALPHABET = "".join(dict.fromkeys(ALPHABET))
+ALL_CHARS = frozenset(ALPHABET)
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_POSSESSIVE = {getattr(sre_constants, "POSSESSIVE_REPEAT", None), getattr(sre_constants, "ATOMIC_GROUP", None)} - {None}
+_CATEGORIES = {
+    "CATEGORY_DIGIT": str.isdigit,
+    "CATEGORY_NOT_DIGIT": lambda c: not c.isdigit(),
+    "CATEGORY_SPACE": str.isspace,
+    "CATEGORY_NOT_SPACE": lambda c: not c.isspace(),
+    "CATEGORY_WORD": lambda c: c.isalnum() or c == "_",
+    "CATEGORY_NOT_WORD": lambda c: not (c.isalnum() or c == "_"),
+}
+
+
+# -- collecting patterns -----------------------------------------------------------
+
+class AuditedPattern:
+    """One regex and every place it is used"""
+
+    def __init__(self, pattern, flags, source):
+        self.pattern = pattern
+        self.flags = flags
+        self.sources = [source]
+        self.static = None
+        self.measured = None
+        self.bounded = None
+
+    @property
+    def label(self):
+        return self.sources[0] + (f" (+{len(self.sources) - 1})" if len(self.sources) > 1 else "")
+
+
+def _flags_value(node):
+    """re.IGNORECASE | re.DOTALL -> int, for flag expressions in scorer source"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "re":
+        return int(getattr(re, node.attr, 0))
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return _flags_value(node.left) | _flags_value(node.right)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    return 0
+
+
+def _string_items(name, value):
+    """(label, pattern) for a str constant, or a list/tuple/dict of them"""
+    if isinstance(value, ast.Constant) and isinstance(value.value, str):
+        return [(name, value.value)]
+    if isinstance(value, (ast.List, ast.Tuple)):
+        return [(f"{name}[{i}]", item.value) for i, item in enumerate(value.elts)
+                if isinstance(item, ast.Constant) and isinstance(item.value, str)]
+    if isinstance(value, ast.Dict):
+        return [(f"{name}[{key.value!r}]", item.value) for key, item in zip(value.keys, value.values)
+                if isinstance(key, ast.Constant) and isinstance(item, ast.Constant) and isinstance(item.value, str)]
+    return []
+
+
+def scorer_patterns(scorer, path):
+    """
+    (label, pattern, flags) from a scorer's source: module-level constants
+    named *PATTERN* (matched case-insensitively, as the scorers do by
+    default) and literal patterns passed to re.* calls
+    """
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if "PATTERN" in name:
+                found += [(f"{scorer} {label}", pattern, re.IGNORECASE) for label, pattern in _string_items(name, node.value)]
+
+    def visit(node, scope):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            scope = f"{node.name}()"
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in RE_FUNCTIONS
+                and isinstance(node.func.value, ast.Name) and node.func.value.id == "re" and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            index = FLAG_ARG.get(node.func.attr, 2)
+            flags = _flags_value(node.args[index]) if len(node.args) > index else 0
+            for keyword in node.keywords:
+                if keyword.arg == "flags":
+                    flags = _flags_value(keyword.value)
+            found.append((f"{scorer} {scope}", node.args[0].value, flags))
+        for child in ast.iter_child_nodes(node):
+            visit(child, scope)
+
+    visit(tree, "module")
+    return found
+
+
+def validation_patterns(path=VALIDATION_RULES):
+    """(label, pattern, flags) for every checkPattern and patterns entry of the rules JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    found = []
+
+    def walk(node, trail):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "checkPattern" and isinstance(value, str):
+                    found.append((f"rules {'.'.join(trail)}", value, 0))
+                elif key == "patterns" and isinstance(value, list):
+                    for i, item in enumerate(value):
+                        pattern = item.get("pattern") if isinstance(item, dict) else item
+                        if isinstance(pattern, str):
+                            found.append((f"rules {'.'.join(trail)}[{i}]", pattern, 0))
+                else:
+                    walk(value, trail + [key])
+
+    walk(rules, [])
+    return found
+
+
+def collect_patterns(sources=SCORER_SOURCES, rules_path=VALIDATION_RULES):
+    """Every distinct (pattern, flags) across the scorers and validation rules"""
+    found = []
+    for scorer, path in sources.items():
+        if Path(path).exists():
+            found += scorer_patterns(scorer, path)
+    if rules_path and Path(rules_path).exists():
+        found += validation_patterns(rules_path)
+    patterns = {}
+    for label, pattern, flags in found:
+        key = (pattern, flags)
+        if key in patterns:
+            patterns[key].sources.append(label)
+        else:
+            patterns[key] = AuditedPattern(pattern, flags, label)
+    return list(patterns.values())
+
+
+# -- static analysis ---------------------------------------------------------------
+
+class _Analysis:
+    """Walks a parsed regex for backtracking hazards"""
+
+    def __init__(self, pattern, flags):
+        parsed = sre_parse.parse(pattern, flags)
+        self.flags = flags | parsed.state.flags
+        self.parsed = parsed
+        self.findings = []
+
+    def leaf_chars(self, op, av):
+        ignore_case = self.flags & re.IGNORECASE
+        if op == sre_constants.LITERAL or op == sre_constants.NOT_LITERAL:
+            chars = {chr(av), chr(av).swapcase()} if ignore_case else {chr(av)}
+            return frozenset(chars) if op == sre_constants.LITERAL else ALL_CHARS - chars
+        if op == sre_constants.ANY:
+            return ALL_CHARS if self.flags & re.DOTALL else ALL_CHARS - {"\n"}
+        if op == sre_constants.IN:
+            chars, negate = set(), False
+            for item_op, item_av in av:
+                if item_op == sre_constants.NEGATE:
+                    negate = True
+                elif item_op == sre_constants.LITERAL:
+                    chars.add(chr(item_av))
+                elif item_op == sre_constants.RANGE:
+                    chars.update(c for c in ALPHABET if item_av[0] <= ord(c) <= item_av[1])
+                elif item_op == sre_constants.CATEGORY:
+                    test = _CATEGORIES.get(str(item_av), lambda c: True)
+                    chars.update(c for c in ALPHABET if test(c))
+            if ignore_case:
+                chars |= {c.swapcase() for c in chars}
+            return frozenset(ALL_CHARS - chars if negate else chars & ALL_CHARS)
+        return None
+
+    def first(self, seq):
+        """(chars a match of seq can start with, whether seq can match empty)"""
+        chars = set()
+        for op, av in seq:
+            item_chars, nullable = self.item_first(op, av)
+            chars |= item_chars
+            if not nullable:
+                return frozenset(chars), False
+        return frozenset(chars), True
+
+    def item_first(self, op, av):
+        leaf = self.leaf_chars(op, av)
+        if leaf is not None:
+            return leaf, False
+        if op in _REPEATS or op == getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            chars, nullable = self.first(av[2])
+            return chars, nullable or av[0] == 0
+        if op == sre_constants.SUBPATTERN:
+            return self.first(av[-1])
+        if op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            return self.first(av)
+        if op == sre_constants.BRANCH:
+            results = [self.first(branch) for branch in av[1]]
+            return frozenset().union(*(c for c, _ in results)), any(n for _, n in results)
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return frozenset(), True
+        return ALL_CHARS, True
+
+    def all_chars(self, seq):
+        """Every character seq can consume"""
+        chars = set()
+        for op, av in seq:
+            leaf = self.leaf_chars(op, av)
+            if leaf is not None:
+                chars |= leaf
+            elif op in _REPEATS or op == getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+                chars |= self.all_chars(av[2])
+            elif op == sre_constants.SUBPATTERN:
+                chars |= self.all_chars(av[-1])
+            elif op == sre_constants.BRANCH:
+                for branch in av[1]:
+                    chars |= self.all_chars(branch)
+        return frozenset(chars)
+
+    def walk(self, seq, follow, start, in_unbounded=False):
+        """
+        Backtracking degree of seq: the number of nested unbounded repeats a
+        failing attempt can backtrack through, and whether one of them
+        rescans text a later attempt starts in. follow is what can come
+        after seq (None at the end of the pattern), start the chars a match
+        attempt begins with.
+        """
+        degree, rescans = 0, False
+        for i, (op, av) in enumerate(seq):
+            rest, rest_nullable = self.first(seq[i + 1:])
+            if not rest_nullable:
+                item_follow = rest
+            else:
+                # Whatever follows may be skipped: at the end of the pattern nothing can fail
+                item_follow = None if follow is None else rest | follow
+            if in_unbounded and item_follow is not None and self.item_first(op, av)[1]:
+                if self.all_chars([(op, av)]) & item_follow:
+                    self.findings.append("optional part of a repeated group overlaps the next iteration")
+            if op in _REPEATS:
+                low, high, body = av
+                body_chars = self.all_chars(body)
+                body_first, _ = self.first(body)
+                unbounded = high == sre_constants.MAXREPEAT
+                inner, inner_rescans = self.walk(body, body_first | (item_follow or frozenset()), start,
+                                                 in_unbounded or unbounded)
+                if unbounded:
+                    overlaps = item_follow is not None and bool(body_chars & item_follow)
+                    if overlaps:
+                        degree += 1
+                        if in_unbounded:
+                            self.findings.append("nested unbounded repeats can split the same text many ways")
+                    if item_follow is not None and body_chars & start:
+                        rescans = True
+                    if self._ambiguous_branch(body):
+                        self.findings.append("repeated alternation with overlapping branches")
+                    if inner and overlaps:
+                        self.findings.append("unbounded repeat around a backtracking repeat")
+                degree += inner
+                rescans = rescans or inner_rescans
+            elif op == sre_constants.SUBPATTERN:
+                inner, inner_rescans = self.walk(av[-1], item_follow, start, in_unbounded)
+                degree += inner
+                rescans = rescans or inner_rescans
+            elif op == sre_constants.BRANCH:
+                results = [self.walk(branch, item_follow, start, in_unbounded) for branch in av[1]]
+                degree += max(d for d, _ in results)
+                rescans = rescans or any(r for _, r in results)
+        return degree, rescans
+
+    def _ambiguous_branch(self, body):
+        for op, av in body:
+            if op == sre_constants.SUBPATTERN and self._ambiguous_branch(av[-1]):
+                return True
+            if op == sre_constants.BRANCH:
+                firsts = [self.first(branch)[0] for branch in av[1]]
+                for i, a in enumerate(firsts):
+                    if any(a & b for b in firsts[i + 1:]):
+                        return True
+        return False
+
+
+def analyze(pattern, flags=0):
+    """
+    Static backtracking estimate:
+    {risk: linear|polynomial|exponential, degree, unbounded, findings}
+    """
+    analysis = _Analysis(pattern, flags)
+    parsed = list(analysis.parsed)
+    branches = parsed[0][1][1] if len(parsed) == 1 and parsed[0][0] == sre_constants.BRANCH else [parsed]
+    degree = 1
+    for branch in branches:
+        start, _ = analysis.first(branch)
+        backtracking, rescans = analysis.walk(branch, None, start)
+        degree = max(degree, max(backtracking, 1) + (1 if rescans else 0) if (backtracking or rescans) else 1)
+    findings = list(dict.fromkeys(analysis.findings))
+    if findings:
+        risk = "exponential"
+    elif degree > 1:
+        risk = "polynomial"
+    else:
+        risk = "linear"
+    return {"risk": risk, "degree": degree, "unbounded": width(pattern, flags)[1] >= MAX_WIDTH,
+            "findings": findings}
+
+
+# -- benchmark ---------------------------------------------------------------------
+
+def _pick(chars, avoid=frozenset()):
+    """Preferred example character from a set, avoiding ones that would complete a match"""
+    for c in ALPHABET:
+        if c in chars and c not in avoid and c not in "\n\r":
+            return c
+    for c in ALPHABET:
+        if c in chars:
+            return c
+    return "a"
+
+
+def _example(analysis, seq, pieces, follow=frozenset()):
+    """Shortest-ish matching text for seq, recording a cut point after every repeat"""
+    text = ""
+    for i, (op, av) in enumerate(seq):
+        rest, _ = analysis.first(seq[i + 1:])
+        leaf = analysis.leaf_chars(op, av)
+        if leaf is not None:
+            text += _pick(leaf, rest | follow)
+        elif op in _REPEATS or op == getattr(sre_constants, "POSSESSIVE_REPEAT", None):
+            low, high, body = av
+            copies = max(low, 1) if high == sre_constants.MAXREPEAT else low
+            text += _example(analysis, body, [], rest | follow) * min(copies, 64)
+            if high == sre_constants.MAXREPEAT:
+                pieces.append(len(text))
+        elif op == sre_constants.SUBPATTERN:
+            text += _example(analysis, av[-1], [], rest | follow)
+        elif op == sre_constants.BRANCH:
+            text += _example(analysis, av[1][0], [], rest | follow)
+    return text
+
+
+def pump_inputs(pattern, flags=0):
+    """Candidate worst-case inputs: a match prefix (or a body character) to repeat along one line"""
+    analysis = _Analysis(pattern, flags)
+    parsed = list(analysis.parsed)
+    branches = parsed[0][1][1] if len(parsed) == 1 and parsed[0][0] == sre_constants.BRANCH else [parsed]
+    pumps = []
+    for branch in branches:
+        cuts = []
+        example = _example(analysis, branch, cuts)
+        pumps += [example[:cut] for cut in cuts]
+        if len(example) > 1:
+            pumps.append(example[:-1])
+        start, _ = analysis.first(branch)
+        for op, av in branch:
+            if op in _REPEATS and av[1] == sre_constants.MAXREPEAT:
+                shared = analysis.all_chars(av[2]) & start
+                if shared:
+                    pumps.append(_pick(shared))
+    pumps = [p.replace("\n", " ") for p in dict.fromkeys(pumps) if p.strip()]
+    return pumps or ["a"]
+
+
+def fail_suffix(pattern, flags=0):
+    """
+    A character the pattern can never consume ('' if it can consume anything)
+    A pumped input ending in it can't satisfy a trailing anchor or suffix, so
+    every start position backtracks through all its ways of splitting the pump.
+    """
+    analysis = _Analysis(pattern, flags)
+    consumable = analysis.all_chars(list(analysis.parsed))
+    for c in ALPHABET:
+        if c not in consumable and c not in "\n\r":
+            return c
+    for c in "\n\r":
+        if c not in consumable:
+            return c
+    return ""
+
+
+def _time(regex, text):
+    started = time.perf_counter()
+    regex.findall(text)
+    elapsed = time.perf_counter() - started
+    if elapsed < 0.005:
+        # Cheap: best of a few runs
+        for _ in range(3):
+            started = time.perf_counter()
+            regex.findall(text)
+            elapsed = min(elapsed, time.perf_counter() - started)
+    return elapsed
+
+
+def exponent(points):
+    """Least-squares slope of log(seconds) over log(chars), from the timings above the noise floor"""
+    usable = [(n, t) for n, t in points if t >= MIN_FIT_SECONDS][-4:]
+    if len(usable) < 2:
+        return 1.0
+    xs = [math.log(n) for n, _ in usable]
+    ys = [math.log(t) for _, t in usable]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 1.0
+
+
+def benchmark(pattern, flags=0, budget=DEFAULT_BUDGET, max_chars=DEFAULT_MAX_CHARS, exponential=False):
+    """
+    Worst measured growth over the pump inputs:
+    {exponent, chars, seconds (at the largest size run), projected (seconds at 1 MB), pump}
+
+    A pattern whose matches are at most W characters wide does at most
+    W^k work per start position, so growth is linear beyond W: the
+    projection follows the fitted exponent up to W and is linear after.
+
+    Inputs double from MIN_CHARS; for a statically exponential pattern they
+    grow two characters at a time from 2 instead (256 characters would never
+    finish), and exponent is None.
+    """
+    regex = re.compile(pattern, flags)
+    match_width = width(pattern, flags)[1]
+    tail = fail_suffix(pattern, flags)
+    worst = None
+    # Each pump runs as is (matches succeed) and with the failing tail (every match attempt fails)
+    pumps = [(pump, suffix) for pump in pump_inputs(pattern, flags) for suffix in dict.fromkeys(("", tail))]
+    for pump, suffix in pumps:
+        points = []
+        chars = 2 if exponential else MIN_CHARS
+        while chars <= (EXPONENTIAL_MAX_CHARS if exponential else max_chars):
+            text = (pump * (chars // len(pump) + 1))[:chars - len(suffix)] + suffix
+            points.append((chars, _time(regex, text)))
+            if points[-1][1] > budget:
+                break
+            chars = chars + 2 if exponential else chars * 2
+        chars, seconds = points[-1]
+        if exponential:
+            slope, projected = None, math.inf if seconds > budget else seconds
+        else:
+            slope = round(max(exponent(points), 1.0), 2)
+            knee = max(chars, min(match_width, PROJECT_CHARS))
+            projected = seconds * (knee / chars) ** slope * (PROJECT_CHARS / knee)
+        result = {"exponent": slope, "chars": chars, "seconds": seconds,
+                  "projected": projected, "pump": pump, "suffix": suffix}
+        if worst is None or projected > worst["projected"]:
+            worst = result
+    return worst
+
+
+# -- bounded equivalents -------------------------------------------------------------
+
+def _benchmark_child(connection, args):
+    connection.send(benchmark(*args))
+
+
+def guarded_benchmark(pattern, flags=0, budget=DEFAULT_BUDGET, max_chars=DEFAULT_MAX_CHARS,
+                      exponential=False, timeout=DEFAULT_TIMEOUT):
+    """
+    benchmark() in a child process: one catastrophic findall can't be
+    interrupted in-process, so a run still going after timeout seconds is
+    killed and reported as never finishing
+    """
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(target=_benchmark_child,
+                            args=(sender, (pattern, flags, budget, max_chars, exponential)), daemon=True)
+    child.start()
+    result = receiver.recv() if receiver.poll(timeout) else None
+    if child.is_alive():
+        child.terminate()
+    child.join()
+    if result is None:
+        return {"exponent": None, "chars": None, "seconds": timeout, "projected": math.inf,
+                "pump": None, "suffix": None, "timed_out": True}
+    return result
+
+
+def bounded_rewrite(pattern, gap_limit=DEFAULT_GAP_LIMIT, repeat_limit=REPEAT_LIMIT):
+    """pattern with every unbounded single-character repeat capped, or None if that isn't enough"""
+    try:
+        branches, _ = split_gaps(pattern, repeat_limit, gap_limit)
+    except UnboundedPatternError:
+        return None
+    rewritten = "|".join(branch[0] for branch in branches)
+    try:
+        if width(rewritten)[1] >= MAX_WIDTH:
+            return None
+    except re.error:
+        return None
+    return rewritten
+
+
+def corpus_files(root=REPO_ROOT, pattern=CORPUS_GLOB):
+    return sorted(Path(root).glob(pattern))
+
+
+def same_counts(pattern, rewritten, flags, corpus):
+    """Outputs in corpus where the rewrite's findall count differs from the original's"""
+    original, bounded = re.compile(pattern, flags), re.compile(rewritten, flags)
+    return [path for path, html in corpus if len(original.findall(html)) != len(bounded.findall(html))]
+
+
+# -- report ------------------------------------------------------------------------
+
+def audit(patterns, bench=True, budget=DEFAULT_BUDGET, max_chars=DEFAULT_MAX_CHARS,
+          gap_limit=DEFAULT_GAP_LIMIT, corpus=None, timeout=DEFAULT_TIMEOUT):
+    """Fill in static, measured and bounded for each AuditedPattern"""
+    for item in patterns:
+        item.static = analyze(item.pattern, item.flags)
+        if bench:
+            item.measured = guarded_benchmark(item.pattern, item.flags, budget, max_chars,
+                                              item.static["risk"] == "exponential", timeout)
+        super_linear = item.static["risk"] != "linear" or (item.measured and (item.measured["exponent"] or 2) >= SUPER_LINEAR_EXPONENT)
+        if not super_linear:
+            continue
+        rewritten = bounded_rewrite(item.pattern, gap_limit)
+        try:
+            streaming = plan_query(item.pattern, item.flags, COUNT).mode
+        except UnboundedPatternError:
+            streaming = None
+        if rewritten is None or rewritten == item.pattern:
+            item.bounded = {"pattern": None, "streaming": streaming}
+            continue
+        item.bounded = {"pattern": rewritten, "static": analyze(rewritten, item.flags), "streaming": streaming}
+        if bench:
+            item.bounded["measured"] = guarded_benchmark(rewritten, item.flags, budget, max_chars,
+                                                         item.bounded["static"]["risk"] == "exponential", timeout)
+        if corpus is not None:
+            item.bounded["differs_on"] = [str(p) for p in same_counts(item.pattern, rewritten, item.flags, corpus)]
+        item.bounded["safe"] = safe_rewrite(item.bounded)
+    return patterns
+
+
+def safe_rewrite(bounded):
+    """
+    A rewrite is only offered if it counts the same on every output and measures
+    about linear; capped repeats always look linear statically, so unmeasured ones don't count
+    """
+    measured = bounded.get("measured")
+    return (bounded.get("differs_on") == [] and measured is not None
+            and measured["exponent"] is not None and measured["exponent"] < SUPER_LINEAR_EXPONENT)
+
+
+def _severity(item):
+    exponential = item.static["risk"] == "exponential"
+    measured = (item.measured["exponent"] or 0) if item.measured else 1.0
+    return (exponential, max(item.static["degree"], round(measured)), measured)
+
+
+def _growth(degree):
+    return "O(n)" if degree <= 1 else f"O(n^{degree})"
+
+
+def print_report(patterns, corpus_size=0):
+    icons = {"exponential": "🔴", "polynomial": "🟠", "linear": "🟢"}
+    counts = {"exponential": 0, "polynomial": 0, "linear": 0}
+    print(f"{'':2} {'static':<11} {'measured':<9} {'@ size':>8} {'1 MB est':>9}  pattern (where)")
+    for item in sorted(patterns, key=_severity, reverse=True):
+        static, measured = item.static, item.measured
+        counts[static["risk"]] += 1
+        growth = "exponential" if static["risk"] == "exponential" else _growth(static["degree"])
+        if measured:
+            timing = (f"{_exponent(measured):<9} {measured['seconds'] * 1000:6.0f}ms "
+                      f"{_duration(measured['projected']):>9}")
+        else:
+            timing = f"{'-':<9} {'-':>8} {'-':>9}"
+        print(f"{icons[static['risk']]} {growth:<11} {timing}  {item.pattern}  ({item.label})")
+        for finding in static["findings"]:
+            print(f"   ⚠️  {finding}")
+        if item.bounded:
+            _print_bounded(item.bounded, corpus_size)
+    print(f"\n{len(patterns)} patterns: {counts['exponential']} exponential, "
+          f"{counts['polynomial']} polynomial, {counts['linear']} linear")
+    return counts
+
+
+def _print_bounded(bounded, corpus_size):
+    if bounded.get("safe"):
+        measured = bounded.get("measured")
+        timing = f"  {_exponent(measured)}, {_duration(measured['projected'])} at 1 MB" if measured else ""
+        print(f"   ↳ bounded: {bounded['pattern']}{timing}, same counts on all {corpus_size} outputs")
+    else:
+        # Say why the rewrite was rejected so nobody applies it anyway
+        reasons = []
+        if bounded["pattern"] is None:
+            reasons.append("capping single-character repeats isn't enough")
+        else:
+            differs = len(bounded.get("differs_on") or ())
+            if differs:
+                reasons.append(f"{bounded['pattern']} counts differ on {differs}/{corpus_size} outputs")
+            elif "differs_on" not in bounded:
+                reasons.append(f"{bounded['pattern']} not checked against the outputs")
+            measured = bounded.get("measured")
+            if measured is None:
+                reasons.append(f"{bounded['pattern']} not benchmarked")
+            elif not (measured["exponent"] is not None and measured["exponent"] < SUPER_LINEAR_EXPONENT):
+                reasons.append(f"{bounded['pattern']} still {_exponent(measured)}, "
+                               f"{_duration(measured['projected'])} at 1 MB")
+        print(f"   ↳ no safe bounded rewrite ({'; '.join(reasons)})")
+    if bounded["streaming"] == "sequence":
+        print("     exact in O(n) as a StreamingFeatures sequence plan (harness.streaming)")
+    elif not bounded.get("safe"):
+        print("     restructure the pattern: give each gap a class that can't run past its end "
+              "(e.g. [^<]* instead of .*?<), or split it into separate counts")
+
+
+def _exponent(measured):
+    if measured.get("timed_out"):
+        return "timed out"
+    if measured["exponent"] is None:
+        return f"2^n@{measured['chars']}"
+    return f"n^{measured['exponent']:.2f}"
+
+
+def _duration(seconds):
+    if math.isinf(seconds):
+        return "never"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 3600:
+        return f"{seconds:.1f}s"
+    return f"{seconds / 3600:.0f}h"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag catastrophic-backtracking risks in scorer and validation regexes")
+    parser.add_argument("--pattern", action="append", help="Audit this regex instead (repeatable)")
+    parser.add_argument("--flags", default="", help="With --pattern: any of i, s (IGNORECASE, DOTALL)")
+    parser.add_argument("--rules", default=str(VALIDATION_RULES), help="Validation rules JSON")
+    parser.add_argument("--no-bench", action="store_true", help="Static analysis only")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="Benchmark: stop growing an input once one findall takes this many seconds")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Benchmark: largest input")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Benchmark: kill a pattern's benchmark after this many seconds")
+    parser.add_argument("--gap-limit", type=int, default=DEFAULT_GAP_LIMIT, help="Bounded rewrite: .* -> .{0,N}")
+    parser.add_argument("--json", metavar="PATH", help="Also save the audit as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any pattern is super-linear")
+    args = parser.parse_args()
+
+    if args.pattern:
+        flags = (re.IGNORECASE if "i" in args.flags else 0) | (re.DOTALL if "s" in args.flags else 0)
+        patterns = [AuditedPattern(p, flags, "--pattern") for p in args.pattern]
+    else:
+        patterns = collect_patterns(rules_path=args.rules)
+    corpus = [(path, path.read_text(encoding="utf-8", errors="replace")) for path in corpus_files()]
+
+    print(f"🔍 Auditing {len(patterns)} patterns"
+          f"{'' if args.no_bench else f' (benchmark up to {args.max_chars // 1024}K chars, {args.budget}s per run)'}\n")
+    started = time.perf_counter()
+    audit(patterns, bench=not args.no_bench, budget=args.budget, max_chars=args.max_chars,
+          gap_limit=args.gap_limit, corpus=corpus, timeout=args.timeout)
+    counts = print_report(patterns, len(corpus))
+    print(f"⏱️  {time.perf_counter() - started:.1f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{"pattern": p.pattern, "flags": p.flags, "sources": p.sources, "static": p.static,
+                        "measured": p.measured, "bounded": p.bounded} for p in patterns], f, indent=2)
+        print(f"   Saved: {args.json}")
+
+    if args.strict and (counts["exponential"] or counts["polynomial"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
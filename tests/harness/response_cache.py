@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of GPTfy executions
+
+An execution is identified by what determines the LLM input:
+(sha256 of the prompt command, record id, DCM id, AI connection id), plus
+an optional sample index for callers that deliberately draw several
+samples of the same input.
+Entries are one JSON file per key under tests/.harness_state/response_cache/.
+
+Modes:
+- auto    read-through: serve hits, execute and store misses (default)
+- record  always execute and overwrite the entry (fresh samples)
+- replay  cache only; a miss raises CacheMiss instead of calling the LLM
+- off     no reads, no writes
+
+Expired entries (ttl) are ignored and removed. Once the cache is over
+max_bytes, the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".harness_state" / "response_cache"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+CACHE_MODES = ("auto", "record", "replay", "off")
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when an execution isn't cached"""
+
+
+def prompt_command_hash(prompt_command):
+    return hashlib.sha256((prompt_command or '').encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """File-backed cache of successful executePrompt results"""
+
+    def __init__(self, path=DEFAULT_CACHE_DIR, mode="auto", ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {', '.join(CACHE_MODES)})")
+        self.path = Path(path)
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt_command, record_id, dcm_id=None, connection_id=None, sample=0):
+        parts = [prompt_command_hash(prompt_command), record_id or '', dcm_id or '',
+                 connection_id or '', str(sample)]
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+    @property
+    def readable(self):
+        return self.mode in ("auto", "replay")
+
+    @property
+    def writable(self):
+        return self.mode in ("auto", "record")
+
+    def _file(self, key):
+        return self.path / f"{key}.json"
+
+    def get(self, key):
+        """Cached entry or None; raises CacheMiss on a replay-mode miss"""
+        if not self.readable:
+            return None
+        entry_file = self._file(key)
+        entry = None
+        try:
+            with open(entry_file, 'r') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+        if entry and time.time() - entry.get("cached_at", 0) > self.ttl:
+            entry_file.unlink(missing_ok=True)
+            entry = None
+
+        with self._lock:
+            self.stats["hits" if entry else "misses"] += 1
+        if entry is None:
+            if self.mode == "replay":
+                raise CacheMiss(f"No cached response for {key[:12]}")
+            return None
+
+        # mtime doubles as the LRU clock for eviction
+        os.utime(entry_file)
+        return entry
+
+    def put(self, key, entry):
+        """Store a successful execution (html, response_id, status, plus any metadata)"""
+        if not self.writable:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {**entry, "key": key, "cached_at": time.time()}
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp, self._file(key))
+        with self._lock:
+            self.stats["writes"] += 1
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry_file in self.path.glob("*.json"):
+                try:
+                    stat = entry_file.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    entry_file.unlink(missing_ok=True)
+                    self.stats["evictions"] += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry_file))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_file in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                entry_file.unlink(missing_ok=True)
+                total -= size
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        for entry_file in self.path.glob("*.json"):
+            entry_file.unlink(missing_ok=True)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+responseId-keyed retrieval of ccai__AI_Response__c records
+
+executePrompt returns the responseId of the record it created, so runners
+look responses up by Id instead of "latest for this prompt by CreatedDate"
+(which picks up the wrong record once variants run side by side).
+
+Polling only selects STATUS_FIELDS. The large ccai__AI_Processed_Data_No_PII__c
+body is downloaded once per completed response, batched into one
+`WHERE Id IN (...)` query for every response that finished in the same tick.
+"""
+
+import json
+
+RESPONSE_OBJECT = "ccai__AI_Response__c"
+
+STATUS_FIELDS = ["Id", "ccai__Status__c"]
+BODY_FIELDS = ["Id", "Name", "ccai__Status__c", "ccai__AI_Processed_Data_No_PII__c"]
+
+# SOQL IN lists are chunked to keep the query URL well under the 16K limit
+MAX_IDS_PER_QUERY = 200
+
+
+def query_by_ids(client, fields, ids, sobject=RESPONSE_OBJECT):
+    """
+    Fetch records by Id with one SOQL query per MAX_IDS_PER_QUERY ids
+    Returns {Id: record}; ids that don't exist are simply absent.
+    """
+    ids = list(dict.fromkeys(ids))
+    records = {}
+    for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+        id_list = ", ".join(f"'{record_id}'" for record_id in ids[i:i + MAX_IDS_PER_QUERY])
+        soql = f"SELECT {', '.join(fields)} FROM {sobject} WHERE Id IN ({id_list})"
+        for record in client.query(soql):
+            records[record['Id']] = record
+    return records
+
+
+def fetch_statuses(client, response_ids):
+    """Status-only lookup used while polling"""
+    return query_by_ids(client, STATUS_FIELDS, response_ids)
+
+
+def fetch_bodies(client, response_ids):
+    """Full records (including the processed data) for completed responses"""
+    return query_by_ids(client, BODY_FIELDS, response_ids)
+
+
+def extract_html(record):
+    """Pull the generated HTML out of an ccai__AI_Response__c record"""
+    processed_data_str = record.get('ccai__AI_Processed_Data_No_PII__c')
+    if not processed_data_str:
+        return None
+    processed_data = json.loads(processed_data_str)
+    return processed_data['data']['value']['choices'][0]['message']['content']
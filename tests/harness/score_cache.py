@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Persistent score cache for the output scorers
+
+A score is identified by (sha256 of the output HTML, scorer id, scorer
+version, weight config). The scorer version is a hash of the scorer's own
+source plus the harness modules it scores with, so editing a term list, a
+regex or a threshold invalidates every cached score on the next run without
+anyone remembering to bump a number.
+
+One JSON file per (scorer, version, weights) under
+tests/.harness_state/score_cache/ holds:
+- scores  {html sha256: result}
+- files   {path: [mtime_ns, size, sha256]} so unchanged outputs are not even
+  re-read or re-hashed - a rerun after one new output costs one stat() per
+  file plus scoring the new one.
+
+Files of the same scorer with an older version are deleted on save.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".harness_state" / "score_cache"
+
+
+def content_hash(data):
+    """sha256 of an output as stored on disk (bytes)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def source_version(*paths):
+    """Short hash of source files; changes whenever any of them is edited"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ScoreCache:
+    """
+    Cached results of one scorer version and weight config
+
+    Usage:
+        cache = ScoreCache("phase0c", source_version(__file__, ...), COMPOSITE_WEIGHTS)
+        result = cache.get(path)
+        if result is None:
+            result = score(path)
+            cache.put(path, result)
+        cache.save()
+    """
+
+    def __init__(self, scorer_id, version, weights=None, path=DEFAULT_CACHE_DIR):
+        self.scorer_id = scorer_id
+        self.version = version
+        self.weights = weights or {}
+        self.path = Path(path)
+        self.stats = {"hits": 0, "misses": 0}
+        self.scores = {}
+        self.files = {}
+        self._dirty = False
+        self._load()
+
+    @property
+    def key(self):
+        weights = json.dumps(self.weights, sort_keys=True)
+        return hashlib.sha256(f"{self.scorer_id}|{self.version}|{weights}".encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def file(self):
+        return self.path / f"{self.scorer_id}_{self.version}_{self.key}.json"
+
+    def _load(self):
+        try:
+            with open(self.file, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self.scores = data.get("scores", {})
+        self.files = data.get("files", {})
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _hash(self, path):
+        with open(path, 'rb') as f:
+            return content_hash(f.read())
+
+    def get(self, path):
+        """Cached result for an output file, or None (unchanged files aren't re-read)"""
+        stamp = self._stamp(path)
+        entry = self.files.get(str(path))
+        if entry and entry[:2] == stamp:
+            sha = entry[2]
+        else:
+            # New or touched file: the same content may still have been scored
+            sha = self._hash(path)
+            if sha in self.scores:
+                self.files[str(path)] = stamp + [sha]
+                self._dirty = True
+        result = self.scores.get(sha)
+        self.stats["hits" if result is not None else "misses"] += 1
+        return result
+
+    def put(self, path, result):
+        sha = self._hash(path)
+        self.scores[sha] = result
+        self.files[str(path)] = self._stamp(path) + [sha]
+        self._dirty = True
+
+    def save(self):
+        """Write the cache (if anything changed) and drop older versions of this scorer"""
+        if not self._dirty:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {"scorer": self.scorer_id, "version": self.version, "weights": self.weights,
+                   "scores": self.scores, "files": self.files}
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp, self.file)
+        self._dirty = False
+        for stale in self.path.glob(f"{self.scorer_id}_*.json"):
+            if not stale.name.startswith(f"{self.scorer_id}_{self.version}_"):
+                stale.unlink(missing_ok=True)
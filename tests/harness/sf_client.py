@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Pooled Salesforce REST client for the experiment runners
+
+Credentials are fetched from the sf CLI once; every call after that goes
+over a keep-alive HTTP connection with an in-memory JSON body instead of a
+`curl`/`sf` subprocess and a /tmp payload file.
+
+Typed helpers cover the calls the runners make:
+- ccai__AI_Prompt__c PATCH (variant prompt command)
+- /services/apexrest/ccai/v1/executePrompt
+- /services/apexrest/test-harness/* (TestHarnessController)
+- SOQL queries
+- sObject Collections inserts/updates (up to 200 records per request)
+- Composite requests (up to 25 subrequests in one round trip)
+"""
+
+import http.client
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from harness.metrics import StepMetrics, request_step
+
+API_VERSION = "v65.0"
+DEFAULT_TIMEOUT = 120
+
+# Records per sObject Collections request (the API maximum)
+COLLECTION_BATCH_SIZE = 200
+# Composite API limits: subrequests per call, and query/collection subrequests among them
+COMPOSITE_MAX_SUBREQUESTS = 25
+COMPOSITE_MAX_QUERIES = 5
+
+# Points every CLI-backed client at a local stand-in org (harness/standin.py)
+STANDIN_URL_ENV = "SF_STANDIN_URL"
+
+# Errors that mean an idle keep-alive connection was dropped by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class SalesforceError(Exception):
+    """Raised for transport failures and non-2xx REST responses"""
+
+    def __init__(self, message, status=None, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+def parse_apex_rest_response(body):
+    """Parse Apex REST response (handles double-encoded JSON from JSON.serialize)"""
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode('utf-8')
+    try:
+        first_parse = json.loads(body) if isinstance(body, str) else body
+        if isinstance(first_parse, str):
+            return json.loads(first_parse)
+        return first_parse
+    except json.JSONDecodeError:
+        return None
+
+
+def get_cli_credentials(org_alias):
+    """Get (access_token, instance_url) from `sf org display`"""
+    result = subprocess.run(
+        ["sf", "org", "display", "--target-org", org_alias, "--json"],
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    if result.returncode != 0:
+        raise SalesforceError(f"Failed to get credentials for {org_alias}: {result.stderr.strip()}")
+    data = json.loads(result.stdout)
+    return data['result']['accessToken'], data['result']['instanceUrl']
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections to a single host"""
+
+    def __init__(self, base_url, max_size=8, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)
+
+    def new_connection(self):
+        if self.scheme == "http":
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        """Return (connection, reused) - an idle connection if one is available"""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self.new_connection(), False
+
+    def release(self, conn):
+        """Return a healthy connection to the pool (closed if the pool is full)"""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SalesforceClient:
+    """In-process Salesforce REST client with connection pooling"""
+
+    def __init__(self, instance_url, access_token, api_version=API_VERSION,
+                 pool_size=8, timeout=DEFAULT_TIMEOUT, org_alias=None, metrics=None):
+        self.instance_url = instance_url.rstrip('/')
+        self.access_token = access_token
+        self.api_version = api_version
+        self.timeout = timeout
+        self.org_alias = org_alias
+        self._pool = ConnectionPool(self.instance_url, max_size=pool_size, timeout=timeout)
+        self._auth_lock = threading.Lock()
+        # Every request is timed by kind; runners report these at the end
+        self.metrics = metrics if metrics is not None else StepMetrics()
+
+    @classmethod
+    def from_cli(cls, org_alias, **kwargs):
+        """Create a client from the sf CLI's stored auth for org_alias"""
+        standin_url = os.environ.get(STANDIN_URL_ENV)
+        if standin_url:
+            return cls(standin_url, "standin", **kwargs)
+        started = time.perf_counter()
+        access_token, instance_url = get_cli_credentials(org_alias)
+        client = cls(instance_url, access_token, org_alias=org_alias, **kwargs)
+        client.metrics.observe("token", time.perf_counter() - started)
+        return client
+
+    def refresh_token(self, stale_token=None):
+        """Re-read the access token from the sf CLI (only for CLI-backed clients)"""
+        if not self.org_alias:
+            return False
+        with self._auth_lock:
+            # Another thread already refreshed while we waited
+            if stale_token is not None and self.access_token != stale_token:
+                return True
+            with self.metrics.span("token"):
+                self.access_token, _ = get_cli_credentials(self.org_alias)
+        return True
+
+    def close(self):
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _send(self, method, path, payload, timeout):
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept": "application/json",
+        }
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers["Content-Type"] = "application/json"
+
+        conn, reused = self._pool.acquire()
+        try:
+            return self._roundtrip(conn, method, path, body, headers, timeout)
+        except STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            # Server dropped the idle keep-alive connection - retry on a fresh one
+            conn = self._pool.new_connection()
+            return self._roundtrip(conn, method, path, body, headers, timeout)
+
+    def _roundtrip(self, conn, method, path, body, headers, timeout):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._pool.release(conn)
+        return response.status, data
+
+    def request(self, method, path, payload=None, timeout=None):
+        """
+        Send a request and return (status, raw_body_bytes)
+        Raises SalesforceError on transport failure or HTTP >= 400.
+        Expired sessions are re-authenticated once via the sf CLI.
+        """
+        timeout = timeout or self.timeout
+        token = self.access_token
+        try:
+            with self.metrics.span(request_step(method, path)):
+                status, data = self._send(method, path, payload, timeout)
+            if status == 401 and self.refresh_token(stale_token=token):
+                with self.metrics.span(request_step(method, path)):
+                    status, data = self._send(method, path, payload, timeout)
+        except (OSError, http.client.HTTPException) as e:
+            raise SalesforceError(f"{method} {path} failed: {e}") from e
+
+        if status >= 400:
+            text = data.decode('utf-8', errors='replace')
+            raise SalesforceError(f"{method} {path} returned HTTP {status}: {text[:300]}",
+                                  status=status, body=text)
+        return status, data
+
+    def request_json(self, method, path, payload=None, timeout=None):
+        """Send a request and decode the JSON body (None for empty bodies)"""
+        _, data = self.request(method, path, payload, timeout)
+        if not data:
+            return None
+        return json.loads(data)
+
+    # ------------------------------------------------------------------
+    # sObject / SOQL
+    # ------------------------------------------------------------------
+
+    @property
+    def data_path(self):
+        return f"/services/data/{self.api_version}"
+
+    def query(self, soql, timeout=None):
+        """Run a SOQL query and return all records (follows nextRecordsUrl)"""
+        result = self.request_json("GET", f"{self.data_path}/query?q={quote(soql)}", timeout=timeout)
+        records = result.get('records', [])
+        while not result.get('done', True) and result.get('nextRecordsUrl'):
+            result = self.request_json("GET", result['nextRecordsUrl'], timeout=timeout)
+            records.extend(result.get('records', []))
+        return records
+
+    def get_record(self, sobject, record_id, fields=None):
+        path = f"{self.data_path}/sobjects/{sobject}/{record_id}"
+        if fields:
+            path += "?fields=" + ",".join(fields)
+        return self.request_json("GET", path)
+
+    def create_record(self, sobject, fields):
+        """Insert a record and return its Id"""
+        result = self.request_json("POST", f"{self.data_path}/sobjects/{sobject}", fields)
+        if not result or not result.get('success'):
+            raise SalesforceError(f"Create {sobject} failed: {result}", body=result)
+        return result['id']
+
+    def update_record(self, sobject, record_id, fields):
+        """PATCH a record (Salesforce returns 204 with an empty body on success)"""
+        self.request("PATCH", f"{self.data_path}/sobjects/{sobject}/{record_id}", fields)
+
+    def delete_record(self, sobject, record_id):
+        self.request("DELETE", f"{self.data_path}/sobjects/{sobject}/{record_id}")
+
+    def _collection(self, method, sobject, records, all_or_none):
+        """One sObject Collections request per COLLECTION_BATCH_SIZE records; results in input order"""
+        results = []
+        for start in range(0, len(records), COLLECTION_BATCH_SIZE):
+            batch = [{"attributes": {"type": sobject}, **record}
+                     for record in records[start:start + COLLECTION_BATCH_SIZE]]
+            results.extend(self.request_json(method, f"{self.data_path}/composite/sobjects",
+                                             {"allOrNone": all_or_none, "records": batch}))
+        return results
+
+    def create_records(self, sobject, records, all_or_none=False):
+        """
+        Insert records through sObject Collections
+        Returns [{id, success, errors}] per record; partial failures don't raise unless all_or_none.
+        """
+        return self._collection("POST", sobject, records, all_or_none)
+
+    def update_records(self, sobject, records, all_or_none=False):
+        """Update records (each with an Id) through sObject Collections; returns [{id, success, errors}]"""
+        return self._collection("PATCH", sobject, records, all_or_none)
+
+    def composite(self, subrequests, all_or_none=False):
+        """
+        Run up to 25 subrequests ({method, url, referenceId, body?}) in one round trip
+        url may be relative to data_path; later subrequests can use @{referenceId.field}.
+        Returns {referenceId: (httpStatusCode, body)}.
+        """
+        if len(subrequests) > COMPOSITE_MAX_SUBREQUESTS:
+            raise ValueError(f"Composite takes at most {COMPOSITE_MAX_SUBREQUESTS} subrequests, got {len(subrequests)}")
+        requests = [{**sub, "url": sub["url"] if sub["url"].startswith("/services/")
+                     else self.data_path + sub["url"]} for sub in subrequests]
+        result = self.request_json("POST", f"{self.data_path}/composite",
+                                   {"allOrNone": all_or_none, "compositeRequest": requests})
+        return {item["referenceId"]: (item["httpStatusCode"], item.get("body"))
+                for item in result.get("compositeResponse", [])}
+
+    def update_prompt_command(self, prompt_id, prompt_text):
+        """Overwrite ccai__Prompt_Command__c on an ccai__AI_Prompt__c record"""
+        self.update_record("ccai__AI_Prompt__c", prompt_id, {"ccai__Prompt_Command__c": prompt_text})
+
+    # ------------------------------------------------------------------
+    # Apex REST
+    # ------------------------------------------------------------------
+
+    def execute_prompt(self, prompt_request_id, record_id, custom_prompt_command="", timeout=180):
+        """
+        Call GPTfy executePrompt
+        Returns the decoded response (status, responseId, responseBody, ...)
+        """
+        payload = {
+            "promptRequestId": prompt_request_id,
+            "recordId": record_id,
+            "customPromptCommand": custom_prompt_command
+        }
+        _, data = self.request("POST", "/services/apexrest/ccai/v1/executePrompt", payload, timeout=timeout)
+        return parse_apex_rest_response(data) or {}
+
+    def harness_get(self, resource, *params, timeout=60):
+        """GET /test-harness/{resource}/{params...} on TestHarnessController"""
+        path = "/".join(["/services/apexrest/test-harness", resource, *[quote(str(p)) for p in params]])
+        _, data = self.request("GET", path, timeout=timeout)
+        return parse_apex_rest_response(data)
+
+    def harness_post(self, resource, payload, timeout=60):
+        """POST /test-harness/{resource} on TestHarnessController"""
+        _, data = self.request("POST", f"/services/apexrest/test-harness/{resource}", payload, timeout=timeout)
+        return parse_apex_rest_response(data)
+
+    def start_pipeline(self, root_object, sample_record_id, template_name=None,
+                       business_context=None, output_format=None, **extra):
+        """Start a pipeline run; returns the decoded start-pipeline response"""
+        payload = {
+            "rootObject": root_object,
+            "sampleRecordId": sample_record_id,
+            "templateName": template_name,
+            "businessContext": business_context,
+            "outputFormat": output_format,
+            **extra
+        }
+        payload = {k: v for k, v in payload.items() if v is not None}
+        return self.harness_post("start-pipeline", payload)
+
+    def run_status(self, run_id):
+        """Get pipeline run status from /test-harness/run-status/{runId}"""
+        return self.harness_get("run-status", run_id, timeout=30)
@@ -0,0 +1,757 @@
+#!/usr/bin/env python3
+"""
+Local Salesforce/GPTfy stand-in server
+
+Implements the subset of the org API the runners use, so the harness can be
+run and benchmarked without `agentictso`:
+- sObject POST / GET / PATCH / DELETE (ccai__AI_Prompt__c, PF_Run__c, ...)
+- sObject Collections POST / PATCH (/composite/sobjects)
+- Composite requests (/composite) with @{referenceId.field} references
+- SOQL query (SELECT ... FROM ... WHERE a = 'x' AND b IN (...) AND
+  CreatedDate >= ... ORDER BY ... LIMIT n; WHERE fields may follow a lookup,
+  e.g. RecordType.DeveloperName)
+- /services/apexrest/ccai/v1/executePrompt
+- /services/apexrest/test-harness/start-pipeline and run-status/{runId}
+
+executePrompt answers with a recorded tests/*/outputs/output_N_name fixture.
+If the prompt command matches tests/*/variants/variant_N_name.txt, that
+variant's own output is used. LLM latency, failure rate, concurrent
+execution slots and API request rate can all be configured.
+
+Usage:
+    python3 tests/harness/standin.py --port 8787 --latency 20 --jitter 5 --error-rate 0.05
+    SF_STANDIN_URL=http://127.0.0.1:8787 python3 tests/phase0c/run_phase0c_test.py
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+TESTS_DIR = Path(__file__).resolve().parent.parent
+
+# Key prefixes for generated record Ids (real prefixes where known)
+ID_PREFIXES = {
+    "ccai__AI_Prompt__c": "a0D",
+    "ccai__AI_Response__c": "a0I",
+}
+DEFAULT_ID_PREFIX = "a0Z"
+
+# The shared Deal Coach prompt the phase0* runners point at (PROMPT_ID / PROMPT_REQUEST_ID)
+SEED_PROMPTS = [
+    {
+        "Id": "a0DQH00000KYLsv2AH",
+        "Name": "Deal Coach",
+        "ccai__Status__c": "Active",
+        "ccai__Prompt_Request_Id__c": "e6e00b0d8e81c6b1976ac4e458a131ed4e951",
+        "ccai__Prompt_Command__c": "",
+    },
+]
+
+# Lookup records the builder maintenance scripts resolve
+SEED_RECORDS = [
+    ("RecordType", {"Id": "012QH0000045bz7YAA", "Name": "Builder", "DeveloperName": "Builder",
+                    "SobjectType": "ccai__AI_Prompt__c"}),
+    ("ccai__AI_Data_Extraction_Mapping__c", {"Id": "a05QH000008PLavYAG", "Name": "Opportunity DCM"}),
+    ("Topic", {"Id": "0TOSB0000000001AAA", "Name": "Next Best Action"}),
+    ("Topic", {"Id": "0TOSB0000000002AAA", "Name": "Opportunity"}),
+    ("Topic", {"Id": "0TOSB0000000003AAA", "Name": "P0"}),
+]
+
+PIPELINE_STAGES = 12
+PROMPT_STAGE = 9
+
+
+class StandinConfig:
+    """Injected behaviour: LLM latency, failures and throughput limits"""
+
+    def __init__(self, latency=2.0, jitter=0.5, error_rate=0.0, http_error_rate=0.0,
+                 max_concurrent=4, rate_limit=None, activation_delay=0.5,
+                 stage_delay=0.5, async_execute=False, seed=None):
+        self.latency = latency                    # mean executePrompt LLM time (s)
+        self.jitter = jitter                      # std dev of the LLM time (s)
+        self.error_rate = error_rate              # fraction of executions that end Failed
+        self.http_error_rate = http_error_rate    # fraction of API calls answered with HTTP 500
+        self.max_concurrent = max_concurrent      # LLM executions in progress at once
+        self.rate_limit = rate_limit              # API requests per second (None = unlimited)
+        self.activation_delay = activation_delay  # Active -> ccai__Prompt_Request_Id__c
+        self.stage_delay = stage_delay            # seconds per pipeline stage
+        self.async_execute = async_execute        # return from executePrompt before the LLM finishes
+        self.seed = seed
+
+
+def sf_datetime(dt=None):
+    """Salesforce REST datetime format"""
+    dt = dt or datetime.now(timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}+0000"
+
+
+def parse_datetime(value):
+    """Parse a SOQL literal or stored datetime; None if it isn't one"""
+    if not isinstance(value, str) or not re.match(r'^\d{4}-\d{2}-\d{2}T', value):
+        return None
+    text = value.replace('Z', '+0000')
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+
+def prompt_hash(text):
+    return hashlib.sha256((text or '').strip().encode('utf-8')).hexdigest()
+
+
+class FixtureLibrary:
+    """Recorded outputs, indexed by the hash of the variant prompt that produced them"""
+
+    def __init__(self, tests_dir=TESTS_DIR):
+        self.outputs = []
+        self.by_prompt = {}
+        for html_file in sorted(Path(tests_dir).glob("*/outputs/output_*.html")):
+            match = re.match(r'output_(\d+)_(.+)\.html$', html_file.name)
+            if not match:
+                continue
+            fixture = {
+                "name": html_file.stem,
+                "html": html_file.read_text(encoding='utf-8'),
+                "processed_data": None,
+            }
+            json_file = html_file.with_suffix('.json')
+            if json_file.exists():
+                with open(json_file, 'r') as f:
+                    fixture["processed_data"] = json.load(f).get('ccai__AI_Processed_Data_No_PII__c')
+            self.outputs.append(fixture)
+
+            variant_file = html_file.parent.parent / "variants" / f"variant_{match.group(1)}_{match.group(2)}.txt"
+            if variant_file.exists():
+                self.by_prompt[prompt_hash(variant_file.read_text(encoding='utf-8'))] = fixture
+
+    def for_prompt(self, prompt_command):
+        """Fixture for a prompt: its own recorded output, else a stable pick by hash"""
+        if not self.outputs:
+            return {"name": "empty", "html": "<div>stand-in</div>", "processed_data": None}
+        digest = prompt_hash(prompt_command)
+        return self.by_prompt.get(digest) or self.outputs[int(digest, 16) % len(self.outputs)]
+
+    def any_prompt_text(self):
+        variants = sorted(TESTS_DIR.glob("*/variants/variant_*.txt"))
+        return variants[0].read_text(encoding='utf-8') if variants else "Stand-in prompt"
+
+
+def processed_data_for(fixture):
+    """ccai__AI_Processed_Data_No_PII__c JSON carrying the fixture HTML"""
+    if fixture["processed_data"]:
+        return fixture["processed_data"]
+    return json.dumps({
+        "id": str(uuid.uuid4()),
+        "data": {"hasValue": True, "value": {"choices": [{"message": {"content": fixture["html"]}}]}}
+    }, indent=2)
+
+
+# ----------------------------------------------------------------------
+# In-memory org
+# ----------------------------------------------------------------------
+
+class OrgStore:
+    """Thread-safe record store with just enough SOQL for the runners"""
+
+    def __init__(self, api_version="v65.0"):
+        self.api_version = api_version
+        self.records = {}
+        self._counter = itertools.count(1)
+        self.lock = threading.RLock()
+
+    def new_id(self, sobject):
+        prefix = ID_PREFIXES.get(sobject, DEFAULT_ID_PREFIX)
+        return f"{prefix}SB{next(self._counter):010d}AAA"
+
+    def insert(self, sobject, fields, record_id=None):
+        with self.lock:
+            record_id = record_id or self.new_id(sobject)
+            now = sf_datetime()
+            record = {
+                "attributes": {
+                    "type": sobject,
+                    "url": f"/services/data/{self.api_version}/sobjects/{sobject}/{record_id}"
+                },
+                **{k: v for k, v in fields.items() if k != "Id"},
+                "Id": record_id,
+                "CreatedDate": now,
+                "LastModifiedDate": now,
+            }
+            self.records[record_id] = record
+            return record_id
+
+    def get(self, record_id):
+        with self.lock:
+            record = self.records.get(record_id)
+            return dict(record) if record else None
+
+    def update(self, record_id, fields):
+        with self.lock:
+            record = self.records.get(record_id)
+            if record is None:
+                return False
+            record.update(fields)
+            record["LastModifiedDate"] = sf_datetime()
+            return True
+
+    def delete(self, record_id):
+        with self.lock:
+            return self.records.pop(record_id, None) is not None
+
+    def query(self, soql):
+        """Evaluate a single-object SOQL query; raises ValueError if unsupported"""
+        match = re.match(
+            r'^\s*SELECT\s+(.+?)\s+FROM\s+(\w+)'
+            r'(?:\s+WHERE\s+(.+?))?'
+            r'(?:\s+ORDER\s+BY\s+(\w+)(?:\s+(ASC|DESC))?)?'
+            r'(?:\s+LIMIT\s+(\d+))?\s*$',
+            soql, re.IGNORECASE | re.DOTALL
+        )
+        if not match:
+            raise ValueError(f"Unsupported SOQL: {soql[:200]}")
+        fields_text, sobject, where, order_field, order_dir, limit = match.groups()
+        fields = [f.strip() for f in fields_text.split(',')]
+        conditions = parse_where(where) if where else []
+
+        with self.lock:
+            rows = [r for r in self.records.values()
+                    if r["attributes"]["type"].lower() == sobject.lower()
+                    and all(matches(r, c, self.records.get) for c in conditions)]
+            if order_field:
+                rows.sort(key=lambda r: sort_key(r.get(order_field)),
+                          reverse=(order_dir or '').upper() == 'DESC')
+            if limit:
+                rows = rows[:int(limit)]
+            return [project(r, fields) for r in rows]
+
+
+CONDITION_RE = re.compile(
+    r"([\w.]+)\s*(=|!=|>=|<=|>|<|\bIN\b|\bNOT IN\b)\s*(\([^)]*\)|'(?:[^'\\]|\\.)*'|[\w:.+-]+)",
+    re.IGNORECASE
+)
+
+
+def parse_where(where):
+    """AND-joined comparisons only (no OR, no nesting)"""
+    conditions = []
+    for part in re.split(r"\s+AND\s+(?=(?:[^']*'[^']*')*[^']*$)", where.strip(), flags=re.IGNORECASE):
+        match = CONDITION_RE.fullmatch(part.strip())
+        if not match:
+            raise ValueError(f"Unsupported WHERE clause: {part}")
+        field, op, value = match.groups()
+        op = op.upper()
+        if op in ('IN', 'NOT IN'):
+            value = [literal(v) for v in re.findall(r"'(?:[^'\\]|\\.)*'|[^,\s()]+", value)]
+        else:
+            value = literal(value)
+        conditions.append((field, op, value))
+    return conditions
+
+
+def literal(token):
+    token = token.strip()
+    if token.startswith("'"):
+        return token[1:-1].replace("\\'", "'")
+    if token.lower() == 'null':
+        return None
+    if token.lower() in ('true', 'false'):
+        return token.lower() == 'true'
+    try:
+        return float(token) if '.' in token else int(token)
+    except ValueError:
+        return token
+
+
+def sort_key(value):
+    dt = parse_datetime(value)
+    if dt is not None:
+        return (1, dt.timestamp())
+    return (0, '' if value is None else str(value))
+
+
+def compare(left, right):
+    """Comparable pair, treating datetimes and numbers by value"""
+    left_dt, right_dt = parse_datetime(left), parse_datetime(right)
+    if left_dt is not None and right_dt is not None:
+        return left_dt, right_dt
+    if isinstance(right, (int, float)) and isinstance(left, (int, float)):
+        return left, right
+    return ('' if left is None else str(left)), ('' if right is None else str(right))
+
+
+def field_value(record, field, lookup=None):
+    """Field of a record, following Lookup.Field through the lookup's Id field"""
+    *relationships, name = field.split('.')
+    for relationship in relationships:
+        target_field = relationship[:-3] + "__c" if relationship.endswith("__r") else relationship + "Id"
+        record = (lookup(record.get(target_field)) if lookup else None) or {}
+    return record.get(name)
+
+
+def matches(record, condition, lookup=None):
+    field, op, value = condition
+    actual = field_value(record, field, lookup)
+    if op == 'IN':
+        return actual in value
+    if op == 'NOT IN':
+        return actual not in value
+    if value is None:
+        return (actual is None) == (op == '=')
+    left, right = compare(actual, value)
+    return {
+        '=': left == right, '!=': left != right,
+        '>': left > right, '>=': left >= right,
+        '<': left < right, '<=': left <= right,
+    }[op]
+
+
+def project(record, fields):
+    row = {"attributes": record["attributes"]}
+    for field in fields:
+        row[field] = record.get(field)
+    return row
+
+
+# ----------------------------------------------------------------------
+# GPTfy + pipeline simulation
+# ----------------------------------------------------------------------
+
+class Simulator:
+    """executePrompt, prompt activation and pipeline runs on top of OrgStore"""
+
+    def __init__(self, store, fixtures, config):
+        self.store = store
+        self.fixtures = fixtures
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._random_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(config.max_concurrent)
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self.stats = {"requests": 0, "executions": 0, "throttled": 0, "http_errors": 0}
+
+    def chance(self, rate):
+        with self._random_lock:
+            return rate > 0 and self.random.random() < rate
+
+    def llm_seconds(self):
+        with self._random_lock:
+            return max(self.random.gauss(self.config.latency, self.config.jitter), 0.0)
+
+    def admit(self):
+        """Per-request rate limit; False means answer 403 REQUEST_LIMIT_EXCEEDED"""
+        with self._rate_lock:
+            self.stats["requests"] += 1
+            if not self.config.rate_limit:
+                return True
+            now = time.monotonic()
+            if now < self._next_request_at:
+                self.stats["throttled"] += 1
+                return False
+            self._next_request_at = max(now, self._next_request_at) + 1.0 / self.config.rate_limit
+            return True
+
+    # -- ccai__AI_Prompt__c ------------------------------------------------
+
+    def prompt_changed(self, prompt_id, fields):
+        """GPTfy assigns a Prompt Request Id shortly after activation"""
+        if fields.get("ccai__Status__c") != "Active":
+            return
+        prompt = self.store.get(prompt_id)
+        if prompt and prompt.get("ccai__Prompt_Request_Id__c"):
+            return
+
+        def activate():
+            self.store.update(prompt_id, {
+                "ccai__Prompt_Request_Id__c": uuid.uuid4().hex[:37],
+                "ccai__Message__c": "Prompt activated"
+            })
+        threading.Timer(self.config.activation_delay, activate).start()
+
+    # -- executePrompt -----------------------------------------------------
+
+    def execute_prompt(self, payload):
+        request_id = payload.get("promptRequestId")
+        prompts = self.store.query(
+            "SELECT Id, ccai__Prompt_Command__c, ccai__Status__c FROM ccai__AI_Prompt__c "
+            f"WHERE ccai__Prompt_Request_Id__c = '{request_id}'"
+        )
+        if not prompts:
+            return {"status": "Error", "message": f"Prompt request not found: {request_id}"}
+        prompt = prompts[0]
+        prompt_command = payload.get("customPromptCommand") or prompt.get("ccai__Prompt_Command__c")
+
+        response_id = self.store.insert("ccai__AI_Response__c", {
+            "Name": f"A-{len(self.store.records):05d}",
+            "ccai__AI_Prompt__c": prompt["Id"],
+            "ccai__Record_Id__c": payload.get("recordId"),
+            "ccai__Status__c": "In Progress",
+        })
+        self.stats["executions"] += 1
+
+        if self.config.async_execute:
+            threading.Thread(target=self._complete, args=(response_id, prompt_command), daemon=True).start()
+            return {"status": "In Progress", "responseId": response_id}
+
+        record = self._complete(response_id, prompt_command)
+        result = {"status": record["ccai__Status__c"], "responseId": response_id}
+        if record["ccai__Status__c"] == "Processed":
+            result["responseBody"] = record["_html"]
+        else:
+            result["message"] = record.get("ccai__Message__c")
+        return result
+
+    def _complete(self, response_id, prompt_command):
+        """Hold an execution slot for the simulated LLM time, then finish the response"""
+        with self._slots:
+            time.sleep(self.llm_seconds())
+        fixture = self.fixtures.for_prompt(prompt_command)
+        if self.chance(self.config.error_rate):
+            fields = {"ccai__Status__c": "Failed", "ccai__Message__c": "Simulated LLM failure"}
+        else:
+            fields = {
+                "ccai__Status__c": "Processed",
+                "ccai__AI_Processed_Data_No_PII__c": processed_data_for(fixture),
+            }
+        self.store.update(response_id, fields)
+        return {**fields, "_html": fixture["html"]}
+
+    # -- Test harness pipeline ---------------------------------------------
+
+    def start_pipeline(self, params):
+        if not params.get("rootObject"):
+            return {"error": "rootObject is required"}
+        if not params.get("sampleRecordId"):
+            return {"error": "sampleRecordId is required"}
+        run_id = self.store.insert("PF_Run__c", {
+            "Name": f"RUN-{len(self.store.records):05d}",
+            "Root_Object__c": params["rootObject"],
+            "Sample_Record_Id__c": params["sampleRecordId"],
+            "Sample_Record_Ids__c": params["sampleRecordId"],
+            "Business_Context__c": params.get("businessContext") or "Sales Executive Dashboard",
+            "Output_Format__c": params.get("outputFormat") or "HTML",
+            "Prompt_Name__c": params.get("templateName") or "V2.6 Test Run",
+            "Status__c": "Queued",
+            "Current_Stage__c": 1,
+            "Created_Prompt_Id__c": None,
+        })
+        threading.Thread(target=self._advance_pipeline, args=(run_id,), daemon=True).start()
+        return {
+            "success": True,
+            "runId": run_id,
+            "message": f"Pipeline started. Monitor via /test-harness/run-status/{run_id}"
+        }
+
+    def _advance_pipeline(self, run_id):
+        for stage in range(1, PIPELINE_STAGES + 1):
+            time.sleep(self.config.stage_delay)
+            run = self.store.get(run_id)
+            if run is None or run["Status__c"] in ("Aborted", "Failed"):
+                return
+            fields = {"Status__c": "In Progress", "Current_Stage__c": stage}
+            if stage == PROMPT_STAGE:
+                # Stage09 waits for the Prompt Request Id before it publishes the prompt
+                prompt_id = self.store.insert("ccai__AI_Prompt__c", {
+                    "Name": run["Prompt_Name__c"],
+                    "ccai__Prompt_Command__c": self.fixtures.any_prompt_text(),
+                    "ccai__Status__c": "Active",
+                    "ccai__Prompt_Request_Id__c": uuid.uuid4().hex[:37],
+                    "ccai__Message__c": "Prompt activated",
+                })
+                fields["Created_Prompt_Id__c"] = prompt_id
+            self.store.update(run_id, fields)
+        self.store.update(run_id, {"Status__c": "Completed"})
+
+    def run_status(self, run_id):
+        run = self.store.get(run_id)
+        if run is None or run["attributes"]["type"] != "PF_Run__c":
+            return {"error": f"Run not found: {run_id}"}
+        return {
+            "runId": run["Id"],
+            "name": run["Name"],
+            "status": run["Status__c"],
+            "currentStage": run["Current_Stage__c"],
+            "rootObject": run["Root_Object__c"],
+            "sampleRecordId": run["Sample_Record_Id__c"],
+            "createdPromptId": run["Created_Prompt_Id__c"],
+            "createdDate": run["CreatedDate"],
+            "lastModifiedDate": run["LastModifiedDate"],
+        }
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Without this, small request/response pairs stall on delayed ACKs
+    disable_nagle_algorithm = True
+    simulator = None
+    # Set while a composite subrequest runs: responses are collected instead of written
+    _captured = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload=None, apex=False):
+        if self._captured is not None:
+            self._captured.append((status, payload))
+            return
+        if payload is None:
+            body = b""
+        elif apex:
+            # Apex REST methods that return String are JSON-encoded twice
+            body = json.dumps(json.dumps(payload)).encode('utf-8')
+        else:
+            body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, error_code, message):
+        self._send(status, [{"errorCode": error_code, "message": message}])
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _dispatch(self, method):
+        sim = self.simulator
+        payload = self._body() if method in ("POST", "PATCH") else None
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._error(401, "INVALID_SESSION_ID", "Session expired or invalid")
+        if not sim.admit():
+            return self._error(403, "REQUEST_LIMIT_EXCEEDED", "Stand-in rate limit exceeded")
+        if sim.chance(sim.config.http_error_rate):
+            sim.stats["http_errors"] += 1
+            return self._error(500, "UNKNOWN_EXCEPTION", "Simulated server error")
+        self._route(method, self.path, payload)
+
+    def _route(self, method, path, payload):
+        url = urlsplit(path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/')]
+
+        if parts[:2] == ["services", "apexrest"]:
+            return self._apex(method, parts[2:], payload)
+        if parts[:2] == ["services", "data"] and len(parts) >= 4:
+            if parts[3] == "query" and method == "GET":
+                return self._query(parse_qs(url.query).get('q', [''])[0])
+            if parts[3:5] == ["composite", "sobjects"] and method in ("POST", "PATCH"):
+                return self._collection(method, payload)
+            if parts[3:] == ["composite"] and method == "POST":
+                return self._composite(payload)
+            if parts[3] == "sobjects" and len(parts) >= 5:
+                fields = parse_qs(url.query).get('fields', [''])[0]
+                return self._sobject(method, parts[4], parts[5] if len(parts) > 5 else None, payload, fields)
+        return self._error(404, "NOT_FOUND", f"Stand-in does not implement {method} {url.path}")
+
+    def _apex(self, method, parts, payload):
+        sim = self.simulator
+        if parts == ["ccai", "v1", "executePrompt"] and method == "POST":
+            return self._send(200, sim.execute_prompt(payload), apex=True)
+        if parts[:1] == ["test-harness"]:
+            if parts[1:2] == ["start-pipeline"] and method == "POST":
+                return self._send(200, sim.start_pipeline(payload), apex=True)
+            if parts[1:2] == ["run-status"] and len(parts) > 2 and method == "GET":
+                return self._send(200, sim.run_status(parts[2]), apex=True)
+        return self._error(404, "NOT_FOUND", f"Stand-in does not implement /{'/'.join(parts)}")
+
+    def _query(self, soql):
+        try:
+            records = self.simulator.store.query(soql)
+        except ValueError as e:
+            return self._error(400, "MALFORMED_QUERY", str(e))
+        self._send(200, {"totalSize": len(records), "done": True, "records": records})
+
+    def _collection(self, method, payload):
+        """sObject Collections insert/update; allOrNone is not rolled back, only reported"""
+        store = self.simulator.store
+        records = payload.get("records") or []
+        if len(records) > 200:
+            return self._error(400, "EXCEEDED_ID_LIMIT", "record limit reached. cannot submit more than 200 records")
+        results = []
+        for record in records:
+            fields = {k: v for k, v in record.items() if k != "attributes"}
+            sobject = record.get("attributes", {}).get("type")
+            if method == "POST":
+                results.append({"id": store.insert(sobject, fields), "success": True, "errors": []})
+            elif store.update(fields.get("Id"), {k: v for k, v in fields.items() if k != "Id"}):
+                results.append({"id": fields["Id"], "success": True, "errors": []})
+            else:
+                results.append({"id": fields.get("Id"), "success": False, "errors": [
+                    {"statusCode": "ENTITY_IS_DELETED", "message": "entity is deleted", "fields": []}]})
+        self._send(200, results)
+
+    def _composite(self, payload):
+        """Subrequests in order, each seeing earlier results through @{referenceId.path}"""
+        results = {}
+
+        def resolve(match):
+            value = results[match.group(1)]
+            for key in re.findall(r'\w+', match.group(2)):
+                value = value[int(key)] if isinstance(value, list) else value[key]
+            return str(value)
+
+        def substitute(value):
+            if isinstance(value, str):
+                return re.sub(r'@\{(\w+)\.([\w.\[\]]+)\}', resolve, value)
+            if isinstance(value, dict):
+                return {k: substitute(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [substitute(v) for v in value]
+            return value
+
+        responses = []
+        for sub in payload.get("compositeRequest", []):
+            self._captured = []
+            try:
+                self._route(sub["method"], substitute(sub["url"]), substitute(sub.get("body")))
+                status, body = self._captured[0]
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                status, body = 400, [{"errorCode": "INVALID_REFERENCE", "message": str(e)}]
+            finally:
+                self._captured = None
+            results[sub["referenceId"]] = body
+            responses.append({"body": body, "httpHeaders": {}, "httpStatusCode": status,
+                              "referenceId": sub["referenceId"]})
+        self._send(200, {"compositeResponse": responses})
+
+    def _sobject(self, method, sobject, record_id, payload, fields):
+        store = self.simulator.store
+        if method == "POST" and record_id is None:
+            new_id = store.insert(sobject, payload)
+            return self._send(201, {"id": new_id, "success": True, "errors": []})
+
+        record = store.get(record_id) if record_id else None
+        if record is None or record["attributes"]["type"] != sobject:
+            return self._error(404, "NOT_FOUND", "The requested resource does not exist")
+        if method == "GET":
+            if fields:
+                record = project(record, fields.split(','))
+            return self._send(200, record)
+        if method == "PATCH":
+            store.update(record_id, payload)
+            if sobject == "ccai__AI_Prompt__c":
+                self.simulator.prompt_changed(record_id, payload)
+            return self._send(204)
+        if method == "DELETE":
+            store.delete(record_id)
+            return self._send(204)
+        return self._error(405, "METHOD_NOT_ALLOWED", f"{method} not allowed")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+class StandinServer:
+    """
+    Stand-in org on a background thread
+
+    Usage:
+        with StandinServer(StandinConfig(latency=0.5)) as server:
+            client = SalesforceClient(server.url, "standin")
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, fixtures=None):
+        self.config = config or StandinConfig()
+        self.store = OrgStore()
+        for prompt in SEED_PROMPTS:
+            self.store.insert("ccai__AI_Prompt__c", prompt, record_id=prompt["Id"])
+        for sobject, record in SEED_RECORDS:
+            self.store.insert(sobject, record, record_id=record["Id"])
+        self.simulator = Simulator(self.store, fixtures or FixtureLibrary(), self.config)
+        handler = type("BoundStandinHandler", (StandinHandler,), {"simulator": self.simulator})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Salesforce/GPTfy stand-in for the test harness")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=2.0, help="mean LLM seconds per execution")
+    parser.add_argument("--jitter", type=float, default=0.5, help="std dev of LLM seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of executions that fail")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fraction of calls answered HTTP 500")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="LLM executions in progress at once")
+    parser.add_argument("--rate-limit", type=float, default=None, help="API requests per second")
+    parser.add_argument("--stage-delay", type=float, default=0.5, help="seconds per pipeline stage")
+    parser.add_argument("--async-execute", action="store_true",
+                        help="return from executePrompt before the response is processed")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable latency/failures")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        http_error_rate=args.http_error_rate, max_concurrent=args.max_concurrent,
+        rate_limit=args.rate_limit, stage_delay=args.stage_delay,
+        async_execute=args.async_execute, seed=args.seed
+    )
+    server = StandinServer(config, host=args.host, port=args.port)
+    print(f"🧪 Stand-in org listening on {server.url}")
+    print(f"   {len(server.simulator.fixtures.outputs)} recorded outputs loaded")
+    print(f"   export SF_STANDIN_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"\n📊 {server.simulator.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory streaming scoring for very large single-line outputs
+
+HtmlFeatures (html_features.py) needs the whole output in memory, and the
+scorers' greedy patterns (r'height:\\s*1?[0-9]px.*border-radius:\\s*6px',
+r'Why:.*Impact:.*Owner:' with DOTALL) can span the entire response.
+StreamingFeatures answers the same count()/search() queries while reading
+the output in fixed-size chunks, keeping only each pattern's overlap window
+between chunks, so memory is constant and time linear in the output size.
+
+Each (pattern, flags) query is planned once:
+
+- bounded     the pattern's longest match is finite: it is scanned with an
+              overlap of that width, and a match is only accepted once its
+              whole window has arrived, so counts equal re.findall.
+              Single-character repeats (\\s*, \\d+, [\\w-]*) are capped at
+              REPEAT_LIMIT characters to make this possible.
+- sequence    A.*B(.*C): bounded pieces joined by top-level .* or .*? gaps.
+              The pieces are searched in order (within a line unless
+              DOTALL); a lazy chain counts like findall, a greedy chain
+              matches at most once per line (once overall with DOTALL),
+              exactly as findall does on the full text.
+- any         an alternation with a gap in some branch, asked only for
+              presence (search): true if any branch is present.
+
+Counting an alternation that has a gap branch would need unbounded
+lookahead, so it is rejected with UnboundedPatternError unless a
+gap_limit is given; the gap is then rewritten to .{0,gap_limit} and the
+query reported as approximate.
+
+The scorers record which queries their dimensions make with
+record_queries(), then score `StreamingFeatures.from_file(path, queries)`.
+"""
+
+import re
+from collections import Counter
+
+from harness.html_features import COLOR_RE, TAG_RE
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+DEFAULT_CHUNK_CHARS = 64 * 1024
+# Longest run a single-character repeat (\s*, \d+, ...) may match when streaming
+REPEAT_LIMIT = 256
+# Widths at or above this are unbounded
+MAX_WIDTH = 1 << 20
+# Characters kept before a scan position for \b and lookbehind
+CONTEXT = 8
+
+COUNT = "count"
+SEARCH = "search"
+
+
+class UnboundedPatternError(ValueError):
+    """A query whose result could depend on the whole output"""
+
+
+# -- planning -------------------------------------------------------------------
+
+def tokenize(pattern):
+    """(atom, quantifier) pairs plus '(' ')' '|' structure tokens"""
+    tokens = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            atom, i = pattern[i:i + 2], i + 2
+        elif c == '[':
+            j = i + 1
+            if j < len(pattern) and pattern[j] == '^':
+                j += 1
+            if j < len(pattern) and pattern[j] == ']':
+                j += 1
+            while j < len(pattern) and pattern[j] != ']':
+                j += 2 if pattern[j] == '\\' else 1
+            atom, i = pattern[i:j + 1], j + 1
+        elif c == '(':
+            j = i + 1
+            if pattern.startswith('?:', j) or pattern.startswith('?=', j) or pattern.startswith('?!', j):
+                j += 2
+            elif pattern.startswith('?<=', j) or pattern.startswith('?<!', j):
+                j += 3
+            tokens.append(("(", pattern[i:j]))
+            i = j
+            continue
+        elif c in ')|':
+            tokens.append((c, c))
+            i += 1
+            continue
+        else:
+            atom, i = c, i + 1
+
+        quantifier = ""
+        if i < len(pattern) and pattern[i] in '*+?':
+            quantifier, i = pattern[i], i + 1
+        elif i < len(pattern) and pattern[i] == '{':
+            close = pattern.find('}', i)
+            if close != -1 and re.fullmatch(r'\{\d*(?:,\d*)?\}', pattern[i:close + 1]):
+                quantifier, i = pattern[i:close + 1], close + 1
+        if quantifier and i < len(pattern) and pattern[i] in '?+':
+            quantifier, i = quantifier + pattern[i], i + 1
+        tokens.append(("atom", atom, quantifier))
+    return tokens
+
+
+def _unbounded(quantifier):
+    return quantifier[:1] in ('*', '+') or bool(re.match(r'\{\d*,\}', quantifier))
+
+
+def _cap(atom, quantifier, limit):
+    """x* -> x{0,limit}, x+ -> x{1,limit}, x{m,} -> x{m,limit} (laziness kept)"""
+    if quantifier.startswith('{'):
+        low = quantifier[1:quantifier.index(',')] or '0'
+        suffix = quantifier[quantifier.index('}') + 1:]
+    else:
+        low = '0' if quantifier[0] == '*' else '1'
+        suffix = quantifier[1:]
+    return f"{atom}{{{low},{limit}}}{suffix}"
+
+
+def split_gaps(pattern, repeat_limit=REPEAT_LIMIT, gap_limit=None):
+    """
+    Top-level branches of pattern, each a list of pieces split at .* / .*?
+    gaps, with single-character repeats capped (and .* too when gap_limit
+    is given). Returns (branches, gap kinds per branch), a gap kind being
+    '*' or '*?'.
+    """
+    branches, gaps = [[[]]], [[]]
+    depth = 0
+    for token in tokenize(pattern):
+        kind = token[0]
+        piece = branches[-1][-1]
+        if kind == "(":
+            depth += 1
+            piece.append(token[1])
+        elif kind == ")":
+            depth -= 1
+            piece.append(")")
+        elif kind == "|":
+            if depth == 0:
+                branches.append([[]])
+                gaps.append([])
+            else:
+                piece.append("|")
+        else:
+            _, atom, quantifier = token
+            if atom == '.' and quantifier in ('*', '*?') and depth == 0 and gap_limit is None:
+                branches[-1].append([])
+                gaps[-1].append(quantifier)
+            elif _unbounded(quantifier):
+                limit = gap_limit if atom == '.' else repeat_limit
+                if limit is None:
+                    raise UnboundedPatternError(f"{pattern!r}: unbounded {atom}{quantifier} inside a group")
+                piece.append(_cap(atom, quantifier, limit))
+            else:
+                piece.append(atom + quantifier)
+    return [["".join(p) for p in branch] for branch in branches], gaps
+
+
+def width(pattern, flags=0):
+    """(min, max) characters a match can span"""
+    return sre_parse.parse(pattern, flags).getwidth()
+
+
+class Plan:
+    """How one (pattern, flags, kind) query is streamed"""
+
+    def __init__(self, pattern, flags, kind, mode, parts, greedy=False, approximate=False):
+        self.pattern = pattern
+        self.flags = flags
+        self.kind = kind
+        self.mode = mode
+        # bounded: [piece]; sequence: [piece, ...]; any: [Plan, ...]
+        self.parts = parts
+        self.greedy = greedy
+        self.approximate = approximate
+
+    def __repr__(self):
+        return f"Plan({self.pattern!r}, {self.kind}, {self.mode}{', approximate' if self.approximate else ''})"
+
+
+def _bounded_piece(pattern, source, flags):
+    low, high = width(pattern, flags)
+    if high >= MAX_WIDTH:
+        raise UnboundedPatternError(f"{source!r}: {pattern!r} has no finite width")
+    if low == 0:
+        raise UnboundedPatternError(f"{source!r}: {pattern!r} can match the empty string")
+    return pattern
+
+
+def plan_query(pattern, flags, kind, repeat_limit=REPEAT_LIMIT, gap_limit=None):
+    """Plan a count or search query; raises UnboundedPatternError if it can't be streamed"""
+    branches, gaps = split_gaps(pattern, repeat_limit)
+    if all(len(branch) == 1 for branch in branches):
+        whole = "|".join(branch[0] for branch in branches)
+        return Plan(pattern, flags, kind, "bounded", [_bounded_piece(whole, pattern, flags)])
+
+    if len(branches) == 1:
+        if len(set(gaps[0])) > 1:
+            raise UnboundedPatternError(f"{pattern!r}: mixes greedy and lazy gaps")
+        pieces = [_bounded_piece(piece, pattern, flags) for piece in branches[0]]
+        return Plan(pattern, flags, kind, "sequence", pieces, greedy=gaps[0][0] == '*')
+
+    if kind == SEARCH:
+        parts = []
+        for branch, branch_gaps in zip(branches, gaps):
+            joined = "".join(piece + ('.' + gap if gap else '') for piece, gap in zip(branch, branch_gaps + [""]))
+            parts.append(plan_query(joined, flags, SEARCH, repeat_limit))
+        return Plan(pattern, flags, kind, "any", parts)
+
+    if gap_limit is None:
+        raise UnboundedPatternError(
+            f"{pattern!r}: counting an alternation with a .* branch needs the whole output "
+            f"(pass a gap limit to rewrite .* as .{{0,N}})")
+    branches, _ = split_gaps(pattern, repeat_limit, gap_limit)
+    whole = "|".join(branch[0] for branch in branches)
+    return Plan(pattern, flags, kind, "bounded", [_bounded_piece(whole, pattern, flags)], approximate=True)
+
+
+# -- scanning ----------------------------------------------------------------
+
+class _Buffer:
+    """The unscanned tail of the stream, addressed by absolute offsets"""
+
+    def __init__(self):
+        self.text = ""
+        self.start = 0
+        self.final = False
+
+    @property
+    def end(self):
+        return self.start + len(self.text)
+
+    def search(self, regex, pos):
+        match = regex.search(self.text, pos - self.start)
+        if match is None:
+            return None, None
+        return match.start() + self.start, match.end() + self.start
+
+    def find(self, char, pos, end=None):
+        index = self.text.find(char, pos - self.start, None if end is None else end - self.start)
+        return -1 if index == -1 else index + self.start
+
+
+class _Scanner:
+    """findall over the stream for one bounded regex"""
+
+    def __init__(self, pattern, flags, stop_at_first=False, on_match=None):
+        self.regex = re.compile(pattern, flags)
+        self.window = width(pattern, flags)[1] + 1
+        self.stop_at_first = stop_at_first
+        self.on_match = on_match
+        self.pos = 0
+        self.count = 0
+        self.done = False
+
+    def advance(self, buffer):
+        limit = buffer.end if buffer.final else buffer.end - self.window
+        while not self.done:
+            start, end = buffer.search(self.regex, self.pos)
+            if start is None or start > limit:
+                # Nothing can start before limit; later positions wait for more data
+                self.pos = max(self.pos, min(limit, buffer.end))
+                return
+            self.count += 1
+            if self.on_match:
+                self.on_match(buffer.text[start - buffer.start:end - buffer.start])
+            self.pos = end if end > start else start + 1
+            self.done = self.stop_at_first
+
+
+class _Sequence:
+    """Pieces separated by .* / .*? gaps, searched in order"""
+
+    def __init__(self, plan, stop_at_first=False):
+        self.pieces = [_Scanner(piece, plan.flags) for piece in plan.parts]
+        self.greedy = plan.greedy
+        self.dotall = bool(plan.flags & re.DOTALL)
+        self.stop_at_first = stop_at_first
+        self.piece = 0
+        self.pos = 0
+        self.count = 0
+        self.skip_line = False
+        self.done = False
+
+    def advance(self, buffer):
+        while not self.done:
+            if self.skip_line:
+                newline = buffer.find('\n', self.pos)
+                if newline == -1:
+                    self.pos = buffer.end
+                    return
+                self.pos, self.skip_line = newline + 1, False
+
+            scanner = self.pieces[self.piece]
+            limit = buffer.end if buffer.final else buffer.end - scanner.window
+            start, end = buffer.search(scanner.regex, self.pos)
+            if self.piece and not self.dotall:
+                # The gap can't cross a line: start over on the next line
+                newline = buffer.find('\n', self.pos, start)
+                if newline != -1:
+                    self.piece, self.pos = 0, newline + 1
+                    continue
+            if start is None or start > limit:
+                self.pos = max(self.pos, min(limit, buffer.end))
+                return
+
+            if self.piece < len(self.pieces) - 1:
+                self.piece, self.pos = self.piece + 1, end
+                continue
+
+            self.count += 1
+            self.piece = 0
+            self.done = self.stop_at_first or (self.greedy and self.dotall)
+            # A greedy chain runs to the last match on its line; lazy resumes right after
+            self.pos = end
+            self.skip_line = self.greedy
+
+
+class _Any:
+    def __init__(self, plan):
+        self.parts = [_matcher(part, stop_at_first=True) for part in plan.parts]
+
+    @property
+    def pos(self):
+        return min(part.pos for part in self.parts)
+
+    @property
+    def done(self):
+        return any(part.done for part in self.parts)
+
+    @property
+    def count(self):
+        return int(any(part.count for part in self.parts))
+
+    def advance(self, buffer):
+        for part in self.parts:
+            if not self.done:
+                part.advance(buffer)
+
+
+def _matcher(plan, stop_at_first=False):
+    if plan.mode == "bounded":
+        return _Scanner(plan.parts[0], plan.flags, stop_at_first=stop_at_first)
+    if plan.mode == "sequence":
+        return _Sequence(plan, stop_at_first=stop_at_first)
+    return _Any(plan)
+
+
+# -- features --------------------------------------------------------------------
+
+class RecordingFeatures:
+    """Stand-in features that record every query a scoring function makes"""
+
+    size = 0
+    is_single_line = True
+    starts_with_div = True
+
+    def __init__(self):
+        self.queries = []
+        self.tags = Counter()
+        self.colors = Counter()
+
+    def _record(self, pattern, flags, kind):
+        if (pattern, flags, kind) not in self.queries:
+            self.queries.append((pattern, flags, kind))
+
+    def count(self, pattern, flags=re.IGNORECASE):
+        self._record(pattern, flags, COUNT)
+        return 0
+
+    def search(self, pattern, flags=re.IGNORECASE):
+        self._record(pattern, flags, SEARCH)
+        return False
+
+    def tag_count(self, prefix):
+        return 0
+
+    def has_color(self, *hex_values):
+        return False
+
+
+def record_queries(score_features):
+    """[(pattern, flags, kind), ...] that score_features(features) asks for"""
+    recorder = RecordingFeatures()
+    score_features(recorder)
+    return recorder.queries
+
+
+class StreamingFeatures:
+    """
+    HtmlFeatures' interface, computed from a stream of text chunks
+
+    Usage:
+        queries = record_queries(score_features)
+        features = StreamingFeatures.from_file(path, queries)
+        result = score_features(features)
+    """
+
+    def __init__(self, chunks, queries, repeat_limit=REPEAT_LIMIT, gap_limit=None):
+        self.plans = {}
+        self._matchers = {}
+        for pattern, flags, kind in queries:
+            key = (pattern, flags)
+            if kind == COUNT or key not in self.plans:
+                plan = plan_query(pattern, flags, kind, repeat_limit, gap_limit)
+                self.plans[key] = plan
+                self._matchers[key] = _matcher(plan, stop_at_first=kind == SEARCH)
+
+        self.tags = Counter()
+        self.colors = Counter()
+        tag_re, _ = split_gaps(TAG_RE.pattern, repeat_limit)
+        color_re, _ = split_gaps(COLOR_RE.pattern, repeat_limit)
+        tag_pattern = re.compile(TAG_RE.pattern)
+        self._scanners = [
+            _Scanner(tag_re[0][0], 0, on_match=lambda m: self.tags.update([tag_pattern.match(m).group(1).lower()])),
+            _Scanner(color_re[0][0], 0, on_match=lambda m: self.colors.update([m])),
+        ]
+
+        self.size = 0
+        self._leading = ""
+        self._seen_content = False
+        self._newline_pending = False
+        self.is_single_line = True
+        self.max_buffer = 0
+        self._consume(chunks)
+
+    @classmethod
+    def from_file(cls, path, queries, chunk_chars=DEFAULT_CHUNK_CHARS, **kwargs):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return cls(iter(lambda: f.read(chunk_chars), ""), queries, **kwargs)
+
+    @property
+    def approximate(self):
+        return [plan.pattern for plan in self.plans.values() if plan.approximate]
+
+    def _track_lines(self, chunk):
+        """is_single_line == '\\n' not in html.strip(), and the first characters for starts_with_div"""
+        content = chunk.strip()
+        if not content:
+            if self._seen_content and '\n' in chunk:
+                self._newline_pending = True
+            return
+        head = chunk[:len(chunk) - len(chunk.lstrip())]
+        if self._seen_content and (self._newline_pending or '\n' in head):
+            self.is_single_line = False
+        if '\n' in content:
+            self.is_single_line = False
+        if not self._seen_content:
+            self._leading = content[:4]
+        elif len(self._leading) < 4:
+            self._leading += chunk[:4 - len(self._leading)]
+        self._seen_content = True
+        self._newline_pending = '\n' in chunk[len(chunk.rstrip()):]
+
+    def _consume(self, chunks):
+        buffer = _Buffer()
+        matchers = list(self._matchers.values()) + self._scanners
+        for chunk in chunks:
+            self.size += len(chunk)
+            self._track_lines(chunk)
+            buffer.text += chunk
+            self.max_buffer = max(self.max_buffer, len(buffer.text))
+            for matcher in matchers:
+                matcher.advance(buffer)
+            # Keep only what some matcher may still need
+            active = [matcher.pos for matcher in matchers if not matcher.done]
+            keep = (min(active) if active else buffer.end) - CONTEXT
+            if keep > buffer.start:
+                buffer.text = buffer.text[keep - buffer.start:]
+                buffer.start = keep
+        buffer.final = True
+        for matcher in matchers:
+            matcher.advance(buffer)
+        self.starts_with_div = self._leading.startswith('<div')
+
+    def _result(self, pattern, flags):
+        try:
+            return self._matchers[(pattern, flags)].count
+        except KeyError:
+            raise KeyError(f"{pattern!r} (flags={flags}) was not in the streaming plan") from None
+
+    def count(self, pattern, flags=re.IGNORECASE):
+        return self._result(pattern, flags)
+
+    def search(self, pattern, flags=re.IGNORECASE):
+        return self._result(pattern, flags) > 0
+
+    def tag_count(self, prefix):
+        return sum(n for name, n in self.tags.items() if name.startswith(prefix))
+
+    def has_color(self, *hex_values):
+        return any(color[1:].startswith(hex_values) for color in self.colors)
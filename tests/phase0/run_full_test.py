@@ -4,12 +4,17 @@ Phase 0 Full Test - Execute all 5 variants
 Uses REST API for prompt updates
 """
 
-import subprocess
 import json
 import time
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.metrics import report as report_metrics
+from harness.polling import SUCCESS_STATUSES, utc_now, wait_for_prompt_response
+from harness.responses import extract_html
+from harness.sf_client import SalesforceClient, SalesforceError
+
 # Configuration
 PROMPT_ID = "a0DQH00000KYLsv2AH"
 OPP_ID = "006QH00000HjgvlYAB"
@@ -25,32 +30,15 @@ VARIANTS = [
     (4, "all")
 ]
 
-def run_command(cmd, timeout=300):
-    """Run shell command"""
+def get_client():
+    """Get a pooled Salesforce REST client (credentials fetched once)"""
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Command timed out"
-
-def get_access_token():
-    """Get Salesforce access token"""
-    cmd = f"sf org display --target-org {ORG_ALIAS} --json"
-    success, stdout, stderr = run_command(cmd)
-    
-    if not success:
-        return None, None
-    
-    data = json.loads(stdout)
-    return data['result']['accessToken'], data['result']['instanceUrl']
+        return SalesforceClient.from_cli(ORG_ALIAS)
+    except SalesforceError as e:
+        print(f"   {e}")
+        return None
 
-def update_prompt_rest(variant_num, variant_name, access_token, instance_url):
+def update_prompt_rest(variant_num, variant_name, client):
     """Update prompt via REST API"""
     variant_file = TEST_DIR / "variants" / f"variant_{variant_num}_{variant_name}.txt"
     
@@ -59,90 +47,53 @@ def update_prompt_rest(variant_num, variant_name, access_token, instance_url):
     
     print(f"   Variant size: {len(prompt_text)} characters")
     
-    # Create payload
-    payload = {"ccai__Prompt_Command__c": prompt_text}
-    payload_file = "/tmp/prompt_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
-    
-    # REST API update
-    url = f"{instance_url}/services/data/v65.0/sobjects/ccai__AI_Prompt__c/{PROMPT_ID}"
-    cmd = f'curl -s -X PATCH "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
-    
-    success, stdout, stderr = run_command(cmd, timeout=60)
-    
-    if success and (not stdout or stdout == ""):
-        # Empty response means success in PATCH
-        print("   ✅ Prompt updated via REST API")
-        return True
-    else:
-        print(f"   ❌ Update failed: {stdout[:200]}")
+    try:
+        client.update_prompt_command(PROMPT_ID, prompt_text)
+    except SalesforceError as e:
+        print(f"   ❌ Update failed: {str(e)[:200]}")
         return False
-
-def execute_prompt_api(variant_num, access_token, instance_url):
-    """Execute prompt via API"""
-    url = f"{instance_url}/services/apexrest/ccai/v1/executePrompt"
-    
-    payload = {
-        "promptRequestId": PROMPT_REQUEST_ID,
-        "recordId": OPP_ID,
-        "customPromptCommand": ""
-    }
-    
-    payload_file = "/tmp/execute_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
-    
-    cmd = f'curl -s -X POST "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
     
-    success, stdout, stderr = run_command(cmd, timeout=120)
-    
-    if success:
-        print("   ✅ API called successfully")
-        return True
-    else:
-        print(f"   ⚠️  API call status unknown")
-        return False
+    print("   ✅ Prompt updated via REST API")
+    return True
 
-def query_response(variant_num, variant_name):
-    """Query AI response"""
-    query = f"SELECT Id, Name, ccai__Status__c, ccai__Response__c, ccai__Token_Count__c, CreatedDate FROM ccai__AI_Response__c WHERE ccai__AI_Prompt__c = '{PROMPT_ID}' ORDER BY CreatedDate DESC LIMIT 1"
-    
-    cmd = f'sf data query -q "{query}" -o {ORG_ALIAS} --json'
-    success, stdout, stderr = run_command(cmd)
+def execute_prompt_api(variant_num, client):
+    """Execute prompt via API (returns the executePrompt response, or None)"""
+    try:
+        execution = client.execute_prompt(PROMPT_REQUEST_ID, OPP_ID, timeout=120)
+    except SalesforceError as e:
+        print(f"   ⚠️  API call status unknown: {str(e)[:200]}")
+        return None
     
-    if not success:
+    print("   ✅ API called successfully")
+    return execution
+
+def save_response(variant_num, variant_name, record):
+    """Save the AI response fetched by responseId"""
+    if not record:
+        print("   ⚠️  No response found")
         return None
     
     try:
-        result = json.loads(stdout)
-        if result.get('result', {}).get('records'):
-            record = result['result']['records'][0]
-            
-            # Save outputs
-            output_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.json"
-            with open(output_file, 'w') as f:
-                json.dump(record, f, indent=2)
-            
-            html_output = record.get('ccai__Response__c', '')
-            html_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.html"
-            with open(html_file, 'w') as f:
-                f.write(html_output)
-            
-            print(f"   Response ID: {record.get('Id')}")
-            print(f"   Status: {record.get('ccai__Status__c')}")
-            print(f"   Tokens: {record.get('ccai__Token_Count__c')}")
-            print(f"   HTML size: {len(html_output)} chars")
-            
-            return record
-        else:
-            print("   ⚠️  No response found")
-            return None
+        # Save outputs
+        output_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.json"
+        with open(output_file, 'w') as f:
+            json.dump(record, f, indent=2)
+        
+        html_output = extract_html(record) or ''
+        html_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.html"
+        with open(html_file, 'w') as f:
+            f.write(html_output)
+        
+        print(f"   Response ID: {record.get('Id')}")
+        print(f"   Status: {record.get('ccai__Status__c')}")
+        print(f"   HTML size: {len(html_output)} chars")
+        
+        return record
     except Exception as e:
         print(f"   ❌ Error: {e}")
         return None
 
-def run_variant(variant_num, variant_name, access_token, instance_url):
+def run_variant(variant_num, variant_name, client):
     """Execute full test for one variant"""
     print()
     print("━" * 70)
@@ -153,7 +104,7 @@ def run_variant(variant_num, variant_name, access_token, instance_url):
     
     # Step 1: Update prompt
     print("📝 Updating prompt...")
-    if not update_prompt_rest(variant_num, variant_name, access_token, instance_url):
+    if not update_prompt_rest(variant_num, variant_name, client):
         print(f"❌ Variant {variant_num} FAILED")
         return False
     
@@ -161,31 +112,34 @@ def run_variant(variant_num, variant_name, access_token, instance_url):
     
     # Step 2: Execute via API
     print("🚀 Executing prompt...")
-    execute_prompt_api(variant_num, access_token, instance_url)
+    started_at = utc_now()
+    started = time.monotonic()
+    execution = execute_prompt_api(variant_num, client) or {}
     
     print()
     
-    # Step 3: Wait for processing
-    print("⏳ Waiting for AI processing (90 seconds)...")
-    for i in range(9):
-        time.sleep(10)
-        print(f"   {(i+1)*10}s...", end=" ", flush=True)
-    print()
+    # Step 3: Wait for processing (adaptive polling instead of a fixed 90s sleep)
+    print("⏳ Waiting for AI processing...")
+    try:
+        _, record = wait_for_prompt_response(
+            client, PROMPT_ID, response_id=execution.get('responseId'),
+            created_after=started_at, started=started, timeout=150
+        )
+    except SalesforceError as e:
+        print(f"   ⚠️  Polling failed: {str(e)[:200]}")
+        record = None
+    client.metrics.observe("llm", time.monotonic() - started, f"{variant_num}_{variant_name}")
+    print(f"   Done waiting after {time.monotonic() - started:.1f}s")
     print()
     
-    # Step 4: Query response (with retries)
-    print("📊 Querying response...")
-    for attempt in range(3):
-        response = query_response(variant_num, variant_name)
-        if response and response.get('ccai__Status__c') == 'Completed':
-            print()
-            print(f"✅ VARIANT {variant_num} COMPLETE - {time.strftime('%H:%M:%S')}")
-            print("━" * 70)
-            return True
-        
-        if attempt < 2:
-            print(f"   Retry {attempt + 2}/3 in 20s...")
-            time.sleep(20)
+    # Step 4: Save response (body was downloaded once, by Id)
+    print("📊 Saving response...")
+    response = save_response(variant_num, variant_name, record)
+    if response and response.get('ccai__Status__c') in SUCCESS_STATUSES:
+        print()
+        print(f"✅ VARIANT {variant_num} COMPLETE - {time.strftime('%H:%M:%S')}")
+        print("━" * 70)
+        return True
     
     print()
     print(f"⚠️  VARIANT {variant_num} STATUS UNKNOWN - {time.strftime('%H:%M:%S')}")
@@ -205,18 +159,19 @@ def main():
     
     # Get access token once
     print("\n🔑 Getting access token...")
-    access_token, instance_url = get_access_token()
+    client = get_client()
     
-    if not access_token:
+    if not client:
         print("❌ Failed to get access token")
         sys.exit(1)
     
-    print(f"✅ Connected to: {instance_url}\n")
+    print(f"✅ Connected to: {client.instance_url}\n")
     
     # Run all variants
     results = []
     for variant_num, variant_name in VARIANTS:
-        success = run_variant(variant_num, variant_name, access_token, instance_url)
+        with client.metrics.span("variant", f"{variant_num}_{variant_name}"):
+            success = run_variant(variant_num, variant_name, client)
         results.append((variant_num, variant_name, success))
         
         if variant_num < VARIANTS[-1][0]:
@@ -236,6 +191,7 @@ def main():
             passed += 1
     print("=" * 70)
     print(f"Completed: {passed}/{len(VARIANTS)} variants")
+    report_metrics(client.metrics, TEST_DIR / "outputs", "phase0_full", client.instance_url)
     print()
     
     print("🎯 Next: Run scoring analysis")
@@ -10,6 +10,12 @@ import time
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.metrics import report as report_metrics
+from harness.polling import SUCCESS_STATUSES, utc_now, wait_for_prompt_response
+from harness.responses import extract_html
+from harness.sf_client import SalesforceClient, SalesforceError
+
 # Configuration
 PROMPT_ID = "a0DQH00000KYLsv2AH"
 OPP_ID = "006QH00000HjgvlYAB"
@@ -132,49 +138,32 @@ if (res.getStatusCode() >= 200 && res.getStatusCode() < 300) {{
         print(f"   STDOUT: {stdout[:500]}")
         return False
 
-def query_response(variant_num, variant_name):
-    """Query AI response"""
-    print(f"📊 Querying AI Response...")
+def save_response(variant_num, variant_name, record):
+    """Save the AI response found after execution"""
+    print(f"📊 Saving AI Response...")
     
-    query = f"SELECT Id, Name, ccai__Status__c, ccai__Response__c, ccai__Token_Count__c, CreatedDate FROM ccai__AI_Response__c WHERE ccai__AI_Prompt__c = '{PROMPT_ID}' ORDER BY CreatedDate DESC LIMIT 1"
+    if not record:
+        print("   ⚠️  No response found yet")
+        return None
     
-    cmd = f'sf data query -q "{query}" -o {ORG_ALIAS} --json'
-    success, stdout, stderr = run_sf_command(cmd)
+    # Save full response
+    output_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.json"
+    with open(output_file, 'w') as f:
+        json.dump(record, f, indent=2)
     
-    if not success:
-        print(f"   ❌ Query failed")
-        return None
+    # Save HTML separately
+    html_output = extract_html(record) or ''
+    html_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.html"
+    with open(html_file, 'w') as f:
+        f.write(html_output)
     
-    try:
-        result = json.loads(stdout)
-        if result.get('result', {}).get('records'):
-            record = result['result']['records'][0]
-            
-            # Save full response
-            output_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.json"
-            with open(output_file, 'w') as f:
-                json.dump(record, f, indent=2)
-            
-            # Save HTML separately
-            html_output = record.get('ccai__Response__c', '')
-            html_file = TEST_DIR / "outputs" / f"output_{variant_num}_{variant_name}.html"
-            with open(html_file, 'w') as f:
-                f.write(html_output)
-            
-            print(f"   Response ID: {record.get('Id')}")
-            print(f"   Status: {record.get('ccai__Status__c')}")
-            print(f"   Tokens: {record.get('ccai__Token_Count__c')}")
-            print(f"   HTML size: {len(html_output)} characters")
-            
-            return record
-        else:
-            print("   ⚠️  No response found yet")
-            return None
-    except json.JSONDecodeError as e:
-        print(f"   ❌ Failed to parse response: {e}")
-        return None
+    print(f"   Response ID: {record.get('Id')}")
+    print(f"   Status: {record.get('ccai__Status__c')}")
+    print(f"   HTML size: {len(html_output)} characters")
+    
+    return record
 
-def run_variant(variant_num, variant_name):
+def run_variant(variant_num, variant_name, client):
     """Run complete test for one variant"""
     print()
     print("━" * 60)
@@ -183,38 +172,47 @@ def run_variant(variant_num, variant_name):
     print(f"Started: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
+    label = f"{variant_num}_{variant_name}"
+    
     # Step 1: Update prompt
-    if not update_prompt(variant_num, variant_name):
+    with client.metrics.span("sf_cli_update", label):
+        updated = update_prompt(variant_num, variant_name)
+    if not updated:
         print(f"❌ Variant {variant_num} FAILED at update step")
         return False
     
     print()
     
     # Step 2: Execute prompt
-    if not execute_prompt(variant_num):
+    started_at = utc_now()
+    started = time.monotonic()
+    with client.metrics.span("sf_cli_execute", label):
+        executed = execute_prompt(variant_num)
+    if not executed:
         print(f"⚠️  Variant {variant_num} API call may have issues")
     
     print()
     
-    # Step 3: Wait for processing
-    print("⏳ Waiting for AI processing (60 seconds)...")
-    time.sleep(60)
+    # Step 3: Wait for processing (adaptive polling instead of a fixed 60s sleep)
+    print("⏳ Waiting for AI processing...")
+    # Anonymous Apex doesn't hand back the responseId, so it is resolved as the
+    # newest response created since the execute started, then tracked by Id
+    try:
+        _, record = wait_for_prompt_response(client, PROMPT_ID, created_after=started_at,
+                                             started=started, timeout=150)
+    except SalesforceError as e:
+        print(f"   ⚠️  Polling failed: {str(e)[:200]}")
+        record = None
+    client.metrics.observe("llm", time.monotonic() - started, label)
+    print(f"   Done waiting after {time.monotonic() - started:.1f}s")
     print()
     
-    # Step 4: Query response (with retries)
-    max_retries = 3
-    response = None
-    for attempt in range(max_retries):
-        response = query_response(variant_num, variant_name)
-        if response and response.get('ccai__Status__c') == 'Completed':
-            break
-        if attempt < max_retries - 1:
-            print(f"   Retrying in 30 seconds... (attempt {attempt + 2}/{max_retries})")
-            time.sleep(30)
+    # Step 4: Save response
+    response = save_response(variant_num, variant_name, record)
     
     print()
     print("━" * 60)
-    if response and response.get('ccai__Status__c') == 'Completed':
+    if response and response.get('ccai__Status__c') in SUCCESS_STATUSES:
         print(f"✅ VARIANT {variant_num} COMPLETE")
     else:
         print(f"⚠️  VARIANT {variant_num} COMPLETED WITH WARNINGS")
@@ -238,9 +236,17 @@ def main():
     print(f"Estimated Time: ~{len(VARIANTS) * 2} minutes")
     print("=" * 60)
     
+    # REST client is only used to poll for completion; updates still go through the CLI
+    try:
+        client = SalesforceClient.from_cli(ORG_ALIAS)
+    except SalesforceError as e:
+        print(f"❌ Failed to get credentials: {e}")
+        sys.exit(1)
+    
     results = []
     for variant_num, variant_name in VARIANTS:
-        success = run_variant(variant_num, variant_name)
+        with client.metrics.span("variant", f"{variant_num}_{variant_name}"):
+            success = run_variant(variant_num, variant_name, client)
         results.append((variant_num, variant_name, success))
         
         # Brief pause between variants
@@ -257,6 +263,7 @@ def main():
         status = "✅ PASS" if success else "❌ FAIL"
         print(f"  Variant {variant_num} ({variant_name}): {status}")
     print("=" * 60)
+    report_metrics(client.metrics, TEST_DIR / "outputs", "phase0", client.instance_url)
     print()
     
     print("🎯 Next step: Run scoring script to analyze results")
@@ -6,9 +6,15 @@ Analyzes and compares all 5 variant outputs
 
 import re
 import json
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.batch_scoring import DEFAULT_CHUNK_SIZE, run_batch
+from harness.phrases import get_matcher
+
 TEST_DIR = Path("tests/phase0")
 
 VARIANTS = [
@@ -53,15 +59,8 @@ def load_html(variant_num, variant_name):
         return f.read()
 
 def count_pattern(text, patterns):
-    """Count occurrences of patterns in text"""
-    count = 0
-    found = []
-    for pattern in patterns:
-        matches = re.findall(re.escape(pattern), text, re.IGNORECASE)
-        if matches:
-            count += len(matches)
-            found.append((pattern, len(matches)))
-    return count, found
+    """Count occurrences of patterns in text (case-insensitive, one pass for the whole list)"""
+    return get_matcher(patterns).count(text)
 
 def count_evidence_citations(text):
     """Count explicit evidence citations"""
@@ -88,23 +87,36 @@ def assess_diagnostic_quality(text):
     score = min(5.0, max(1.0, 1 + (ratio * 0.8)))
     return round(score, 1), diag_count, desc_count
 
+def composite_components(metrics):
+    """Points per component of the composite score"""
+    return {
+        'evidence': min(metrics['evidenceCitations'] * 5, 50),  # Max 50
+        'forbidden': max(50 - (metrics['forbiddenPhrases'] * 10), 0),  # -10 per phrase
+        'customer': min(metrics['customerReferences'] * 2, 20),  # Max 20
+        'diagnostic': metrics['diagnosticScore'] * 4,  # Max 20
+        'structure': 10 if metrics['hasStructuredFormat'] else 0
+    }
+
 def calculate_composite_score(metrics):
     """Calculate composite quality score (0-100)"""
-    evidence_points = min(metrics['evidenceCitations'] * 5, 50)  # Max 50
-    forbidden_penalty = max(50 - (metrics['forbiddenPhrases'] * 10), 0)  # -10 per phrase
-    customer_points = min(metrics['customerReferences'] * 2, 20)  # Max 20
-    diagnostic_points = metrics['diagnosticScore'] * 4  # Max 20
-    structure_bonus = 10 if metrics['hasStructuredFormat'] else 0
+    components = composite_components(metrics)
     
-    composite = (evidence_points + forbidden_penalty + customer_points + 
-                 diagnostic_points + structure_bonus) / 1.5
+    composite = (components['evidence'] + components['forbidden'] + components['customer'] + 
+                 components['diagnostic'] + components['structure']) / 1.5
     
     return round(composite, 1)
 
 def score_variant(variant_num, variant_name):
     """Score a single variant"""
-    html = load_html(variant_num, variant_name)
-    
+    return score_html(load_html(variant_num, variant_name))
+
+def score_file(path):
+    """Score one output file (batch mode worker)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return score_html(f.read())
+
+def score_html(html):
+    """All metrics for one output's HTML"""
     # Count evidence citations
     evidence_count, evidence_examples = count_evidence_citations(html)
     
@@ -136,6 +148,7 @@ def score_variant(variant_num, variant_name):
     }
     
     metrics['compositeScore'] = calculate_composite_score(metrics)
+    metrics['scores'] = composite_components(metrics)
     
     return metrics
 
@@ -305,6 +318,19 @@ All HTML outputs saved to: `tests/phase0/outputs/`
     return md
 
 def main():
+    parser = argparse.ArgumentParser(description="Score Phase 0 variant outputs")
+    parser.add_argument("--batch", metavar="DIR",
+                        help="Score every *.html under DIR in a process pool instead of the 5 variants")
+    parser.add_argument("--out", default=str(TEST_DIR / "comparison" / "batch_scores.jsonl"),
+                        help="Batch mode sink (.jsonl, or .csv for flattened metrics)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Outputs per batch work unit")
+    args = parser.parse_args()
+    
+    if args.batch:
+        run_batch(score_file, args.batch, args.out, workers=args.workers, chunk_size=args.chunk_size)
+        return
+    
     print("=" * 70)
     print("📊 PHASE 0 OUTPUT SCORING")
     print("=" * 70)
@@ -7,10 +7,14 @@ Uses same framework as Phase 0 but with enhanced scoring
 
 import json
 import subprocess
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.metrics import StepMetrics, report as report_metrics
+
 # Configuration
 PROMPT_ID = "a0DQH00000KYLsv2AH"
 OPPORTUNITY_ID = "006QH00000HjgvlYAB"
@@ -220,9 +224,12 @@ def main():
     print(f"  Total Variants: {len(VARIANTS)}")
     print(f"  Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    metrics = StepMetrics()
+    
     # Get credentials
     try:
-        creds = get_org_credentials()
+        with metrics.span("token"):
+            creds = get_org_credentials()
         print(f"✅ Connected to org: {creds['instance_url']}")
     except Exception as e:
         print(f"❌ Failed to get credentials: {e}")
@@ -236,8 +243,12 @@ def main():
         print(f"TESTING VARIANT {variant['num']}: {variant['name']}")
         print(f"{'=' * 70}")
         
+        label = f"{variant['num']}_{variant['name']}"
+        
         # Update prompt using Apex Anonymous
-        if not update_prompt_apex(variant["num"], variant["name"]):
+        with metrics.span("sf_cli_update", label):
+            updated = update_prompt_apex(variant["num"], variant["name"])
+        if not updated:
             print(f"⚠️ Skipping execution for Variant {variant['num']}")
             continue
         
@@ -245,14 +256,16 @@ def main():
         time.sleep(3)
         
         # Execute prompt
-        exec_result = execute_prompt_api(variant["num"], variant["name"], creds["access_token"], creds["instance_url"])
+        with metrics.span("execute_prompt", label):
+            exec_result = execute_prompt_api(variant["num"], variant["name"], creds["access_token"], creds["instance_url"])
         
         if not exec_result:
             print(f"⚠️ Skipping query for Variant {variant['num']}")
             continue
         
         # Query response
-        response_data = query_response(variant["num"], variant["name"])
+        with metrics.span("llm", label):
+            response_data = query_response(variant["num"], variant["name"])
         
         if response_data:
             results.append({
@@ -282,6 +295,7 @@ def main():
         json.dump(results, f, indent=2)
     
     print(f"\n✅ All tests complete! Results saved to tests/phase0b/outputs/")
+    report_metrics(metrics, "tests/phase0b/outputs", "phase0b", creds["instance_url"])
     print(f"📊 Next: Run score_phase0b_outputs.py to analyze quality")
 
 if __name__ == "__main__":
@@ -4,11 +4,17 @@ Phase 0B Test Execution - Using REST API (working approach from Phase 0)
 """
 
 import json
-import subprocess
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.metrics import report as report_metrics
+from harness.polling import utc_now, wait_for_prompt_response
+from harness.responses import extract_html
+from harness.sf_client import SalesforceClient, SalesforceError
+
 # Configuration
 PROMPT_ID = "a0DQH00000KYLsv2AH"
 OPP_ID = "006QH00000HjgvlYAB"
@@ -24,30 +30,11 @@ VARIANTS = [
     (20, "account360_enhanced")
 ]
 
-def run_command(cmd, timeout=60):
-    """Run shell command"""
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Timeout"
-
-def get_credentials():
-    """Get Salesforce credentials"""
-    cmd = f"sf org display -o {ORG_ALIAS} --json"
-    success, stdout, stderr = run_command(cmd)
-    if not success:
-        raise Exception("Failed to get credentials")
-    data = json.loads(stdout)
-    return data['result']['accessToken'], data['result']['instanceUrl']
+def get_client():
+    """Get a pooled Salesforce REST client (credentials fetched once)"""
+    return SalesforceClient.from_cli(ORG_ALIAS)
 
-def update_prompt_rest(variant_num, variant_name, access_token, instance_url):
+def update_prompt_rest(variant_num, variant_name, client):
     """Update prompt via REST API"""
     variant_file = TEST_DIR / "variants" / f"variant_{variant_num}_{variant_name}.txt"
     
@@ -56,73 +43,46 @@ def update_prompt_rest(variant_num, variant_name, access_token, instance_url):
     
     print(f"   Variant size: {len(prompt_text)} characters")
     
-    # Create payload
-    payload = {"ccai__Prompt_Command__c": prompt_text}
-    payload_file = "/tmp/prompt_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
-    
-    # REST API update
-    url = f"{instance_url}/services/data/v65.0/sobjects/ccai__AI_Prompt__c/{PROMPT_ID}"
-    cmd = f'curl -s -X PATCH "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
-    
-    success, stdout, stderr = run_command(cmd, timeout=60)
-    
-    if success and (not stdout or stdout.strip() == ""):
-        # Empty response means success in PATCH
-        print("   ✅ Prompt updated via REST API")
-        return True
-    else:
-        print(f"   ❌ Update failed: {stdout[:200]}")
+    try:
+        client.update_prompt_command(PROMPT_ID, prompt_text)
+    except SalesforceError as e:
+        print(f"   ❌ Update failed: {str(e)[:200]}")
         return False
-
-def execute_prompt_api(variant_num, access_token, instance_url):
-    """Execute prompt via API"""
-    url = f"{instance_url}/services/apexrest/ccai/v1/executePrompt"
-    
-    payload = {
-        "promptRequestId": PROMPT_REQUEST_ID,
-        "recordId": OPP_ID,
-        "customPromptCommand": ""
-    }
-    
-    payload_file = "/tmp/execute_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
     
-    cmd = f'curl -s -X POST "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
-    
-    success, stdout, stderr = run_command(cmd, timeout=120)
+    print("   ✅ Prompt updated via REST API")
+    return True
+
+def execute_prompt_api(variant_num, client):
+    """Execute prompt via API (returns the executePrompt response, or None)"""
+    try:
+        execution = client.execute_prompt(PROMPT_REQUEST_ID, OPP_ID, timeout=120)
+    except SalesforceError as e:
+        print(f"   ⚠️  API call failed: {str(e)[:200]}")
+        return None
     
-    if success:
-        print("   ✅ API called")
-        return True
-    else:
-        print(f"   ⚠️  API call failed")
-        return False
+    print("   ✅ API called")
+    return execution
 
-def query_response(variant_num, variant_name):
+def query_response(variant_num, variant_name, client, execution, started_at, started):
     """Query AI response"""
-    # Wait for processing
-    print("   ⏳ Waiting 20 seconds for AI processing...")
-    time.sleep(20)
-    
-    query = f"SELECT Id, ccai__Status__c, ccai__AI_Processed_Data_No_PII__c FROM ccai__AI_Response__c WHERE ccai__AI_Prompt__c = '{PROMPT_ID}' AND ccai__Record_Id__c = '{OPP_ID}' ORDER BY CreatedDate DESC LIMIT 1"
-    
-    cmd = f'sf data query -q "{query}" -o {ORG_ALIAS} --json'
-    success, stdout, stderr = run_command(cmd, timeout=60)
-    
-    if not success:
-        print(f"   ❌ Query failed")
+    # Wait for processing (polls until the response is terminal instead of a fixed 20s)
+    print("   ⏳ Waiting for AI processing...")
+    # The response is looked up by the responseId executePrompt returned, and its body is
+    # downloaded once when it completes
+    try:
+        _, record = wait_for_prompt_response(client, PROMPT_ID, OPP_ID, response_id=execution.get('responseId'),
+                                             created_after=started_at, started=started, timeout=120)
+    except SalesforceError as e:
+        print(f"   ❌ Polling failed: {str(e)[:200]}")
         return None
+    client.metrics.observe("llm", time.monotonic() - started, f"{variant_num}_{variant_name}")
+    print(f"   Waited {time.monotonic() - started:.1f}s")
     
     try:
-        result = json.loads(stdout)
-        if not result.get('result', {}).get('records'):
+        if not record:
             print("   ❌ No response record found")
             return None
         
-        record = result['result']['records'][0]
         response_id = record['Id']
         status = record['ccai__Status__c']
         
@@ -137,14 +97,11 @@ def query_response(variant_num, variant_name):
             json.dump(record, f, indent=2)
         
         # Extract HTML
-        processed_data_str = record.get('ccai__AI_Processed_Data_No_PII__c')
-        if not processed_data_str:
+        html_content = extract_html(record)
+        if not html_content:
             print("   ⚠️ No processed data found")
             return None
         
-        processed_data = json.loads(processed_data_str)
-        html_content = processed_data['data']['value']['choices'][0]['message']['content']
-        
         # Save HTML
         html_file = output_dir / f"output_{variant_num}_{variant_name}.html"
         with open(html_file, 'w') as f:
@@ -173,8 +130,8 @@ def main():
     # Get credentials
     print("🔑 Getting credentials...")
     try:
-        access_token, instance_url = get_credentials()
-        print(f"✅ Connected to: {instance_url}\n")
+        client = get_client()
+        print(f"✅ Connected to: {client.instance_url}\n")
     except Exception as e:
         print(f"❌ Failed: {e}")
         return
@@ -188,7 +145,7 @@ def main():
         
         # Update prompt
         print(f"📝 Updating prompt...")
-        if not update_prompt_rest(variant_num, variant_name, access_token, instance_url):
+        if not update_prompt_rest(variant_num, variant_name, client):
             print(f"⚠️ Skipping Variant {variant_num}\n")
             continue
         
@@ -196,13 +153,16 @@ def main():
         
         # Execute
         print(f"🚀 Executing prompt...")
-        if not execute_prompt_api(variant_num, access_token, instance_url):
+        started_at = utc_now()
+        started = time.monotonic()
+        execution = execute_prompt_api(variant_num, client)
+        if execution is None:
             print(f"⚠️ Skipping Variant {variant_num}\n")
             continue
         
         # Query response
         print(f"📊 Querying response...")
-        response_data = query_response(variant_num, variant_name)
+        response_data = query_response(variant_num, variant_name, client, execution, started_at, started)
         
         if response_data:
             results.append({
@@ -229,6 +189,7 @@ def main():
         json.dump(results, f, indent=2)
     
     print(f"\n✅ Saved to: {summary_file}")
+    report_metrics(client.metrics, TEST_DIR / "outputs", "phase0b_v2", client.instance_url)
     print(f"📊 Next: Run score_phase0b_outputs.py")
 
 if __name__ == "__main__":
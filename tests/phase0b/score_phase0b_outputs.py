@@ -7,12 +7,97 @@ Total: 10 dimensions for comprehensive quality evaluation
 
 import json
 import re
+import sys
+import argparse
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.batch_scoring import DEFAULT_CHUNK_SIZE, run_batch
+from harness.html_features import HtmlFeatures
+from harness.streaming import DEFAULT_CHUNK_CHARS, StreamingFeatures, record_queries
+
 # Load outputs
 OUTPUT_DIR = Path("tests/phase0b/outputs")
 
+# UI component patterns (counted, case-insensitive)
+UI_COMPONENT_PATTERNS = {
+    "stat_cards": r'flex:\s*1\s+1\s+calc\((?:25|33)%',
+    "alert_boxes": r'border-left:\s*[46]px\s+solid\s+#(?:dc3545|FF9800|28a745)',
+    "progress_bars": r'height:\s*1?[0-9]px.*border-radius:\s*6px',
+    "tables": r'<table',
+    "gradients": r'linear-gradient',
+    "cards": r'box-shadow:\s*0\s+[12]px',
+    "badges": r'padding:\s*[46]px\s+12px.*border-radius:\s*4px',
+}
+
+# Analytical depth indicators (present/absent, case-insensitive)
+ANALYTICAL_PATTERNS = {
+    "risk": r'risk|critical|warning',
+    "recommendation": r'action|recommend|should|must',
+    "impact": r'impact|affect|result|consequence',
+    "diagnosis": r'gap|missing|weakness|strength|indicator',
+    "synthesis": r'summary|overall|health|assessment',
+}
+
+# Analytical pattern indicators (present/absent, case-insensitive)
+PATTERN_INDICATORS = {
+    "risk_assessment": r'CRITICAL|WARNING|POSITIVE|risk assessment',
+    "next_best_action": r'action|priority:|owner:|deadline:',
+    "metrics_calculation": r'total|count|average|sum|distribution',
+    "timeline_analysis": r'overdue|days|upcoming|velocity|progression',
+    "stakeholder_analysis": r'contact|stakeholder|champion|buyer|role',
+}
+
+# Pattern-specific output formats (case-sensitive)
+RISK_CARD_PATTERN = r'border-left:[46]px solid #(?:dc3545|FF9800)'
+ACTION_STRUCTURE_PATTERN = r'Why:.*Impact:.*Owner:'
+PROGRESS_BAR_PATTERN = r'height:1[0-9]px.*width:\d+%'
+
+EVIDENCE_PATTERNS = [
+    r'Evidence:.*?=',
+    r'\(Evidence:',
+    r'based on.*?=',
+    r'shows.*?=',
+    r'indicates.*?='
+]
+
+# Forbidden generic phrases
+FORBIDDEN_PATTERNS = [
+    r'ensure alignment',
+    r'consider scheduling',
+    r'maintain momentum',
+    r'engage stakeholders',
+    r'follow up with',
+    r'reach out to'
+]
+
+# Design elements (present/absent, case-sensitive)
+ELEGANCE_PATTERNS = {
+    "large_numbers": r'font-size:\s*(?:3[2-9]|4[0-9])px',
+    "semantic_colors": r'#(?:dc3545|FF9800|28a745)',
+    "shadows": r'box-shadow',
+    "gradients": r'linear-gradient',
+    "spacing_rhythm": r'gap:\s*1[0-9]px',
+    "border_accents": r'border-left:\s*[46]px',
+    "rounded_corners": r'border-radius:\s*[468]px',
+    "typography_hierarchy": r'font-size:\s*(?:12|14|16|20|32|42)px',
+}
+
+PLACEHOLDER_PATTERN = r'\[.*?\]|TBD|TODO|null|undefined'
+COACHING_TONE_PATTERN = r'action|recommend|should|priority|next step'
+ACTION_COUNT_PATTERN = r'action|recommend|should|must|priority'
+BUSINESS_CONTEXT_PATTERN = r'revenue|cost|ROI|value|impact|risk'
+
+# Every pattern above; their literal prefixes are located in one pass per output
+SCORER_PATTERNS = [
+    *UI_COMPONENT_PATTERNS.values(), *ANALYTICAL_PATTERNS.values(), *PATTERN_INDICATORS.values(),
+    RISK_CARD_PATTERN, ACTION_STRUCTURE_PATTERN, PROGRESS_BAR_PATTERN,
+    *EVIDENCE_PATTERNS, *FORBIDDEN_PATTERNS, *ELEGANCE_PATTERNS.values(),
+    PLACEHOLDER_PATTERN, COACHING_TONE_PATTERN, ACTION_COUNT_PATTERN, BUSINESS_CONTEXT_PATTERN,
+]
+
 def load_outputs():
     """Load all HTML outputs"""
     outputs = {}
@@ -22,21 +107,17 @@ def load_outputs():
             outputs[variant_num] = f.read()
     return outputs
 
-def count_pattern(text, pattern):
+def extract_features(html):
+    """Scan an output once; every dimension below reads from the result"""
+    return HtmlFeatures(html, SCORER_PATTERNS)
+
+def count_pattern(features, pattern):
     """Count occurrences of a regex pattern"""
-    return len(re.findall(pattern, text, re.IGNORECASE))
+    return features.count(pattern)
 
-def count_ui_components(html):
+def count_ui_components(features):
     """Count different types of UI components used"""
-    components = {
-        "stat_cards": count_pattern(html, r'flex:\s*1\s+1\s+calc\((?:25|33)%'),
-        "alert_boxes": count_pattern(html, r'border-left:\s*[46]px\s+solid\s+#(?:dc3545|FF9800|28a745)'),
-        "progress_bars": count_pattern(html, r'height:\s*1?[0-9]px.*border-radius:\s*6px'),
-        "tables": count_pattern(html, r'<table'),
-        "gradients": count_pattern(html, r'linear-gradient'),
-        "cards": count_pattern(html, r'box-shadow:\s*0\s+[12]px'),
-        "badges": count_pattern(html, r'padding:\s*[46]px\s+12px.*border-radius:\s*4px'),
-    }
+    components = {name: count_pattern(features, pattern) for name, pattern in UI_COMPONENT_PATTERNS.items()}
     
     # Count distinct component types used
     distinct_types = sum(1 for count in components.values() if count > 0)
@@ -47,12 +128,12 @@ def count_ui_components(html):
         "total_components": sum(components.values())
     }
 
-def assess_visual_diversity(html):
+def assess_visual_diversity(features):
     """
     Visual Diversity Score (1-10)
     How many different UI components used effectively?
     """
-    ui_analysis = count_ui_components(html)
+    ui_analysis = count_ui_components(features)
     distinct = ui_analysis["distinct_types"]
     
     # Scoring
@@ -77,30 +158,23 @@ def assess_visual_diversity(html):
                     f"Tables: {ui_analysis['components']['tables']}"
     }
 
-def assess_analytical_depth(html):
+def assess_analytical_depth(features):
     """
     Analytical Depth Score (1-10)
     Goes beyond data display to actual insights and diagnosis
     """
     # Look for analytical indicators
-    has_risk_section = bool(re.search(r'risk|critical|warning', html, re.IGNORECASE))
-    has_recommendation = bool(re.search(r'action|recommend|should|must', html, re.IGNORECASE))
-    has_impact_analysis = bool(re.search(r'impact|affect|result|consequence', html, re.IGNORECASE))
-    has_diagnosis = bool(re.search(r'gap|missing|weakness|strength|indicator', html, re.IGNORECASE))
-    has_synthesis = bool(re.search(r'summary|overall|health|assessment', html, re.IGNORECASE))
+    found = {name: features.search(pattern) for name, pattern in ANALYTICAL_PATTERNS.items()}
+    has_risk_section = found["risk"]
+    has_recommendation = found["recommendation"]
+    has_impact_analysis = found["impact"]
     
     # Count sections beyond just data tables
-    analytical_sections = sum([
-        has_risk_section,
-        has_recommendation,
-        has_impact_analysis,
-        has_diagnosis,
-        has_synthesis
-    ])
+    analytical_sections = sum(found.values())
     
     # Check if it's mostly tables or has analytical content
-    table_count = count_pattern(html, r'<table')
-    total_length = len(html)
+    table_count = features.tag_count("table")
+    total_length = features.size
     
     # If output is >80% table content, lower score
     if table_count > 3 and total_length < 15000:
@@ -118,26 +192,20 @@ def assess_analytical_depth(html):
                     f"Risk analysis: {has_risk_section}, Recommendations: {has_recommendation}"
     }
 
-def assess_pattern_application(html):
+def assess_pattern_application(features):
     """
     Pattern Application Score (1-10)
     Are analytical patterns triggered and used correctly?
     """
     # Check for pattern indicators
-    patterns_found = {
-        "risk_assessment": bool(re.search(r'CRITICAL|WARNING|POSITIVE|risk assessment', html, re.IGNORECASE)),
-        "next_best_action": bool(re.search(r'action|priority:|owner:|deadline:', html, re.IGNORECASE)),
-        "metrics_calculation": bool(re.search(r'total|count|average|sum|distribution', html, re.IGNORECASE)),
-        "timeline_analysis": bool(re.search(r'overdue|days|upcoming|velocity|progression', html, re.IGNORECASE)),
-        "stakeholder_analysis": bool(re.search(r'contact|stakeholder|champion|buyer|role', html, re.IGNORECASE)),
-    }
+    patterns_found = {name: features.search(pattern) for name, pattern in PATTERN_INDICATORS.items()}
     
     patterns_count = sum(patterns_found.values())
     
     # Check for pattern-specific output formats
-    has_risk_cards = bool(re.search(r'border-left:[46]px solid #(?:dc3545|FF9800)', html))
-    has_action_structure = bool(re.search(r'Why:.*Impact:.*Owner:', html, re.DOTALL))
-    has_progress_bars = bool(re.search(r'height:1[0-9]px.*width:\d+%', html))
+    has_risk_cards = features.search(RISK_CARD_PATTERN, 0)
+    has_action_structure = features.search(ACTION_STRUCTURE_PATTERN, re.DOTALL)
+    has_progress_bars = features.search(PROGRESS_BAR_PATTERN, 0)
     
     format_compliance = sum([has_risk_cards, has_action_structure, has_progress_bars])
     
@@ -152,33 +220,16 @@ def assess_pattern_application(html):
                     f"Format compliance: {format_compliance}/3"
     }
 
-def assess_evidence_binding(html):
+def assess_evidence_binding(features):
     """
     Evidence Binding Score (1-10) - From Phase 0
     Specific field citations
     """
     # Count evidence citations
-    evidence_patterns = [
-        r'Evidence:.*?=',
-        r'\(Evidence:',
-        r'based on.*?=',
-        r'shows.*?=',
-        r'indicates.*?='
-    ]
-    
-    citations = sum(count_pattern(html, pattern) for pattern in evidence_patterns)
+    citations = sum(count_pattern(features, pattern) for pattern in EVIDENCE_PATTERNS)
     
     # Count forbidden generic phrases
-    forbidden = [
-        r'ensure alignment',
-        r'consider scheduling',
-        r'maintain momentum',
-        r'engage stakeholders',
-        r'follow up with',
-        r'reach out to'
-    ]
-    
-    generic_count = sum(count_pattern(html, phrase) for phrase in forbidden)
+    generic_count = sum(count_pattern(features, phrase) for phrase in FORBIDDEN_PATTERNS)
     
     # Scoring
     evidence_score = min(citations / 3, 10)  # 1 point per 3 citations, max 10
@@ -194,31 +245,19 @@ def assess_evidence_binding(html):
                     f"Strong evidence binding." if citations > 10 else "Limited evidence citations."
     }
 
-def assess_ui_elegance(html):
+def assess_ui_elegance(features):
     """
     UI/UX Elegance Score (1-10)
     Visual hierarchy, sophistication, elegance
     """
     # Check for sophisticated design elements
-    has_large_numbers = bool(re.search(r'font-size:\s*(?:3[2-9]|4[0-9])px', html))
-    has_semantic_colors = bool(re.search(r'#(?:dc3545|FF9800|28a745)', html))
-    has_shadows = bool(re.search(r'box-shadow', html))
-    has_gradients = bool(re.search(r'linear-gradient', html))
-    has_spacing_rhythm = bool(re.search(r'gap:\s*1[0-9]px', html))
-    has_border_accents = bool(re.search(r'border-left:\s*[46]px', html))
-    has_rounded_corners = bool(re.search(r'border-radius:\s*[468]px', html))
-    has_typography_hierarchy = bool(re.search(r'font-size:\s*(?:12|14|16|20|32|42)px', html))
-    
-    elegance_indicators = sum([
-        has_large_numbers,
-        has_semantic_colors,
-        has_shadows,
-        has_gradients,
-        has_spacing_rhythm,
-        has_border_accents,
-        has_rounded_corners,
-        has_typography_hierarchy
-    ])
+    found = {name: features.search(pattern, 0) for name, pattern in ELEGANCE_PATTERNS.items()}
+    has_large_numbers = found["large_numbers"]
+    has_semantic_colors = found["semantic_colors"]
+    has_shadows = found["shadows"]
+    has_gradients = found["gradients"]
+    
+    elegance_indicators = sum(found.values())
     
     score = min(elegance_indicators * 1.25, 10)
     
@@ -232,40 +271,40 @@ def assess_ui_elegance(html):
                     f"Large numbers: {has_large_numbers}, Shadows: {has_shadows}, Gradients: {has_gradients}"
     }
 
-def calculate_phase0b_metrics(html):
+def calculate_phase0b_metrics(features):
     """Calculate Phase 0B custom metrics (5 new dimensions)"""
     return {
-        "visual_diversity": assess_visual_diversity(html),
-        "analytical_depth": assess_analytical_depth(html),
-        "pattern_application": assess_pattern_application(html),
-        "evidence_binding": assess_evidence_binding(html),
-        "ui_elegance": assess_ui_elegance(html)
+        "visual_diversity": assess_visual_diversity(features),
+        "analytical_depth": assess_analytical_depth(features),
+        "pattern_application": assess_pattern_application(features),
+        "evidence_binding": assess_evidence_binding(features),
+        "ui_elegance": assess_ui_elegance(features)
     }
 
-def assess_stage12_dimensions(html):
+def assess_stage12_dimensions(features):
     """
     Assess Stage12 dimensions (simulated - would normally call Claude AI)
     For now, use heuristics based on content analysis
     """
     
     # Visual Quality (1-10)
-    ui_analysis = count_ui_components(html)
+    ui_analysis = count_ui_components(features)
     visual_quality = min(5 + ui_analysis["distinct_types"], 10)
     
     # Data Accuracy (1-10) - Assume high if no placeholders/nulls
-    has_placeholders = bool(re.search(r'\[.*?\]|TBD|TODO|null|undefined', html))
+    has_placeholders = features.search(PLACEHOLDER_PATTERN, 0)
     data_accuracy = 8 if not has_placeholders else 5
     
     # Persona Fit (1-10) - Sales Rep persona
-    has_coaching_tone = bool(re.search(r'action|recommend|should|priority|next step', html, re.IGNORECASE))
+    has_coaching_tone = features.search(COACHING_TONE_PATTERN)
     persona_fit = 8 if has_coaching_tone else 6
     
     # Actionability (1-10)
-    action_count = count_pattern(html, r'action|recommend|should|must|priority')
+    action_count = count_pattern(features, ACTION_COUNT_PATTERN)
     actionability = min(5 + (action_count // 3), 10)
     
     # Business Value (1-10)
-    has_business_context = bool(re.search(r'revenue|cost|ROI|value|impact|risk', html, re.IGNORECASE))
+    has_business_context = features.search(BUSINESS_CONTEXT_PATTERN)
     business_value = 8 if has_business_context else 6
     
     return {
@@ -281,11 +320,43 @@ def score_variant(variant_num, html):
     """Score a single variant across all 10 dimensions"""
     print(f"\n📊 Scoring Variant {variant_num}...")
     
+    result = {"variant_num": variant_num, **score_html(html)}
+    
+    print(f"  Phase 0B Score: {result['phase0b_avg']:.1f}/10")
+    print(f"  Stage12 Score: {result['stage12_avg']:.1f}/10")
+    print(f"  Overall Composite: {result['overall_composite']:.1f}/100")
+    
+    return result
+
+def score_file(path):
+    """Score one output file (batch mode worker)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return score_html(f.read())
+
+def score_file_streaming(path, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """score_file in bounded memory: the output is read in chunks, never whole"""
+    return score_features(StreamingFeatures.from_file(path, stream_queries(), chunk_chars))
+
+_stream_queries = None
+
+def stream_queries():
+    """The (pattern, flags, kind) queries score_features makes, recorded once per process"""
+    global _stream_queries
+    if _stream_queries is None:
+        _stream_queries = record_queries(score_features)
+    return _stream_queries
+
+def score_html(html):
+    """All 10 dimensions for one output's HTML"""
+    return score_features(extract_features(html))
+
+def score_features(features):
+    """All 10 dimensions from an output's features (HtmlFeatures or StreamingFeatures)"""
     # Phase 0B custom metrics (5 new dimensions)
-    phase0b_metrics = calculate_phase0b_metrics(html)
+    phase0b_metrics = calculate_phase0b_metrics(features)
     
     # Stage12 dimensions (5 core dimensions)
-    stage12_metrics = assess_stage12_dimensions(html)
+    stage12_metrics = assess_stage12_dimensions(features)
     
     # Calculate composite scores
     phase0b_avg = sum([
@@ -301,12 +372,7 @@ def score_variant(variant_num, html):
     # Overall composite (all 10 dimensions, converted to 0-100 scale)
     overall_composite = ((phase0b_avg + stage12_avg) / 2) * 10
     
-    print(f"  Phase 0B Score: {phase0b_avg:.1f}/10")
-    print(f"  Stage12 Score: {stage12_avg:.1f}/10")
-    print(f"  Overall Composite: {overall_composite:.1f}/100")
-    
     return {
-        "variant_num": variant_num,
         "phase0b_metrics": phase0b_metrics,
         "stage12_metrics": stage12_metrics,
         "phase0b_avg": round(phase0b_avg, 2),
@@ -410,6 +476,23 @@ def generate_markdown_report(all_results):
 
 def main():
     """Main scoring execution"""
+    parser = argparse.ArgumentParser(description="Score Phase 0B variant outputs")
+    parser.add_argument("--batch", metavar="DIR",
+                        help="Score every *.html under DIR in a process pool instead of tests/phase0b/outputs")
+    parser.add_argument("--out", default="tests/phase0b/comparison/batch_scores.jsonl",
+                        help="Batch mode sink (.jsonl, or .csv for flattened metrics)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Outputs per batch work unit")
+    parser.add_argument("--stream", action="store_true",
+                        help="Batch mode: read each output in chunks (bounded memory for multi-MB outputs)")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS, help="Streaming read size")
+    args = parser.parse_args()
+    
+    if args.batch:
+        scorer = partial(score_file_streaming, chunk_chars=args.chunk_chars) if args.stream else score_file
+        run_batch(scorer, args.batch, args.out, workers=args.workers, chunk_size=args.chunk_size)
+        return
+    
     print("=" * 70)
     print("PHASE 0B: SCORING & ANALYSIS")
     print("=" * 70)
@@ -4,16 +4,24 @@ Phase 0C Test Execution - Comprehensive Pattern Testing
 Executes all 19 variants (7 pattern tests + 8 UI tests + 4 combinations)
 """
 
+import argparse
 import json
-import subprocess
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.executor import DEFAULT_CONCURRENCY, VariantExecutor, parse_record_ids
+from harness.journal import RunJournal, journal_path, latest_journal, new_journal_name
+from harness.merge_fields import DEFAULT_SNAPSHOT_FILE, DCMSnapshot, preflight, print_report
+from harness.metrics import report as report_metrics
+from harness.response_cache import CACHE_MODES, ResponseCache
+from harness.sf_client import SalesforceClient
+
 # Configuration
-PROMPT_ID = "a0DQH00000KYLsv2AH"
+PROMPT_ID = "a0DQH00000KYLsv2AH"  # Template - each variant runs on its own clone
 OPP_ID = "006QH00000HjgvlYAB"
-PROMPT_REQUEST_ID = "e6e00b0d8e81c6b1976ac4e458a131ed4e951"
 ORG_ALIAS = "agentictso"
 TEST_DIR = Path("tests/phase0c")
 
@@ -43,232 +51,206 @@ VARIANTS = [
     (39, "three_pattern_test")
 ]
 
-def run_command(cmd, timeout=60):
-    """Run shell command"""
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Timeout"
+def get_client(pool_size=DEFAULT_CONCURRENCY):
+    """Get a pooled Salesforce REST client (credentials fetched once)"""
+    return SalesforceClient.from_cli(ORG_ALIAS, pool_size=max(pool_size, DEFAULT_CONCURRENCY))
 
-def get_credentials():
-    """Get Salesforce credentials"""
-    cmd = f"sf org display -o {ORG_ALIAS} --json"
-    success, stdout, stderr = run_command(cmd)
-    if not success:
-        raise Exception("Failed to get credentials")
-    data = json.loads(stdout)
-    return data['result']['accessToken'], data['result']['instanceUrl']
+def get_run_sample_ids(client, run_id):
+    """Sample records of a pipeline run (PF_Run__c.Sample_Record_Ids__c)"""
+    records = client.query(f"SELECT Sample_Record_Ids__c, Sample_Record_Id__c FROM PF_Run__c WHERE Id = '{run_id}'")
+    if not records:
+        return []
+    return parse_record_ids(records[0].get('Sample_Record_Ids__c') or records[0].get('Sample_Record_Id__c'))
 
-def update_prompt_rest(variant_num, variant_name, access_token, instance_url):
-    """Update prompt via REST API"""
-    variant_file = TEST_DIR / "variants" / f"variant_{variant_num}_{variant_name}.txt"
-    
-    if not variant_file.exists():
-        print(f"   ❌ Variant file not found: {variant_file}")
-        return False
+def load_variants():
+    """Read every variant's prompt text, skipping missing files"""
+    variants = []
+    for variant_num, variant_name in VARIANTS:
+        variant_file = TEST_DIR / "variants" / f"variant_{variant_num}_{variant_name}.txt"
+        
+        if not variant_file.exists():
+            print(f"   ❌ Variant file not found: {variant_file}")
+            continue
+        
+        with open(variant_file, 'r') as f:
+            variants.append({
+                "variant_num": variant_num,
+                "variant_name": variant_name,
+                "prompt_text": f.read()
+            })
+    return variants
+
+def save_output(result, per_record=False, run_id=None):
+    """Save the response record and HTML for a finished variant (or grid cell)"""
+    variant_num = result["variant_num"]
+    variant_name = result["variant_name"]
+    label = f"V{variant_num} {variant_name}" + (f" @ {result['record_id']}" if per_record else "")
     
-    with open(variant_file, 'r') as f:
-        prompt_text = f.read()
+    output_dir = TEST_DIR / "outputs"
+    if per_record:
+        # Grid runs stream one line per cell as it lands, plus per-record output files.
+        # Rows carry the run's journal id (shared by its resumes) so runs can be told apart.
+        output_dir = output_dir / "records"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_dir / "grid_results.jsonl", 'a') as f:
+            f.write(json.dumps({"run_id": run_id, "recorded_at": datetime.now().isoformat(timespec='seconds'),
+                                **{k: result.get(k) for k in (
+                                    "variant_num", "variant_name", "record_id", "response_id",
+                                    "status", "html_size", "elapsed_seconds", "error")}}) + "\n")
+        output_dir = output_dir / result["record_id"]
     
-    print(f"   Variant size: {len(prompt_text)} characters")
+    if result.get("error") or not result.get("html"):
+        reason = result.get("error") or f"no HTML (status: {result.get('status')})"
+        print(f"   ❌ {label}: {reason}")
+        return
     
-    # Create payload
-    payload = {"ccai__Prompt_Command__c": prompt_text}
-    payload_file = "/tmp/prompt_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
-    # REST API update
-    url = f"{instance_url}/services/data/v65.0/sobjects/ccai__AI_Prompt__c/{PROMPT_ID}"
-    cmd = f'curl -s -X PATCH "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
+    output_file = output_dir / f"output_{variant_num}_{variant_name}.json"
+    with open(output_file, 'w') as f:
+        json.dump(result["record"], f, indent=2)
     
-    success, stdout, stderr = run_command(cmd, timeout=60)
+    html_file = output_dir / f"output_{variant_num}_{variant_name}.html"
+    with open(html_file, 'w') as f:
+        f.write(result["html"])
     
-    if success and (not stdout or stdout.strip() == ""):
-        # Empty response means success in PATCH
-        print("   ✅ Prompt updated via REST API")
-        return True
+    if result.get("cached"):
+        source = "cached"
+    elif result.get("resumed"):
+        source = "resumed"
     else:
-        print(f"   ❌ Update failed: {stdout[:200]}")
-        return False
+        source = f"{result['elapsed_seconds']:.0f}s"
+    print(f"   ✅ {label}: {result['status']} | "
+          f"{result['html_size']:,} bytes | {source}")
 
-def execute_prompt_api(variant_num, access_token, instance_url):
-    """Execute prompt via API"""
-    url = f"{instance_url}/services/apexrest/ccai/v1/executePrompt"
-    
-    payload = {
-        "promptRequestId": PROMPT_REQUEST_ID,
-        "recordId": OPP_ID,
-        "customPromptCommand": ""
-    }
-    
-    payload_file = "/tmp/execute_payload.json"
-    with open(payload_file, 'w') as f:
-        json.dump(payload, f)
-    
-    cmd = f'curl -s -X POST "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @{payload_file}'
-    
-    success, stdout, stderr = run_command(cmd, timeout=120)
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Run the Phase 0C variant matrix")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="variant/record cells in flight at once (default: %(default)s)")
+    parser.add_argument("--records", metavar="IDS",
+                        help="comma-separated sample record ids to fan each variant out over")
+    parser.add_argument("--records-from-run", metavar="RUN_ID",
+                        help="use Sample_Record_Ids__c of a PF_Run__c as the sample records")
+    parser.add_argument("--keep-clones", action="store_true",
+                        help="keep the per-variant prompt clones for inspection")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="auto",
+                        help="response cache: auto (read-through), record, replay or off")
+    parser.add_argument("--fresh", action="store_true",
+                        help="bypass cached responses and record fresh samples")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="JOURNAL",
+                        help="resume a journaled run (default: the most recent one)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run's step latencies as the outlier baseline")
+    parser.add_argument("--dcm-snapshot", default=str(DEFAULT_SNAPSHOT_FILE),
+                        help="DCM snapshot for the merge-field pre-flight (skipped if missing)")
+    args = parser.parse_args()
+    cache = ResponseCache(mode="record" if args.fresh else args.cache_mode)
     
-    if success:
-        print("   ✅ API called")
-        return True
+    if args.resume == "latest":
+        journal_file = latest_journal("phase0c")
+        if journal_file is None:
+            print("❌ No phase0c journal to resume")
+            return
+    elif args.resume:
+        journal_file = journal_path(args.resume)
     else:
-        print(f"   ⚠️  API call failed")
-        return False
-
-def query_response(variant_num, variant_name):
-    """Query AI response"""
-    # Wait for processing
-    print("   ⏳ Waiting 20 seconds for AI processing...")
-    time.sleep(20)
-    
-    query = f"SELECT Id, ccai__Status__c, ccai__AI_Processed_Data_No_PII__c FROM ccai__AI_Response__c WHERE ccai__AI_Prompt__c = '{PROMPT_ID}' AND ccai__Record_Id__c = '{OPP_ID}' ORDER BY CreatedDate DESC LIMIT 1"
-    
-    cmd = f'sf data query -q "{query}" -o {ORG_ALIAS} --json'
-    success, stdout, stderr = run_command(cmd, timeout=60)
+        journal_file = journal_path(new_journal_name("phase0c"))
+    journal = RunJournal(journal_file)
     
-    if not success:
-        print(f"   ❌ Query failed")
-        return None
-    
-    try:
-        result = json.loads(stdout)
-        if not result.get('result', {}).get('records'):
-            print("   ❌ No response record found")
-            return None
-        
-        record = result['result']['records'][0]
-        response_id = record['Id']
-        status = record['ccai__Status__c']
-        
-        print(f"   ✅ Found response: {response_id} (Status: {status})")
-        
-        # Save full record
-        output_dir = TEST_DIR / "outputs"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        output_file = output_dir / f"output_{variant_num}_{variant_name}.json"
-        with open(output_file, 'w') as f:
-            json.dump(record, f, indent=2)
-        
-        # Extract HTML
-        processed_data_str = record.get('ccai__AI_Processed_Data_No_PII__c')
-        if not processed_data_str:
-            print("   ⚠️ No processed data found")
-            return None
-        
-        processed_data = json.loads(processed_data_str)
-        html_content = processed_data['data']['value']['choices'][0]['message']['content']
-        
-        # Save HTML
-        html_file = output_dir / f"output_{variant_num}_{variant_name}.html"
-        with open(html_file, 'w') as f:
-            f.write(html_content)
-        
-        html_size = len(html_content)
-        print(f"   ✅ Saved output ({html_size:,} bytes)")
-        
-        return {
-            "response_id": response_id,
-            "status": status,
-            "html_size": html_size
-        }
-    
-    except Exception as e:
-        print(f"   ❌ Error processing response: {e}")
-        return None
-
-def main():
-    """Main execution"""
     print("=" * 70)
     print("PHASE 0C: COMPREHENSIVE PATTERN TESTING")
     print("=" * 70)
     print(f"Total Variants: {len(VARIANTS)}")
+    print(f"Concurrency: {args.concurrency}")
+    print(f"Response cache: {cache.mode}")
+    print(f"Journal: {journal_file.stem}" + (f" (resuming: {journal.summary()})" if args.resume else ""))
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
     # Get credentials
     print("🔑 Getting credentials...")
     try:
-        access_token, instance_url = get_credentials()
-        print(f"✅ Connected to: {instance_url}\n")
+        client = get_client(args.concurrency)
+        print(f"✅ Connected to: {client.instance_url}\n")
     except Exception as e:
         print(f"❌ Failed: {e}")
         return
     
-    results = []
+    record_ids = [OPP_ID]
+    if args.records_from_run:
+        record_ids = get_run_sample_ids(client, args.records_from_run)
+    elif args.records:
+        record_ids = parse_record_ids(args.records)
+    if not record_ids:
+        print("❌ No valid sample record ids")
+        return
+    per_record = len(record_ids) > 1
+    
+    variants = load_variants()
+    if Path(args.dcm_snapshot).exists():
+        # Reject broken merge fields here instead of after an executePrompt round trip
+        variants, rejected = preflight(variants, DCMSnapshot.load(args.dcm_snapshot))
+        for variant in rejected:
+            print_report(f"V{variant['variant_num']} {variant['variant_name']}", variant["preflight"])
+        if rejected:
+            print(f"⚠️  Pre-flight rejected {len(rejected)} variant(s)\n")
     start_time = time.time()
     
-    for idx, (variant_num, variant_name) in enumerate(VARIANTS, 1):
-        print(f"{'=' * 70}")
-        print(f"VARIANT {variant_num}: {variant_name} ({idx}/{len(VARIANTS)})")
-        print(f"{'=' * 70}")
-        
-        # Update prompt
-        print(f"📝 Updating prompt...")
-        if not update_prompt_rest(variant_num, variant_name, access_token, instance_url):
-            print(f"⚠️ Skipping Variant {variant_num}\n")
-            continue
-        
-        time.sleep(3)
-        
-        # Execute
-        print(f"🚀 Executing prompt...")
-        if not execute_prompt_api(variant_num, access_token, instance_url):
-            print(f"⚠️ Skipping Variant {variant_num}\n")
-            continue
-        
-        # Query response
-        print(f"📊 Querying response...")
-        response_data = query_response(variant_num, variant_name)
-        
-        if response_data:
-            results.append({
-                "variant_num": variant_num,
-                "variant_name": variant_name,
-                **response_data
-            })
-            print(f"\n✅ Variant {variant_num} COMPLETE!\n")
-        
-        # Wait between variants
-        if idx < len(VARIANTS):
-            print(f"⏸️  Waiting 10 seconds before next variant...\n")
-            time.sleep(10)
+    # Each variant runs on its own clone of PROMPT_ID, so they can execute side by side
+    print(f"🚀 Executing {len(variants)} variants x {len(record_ids)} record(s)...")
+    executor = VariantExecutor(
+        client, PROMPT_ID, record_ids,
+        concurrency=args.concurrency,
+        keep_clones=args.keep_clones,
+        on_result=lambda result: save_output(result, per_record, journal_file.stem),
+        cache=cache,
+        journal=journal
+    )
+    outcomes = executor.run_all(variants)
+    
+    results = [
+        {
+            "variant_num": r["variant_num"],
+            "variant_name": r["variant_name"],
+            "record_id": r["record_id"],
+            "response_id": r["response_id"],
+            "status": r["status"],
+            "html_size": r["html_size"]
+        }
+        for r in outcomes if r.get("html")
+    ]
     
     # Summary
     elapsed = time.time() - start_time
     print(f"{'=' * 70}")
     print(f"EXECUTION SUMMARY")
     print(f"{'=' * 70}")
-    print(f"Successful: {len(results)}/{len(VARIANTS)}")
+    print(f"Successful: {len(results)}/{len(outcomes)}")
     print(f"Total Time: {elapsed/60:.1f} minutes ({elapsed/60/60:.2f} hours)")
-    print(f"Avg Time Per Variant: {elapsed/len(results):.1f} seconds\n")
+    print(f"Avg Time Per Variant: {elapsed/max(len(results), 1):.1f} seconds")
+    print(f"Cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses\n")
+    
+    def suffix(r):
+        return f" @ {r['record_id']}" if per_record else ""
     
     print("Results by Group:")
     print("\nGROUP 1 - Pattern Tests:")
-    for r in results[:7]:
+    for r in results:
         if r['variant_num'] >= 21 and r['variant_num'] <= 27:
-            print(f"  V{r['variant_num']}: {r['status']} | {r['html_size']:,} bytes")
+            print(f"  V{r['variant_num']}{suffix(r)}: {r['status']} | {r['html_size']:,} bytes")
     
     print("\nGROUP 2 - UI Component Tests:")
     for r in results:
         if r['variant_num'] >= 28 and r['variant_num'] <= 35:
-            print(f"  V{r['variant_num']}: {r['status']} | {r['html_size']:,} bytes")
+            print(f"  V{r['variant_num']}{suffix(r)}: {r['status']} | {r['html_size']:,} bytes")
     
     print("\nGROUP 3 - Refined Combinations:")
     for r in results:
         if r['variant_num'] >= 36 and r['variant_num'] <= 39:
-            print(f"  V{r['variant_num']}: {r['status']} | {r['html_size']:,} bytes")
+            print(f"  V{r['variant_num']}{suffix(r)}: {r['status']} | {r['html_size']:,} bytes")
     
     # Save
-    output_dir = TEST_DIR / "outputs"
+    output_dir = TEST_DIR / "outputs" / ("records" if per_record else "")
     output_dir.mkdir(parents=True, exist_ok=True)
     
     summary_file = output_dir / "execution_summary.json"
@@ -276,12 +258,14 @@ def main():
         json.dump({
             "executed_at": datetime.now().isoformat(),
             "total_variants": len(VARIANTS),
+            "record_ids": record_ids,
             "successful": len(results),
             "elapsed_seconds": elapsed,
             "results": results
         }, f, indent=2)
     
     print(f"\n✅ Saved to: {summary_file}")
+    report_metrics(client.metrics, output_dir, "phase0c", client.instance_url, update_baseline=args.update_baseline)
     print(f"📊 Next: Run scoring script")
     print(f"\nFinished: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
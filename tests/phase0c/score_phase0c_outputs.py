@@ -8,52 +8,127 @@ Designed to determine which patterns and UI components add value vs noise.
 import json
 import re
 import os
+import sys
+import argparse
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness import html_features, phrases
+from harness.batch_scoring import DEFAULT_CHUNK_SIZE, run_batch
+from harness.html_features import HtmlFeatures
+from harness.score_cache import ScoreCache, source_version
+from harness.streaming import DEFAULT_CHUNK_CHARS, StreamingFeatures, record_queries
+
 # Configuration
 BASE_DIR = Path("/Users/sgupta/projects-sfdc/gptfy-prompt-factory")
 PHASE0C_DIR = BASE_DIR / "tests" / "phase0c"
 OUTPUT_DIR = PHASE0C_DIR / "outputs"
 COMPARISON_DIR = PHASE0C_DIR / "comparison"
 
-def load_outputs():
-    """Load all HTML outputs from Phase 0C"""
-    outputs = {}
+# Composite weights (0-100): 20, 20, 15, 15, 15, 10, 5
+COMPOSITE_WEIGHTS = {
+    "pattern_effectiveness": 2.0,
+    "ui_impact": 2.0,
+    "evidence_binding": 1.5,
+    "output_quality": 1.5,
+    "analytical_value": 1.5,
+    "information_density": 1.0,
+    "actionability": 0.5
+}
+
+# Cached scores are invalidated whenever this file or the feature extraction changes
+SCORER_ID = "phase0c"
+SCORER_VERSION = source_version(__file__, html_features.__file__, phrases.__file__)
+
+# Pattern effectiveness indicators (counted, case-insensitive)
+PATTERN_INDICATORS = {
+    "risk": r'risk|critical|warning|gap|mitigation',
+    "metrics": r'calculated|total|average|distribution|count',
+    "action": r'next step|recommend|priority|owner|deadline',
+    "timeline": r'days|overdue|velocity|upcoming|progression',
+    "stakeholder": r'champion|buyer|decision maker|role|contact',
+    "rootcause": r'cause|why|factor|contributor|underlying'
+}
+
+# UI components (counted, case-insensitive)
+UI_ELEMENT_PATTERNS = {
+    "stat_cards": r'flex:\s*1|min-width:\s*\d+px.*text-align:\s*center|stat-box',
+    "alert_boxes": r'border-left:\s*\d+px\s+solid|critical-alerts|alert-box',
+    "progress_bars": r'background:\s*linear-gradient|height:\s*\d+px.*progress',
+    "action_cards": r'border-radius:\s*\d+px.*padding:\s*\d+px|action-card',
+    "gradients": r'linear-gradient',
+    "milestones": r'milestone|timeline|node_color',
+    "icons_or_badges": r'padding:\s*\d+px\s*\d+px.*border-radius:\s*\d+px|badge'
+}
+
+EVIDENCE_PATTERN = r'Evidence:.*?='
+
+# Output quality checks (placeholders/nulls are case-sensitive)
+PLACEHOLDER_PATTERN = r'\[.*?\]|TBD|TODO|\{placeholder\}'
+NULL_PATTERN = r'null|undefined|\[X\]'
+ERROR_PATTERN = r'error|fail|exception'
+
+ANALYTICAL_ELEMENTS = [
+    r'risk assessment', r'gap analysis', r'recommendation',
+    r'priority', r'impact', r'root cause', r'why it matters',
+    r'strategy', r'heuristic', r'judgment', r'diagnosis'
+]
+
+ACTION_PATTERN = r'action|recommend|next step|do immediately'
+PRIORITY_PATTERN = r'priority|critical|high|medium|low'
+OWNER_PATTERN = r'owner|assigned to|responsible'
+
+# Every pattern above; their literal prefixes are located in one pass per output
+SCORER_PATTERNS = [
+    *PATTERN_INDICATORS.values(), *UI_ELEMENT_PATTERNS.values(), EVIDENCE_PATTERN,
+    PLACEHOLDER_PATTERN, NULL_PATTERN, ERROR_PATTERN, *ANALYTICAL_ELEMENTS,
+    ACTION_PATTERN, PRIORITY_PATTERN, OWNER_PATTERN,
+]
+
+def output_files():
+    """{variant_num: path} for every Phase 0C HTML output"""
+    files = {}
     if not OUTPUT_DIR.exists():
-        return outputs
+        return files
         
     for html_file in OUTPUT_DIR.glob("output_*.html"):
         # Match output_21_variant_name.html
         match = re.match(r'output_(\d+)', html_file.name)
         if match:
-            variant_num = int(match.group(1))
-            with open(html_file, 'r', encoding='utf-8') as f:
-                outputs[variant_num] = {
-                    "content": f.read(),
-                    "filename": html_file.name,
-                    "size_kb": html_file.stat().st_size / 1024
-                }
-    return outputs
-
-def count_pattern(text, pattern):
+            files[int(match.group(1))] = html_file
+    return files
+
+def load_outputs():
+    """Load all HTML outputs from Phase 0C"""
+    return {variant_num: load_output(html_file) for variant_num, html_file in output_files().items()}
+
+def load_output(html_file):
+    """One output as {content, filename, size_kb}"""
+    html_file = Path(html_file)
+    with open(html_file, 'r', encoding='utf-8') as f:
+        return {
+            "content": f.read(),
+            "filename": html_file.name,
+            "size_kb": html_file.stat().st_size / 1024
+        }
+
+def extract_features(html):
+    """Scan an output once; every metric below reads from the result"""
+    return HtmlFeatures(html, SCORER_PATTERNS)
+
+def count_pattern(features, pattern):
     """Count occurrences of a regex pattern"""
-    return len(re.findall(pattern, text, re.IGNORECASE))
+    return features.count(pattern)
 
-def assess_pattern_effectiveness(html, variant_num):
+def assess_pattern_effectiveness(features, variant_num):
     """
     1. PATTERN EFFECTIVENESS (20%)
     Does this pattern generate valuable insights?
     """
     # Look for analytical indicators specific to patterns
-    indicators = {
-        "risk": count_pattern(html, r'risk|critical|warning|gap|mitigation'),
-        "metrics": count_pattern(html, r'calculated|total|average|distribution|count'),
-        "action": count_pattern(html, r'next step|recommend|priority|owner|deadline'),
-        "timeline": count_pattern(html, r'days|overdue|velocity|upcoming|progression'),
-        "stakeholder": count_pattern(html, r'champion|buyer|decision maker|role|contact'),
-        "rootcause": count_pattern(html, r'cause|why|factor|contributor|underlying')
-    }
+    indicators = {name: count_pattern(features, pattern) for name, pattern in PATTERN_INDICATORS.items()}
     
     total_indicators = sum(indicators.values())
     
@@ -76,27 +151,19 @@ def assess_pattern_effectiveness(html, variant_num):
         "reasoning": f"Found {total_indicators} pattern-specific indicators."
     }
 
-def assess_ui_impact(html, variant_num, baseline_html=None):
+def assess_ui_impact(features, variant_num, baseline_html=None):
     """
     2. UI COMPONENT IMPACT (20%)
     Does this UI improve readability vs tables-only baseline?
     """
     # Count distinct UI components with more robust regex
-    ui_elements = {
-        "stat_cards": count_pattern(html, r'flex:\s*1|min-width:\s*\d+px.*text-align:\s*center|stat-box'),
-        "alert_boxes": count_pattern(html, r'border-left:\s*\d+px\s+solid|critical-alerts|alert-box'),
-        "progress_bars": count_pattern(html, r'background:\s*linear-gradient|height:\s*\d+px.*progress'),
-        "action_cards": count_pattern(html, r'border-radius:\s*\d+px.*padding:\s*\d+px|action-card'),
-        "gradients": count_pattern(html, r'linear-gradient'),
-        "milestones": count_pattern(html, r'milestone|timeline|node_color'),
-        "icons_or_badges": count_pattern(html, r'padding:\s*\d+px\s*\d+px.*border-radius:\s*\d+px|badge')
-    }
+    ui_elements = {name: count_pattern(features, pattern) for name, pattern in UI_ELEMENT_PATTERNS.items()}
     
     # Calculate diversity score
     distinct_elements = sum(1 for count in ui_elements.values() if count > 0)
     
     # Tables are baseline
-    has_tables = count_pattern(html, r'<table') > 0
+    has_tables = features.tag_count("table") > 0
     
     if distinct_elements >= 4:
         score = 10
@@ -118,13 +185,13 @@ def assess_ui_impact(html, variant_num, baseline_html=None):
         "reasoning": f"Uses {distinct_elements} distinct UI component types (verified via robust regex)."
     }
 
-def assess_evidence_binding(html):
+def assess_evidence_binding(features):
     """
     3. EVIDENCE BINDING (15%)
     Specific field citations vs generic statements
     """
     # Count evidence citations (Evidence: Field = Value)
-    citations = count_pattern(html, r'Evidence:.*?=')
+    citations = count_pattern(features, EVIDENCE_PATTERN)
     
     if citations >= 8:
         score = 10
@@ -143,17 +210,17 @@ def assess_evidence_binding(html):
         "reasoning": f"Found {citations} specific evidence citations."
     }
 
-def assess_output_quality(html):
+def assess_output_quality(features):
     """
     4. OUTPUT QUALITY (15%)
     Professional appearance, no placeholders
     """
     # Quality checks
-    has_placeholders = bool(re.search(r'\[.*?\]|TBD|TODO|\{placeholder\}', html))
-    has_nulls = bool(re.search(r'null|undefined|\[X\]', html))
-    has_errors = bool(re.search(r'error|fail|exception', html, re.IGNORECASE))
-    is_single_line = '\n' not in html.strip()
-    starts_with_div = html.strip().startswith('<div')
+    has_placeholders = features.search(PLACEHOLDER_PATTERN, 0)
+    has_nulls = features.search(NULL_PATTERN, 0)
+    has_errors = features.search(ERROR_PATTERN)
+    is_single_line = features.is_single_line
+    starts_with_div = features.starts_with_div
     
     score = 10
     if has_placeholders: score -= 3
@@ -172,19 +239,13 @@ def assess_output_quality(html):
         "reasoning": f"Quality score {score}/10 based on structure and content integrity."
     }
 
-def assess_analytical_value(html):
+def assess_analytical_value(features):
     """
     5. ANALYTICAL VALUE (15%)
     Beyond data display - actual insights
     """
     # Count analytical sections/elements
-    elements = [
-        r'risk assessment', r'gap analysis', r'recommendation',
-        r'priority', r'impact', r'root cause', r'why it matters',
-        r'strategy', r'heuristic', r'judgment', r'diagnosis'
-    ]
-    
-    found_count = sum(1 for e in elements if re.search(e, html, re.IGNORECASE))
+    found_count = sum(1 for e in ANALYTICAL_ELEMENTS if features.search(e))
     
     if found_count >= 6:
         score = 10
@@ -225,14 +286,14 @@ def assess_info_density(size_kb):
         "reasoning": f"Output size is {size_kb:.2f} KB (optimal is 4-7 KB)."
     }
 
-def assess_actionability(html):
+def assess_actionability(features):
     """
     7. ACTIONABILITY (5%)
     Provides next steps or decisions
     """
-    has_actions = bool(re.search(r'action|recommend|next step|do immediately', html, re.IGNORECASE))
-    has_priorities = bool(re.search(r'priority|critical|high|medium|low', html, re.IGNORECASE))
-    has_owners = bool(re.search(r'owner|assigned to|responsible', html, re.IGNORECASE))
+    has_actions = features.search(ACTION_PATTERN)
+    has_priorities = features.search(PRIORITY_PATTERN)
+    has_owners = features.search(OWNER_PATTERN)
     
     score = 0
     if has_actions: score += 5
@@ -245,32 +306,25 @@ def assess_actionability(html):
         "reasoning": f"Actionability score {score}/10."
     }
 
-def score_variant(variant_num, output_data, baseline_html=None):
+def score_variant(variant_num, output_data, baseline_html=None, weights=COMPOSITE_WEIGHTS):
     """Score a single variant using the 7 metrics"""
-    html = output_data["content"]
-    size_kb = output_data["size_kb"]
-    
+    features = extract_features(output_data["content"])
+    return score_features(variant_num, features, output_data["size_kb"], baseline_html, weights)
+
+def score_features(variant_num, features, size_kb, baseline_html=None, weights=COMPOSITE_WEIGHTS):
+    """The 7 metrics from an output's features (HtmlFeatures or StreamingFeatures)"""
     metrics = {
-        "pattern_effectiveness": assess_pattern_effectiveness(html, variant_num),
-        "ui_impact": assess_ui_impact(html, variant_num, baseline_html),
-        "evidence_binding": assess_evidence_binding(html),
-        "output_quality": assess_output_quality(html),
-        "analytical_value": assess_analytical_value(html),
+        "pattern_effectiveness": assess_pattern_effectiveness(features, variant_num),
+        "ui_impact": assess_ui_impact(features, variant_num, baseline_html),
+        "evidence_binding": assess_evidence_binding(features),
+        "output_quality": assess_output_quality(features),
+        "analytical_value": assess_analytical_value(features),
         "information_density": assess_info_density(size_kb),
-        "actionability": assess_actionability(html)
+        "actionability": assess_actionability(features)
     }
     
     # Calculate weighted composite (0-100)
-    # Weights: 20, 20, 15, 15, 15, 10, 5 = 100
-    composite_score = (
-        metrics["pattern_effectiveness"]["score"] * 2.0 +
-        metrics["ui_impact"]["score"] * 2.0 +
-        metrics["evidence_binding"]["score"] * 1.5 +
-        metrics["output_quality"]["score"] * 1.5 +
-        metrics["analytical_value"]["score"] * 1.5 +
-        metrics["information_density"]["score"] * 1.0 +
-        metrics["actionability"]["score"] * 0.5
-    )
+    composite_score = sum(metrics[name]["score"] * weight for name, weight in weights.items())
     
     return {
         "variant_num": variant_num,
@@ -278,6 +332,33 @@ def score_variant(variant_num, output_data, baseline_html=None):
         "composite_score": round(composite_score, 1)
     }
 
+def score_file(path):
+    """Score one output file (batch mode worker)"""
+    match = re.match(r'output_(\d+)', Path(path).name)
+    return score_variant(int(match.group(1)) if match else None, load_output(path))
+
+def score_file_streaming(path, chunk_chars=DEFAULT_CHUNK_CHARS, gap_limit=None):
+    """
+    score_file in bounded memory: the output is read in chunks, never whole.
+    The stat_cards/progress_bars/action_cards/icons_or_badges counts are
+    alternations with a .* branch and need gap_limit (approximate counts).
+    """
+    match = re.match(r'output_(\d+)', Path(path).name)
+    features = StreamingFeatures.from_file(path, stream_queries(), chunk_chars, gap_limit=gap_limit)
+    result = score_features(int(match.group(1)) if match else None, features, Path(path).stat().st_size / 1024)
+    if features.approximate:
+        result["approximate"] = features.approximate
+    return result
+
+_stream_queries = None
+
+def stream_queries():
+    """The (pattern, flags, kind) queries score_features makes, recorded once per process"""
+    global _stream_queries
+    if _stream_queries is None:
+        _stream_queries = record_queries(lambda features: score_features(None, features, 0))
+    return _stream_queries
+
 def generate_report(results):
     """Generate markdown report for Phase 0C"""
     report = ["# Phase 0C: Comprehensive Pattern Testing Results"]
@@ -339,23 +420,62 @@ def generate_report(results):
     return "\n".join(report)
 
 def main():
+    parser = argparse.ArgumentParser(description="Score Phase 0C variant outputs")
+    parser.add_argument("--batch", metavar="DIR",
+                        help="Score every *.html under DIR in a process pool instead of the phase0c outputs")
+    parser.add_argument("--out", default=str(COMPARISON_DIR / "batch_scores.jsonl"),
+                        help="Batch mode sink (.jsonl, or .csv for flattened metrics)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Outputs per batch work unit")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rescore every output instead of reusing cached scores for unchanged ones")
+    parser.add_argument("--stream", action="store_true",
+                        help="Batch mode: read each output in chunks (bounded memory for multi-MB outputs)")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS, help="Streaming read size")
+    parser.add_argument("--gap-limit", type=int, default=None,
+                        help="Streaming: count .* in alternations as .{0,N} (required by --stream; approximate)")
+    args = parser.parse_args()
+    
+    if args.stream and args.gap_limit is None:
+        parser.error("--stream needs --gap-limit: four UI element counts are alternations with a .* branch")
+    
+    if args.batch:
+        scorer = (partial(score_file_streaming, chunk_chars=args.chunk_chars, gap_limit=args.gap_limit)
+                  if args.stream else score_file)
+        run_batch(scorer, args.batch, args.out, workers=args.workers, chunk_size=args.chunk_size)
+        return
+    
     print("======================================================================")
     print("PHASE 0C: LIGHTWEIGHT PATTERN-FOCUSED SCORING")
     print("======================================================================")
     
-    outputs = load_outputs()
-    if not outputs:
+    files = output_files()
+    if not files:
         print("❌ No outputs found in tests/phase0c/outputs/")
         return
         
-    print(f"✅ Loaded {len(outputs)} outputs")
+    print(f"✅ Found {len(files)} outputs")
     
-    baseline_html = outputs.get(30, {}).get("content")
+    cache = None if args.no_cache else ScoreCache(SCORER_ID, SCORER_VERSION, COMPOSITE_WEIGHTS)
+    baseline_html = None
     
     results = []
-    for vnum, data in outputs.items():
+    for vnum, html_file in sorted(files.items()):
+        cached = cache.get(html_file) if cache else None
+        if cached is not None:
+            results.append({"variant_num": vnum, **cached})
+            continue
+        if baseline_html is None and 30 in files:
+            baseline_html = load_output(files[30])["content"]
         print(f"📊 Scoring Variant {vnum}...")
-        results.append(score_variant(vnum, data, baseline_html))
+        result = score_variant(vnum, load_output(html_file), baseline_html)
+        results.append(result)
+        if cache:
+            cache.put(html_file, {k: v for k, v in result.items() if k != "variant_num"})
+    
+    if cache:
+        cache.save()
+        print(f"♻️  Score cache: {cache.stats['hits']} reused, {cache.stats['misses']} scored")
         
     # Sort results by variant number
     results.sort(key=lambda x: x["variant_num"])
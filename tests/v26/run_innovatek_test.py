@@ -4,22 +4,31 @@ V2.6 End-to-End Test - Innovatek Account
 Fully automated: pipeline -> GPTfy API -> score -> iterate
 
 Flow:
-1. Start pipeline via TestHarnessController REST API
-2. Poll until Stage 9 completes (get promptId)
+1. Start --runs pipeline runs at once via TestHarnessController REST API
+2. Poll all runs together until each reaches Stage 9 (get promptId)
 3. Get promptRequestId from prompt record
 4. Call GPTfy executePrompt API directly (bypasses Stage 10 Apex)
-5. Score the HTML response
-6. Iterate if score < 90
+5. Score the HTML response as soon as it arrives
+6. Abort the remaining runs once one scores >= 90
 """
 
-import subprocess
+import argparse
 import json
-import time
 import sys
 import re
+import threading
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from harness.metrics import report as report_metrics
+from harness.phrases import get_matcher
+from harness.pipelines import PipelineLauncher
+from harness.polling import SUCCESS_STATUSES, TERMINAL_STATUSES, wait_for_responses
+from harness.response_cache import CACHE_MODES, ResponseCache
+from harness.responses import extract_html
+from harness.sf_client import SalesforceClient, SalesforceError
+
 # Configuration
 ORG_ALIAS = "agentictso"
 INNOVATEK_ACCOUNT_ID = "001QH000024pY3ZYAU"
@@ -59,139 +68,61 @@ DATE_ANALYSIS_PATTERNS = [
 ]
 
 
-def run_command(cmd, timeout=300):
-    """Run shell command and return (success, stdout, stderr)"""
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Command timed out"
-
-
-def parse_apex_rest_response(stdout):
-    """Parse Apex REST response (handles double-encoded JSON from JSON.serialize)"""
-    try:
-        first_parse = json.loads(stdout)
-        if isinstance(first_parse, str):
-            return json.loads(first_parse)
-        return first_parse
-    except json.JSONDecodeError:
-        return None
+def get_client():
+    """Get a pooled Salesforce REST client (credentials fetched once)"""
+    return SalesforceClient.from_cli(ORG_ALIAS)
 
 
-def get_credentials():
-    """Get Salesforce access token and instance URL"""
-    cmd = f"sf org display -o {ORG_ALIAS} --json 2>/dev/null"
-    success, stdout, _ = run_command(cmd)
-    if not success:
-        raise Exception("Failed to get credentials")
-    data = json.loads(stdout)
-    return data['result']['accessToken'], data['result']['instanceUrl']
-
-
-def start_pipeline(access_token, instance_url):
-    """Start pipeline via TestHarnessController REST API, return run_id"""
-    url = f"{instance_url}/services/apexrest/test-harness/start-pipeline"
-    payload = {
-        "rootObject": ROOT_OBJECT,
-        "sampleRecordId": INNOVATEK_ACCOUNT_ID,
-        "templateName": TEMPLATE_NAME,
-        "businessContext": BUSINESS_CONTEXT,
-        "outputFormat": OUTPUT_FORMAT
+def pipeline_params(account_id):
+    """start-pipeline arguments for one run against an account"""
+    return {
+        "root_object": ROOT_OBJECT,
+        "sample_record_id": account_id,
+        "template_name": TEMPLATE_NAME,
+        "business_context": BUSINESS_CONTEXT,
+        "output_format": OUTPUT_FORMAT,
     }
 
-    with open("/tmp/pipeline_payload.json", 'w') as f:
-        json.dump(payload, f)
-
-    cmd = f'curl -s -X POST "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @/tmp/pipeline_payload.json'
-    success, stdout, stderr = run_command(cmd, timeout=60)
-
-    if not success:
-        raise Exception(f"Pipeline start failed: {stderr}")
-
-    response = parse_apex_rest_response(stdout)
-    if not response or not response.get('success'):
-        raise Exception(f"Pipeline start failed: {response}")
-
-    return response.get('runId')
-
-
-def poll_until_stage9(run_id, access_token, instance_url, max_wait=600):
-    """Poll run status until Stage 9 completes, return prompt_id"""
-    url = f"{instance_url}/services/apexrest/test-harness/run-status/{run_id}"
-    start_time = time.time()
 
-    while time.time() - start_time < max_wait:
-        cmd = f'curl -s "{url}" -H "Authorization: Bearer {access_token}"'
-        success, stdout, _ = run_command(cmd, timeout=30)
-
-        if success:
-            response = parse_apex_rest_response(stdout)
-            if response:
-                stage = response.get('currentStage', 0)
-                status = response.get('status', 'Unknown')
-                prompt_id = response.get('createdPromptId')
-
-                print(f"   Stage {stage}: {status}")
-
-                if status == 'Failed':
-                    raise Exception(f"Pipeline failed at stage {stage}")
-
-                if stage >= 9 and prompt_id:
-                    return prompt_id
-
-        time.sleep(10)
-
-    raise Exception("Timeout waiting for Stage 9")
-
-
-def get_prompt_request_id(prompt_id):
-    """Get ccai__Prompt_Request_Id__c from the prompt record"""
-    query = f"SELECT ccai__Prompt_Request_Id__c FROM ccai__AI_Prompt__c WHERE Id = '{prompt_id}'"
-    cmd = f'sf data query -o {ORG_ALIAS} -q "{query}" --json 2>/dev/null'
-    success, stdout, _ = run_command(cmd, timeout=30)
+def get_prompt(prompt_id, client):
+    """Get the prompt fields that identify an execution (request id, command, DCM, connection)"""
+    query = ("SELECT ccai__Prompt_Request_Id__c, ccai__Prompt_Command__c, "
+             "ccai__AI_Data_Extraction_Mapping__c, ccai__AI_Connection__c "
+             f"FROM ccai__AI_Prompt__c WHERE Id = '{prompt_id}'")
+    try:
+        records = client.query(query, timeout=30)
+    except SalesforceError:
+        return None
 
-    if success:
-        try:
-            result = json.loads(stdout)
-            records = result.get('result', {}).get('records', [])
-            if records:
-                return records[0].get('ccai__Prompt_Request_Id__c')
-        except:
-            pass
-    return None
+    return records[0] if records else None
 
 
-def execute_gptfy_and_get_html(prompt_request_id, record_id, access_token, instance_url):
+def execute_gptfy_and_get_html(prompt_request_id, record_id, client):
     """Call GPTfy executePrompt API and return HTML from responseBody"""
-    url = f"{instance_url}/services/apexrest/ccai/v1/executePrompt"
-    payload = {
-        "promptRequestId": prompt_request_id,
-        "recordId": record_id,
-        "customPromptCommand": ""
-    }
-
-    with open("/tmp/gptfy_payload.json", 'w') as f:
-        json.dump(payload, f)
-
-    cmd = f'curl -s -X POST "{url}" -H "Authorization: Bearer {access_token}" -H "Content-Type: application/json" -d @/tmp/gptfy_payload.json'
-    success, stdout, _ = run_command(cmd, timeout=180)
-
-    if not success:
+    try:
+        response = client.execute_prompt(prompt_request_id, record_id, timeout=180)
+    except SalesforceError:
         return None, "API call failed"
 
-    try:
-        response = json.loads(stdout)
-        status = response.get('status')
-        html = response.get('responseBody', '')
-        response_id = response.get('responseId')
+    status = response.get('status')
+    html = response.get('responseBody', '')
+    response_id = response.get('responseId')
+
+    if status in SUCCESS_STATUSES and html:
+        return html, response_id
 
-        if status == 'Processed' and html:
+    # Not finished inline - follow the response by its Id instead of giving up
+    if response_id and status not in TERMINAL_STATUSES:
+        try:
+            record = wait_for_responses(client, [response_id], key=prompt_request_id, timeout=180)[response_id]
+        except SalesforceError:
+            record = None
+        html = extract_html(record) if record else None
+        if html and record.get('ccai__Status__c') in SUCCESS_STATUSES:
             return html, response_id
-        else:
-            return None, f"Status: {status}"
-    except json.JSONDecodeError:
-        return None, "Invalid JSON response"
+        status = (record or {}).get('ccai__Status__c', status)
+
+    return None, f"Status: {status}"
 
 
 def score_output(html):
@@ -213,16 +144,10 @@ def score_output(html):
         date_count += len(re.findall(pattern, html, re.IGNORECASE))
     metrics['dateAnalysis'] = date_count
 
-    # Forbidden phrases
-    forbidden_count = 0
-    forbidden_found = []
-    for phrase in FORBIDDEN_PHRASES:
-        matches = re.findall(re.escape(phrase), html, re.IGNORECASE)
-        if matches:
-            forbidden_count += len(matches)
-            forbidden_found.append(phrase)
+    # Forbidden phrases (all counted in one pass)
+    forbidden_count, forbidden_found = get_matcher(FORBIDDEN_PHRASES).count(html)
     metrics['forbiddenPhrases'] = forbidden_count
-    metrics['forbiddenFound'] = forbidden_found
+    metrics['forbiddenFound'] = [phrase for phrase, _ in forbidden_found]
 
     # Color diversity
     has_red = 'BA0517' in html or 'ba0517' in html.lower()
@@ -287,82 +212,96 @@ def print_summary(metrics):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="V2.6 Innovatek Account 360 test")
+    parser.add_argument("--runs", type=int, default=MAX_ITERATIONS,
+                        help=f"pipeline runs to launch concurrently (default {MAX_ITERATIONS})")
+    parser.add_argument("--accounts", default=INNOVATEK_ACCOUNT_ID,
+                        help="comma-separated account ids; runs cycle through them")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="auto",
+                        help="response cache: auto (read-through), record, replay or off")
+    parser.add_argument("--fresh", action="store_true",
+                        help="bypass cached responses and record fresh samples")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run's step latencies as the outlier baseline")
+    args = parser.parse_args()
+    cache = ResponseCache(mode="record" if args.fresh else args.cache_mode)
+    accounts = [a.strip() for a in args.accounts.split(',') if a.strip()]
+
     print(f"\n{'=' * 70}")
     print("V2.6 INNOVATEK ACCOUNT 360 TEST")
     print(f"{'=' * 70}")
-    print(f"Target: {TARGET_SCORE}/100 | Max Iterations: {MAX_ITERATIONS}")
+    print(f"Target: {TARGET_SCORE}/100 | Concurrent Runs: {args.runs}")
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # Get credentials once
     print("\n[1] Getting credentials...")
-    access_token, instance_url = get_credentials()
-    print(f"    Connected: {instance_url}")
+    client = get_client()
+    print(f"    Connected: {client.instance_url}")
 
-    best_score = 0
+    print_lock = threading.Lock()
 
-    for iteration in range(1, MAX_ITERATIONS + 1):
-        print(f"\n{'=' * 70}")
-        print(f"ITERATION {iteration}/{MAX_ITERATIONS}")
-        print(f"{'=' * 70}")
+    def log(run, message):
+        with print_lock:
+            print(f"    [run {run['index']}] {message}")
 
-        # Start pipeline
-        print("\n[2] Starting pipeline...")
-        try:
-            run_id = start_pipeline(access_token, instance_url)
-            print(f"    Run ID: {run_id}")
-        except Exception as e:
-            print(f"    FAILED: {e}")
-            continue
-
-        # Poll for Stage 9
-        print("\n[3] Waiting for Stage 9...")
-        try:
-            prompt_id = poll_until_stage9(run_id, access_token, instance_url)
-            print(f"    Prompt ID: {prompt_id}")
-        except Exception as e:
-            print(f"    FAILED: {e}")
-            continue
-
-        # Get prompt request ID
-        print("\n[4] Getting prompt request ID...")
-        prompt_request_id = get_prompt_request_id(prompt_id)
+    def evaluate(run):
+        """Stage 9 done: execute the run's prompt and score it"""
+        iteration, prompt_id = run['index'], run['prompt_id']
+        account_id = run['params']['sample_record_id']
+        prompt = get_prompt(prompt_id, client) or {}
+        prompt_request_id = prompt.get('ccai__Prompt_Request_Id__c')
         if not prompt_request_id:
-            print("    FAILED: No prompt request ID")
-            continue
-        print(f"    Request ID: {prompt_request_id}")
-
-        # Execute GPTfy
-        print("\n[5] Calling GPTfy API...")
-        html, response_info = execute_gptfy_and_get_html(prompt_request_id, INNOVATEK_ACCOUNT_ID, access_token, instance_url)
-        if not html:
-            print(f"    FAILED: {response_info}")
-            continue
-        print(f"    Response: {response_info} | HTML: {len(html)} chars")
-
-        # Score
-        print("\n[6] Scoring output...")
+            raise Exception("No prompt request ID")
+
+        # Each run is its own cached sample of the same input
+        cache_key = cache.key(
+            prompt.get('ccai__Prompt_Command__c'), account_id,
+            prompt.get('ccai__AI_Data_Extraction_Mapping__c'), prompt.get('ccai__AI_Connection__c'),
+            sample=iteration
+        )
+        cached = cache.get(cache_key)
+        if cached:
+            html, response_info = cached['html'], cached['response_id']
+            log(run, f"cached response: {response_info} | HTML: {len(html)} chars")
+        else:
+            html, response_info = execute_gptfy_and_get_html(prompt_request_id, account_id, client)
+            if not html:
+                raise Exception(response_info)
+            cache.put(cache_key, {"response_id": response_info, "status": "Processed", "html": html,
+                                  "prompt_id": prompt_id, "record_id": account_id})
+            log(run, f"response: {response_info} | HTML: {len(html)} chars")
+
         metrics = score_output(html)
-        print_summary(metrics)
+        html_file, _ = save_output(iteration, html, metrics, prompt_id)
+        log(run, f"saved: {html_file.name}")
+        return metrics.get('compositeScore', 0), metrics
 
-        # Save
-        html_file, metrics_file = save_output(iteration, html, metrics, prompt_id)
-        print(f"\n[7] Saved: {html_file.name}")
+    # Launch every run at once; each is scored as soon as its prompt exists
+    print(f"\n[2] Starting {args.runs} pipeline runs...")
+    launcher = PipelineLauncher(client, evaluate, target_score=TARGET_SCORE, on_update=log)
+    runs = launcher.run_all([pipeline_params(accounts[i % len(accounts)]) for i in range(args.runs)])
 
-        score = metrics.get('compositeScore', 0)
-        best_score = max(best_score, score)
+    best_score = 0
+    for run in runs:
+        print(f"\n{'=' * 70}")
+        print(f"RUN {run['index']}/{args.runs} | {run['run_id']} | {run['status']} | {run.get('elapsed', 0)}s")
+        print(f"{'=' * 70}")
+        if run['result']:
+            print_summary(run['result'])
+            best_score = max(best_score, run['score'])
+        elif run.get('error'):
+            print(f"    FAILED: {run['error']}")
 
-        if score >= TARGET_SCORE:
-            print(f"\n{'=' * 70}")
-            print(f"SUCCESS! Score {score} >= {TARGET_SCORE}")
-            print(f"{'=' * 70}")
-            break
-        else:
-            print(f"\n    Score {score} < {TARGET_SCORE} - {'iterating...' if iteration < MAX_ITERATIONS else 'max iterations reached'}")
+    if best_score >= TARGET_SCORE:
+        print(f"\n{'=' * 70}")
+        print(f"SUCCESS! Score {best_score} >= {TARGET_SCORE}")
+        print(f"{'=' * 70}")
 
     # Final
     print(f"\n{'=' * 70}")
     print(f"RESULT: {'PASS' if best_score >= TARGET_SCORE else 'NEEDS IMPROVEMENT'}")
     print(f"Best Score: {best_score}/100 | Target: {TARGET_SCORE}/100")
+    report_metrics(client.metrics, TEST_DIR / "outputs", "v26", client.instance_url, update_baseline=args.update_baseline)
     print(f"Finished: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'=' * 70}\n")
 